@@ -0,0 +1,126 @@
+"""Compares the throughput of HTMLBuilder against the list based splicing it
+used to do, on a page which imports deeply nested, large partials. Every
+paragraph within a partial retrieves a variable, so the builder replaces
+tokens while many tokens from the enclosing partials are still pending.
+
+Usage:
+    python benchmarks/html_builder.py --depth 8 --paragraphs 500
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vanillaplusjs.build.build_context import BuildContext  # noqa: E402
+from vanillaplusjs.build.html.builder import HTMLBuilder  # noqa: E402
+from vanillaplusjs.build.html.manips.template import (  # noqa: E402
+    TemplateManipulator,
+)
+from vanillaplusjs.build.html.tokenizer import tokenize  # noqa: E402
+
+
+class ListHTMLBuilder(HTMLBuilder):
+    """HTMLBuilder as it was before replacement tokens were spliced into a
+    deque, i.e., O(n) for every token and every replacement
+    """
+
+    def handle_token(self, token) -> None:
+        stack = [token]
+        while stack:
+            token = stack.pop(0)
+            if self.mark is None:
+                for manipulator in self.manipulators:
+                    if manipulator.start_mark(token):
+                        self.mark = manipulator
+                        break
+
+                if self.mark is None:
+                    self.output.append(token)
+                    continue
+
+            replacement_tokens = self.mark.continue_mark(token)
+            if replacement_tokens is not None:
+                stack = replacement_tokens + stack
+                self.mark = None
+
+
+def generate(folder: str, depth: int, paragraphs: int) -> str:
+    partials = os.path.join(folder, "src", "partials")
+    os.makedirs(partials, exist_ok=True)
+    for level in range(depth):
+        body = "".join(
+            f'<p>{i} <!--[STACK: ["retrieve", "title"]]--></p>\n'
+            for i in range(paragraphs)
+        )
+        if level + 1 < depth:
+            nested = json.dumps([f"/level{level + 1}.html", {"title": f"L{level}"}])
+            middle = len(body) // 2
+            middle = body.index("\n", middle) + 1
+            body = body[:middle] + f"<!--[TEMPLATE: {nested}]-->\n" + body[middle:]
+        with open(os.path.join(partials, f"level{level}.html"), "w") as f:
+            f.write(body)
+
+    top = json.dumps(["/level0.html", {"title": "Top"}])
+    return (
+        "<!DOCTYPE html><html><head><title>Benchmark</title></head><body>"
+        f"<!--[TEMPLATE: {top}]--></body></html>"
+    )
+
+
+def run(builder_cls, context: BuildContext, tokens: list) -> int:
+    manipulator = TemplateManipulator(
+        context, os.path.join("src", "public", "index.html"), "build"
+    )
+    builder = builder_cls([manipulator])
+    produced = 0
+    for token in tokens:
+        builder.handle_token(token)
+        produced += len(builder.consume_tokens())
+    return produced
+
+
+def timeit(name: str, fn, repeat: int):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:<12} {best * 1000:9.1f}ms {result / best:12.0f} tokens/s")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=8)
+    parser.add_argument("--paragraphs", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    try:
+        html = generate(folder, args.depth, args.paragraphs)
+        context = BuildContext(folder, dev=False, symlinks=False)
+        tokens = list(tokenize(io.StringIO(html)))
+
+        expected = timeit(
+            "list", lambda: run(ListHTMLBuilder, context, tokens), args.repeat
+        )
+        produced = timeit(
+            "deque", lambda: run(HTMLBuilder, context, tokens), args.repeat
+        )
+        assert produced == expected
+        print(f"{produced} output tokens from {args.depth} nested partials")
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()
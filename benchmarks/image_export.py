@@ -0,0 +1,96 @@
+"""Compares exporting every size of a large photo by decoding, cropping and
+resizing the source for each output, as the exporter used to, against
+produce_images, which decodes once and resizes from a pyramid.
+
+Usage:
+    python benchmarks/image_export.py --width 6000 --height 4000
+"""
+import argparse
+import dataclasses
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PIL import Image  # noqa: E402
+from vanillaplusjs.build.html.manips.images.cover_fit import cover_fit  # noqa: E402
+from vanillaplusjs.build.html.manips.images.exporter import (  # noqa: E402
+    produce_images,
+)
+from vanillaplusjs.build.html.manips.images.metadata import (  # noqa: E402
+    CropSettingsCover,
+)
+
+
+FORMATS = {"jpeg": {"quality": 85}, "webp": {"quality": 90, "method": 4}}
+
+
+def produce_separately(src_file: str, exports: dict) -> None:
+    for (width, height), targets in exports.items():
+        for dst_file, format, formatter_kwargs in targets:
+            image = Image.open(src_file)
+            (x, y, w, h) = cover_fit(
+                source_width=image.width,
+                source_height=image.height,
+                dest_width=width,
+                dest_height=height,
+                **dataclasses.asdict(CropSettingsCover()),
+            )
+            image = image.crop((x, y, x + w, y + h))
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+            image.save(dst_file, format=format, **formatter_kwargs)
+
+
+def timeit(name: str, fn) -> None:
+    started_at = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started_at
+    suffix = "" if result is None else f" peak {result / (1024 * 1024):.1f}MiB"
+    print(f"{name:<10} {elapsed * 1000:9.1f}ms{suffix}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=6000)
+    parser.add_argument("--height", type=int, default=4000)
+    parser.add_argument("--target-width", type=int, default=600)
+    parser.add_argument("--target-height", type=int, default=300)
+    parser.add_argument("--resolutions", type=int, default=5)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    try:
+        src_file = os.path.join(folder, "source.jpg")
+        Image.effect_mandelbrot(
+            (args.width, args.height), (-2, -1.25, 1, 1.25), 64
+        ).convert("RGB").save(src_file, quality=95)
+
+        exports = dict(
+            (
+                (args.target_width * r, args.target_height * r),
+                [
+                    (
+                        os.path.join(folder, f"{args.target_width * r}.{fmt}"),
+                        fmt,
+                        kwargs,
+                    )
+                    for fmt, kwargs in FORMATS.items()
+                ],
+            )
+            for r in range(1, args.resolutions + 1)
+        )
+
+        timeit("separate", lambda: produce_separately(src_file, exports))
+        timeit(
+            "pyramid",
+            lambda: produce_images(src_file, exports, "cover", CropSettingsCover()),
+        )
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()
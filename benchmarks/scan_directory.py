@@ -0,0 +1,112 @@
+"""Compares the time it takes to find every file and its signature within a
+source folder using os.walk (how cold builds used to detect changes) against
+scan_directory, both without and with the index from a previous scan.
+
+Usage:
+    python benchmarks/scan_directory.py --dirs 200 --files 50
+
+Pass --folder to benchmark an existing project instead of a generated one,
+e.g., one on a network filesystem.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from vanillaplusjs.build.directory_scan import scan_directory  # noqa: E402
+from vanillaplusjs.build.file_signature import get_file_signature  # noqa: E402
+
+
+def walk(folder: str) -> dict:
+    result = dict()
+    for (dirpath, _, filenames) in os.walk(os.path.join(folder, "src")):
+        for filename in filenames:
+            relpath = os.path.relpath(os.path.join(dirpath, filename), folder)
+            result[relpath] = get_file_signature(os.path.join(folder, relpath))
+    return result
+
+
+def generate(folder: str, dirs: int, files: int) -> None:
+    for dir_idx in range(dirs):
+        dir_path = os.path.join(
+            folder, "src", "public", f"group{dir_idx % 10}", f"dir{dir_idx}"
+        )
+        os.makedirs(dir_path, exist_ok=True)
+        for file_idx in range(files):
+            with open(os.path.join(dir_path, f"file{file_idx}.js"), "w") as f:
+                f.write(f"export const value = {file_idx};\n")
+
+    # directories modified within the last few seconds are never reused
+    for (dirpath, _, _) in os.walk(folder):
+        os.utime(dirpath, (time.time() - 60, time.time() - 60))
+
+
+def timeit(name: str, fn, repeat: int):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:<28} {best * 1000:9.1f}ms")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--folder", help="an existing project to scan")
+    parser.add_argument("--dirs", type=int, default=200)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    folder = args.folder
+    temp_folder = None
+    if folder is None:
+        temp_folder = tempfile.mkdtemp()
+        folder = temp_folder
+        generate(folder, args.dirs, args.files)
+
+    try:
+        expected = timeit("os.walk + lstat", lambda: walk(folder), args.repeat)
+        cold = timeit(
+            "scan_directory",
+            lambda: scan_directory(folder, "src", max_workers=args.threads),
+            args.repeat,
+        )
+        assert cold.files == expected
+
+        known_files = dict()
+        for relpath in cold.files:
+            (dir_relpath, filename) = os.path.split(relpath)
+            known_files.setdefault(dir_relpath, []).append(filename)
+
+        warm = timeit(
+            "scan_directory (indexed)",
+            lambda: scan_directory(
+                folder,
+                "src",
+                old_index=cold.index,
+                known_files=known_files,
+                max_workers=args.threads,
+            ),
+            args.repeat,
+        )
+        assert warm.files == expected
+        print(
+            f"{len(expected)} files; indexed scan listed {warm.listed} and "
+            f"reused {warm.reused} directories"
+        )
+    finally:
+        if temp_folder is not None:
+            shutil.rmtree(temp_folder)
+
+
+if __name__ == "__main__":
+    main()
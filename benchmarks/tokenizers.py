@@ -0,0 +1,95 @@
+"""Measures the throughput of the css and js tokenizers in MB/s on generated
+stylesheets and scripts, or on the given files.
+
+Usage:
+    python benchmarks/tokenizers.py --size 2
+    python benchmarks/tokenizers.py --css path/to/main.css --js path/to/app.js
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import vanillaplusjs.build.css.tokenizer  # noqa: E402
+import vanillaplusjs.build.js.tokenizer  # noqa: E402
+
+
+CSS_BLOCK = """/* card styles, see https://example.com/docs */
+.card-{i} > .card-body:hover, #main-{i} .title::after {{
+    background: url(/img/background-{i}.png) no-repeat;
+    font-family: "Helvetica Neue", 'Segoe UI', sans-serif;
+    margin: 0 auto -1.5rem;
+    width: calc(100% - {i}px);
+    content: "\\201C";
+}}
+@media (min-width: 768px) {{ .card-{i} {{ padding: 12px 0.5em; }} }}
+"""
+
+JS_BLOCK = """// helpers for widget {i}
+export function formatWidget{i}(value, options = {{}}) {{
+    /* normalize the value before formatting it */
+    const pattern = /^[a-z0-9_-]+$/i;
+    if (!pattern.test(value)) {{
+        throw new Error("invalid value for widget {i}: " + value);
+    }}
+    return `${{options.prefix || ''}}${{value}}`.replace(/\\s+/g, ' ');
+}}
+"""
+
+
+def generate(block: str, size_mb: float) -> str:
+    parts = []
+    length = 0
+    i = 0
+    while length < size_mb * 1024 * 1024:
+        part = block.format(i=i)
+        parts.append(part)
+        length += len(part)
+        i += 1
+    return "".join(parts)
+
+
+def measure(name: str, tokenize, text: str, repeat: int) -> None:
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+    best = None
+    tokens = 0
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        tokens = sum(1 for _ in tokenize(io.StringIO(text)))
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+    print(
+        f"{name:<4} {size_mb:6.2f}MB {tokens:9d} tokens "
+        f"{best * 1000:9.1f}ms {size_mb / best:7.2f} MB/s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=float, default=1, help="generated MB")
+    parser.add_argument("--css", help="a stylesheet to tokenize instead")
+    parser.add_argument("--js", help="a script to tokenize instead")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.css is not None:
+        with open(args.css, "r") as f:
+            css = f.read()
+    else:
+        css = generate(CSS_BLOCK, args.size)
+
+    if args.js is not None:
+        with open(args.js, "r") as f:
+            js = f.read()
+    else:
+        js = generate(JS_BLOCK, args.size)
+
+    measure("css", vanillaplusjs.build.css.tokenizer.tokenize, css, args.repeat)
+    measure("js", vanillaplusjs.build.js.tokenizer.tokenize, js, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import helper  # noqa
+import unittest
+import io
+import re
+from vanillaplusjs.build.ioutil import BufferedTextIO, preprocess
+
+
+class Test(unittest.TestCase):
+    def test_preprocesses_across_chunks(self):
+        for chunk_size in range(1, 6):
+            fp = BufferedTextIO(io.StringIO("a\r\nb\rc\fd"), chunk_size=chunk_size)
+            self.assertEqual(fp.read(), preprocess("a\r\nb\rc\fd"))
+            self.assertEqual(fp.tell(), 7)
+            self.assertIsNone(fp.peek(1))
+            self.assertIsNone(fp.read(1))
+
+    def test_read_run_across_chunks(self):
+        for chunk_size in range(1, 6):
+            fp = BufferedTextIO(io.StringIO("abcdef123"), chunk_size=chunk_size)
+            self.assertEqual(fp.read_run(re.compile("[0-9]+")), "")
+            self.assertEqual(fp.read_run(re.compile("[a-z]+")), "abcdef")
+            self.assertEqual(fp.tell(), 6)
+            self.assertEqual(fp.read_run(re.compile("[0-9]+")), "123")
+            self.assertEqual(fp.read_run(re.compile("[0-9]+")), "")
+
+    def test_read_until_across_chunks(self):
+        for chunk_size in range(1, 6):
+            fp = BufferedTextIO(io.StringIO("a comment */ rest"), chunk_size=chunk_size)
+            self.assertEqual(fp.read_until("*/"), ("a comment ", True))
+            self.assertEqual(fp.peek(2), " r")
+            self.assertEqual(fp.read_until("*/"), (" rest", False))
+            self.assertIsNone(fp.peek(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
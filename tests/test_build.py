@@ -2,7 +2,8 @@ import helper  # noqa
 import unittest
 import os
 import shutil
-from vanillaplusjs.build.graph import FileDependencyGraph
+from vanillaplusjs.build.build_context import BuildContext
+from vanillaplusjs.build.build_graphs import load_build_graphs
 import vanillaplusjs.runners.init
 import vanillaplusjs.runners.build
 import time
@@ -127,8 +128,9 @@ class Test(unittest.TestCase):
             for outfile in outfiles_rel_root:
                 self.assertTrue(os.path.exists(os.path.join("tmp", outfile)))
 
-            with open(os.path.join("tmp", "out", "output_graph.json")) as f:
-                output_graph = FileDependencyGraph.load(f)
+            output_graph = load_build_graphs(
+                BuildContext("tmp", dev=False, symlinks=False)
+            ).output
 
             self.assertIn(infile_rel_root, output_graph)
             self.assertEqual(
@@ -142,8 +144,9 @@ class Test(unittest.TestCase):
             for outfile in outfiles_rel_root:
                 self.assertFalse(os.path.exists(os.path.join("tmp", outfile)))
 
-            with open(os.path.join("tmp", "out", "output_graph.json")) as f:
-                output_graph = FileDependencyGraph.load(f)
+            output_graph = load_build_graphs(
+                BuildContext("tmp", dev=False, symlinks=False)
+            ).output
 
             self.assertNotIn(infile_rel_root, output_graph)
         finally:
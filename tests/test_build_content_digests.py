@@ -0,0 +1,72 @@
+import helper  # noqa
+import unittest
+import json
+import os
+import shutil
+from vanillaplusjs.build.build_context import BuildContext
+from vanillaplusjs.build.build_graphs import load_build_graphs
+from vanillaplusjs.build.file_signature import get_file_signature
+import vanillaplusjs.runners.init
+import vanillaplusjs.runners.build
+
+
+SAMPLE_HTML = (
+    '<!DOCTYPE html><html><head><meta charset="utf-8"></head><body></body></html>'
+)
+
+
+class Test(unittest.TestCase):
+    def _touch_and_rebuild(self, content_digests: bool) -> bool:
+        """Builds the project, changes the mtime of index.html without changing
+        its contents, and rebuilds. Returns True if index.html was rebuilt.
+        """
+        vanillaplusjs.runners.init.main(["--folder", "tmp"])
+        with open(os.path.join("tmp", "vanillaplusjs.json")) as f:
+            config = json.load(f)
+        config["content_digests"] = content_digests
+        with open(os.path.join("tmp", "vanillaplusjs.json"), "w") as f:
+            json.dump(config, f)
+
+        src_path = os.path.join("tmp", "src", "public", "index.html")
+        out_path = os.path.join("tmp", "out", "www", "index.html")
+        with open(src_path, "w") as f:
+            f.write(SAMPLE_HTML)
+        vanillaplusjs.runners.build.main(["--folder", "tmp", "--no-daemon"])
+
+        src_stat = os.stat(src_path)
+        os.utime(src_path, (src_stat.st_atime + 100, src_stat.st_mtime + 100))
+        os.utime(out_path, (1000, 1000))
+        vanillaplusjs.runners.build.main(["--folder", "tmp", "--no-daemon"])
+
+        graphs = load_build_graphs(BuildContext("tmp", dev=False, symlinks=False))
+        self.assertEqual(
+            graphs.dependency.get_signature(
+                os.path.join("src", "public", "index.html")
+            ),
+            get_file_signature(src_path),
+        )
+        return os.stat(out_path).st_mtime != 1000
+
+    def test_unchanged_contents_are_not_rebuilt(self):
+        os.makedirs(os.path.join("tmp"), exist_ok=True)
+        try:
+            self.assertFalse(self._touch_and_rebuild(content_digests=True))
+            self.assertTrue(
+                os.path.exists(os.path.join("tmp", "out", "content_digests.json"))
+            )
+        finally:
+            shutil.rmtree("tmp")
+
+    def test_signature_change_rebuilds_without_digests(self):
+        os.makedirs(os.path.join("tmp"), exist_ok=True)
+        try:
+            self.assertTrue(self._touch_and_rebuild(content_digests=False))
+            self.assertFalse(
+                os.path.exists(os.path.join("tmp", "out", "content_digests.json"))
+            )
+        finally:
+            shutil.rmtree("tmp")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import helper  # noqa
+import unittest
+import os
+import shutil
+import vanillaplusjs.runners.init
+import vanillaplusjs.runners.build
+from vanillaplusjs.build.handlers.hash import HASH_CHUNK_SIZE
+import hashlib
+import base64
+
+
+class Test(unittest.TestCase):
+    def test_copies_and_hashes_large_file(self):
+        os.makedirs(os.path.join("tmp"), exist_ok=True)
+        try:
+            vanillaplusjs.runners.init.main(["--folder", "tmp"])
+            contents = os.urandom(HASH_CHUNK_SIZE * 2 + 17)
+            with open(os.path.join("tmp", "src", "public", "video.mp4"), "wb") as f:
+                f.write(contents)
+
+            vanillaplusjs.runners.build.main(
+                ["--folder", "tmp", "--no-symlinks", "--no-daemon"]
+            )
+
+            out_path = os.path.join("tmp", "out", "www", "video.mp4")
+            self.assertFalse(os.path.islink(out_path))
+            with open(out_path, "rb") as f:
+                self.assertEqual(f.read(), contents)
+
+            with open(out_path + ".hash", "r") as f:
+                self.assertEqual(
+                    f.read(),
+                    base64.urlsafe_b64encode(hashlib.sha256(contents).digest()).decode(
+                        "utf-8"
+                    ),
+                )
+
+            self.assertEqual(
+                [
+                    name
+                    for name in os.listdir(os.path.dirname(out_path))
+                    if ".tmp" in name
+                ],
+                [],
+            )
+        finally:
+            shutil.rmtree("tmp")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import helper  # noqa
+import unittest
+import os
+import shutil
+import socket
+import threading
+import time
+import vanillaplusjs.runners.init
+import vanillaplusjs.runners.build
+import vanillaplusjs.runners.daemon
+
+
+SAMPLE_HTML = (
+    '<!DOCTYPE html><html><head><meta charset="utf-8"></head><body></body></html>'
+)
+OTHER_HTML = (
+    '<!DOCTYPE html><html><head><meta charset="utf-8"></head><body>hi</body></html>'
+)
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "requires unix sockets")
+class Test(unittest.TestCase):
+    def test_build_is_handed_off_to_daemon(self):
+        os.makedirs(os.path.join("tmp"), exist_ok=True)
+        try:
+            vanillaplusjs.runners.init.main(["--folder", "tmp"])
+            with open(os.path.join("tmp", "src", "public", "index.html"), "w") as f:
+                f.write(SAMPLE_HTML)
+
+            socket_path = os.path.join("tmp", "out", "daemon.sock")
+            daemon_thread = threading.Thread(
+                target=vanillaplusjs.runners.daemon.main,
+                args=(["--folder", "tmp"],),
+                daemon=True,
+            )
+            daemon_thread.start()
+            try:
+                started_at = time.time()
+                while not os.path.exists(socket_path):
+                    self.assertLess(time.time() - started_at, 10)
+                    time.sleep(0.05)
+
+                vanillaplusjs.runners.build.main(["--folder", "tmp"])
+                with open(os.path.join("tmp", "out", "www", "index.html")) as f:
+                    self.assertEqual(f.read().rstrip(), SAMPLE_HTML)
+
+                with open(os.path.join("tmp", "src", "public", "index.html"), "w") as f:
+                    f.write(OTHER_HTML)
+                vanillaplusjs.runners.build.main(["--folder", "tmp"])
+                with open(os.path.join("tmp", "out", "www", "index.html")) as f:
+                    self.assertEqual(f.read().rstrip(), OTHER_HTML)
+            finally:
+                vanillaplusjs.runners.daemon.main(["--folder", "tmp", "--stop"])
+                daemon_thread.join(10)
+
+            self.assertFalse(daemon_thread.is_alive())
+            self.assertFalse(os.path.exists(socket_path))
+        finally:
+            shutil.rmtree("tmp")
+
+    def test_different_symlinks_builds_in_process(self):
+        os.makedirs(os.path.join("tmp"), exist_ok=True)
+        try:
+            vanillaplusjs.runners.init.main(["--folder", "tmp"])
+            with open(os.path.join("tmp", "src", "public", "robots.txt"), "w") as f:
+                f.write("User-agent: *\n")
+
+            socket_path = os.path.join("tmp", "out", "daemon.sock")
+            daemon_thread = threading.Thread(
+                target=vanillaplusjs.runners.daemon.main,
+                args=(["--folder", "tmp", "--symlinks"],),
+                daemon=True,
+            )
+            daemon_thread.start()
+            try:
+                started_at = time.time()
+                while not os.path.exists(socket_path):
+                    self.assertLess(time.time() - started_at, 10)
+                    time.sleep(0.05)
+
+                vanillaplusjs.runners.build.main(["--folder", "tmp", "--no-symlinks"])
+                out_path = os.path.join("tmp", "out", "www", "robots.txt")
+                self.assertTrue(os.path.exists(out_path))
+                self.assertFalse(os.path.islink(out_path))
+            finally:
+                vanillaplusjs.runners.daemon.main(["--folder", "tmp", "--stop"])
+                daemon_thread.join(10)
+
+            self.assertFalse(daemon_thread.is_alive())
+        finally:
+            shutil.rmtree("tmp")
+
+    def test_stale_socket_builds_in_process(self):
+        os.makedirs(os.path.join("tmp"), exist_ok=True)
+        try:
+            vanillaplusjs.runners.init.main(["--folder", "tmp"])
+            with open(os.path.join("tmp", "src", "public", "index.html"), "w") as f:
+                f.write(SAMPLE_HTML)
+
+            os.makedirs(os.path.join("tmp", "out"), exist_ok=True)
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.bind(os.path.join("tmp", "out", "daemon.sock"))
+
+            vanillaplusjs.runners.build.main(["--folder", "tmp"])
+            self.assertTrue(
+                os.path.exists(os.path.join("tmp", "out", "www", "index.html"))
+            )
+        finally:
+            shutil.rmtree("tmp")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import helper  # noqa
+import unittest
+import os
+import shutil
+from vanillaplusjs.build.directory_scan import scan_directory
+from vanillaplusjs.build.file_signature import get_file_signature
+
+
+class Test(unittest.TestCase):
+    def _make_tree(self) -> None:
+        for dir_relpath in (
+            os.path.join("tmp", "src", "a"),
+            os.path.join("tmp", "src", "a", "b"),
+            os.path.join("tmp", "src", "c"),
+            os.path.join("tmp", "src", "empty"),
+        ):
+            os.makedirs(dir_relpath, exist_ok=True)
+
+        for file_relpath in (
+            os.path.join("src", "root.txt"),
+            os.path.join("src", "a", "one.txt"),
+            os.path.join("src", "a", "b", "two.txt"),
+            os.path.join("src", "c", "three.txt"),
+        ):
+            with open(os.path.join("tmp", file_relpath), "w") as f:
+                f.write(file_relpath)
+
+    def _walk(self):
+        result = dict()
+        for (dirpath, _, filenames) in os.walk(os.path.join("tmp", "src")):
+            for filename in filenames:
+                relpath = os.path.relpath(os.path.join(dirpath, filename), "tmp")
+                result[relpath] = get_file_signature(os.path.join("tmp", relpath))
+        return result
+
+    def test_matches_walk(self):
+        os.makedirs("tmp", exist_ok=True)
+        try:
+            self._make_tree()
+            try:
+                os.symlink(
+                    os.path.abspath(os.path.join("tmp", "src", "a")),
+                    os.path.join("tmp", "src", "link"),
+                )
+            except OSError:
+                pass
+
+            result = scan_directory("tmp", "src", max_workers=2)
+            self.assertEqual(result.files, self._walk())
+            self.assertEqual(result.listed, 5)
+            self.assertEqual(result.reused, 0)
+        finally:
+            shutil.rmtree("tmp")
+
+    def test_reuses_unchanged_directories(self):
+        os.makedirs("tmp", exist_ok=True)
+        try:
+            self._make_tree()
+            for (dirpath, _, _) in os.walk(os.path.join("tmp", "src")):
+                os.utime(dirpath, (1000, 1000))
+
+            first = scan_directory("tmp", "src")
+            known_files = dict()
+            for relpath in first.files:
+                (dir_relpath, filename) = os.path.split(relpath)
+                known_files.setdefault(dir_relpath, []).append(filename)
+
+            with open(os.path.join("tmp", "src", "a", "one.txt"), "w") as f:
+                f.write("modified")
+            with open(os.path.join("tmp", "src", "c", "four.txt"), "w") as f:
+                f.write("added")
+
+            second = scan_directory(
+                "tmp", "src", old_index=first.index, known_files=known_files
+            )
+            self.assertEqual(second.files, self._walk())
+            self.assertEqual(second.listed, 1)
+            self.assertEqual(second.reused, 4)
+        finally:
+            shutil.rmtree("tmp")
+
+
+if __name__ == "__main__":
+    unittest.main()
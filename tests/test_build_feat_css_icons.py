@@ -2,10 +2,12 @@ from pathlib import Path
 from typing import Dict
 import helper  # noqa
 import unittest
+import json
 import os
 import shutil
 from vanillaplusjs.build.file_signature import get_file_signature
 from vanillaplusjs.constants import PROCESSOR_VERSION
+from urllib.parse import urlencode
 import vanillaplusjs.runners.init
 import vanillaplusjs.runners.build
 
@@ -826,6 +828,30 @@ CHANGE_MAIN_CSS_REBUILDS = {
     }
 }
 
+SHARED_ICON = {
+    "orig": {
+        "src/public/css/main.css": """
+:root {
+    --col-primary: #333;
+    --col-primary-dark: #222;
+    --icon-size-medium: 1rem;
+}
+
+/*! PREPROCESSOR: icon x primary all-colors all-sizes no-btn */
+""",
+        "src/public/css/other.css": """
+/*! PREPROCESSOR: icon x primary ["primary-dark"] all-sizes no-btn */
+""",
+        "src/public/img/icons/x.svg": """
+<svg width="12" height="12" viewBox="0 0 12 12" fill="none" xmlns="http://www.w3.org/2000/svg">
+<!-- the x -->
+<path d="M2 2.38721L9.5 9.88721" stroke="#333333" stroke-width="1.5" stroke-linecap="round" stroke-linejoin="round"/>
+<path d="M2 9.88721L9.5 2.38721" stroke="#333333" stroke-width="1.5" stroke-linecap="round" stroke-linejoin="round"/>
+</svg>
+""",
+    }
+}
+
 
 class Test(unittest.TestCase):
     def _basic_test(self, orig: Dict[str, str], conv: Dict[str, str]):
@@ -893,3 +919,103 @@ class Test(unittest.TestCase):
             self.assertNotEqual(old_signature, new_signature)
         finally:
             shutil.rmtree("tmp")
+
+    def test_icon_settings_loaded_lazily(self):
+        orig = CHANGE_MAIN_CSS_REBUILDS["orig"]
+        os.makedirs(os.path.join("tmp"), exist_ok=True)
+        try:
+            vanillaplusjs.runners.init.main(["--folder", "tmp"])
+            os.makedirs(os.path.join("tmp", "src", "public", "css"), exist_ok=True)
+            with open(
+                os.path.join("tmp", "src", "public", "css", "main.css"), "w"
+            ) as f:
+                f.write(orig["src/public/css/main.css"])
+
+            # no icon commands, so the default css file is never walked
+            vanillaplusjs.runners.build.main(["--folder", "tmp"])
+            icon_settings_path = os.path.join("tmp", "out", "icon_settings.json")
+            self.assertFalse(os.path.exists(icon_settings_path))
+
+            for path, val in orig.items():
+                os.makedirs(os.path.dirname(os.path.join("tmp", path)), exist_ok=True)
+                with open(os.path.join("tmp", path), "w") as f:
+                    f.write(val)
+            vanillaplusjs.runners.build.main(["--folder", "tmp"])
+            with open(icon_settings_path) as f:
+                icon_settings = json.load(f)
+            self.assertEqual(
+                icon_settings["colors"],
+                {"primary": {"red": 51, "green": 51, "blue": 51}},
+            )
+            self.assertEqual(icon_settings["sizes"], ["medium"])
+
+            with open(
+                os.path.join("tmp", "src", "public", "css", "main.css"), "w"
+            ) as f:
+                f.write(
+                    orig["src/public/css/main.css"].replace(
+                        "--icon-size-medium: 1rem;",
+                        "--icon-size-medium: 1rem;\n    --icon-size-large: 2rem;",
+                    )
+                )
+            vanillaplusjs.runners.build.main(["--folder", "tmp"])
+            with open(icon_settings_path) as f:
+                icon_settings = json.load(f)
+            self.assertEqual(icon_settings["sizes"], ["medium", "large"])
+            with open(os.path.join("tmp", "out", "www", "css", "icons.css")) as f:
+                self.assertIn("icon-x-large", f.read())
+        finally:
+            shutil.rmtree("tmp")
+
+    def test_icon_variants_shared_minified_and_sprited(self):
+        orig = SHARED_ICON["orig"]
+        os.makedirs(os.path.join("tmp"), exist_ok=True)
+        try:
+            vanillaplusjs.runners.init.main(["--folder", "tmp"])
+            with open(os.path.join("tmp", "vanillaplusjs.json")) as f:
+                config = json.load(f)
+            config["icons"] = {"minify": True, "sprite": True}
+            with open(os.path.join("tmp", "vanillaplusjs.json"), "w") as f:
+                json.dump(config, f)
+            for path, val in orig.items():
+                os.makedirs(os.path.dirname(os.path.join("tmp", path)), exist_ok=True)
+                with open(os.path.join("tmp", path), "w") as f:
+                    f.write(val)
+
+            vanillaplusjs.runners.build.main(["--folder", "tmp"])
+
+            icons_folder = os.path.join("tmp", "out", "www", "img", "icons", "x")
+            with open(os.path.join(icons_folder, "primary-dark.svg")) as f:
+                primary_dark = f.read()
+            self.assertTrue(primary_dark.startswith("<svg"), primary_dark)
+            self.assertNotIn("the x", primary_dark)
+            self.assertNotIn("\n", primary_dark)
+            self.assertIn('"#222222"', primary_dark)
+
+            with open(os.path.join(icons_folder, "sprite.svg")) as f:
+                sprite = f.read()
+            self.assertIn('<view id="primary" viewBox="0 0 12 12"/>', sprite)
+            self.assertIn('<view id="primary-dark" viewBox="0 12 12 12"/>', sprite)
+            self.assertIn('"#333333"', sprite)
+            self.assertIn('"#222222"', sprite)
+
+            with open(os.path.join(icons_folder, "sprite.svg.hash")) as f:
+                sprite_hash = f.read()
+            with open(os.path.join("tmp", "out", "www", "css", "other.css")) as f:
+                other_css = f.read()
+            self.assertIn(
+                f"/img/icons/x/sprite.svg?{urlencode({'v': sprite_hash, 'pv': PROCESSOR_VERSION})}#primary-dark",
+                other_css,
+            )
+
+            # each variant, and the sprite, is rendered once even though both
+            # stylesheets ask for them
+            cached = [
+                name
+                for _, _, names in os.walk(os.path.join("tmp", "out", "icon_cache"))
+                for name in names
+                if name.endswith(".svg")
+            ]
+            self.assertEqual(len(cached), 3, cached)
+        finally:
+            shutil.rmtree("tmp")
@@ -3,7 +3,12 @@ import helper  # noqa
 import unittest
 import os
 import shutil
+from vanillaplusjs.build.css.rule_index import RuleIndexer
+from vanillaplusjs.build.css.serializer import serialize
+from vanillaplusjs.build.css.tokenizer import tokenize
 from vanillaplusjs.build.exceptions import MissingConfigurationException
+import io
+import json
 import vanillaplusjs.runners.init
 import vanillaplusjs.runners.build
 
@@ -115,6 +120,25 @@ MULTI_B_CONV = """
 }
 """
 
+INDEXED_ORIG = """@import url("reset.css");
+<!-- .hidden { display: none; } -->
+/* comment */
+.a, .b > p {
+    color: red;
+    .nested { color: blue; }
+}
+
+@media (min-width: 600px) {
+    .a { color: green; }
+}
+
+.a, .b > p {
+    color: black;
+}
+
+.empty {}
+"""
+
 REPEATED_ORIG = """
 /* #region TYPOGRAPHY */
 .serif {
@@ -284,3 +308,50 @@ class Test(unittest.TestCase):
                 )
             ),
         )
+
+    def test_rule_index(self):
+        indexer = RuleIndexer()
+        for token in tokenize(io.StringIO(INDEXED_ORIG)):
+            indexer.handle_token(token, serialize(token))
+
+        self.assertEqual(list(indexer.rules.keys()), [".a, .b > p", ".empty"])
+        block, start, end = indexer.rules[".a, .b > p"]
+        self.assertEqual(block, "color: red;\n    .nested { color: blue; }")
+        self.assertEqual(INDEXED_ORIG[start:end], block)
+        self.assertEqual(indexer.rules[".empty"][0], "")
+
+    def test_multi_uses_index(self):
+        os.makedirs(os.path.join("tmp"), exist_ok=True)
+        try:
+            vanillaplusjs.runners.init.main(["--folder", "tmp"])
+            os.makedirs(os.path.join("tmp", "src", "public", "css"), exist_ok=True)
+            with open(os.path.join("tmp", "src", "public", "css", "a.css"), "w") as f:
+                f.write(MULTI_A_ORIG)
+            with open(os.path.join("tmp", "src", "public", "css", "b.css"), "w") as f:
+                f.write(MULTI_B_ORIG)
+            vanillaplusjs.runners.build.main(["--folder", "tmp", "--no-daemon"])
+
+            index_path = os.path.join("tmp", "out", "css_rules", "css", "a.css.json")
+            with open(index_path) as f:
+                index = json.load(f)
+            self.assertEqual(index["rules"][".bg-white"]["block"], "background: white;")
+
+            # the index is used rather than the built stylesheet
+            index["rules"][".bg-white"]["block"] = "background: black;"
+            with open(index_path, "w") as f:
+                json.dump(index, f)
+            with open(os.path.join("tmp", "src", "public", "css", "b.css"), "a") as f:
+                f.write("\n")
+            vanillaplusjs.runners.build.main(["--folder", "tmp", "--no-daemon"])
+            with open(os.path.join("tmp", "out", "www", "css", "b.css")) as f:
+                self.assertIn("background: black;", f.read())
+
+            # without the index the built stylesheet is tokenized instead
+            os.remove(index_path)
+            with open(os.path.join("tmp", "src", "public", "css", "b.css"), "a") as f:
+                f.write("\n")
+            vanillaplusjs.runners.build.main(["--folder", "tmp", "--no-daemon"])
+            with open(os.path.join("tmp", "out", "www", "css", "b.css")) as f:
+                self.assertIn("background: white;", f.read())
+        finally:
+            shutil.rmtree("tmp")
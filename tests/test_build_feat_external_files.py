@@ -2,6 +2,9 @@ import helper  # noqa
 import unittest
 import os
 import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from vanillaplusjs.build.external_fetch import get_cache_path
 from vanillaplusjs.build.file_signature import get_file_signature
 import vanillaplusjs.runners.init
 import vanillaplusjs.runners.build
@@ -22,6 +25,52 @@ def get_sha384(filepath: str) -> str:
     return str(b64encode(digest.digest()), "ascii")
 
 
+class StandInServer:
+    """Serves the given files over http on localhost, supporting range
+    requests, and records the headers of each request
+    """
+
+    def __init__(self, files: dict):
+        self.files = files
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests.append((self.path, dict(self.headers)))
+                body = stand_in.files[self.path]
+                start = 0
+                range_header = self.headers.get("Range")
+                if range_header is not None:
+                    start = int(range_header[len("bytes=") :].split("-")[0])
+                    self.send_response(206)
+                    self.send_header(
+                        "Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}"
+                    )
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Length", str(len(body) - start))
+                self.end_headers()
+                self.wfile.write(body[start:])
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}{path}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
 class Test(unittest.TestCase):
     def test_downloads_bootstrap(self):
         os.makedirs(os.path.join("tmp"), exist_ok=True)
@@ -94,6 +143,105 @@ class Test(unittest.TestCase):
         finally:
             shutil.rmtree("tmp")
 
+    def _init_with_external_file(self, folder: str, url: str, integrity: str):
+        vanillaplusjs.runners.init.main(["--folder", folder])
+        with open(os.path.join(folder, "vanillaplusjs.json"), "r") as f:
+            config = json.load(f)
+        config["external_files"] = {
+            "src/public/js/lib/big.js": {"url": url, "integrity": integrity}
+        }
+        config["external_files_cache"] = {"folder": os.path.abspath("tmp/cache")}
+        with open(os.path.join(folder, "vanillaplusjs.json"), "w") as f:
+            json.dump(config, f, indent=2)
+
+    def test_external_files_cache_shared_between_projects(self):
+        body = b"export const x = 1;\n" * 5000
+        integrity = "sha384-" + str(b64encode(hashlib.sha384(body).digest()), "ascii")
+        os.makedirs(os.path.join("tmp", "a"), exist_ok=True)
+        os.makedirs(os.path.join("tmp", "b"), exist_ok=True)
+        try:
+            with StandInServer({"/big.js": body}) as server:
+                for project in ("a", "b"):
+                    folder = os.path.join("tmp", project)
+                    self._init_with_external_file(
+                        folder, server.url("/big.js"), integrity
+                    )
+                    vanillaplusjs.runners.build.main(["--folder", folder])
+                    with open(
+                        os.path.join(folder, "src", "public", "js", "lib", "big.js"),
+                        "rb",
+                    ) as f:
+                        self.assertEqual(f.read(), body)
+
+                self.assertEqual(len(server.requests), 1)
+        finally:
+            shutil.rmtree("tmp")
+
+    def test_external_files_resume_partial_download(self):
+        body = b"export const y = 2;\n" * 5000
+        integrity = "sha384-" + str(b64encode(hashlib.sha384(body).digest()), "ascii")
+        os.makedirs(os.path.join("tmp", "a"), exist_ok=True)
+        try:
+            part_path = (
+                get_cache_path(os.path.abspath("tmp/cache"), integrity) + ".part"
+            )
+            os.makedirs(os.path.dirname(part_path))
+            with open(part_path, "wb") as f:
+                f.write(body[:40000])
+
+            with StandInServer({"/big.js": body}) as server:
+                folder = os.path.join("tmp", "a")
+                self._init_with_external_file(folder, server.url("/big.js"), integrity)
+                vanillaplusjs.runners.build.main(["--folder", folder])
+                with open(
+                    os.path.join(folder, "src", "public", "js", "lib", "big.js"), "rb"
+                ) as f:
+                    self.assertEqual(f.read(), body)
+
+                self.assertEqual(len(server.requests), 1)
+                self.assertEqual(server.requests[0][1].get("Range"), "bytes=40000-")
+        finally:
+            shutil.rmtree("tmp")
+
+    def test_external_files_touched_not_refetched(self):
+        body = b"export const z = 3;\n" * 10000
+        integrity = "sha384-" + str(b64encode(hashlib.sha384(body).digest()), "ascii")
+        os.makedirs(os.path.join("tmp", "a"), exist_ok=True)
+        try:
+            with StandInServer({"/big.js": body}) as server:
+                folder = os.path.join("tmp", "a")
+                self._init_with_external_file(folder, server.url("/big.js"), integrity)
+                vanillaplusjs.runners.build.main(["--folder", folder])
+
+                path = os.path.join(folder, "src", "public", "js", "lib", "big.js")
+                state_path = os.path.join(folder, "out", "external_files_state.json")
+                with open(state_path) as f:
+                    state = json.load(f)["state_by_relpath"][
+                        os.path.join("src", "public", "js", "lib", "big.js")
+                    ]
+                self.assertIsNotNone(state["fingerprint"])
+
+                os.utime(path, (1, 1))
+                vanillaplusjs.runners.build.main(["--folder", folder])
+                with open(state_path) as f:
+                    new_state = json.load(f)["state_by_relpath"][
+                        os.path.join("src", "public", "js", "lib", "big.js")
+                    ]
+                self.assertEqual(new_state["fingerprint"], state["fingerprint"])
+                self.assertEqual(new_state["signature"]["mtime"], 1)
+
+                with open(path, "r+b") as f:
+                    f.seek(len(body) - 2)
+                    f.write(b"!\n")
+                vanillaplusjs.runners.build.main(["--folder", folder])
+                with open(path, "rb") as f:
+                    self.assertEqual(f.read(), body)
+
+                # restored from the cache, not downloaded again
+                self.assertEqual(len(server.requests), 1)
+        finally:
+            shutil.rmtree("tmp")
+
 
 if __name__ == "__main__":
     unittest.main()
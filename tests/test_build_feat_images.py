@@ -3,10 +3,32 @@ import helper  # noqa
 import unittest
 import os
 import shutil
-from vanillaplusjs.build.html.manips.images.metadata import hash_image_settings
-from vanillaplusjs.build.html.manips.images.settings import load_image_settings
+from vanillaplusjs.build.html.manips.images.encode_scheduler import EncodeScheduler
+from vanillaplusjs.build.html.manips.images.exporter import (
+    encode_image,
+    get_decoded_size,
+    produce_images,
+    search_exports,
+)
+from vanillaplusjs.build.html.manips.images.metadata import (
+    CropSettingsCover,
+    ImageTargetOutput,
+    hash_image_settings,
+)
+from vanillaplusjs.build.html.manips.images.store import (
+    fetch as fetch_stored_outputs,
+    get_entry_path,
+    publish as publish_stored_outputs,
+)
+from vanillaplusjs.build.html.manips.images.settings import (
+    ImageExport,
+    ImageFormat,
+    compare_in_format,
+    load_image_settings,
+)
 import vanillaplusjs.runners.init
 import vanillaplusjs.runners.build
+import vanillaplusjs.runners.clean
 import json
 from pathlib import Path
 from PIL import Image
@@ -194,3 +216,224 @@ class Test(unittest.TestCase):
             image_settings = load_image_settings(config["images"])
             hashed_image_settings = hash_image_settings(image_settings)
             self.assertEqual(hashed_image_settings, 5478490489390831371)
+
+    def test_produce_images_caps_memory(self):
+        os.makedirs("tmp", exist_ok=True)
+        try:
+            src_file = os.path.join("tmp", "test.png")
+            Image.new("RGB", (400, 300), color=(255, 0, 0)).save(src_file)
+            sizes = [(200, 100), (150, 75), (100, 50), (50, 25)]
+            exports = dict(
+                (
+                    size,
+                    [
+                        (
+                            os.path.join("tmp", f"{size[0]}.{fmt}"),
+                            fmt,
+                            {"lossless": True},
+                        )
+                        for fmt in ("png", "webp")
+                    ],
+                )
+                for size in sizes
+            )
+
+            source_size = get_decoded_size(Image.new("RGB", (400, 300)))
+            crop_size = get_decoded_size(Image.new("RGB", (400, 200)))
+            scheduler = EncodeScheduler(max_memory=source_size + crop_size)
+            peak = produce_images(
+                src_file, exports, "cover", CropSettingsCover(), scheduler=scheduler
+            )
+            self.assertEqual(scheduler.memory_in_use, 0)
+
+            for width, height in sizes:
+                for fmt in ("png", "webp"):
+                    with Image.open(os.path.join("tmp", f"{width}.{fmt}")) as img:
+                        self.assertEqual(img.size, (width, height))
+                        self.assertEqual(img.getpixel((0, 0))[:3], (255, 0, 0))
+
+            # only a single resized image is allowed past the limit
+            self.assertLessEqual(
+                peak,
+                source_size
+                + crop_size
+                + get_decoded_size(Image.new("RGB", (200, 100))),
+            )
+        finally:
+            shutil.rmtree("tmp")
+
+    def test_image_store_shares_identical_images(self):
+        os.makedirs(os.path.join("tmp", "src", "public", "img"))
+        img = Image.new("RGB", (30, 30), color=(255, 0, 0))
+        img.save(os.path.join("tmp", "src", "public", "img", "test.jpg"))
+        shutil.copyfile(
+            os.path.join("tmp", "src", "public", "img", "test.jpg"),
+            os.path.join("tmp", "src", "public", "img", "copy.jpg"),
+        )
+        orig = dict(BASIC["orig"])
+        orig["src/public/copy.html"] = orig["src/public/index.html"].replace(
+            "/img/test.jpg", "/img/copy.jpg"
+        )
+        for _ in self._basic_test(orig, BASIC["conv"]):
+            store_folder = os.path.join("tmp", "out", "image_store")
+            entries = [
+                entry
+                for prefix in os.listdir(store_folder)
+                if len(prefix) == 2
+                for entry in os.listdir(os.path.join(store_folder, prefix))
+            ]
+            self.assertEqual(len(entries), 1)
+
+            for name in ("20x20.jpeg", "20x20.webp", "30x30.jpeg", "30x30.webp"):
+                with open(
+                    os.path.join("tmp", "artifacts", "img", "test", "1", name), "rb"
+                ) as f:
+                    expected = f.read()
+                with open(
+                    os.path.join("tmp", "artifacts", "img", "copy", "1", name), "rb"
+                ) as f:
+                    self.assertEqual(f.read(), expected, name)
+
+            # a store outside of out/ is kept by clean and reused afterward
+            with open(os.path.join("tmp", "vanillaplusjs.json")) as f:
+                config = json.load(f)
+            config["image_store"]["folder"] = "image_store"
+            with open(os.path.join("tmp", "vanillaplusjs.json"), "w") as f:
+                json.dump(config, f)
+            vanillaplusjs.runners.clean.clean("tmp", False)
+            vanillaplusjs.runners.build.main(["--folder", "tmp"])
+            vanillaplusjs.runners.clean.clean("tmp", False)
+            vanillaplusjs.runners.build.main(["--folder", "tmp"])
+
+            store_folder = os.path.join("tmp", "image_store")
+            (prefix,) = [name for name in os.listdir(store_folder) if len(name) == 2]
+            (entry,) = os.listdir(os.path.join(store_folder, prefix))
+            self.assertTrue(
+                os.path.samefile(
+                    os.path.join(store_folder, prefix, entry, "20x20.webp"),
+                    os.path.join("tmp", "artifacts", "img", "test", "1", "20x20.webp"),
+                )
+            )
+
+    def test_image_store_removes_least_recently_used(self):
+        os.makedirs(os.path.join("tmp", "src"), exist_ok=True)
+        try:
+            with open(os.path.join("tmp", "src", "20x20.jpeg"), "wb") as f:
+                f.write(b"0" * 100)
+            outputs = {
+                "jpeg": [
+                    ImageTargetOutput(
+                        width=20, height=20, relpath="20x20.jpeg", choice="100"
+                    )
+                ]
+            }
+            store_folder = os.path.join("tmp", "store")
+            src_folder = os.path.join("tmp", "src")
+
+            publish_stored_outputs(store_folder, "aa01", src_folder, outputs, 1000)
+            publish_stored_outputs(store_folder, "bb02", src_folder, outputs, 1000)
+            os.utime(
+                os.path.join(get_entry_path(store_folder, "aa01"), "outputs.json"),
+                (0, 0),
+            )
+            self.assertEqual(
+                fetch_stored_outputs(store_folder, "bb02", os.path.join("tmp", "dst")),
+                outputs,
+            )
+            with open(os.path.join("tmp", "dst", "20x20.jpeg"), "rb") as f:
+                self.assertEqual(f.read(), b"0" * 100)
+
+            publish_stored_outputs(store_folder, "cc03", src_folder, outputs, 400)
+            self.assertFalse(os.path.exists(get_entry_path(store_folder, "aa01")))
+            self.assertTrue(os.path.exists(get_entry_path(store_folder, "bb02")))
+            self.assertTrue(os.path.exists(get_entry_path(store_folder, "cc03")))
+            self.assertIsNone(
+                fetch_stored_outputs(store_folder, "aa01", os.path.join("tmp", "x"))
+            )
+        finally:
+            shutil.rmtree("tmp")
+
+    def test_search_skips_exports_which_cannot_be_preferred(self):
+        os.makedirs("tmp", exist_ok=True)
+        try:
+            fmt = ImageFormat(
+                name="jpeg",
+                exports={
+                    "50": ImageExport(None, None, 1, {"quality": 50}),
+                    "85": ImageExport(None, None, 3, {"quality": 85}),
+                    "100": ImageExport(None, None, 5, {"quality": 100}),
+                },
+                minimum_unit_size_bytes=1_000_000,
+            )
+            candidates = [
+                (fmt, name, export, os.path.join("tmp", f"{name}.jpeg"))
+                for name, export in fmt.exports.items()
+            ]
+            image = Image.new("RGB", (64, 64), color=(255, 0, 0))
+
+            # every export is below the minimum unit size, so the most preferred
+            # export wins, even when another export is tried first
+            for hint in ({}, {"jpeg": "50"}):
+                search_exports(image, candidates, hint)
+                self.assertEqual(sorted(os.listdir("tmp")), ["100.jpeg"], hint)
+                os.remove(os.path.join("tmp", "100.jpeg"))
+        finally:
+            shutil.rmtree("tmp")
+
+    def test_search_estimates_agree_with_exhaustive(self):
+        os.makedirs(os.path.join("tmp", "search"), exist_ok=True)
+        os.makedirs(os.path.join("tmp", "exhaustive"), exist_ok=True)
+        try:
+            fmt = ImageFormat(
+                name="jpeg",
+                exports={
+                    "30": ImageExport(None, None, 1, {"quality": 30}),
+                    "95": ImageExport(None, None, 2, {"quality": 95}),
+                },
+                minimum_unit_size_bytes=0,
+            )
+            image = Image.effect_noise((640, 640), 64).convert("RGB")
+
+            sizes = dict()
+            for name, export in fmt.exports.items():
+                path = os.path.join("tmp", "exhaustive", f"{name}.jpeg")
+                encode_image(image, [(path, "jpeg", export.formatter_kwargs)])
+                sizes[name] = os.lstat(path).st_size
+            expected = (
+                "30"
+                if compare_in_format(
+                    fmt, fmt.exports["95"], sizes["95"], fmt.exports["30"], sizes["30"]
+                )
+                > 0
+                else "95"
+            )
+
+            search_exports(
+                image,
+                [
+                    (fmt, name, export, os.path.join("tmp", "search", f"{name}.jpeg"))
+                    for name, export in fmt.exports.items()
+                ],
+                {},
+            )
+            self.assertEqual(
+                os.listdir(os.path.join("tmp", "search")), [f"{expected}.jpeg"]
+            )
+        finally:
+            shutil.rmtree("tmp")
+
+    def test_load_image_settings_rejects_unknown_search(self):
+        os.makedirs("tmp", exist_ok=True)
+        try:
+            vanillaplusjs.runners.init.main(["--folder", "tmp"])
+            with open(os.path.join("tmp", "vanillaplusjs.json")) as f:
+                config = json.load(f)
+
+            self.assertEqual(load_image_settings(config["images"]).search, "estimate")
+            del config["images"]["search"]
+            self.assertEqual(load_image_settings(config["images"]).search, "exhaustive")
+            config["images"]["search"] = "fastest"
+            with self.assertRaises(ValueError):
+                load_image_settings(config["images"])
+        finally:
+            shutil.rmtree("tmp")
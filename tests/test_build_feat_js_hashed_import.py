@@ -29,6 +29,8 @@ BASIC = {
         "src/public/js/example9.js": 'import defaultExport, * as name from "/js/example.js";',
         "src/public/js/example10.js": 'import "/js/example.js";',
         "src/public/js/example11.js": 'import "./example.js";',
+        "src/public/js/example12.js": "import \"./example.js\";\nconst a = 'a'; // a",
+        "src/public/js/example13.js": "const a = 'a';\nimport \"./example.js\";\nconst b = 'b';",
     },
     "conv": {
         "out/www/js/example.js": "/* we don't need a real script here for this test */",
@@ -42,6 +44,9 @@ BASIC = {
         "out/www/js/example9.js": f"import defaultExport, * as name from {EXPECTED_IMPORT_PATH_LITERAL};",
         "out/www/js/example10.js": f"import {EXPECTED_IMPORT_PATH_LITERAL};",
         "out/www/js/example11.js": f"import {EXPECTED_IMPORT_PATH_LITERAL};",
+        # after the last import the file is copied verbatim
+        "out/www/js/example12.js": f"import {EXPECTED_IMPORT_PATH_LITERAL};\nconst a = 'a'; // a",
+        "out/www/js/example13.js": f"const a = \"a\";\nimport {EXPECTED_IMPORT_PATH_LITERAL};\nconst b = 'b';",
     },
 }
 
@@ -1,10 +1,13 @@
 from typing import Dict
 import helper  # noqa
 import unittest
+import io
 import os
 import shutil
 import vanillaplusjs.runners.init
 import vanillaplusjs.runners.build
+from vanillaplusjs.build.js.serializer import serialize_many
+from vanillaplusjs.build.js.tokenizer import tokenize
 
 
 # We define these here to avoid breaking the indent flow too much while
@@ -47,5 +50,22 @@ class Test(unittest.TestCase):
         finally:
             shutil.rmtree("tmp")
 
+    def _tokenizer_test(self, orig: Dict[str, str], conv: Dict[str, str]):
+        for path, val in orig.items():
+            out_path = "out/www/" + path[len("src/public/") :]
+            self.assertEqual(
+                serialize_many(tokenize(io.StringIO(val))), conv[out_path], path
+            )
+
     def test_basic(self):
-        self._basic_test(BASIC["orig"], BASIC["conv"])
+        self._tokenizer_test(BASIC["orig"], BASIC["conv"])
+
+    def test_build_copies_verbatim(self):
+        # without imports, no manipulator needs the file to be tokenized
+        self._basic_test(
+            BASIC["orig"],
+            dict(
+                ("out/www/" + path[len("src/public/") :], val)
+                for path, val in BASIC["orig"].items()
+            ),
+        )
@@ -120,6 +120,14 @@ CSS_IS_PROCESSED = {
 }
 
 
+def list_folder(folder: str) -> list:
+    """Lists every file and folder within the given folder"""
+    result = []
+    for (dirpath, dirnames, filenames) in os.walk(folder):
+        result.extend(os.path.join(dirpath, name) for name in dirnames + filenames)
+    return sorted(result)
+
+
 class Test(unittest.TestCase):
     def _basic_test(self, orig: Dict[str, str], conv: Dict[str, str]):
         os.makedirs(os.path.join("tmp"), exist_ok=True)
@@ -130,7 +138,9 @@ class Test(unittest.TestCase):
                 with open(os.path.join("tmp", path), "w") as f:
                     f.write(val)
 
+            src_before = list_folder(os.path.join("tmp", "src"))
             vanillaplusjs.runners.build.main(["--folder", "tmp"])
+            self.assertEqual(list_folder(os.path.join("tmp", "src")), src_before)
 
             for path, val in conv.items():
                 with open(os.path.join("tmp", path), "r") as f:
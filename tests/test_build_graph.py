@@ -1,7 +1,10 @@
 import helper  # noqa
 import unittest
 import os
+from vanillaplusjs.build.build_graphs import load_build_graph
+from vanillaplusjs.build.file_signature import FileSignature
 from vanillaplusjs.build.graph import FileDependencyGraph, FileRelationship
+from vanillaplusjs.build.graph_binary import MappedFileDependencyGraph
 
 
 class Test(unittest.TestCase):
@@ -156,6 +159,92 @@ class Test(unittest.TestCase):
             if os.path.exists("test.json"):
                 os.unlink("test.json")
 
+    def test_save_binary_empty(self):
+        graph = FileDependencyGraph()
+        try:
+            with open("test.bin", "wb") as f:
+                graph.store(f, format="binary")
+            with open("test.bin", "rb") as f:
+                new_graph = FileDependencyGraph.load(f, format="binary")
+            self.assertEqual(new_graph, graph)
+        finally:
+            if os.path.exists("test.bin"):
+                os.unlink("test.bin")
+
+    def test_save_binary_cyclic(self):
+        graph = FileDependencyGraph()
+        graph.add_file("a.js", 1, 2.5, 3)
+        graph.add_file("b.js", 4, 5.25, 2**63)
+        graph.add_file("c\u00e9.js", 0, 0, 0, ["b.js", "a.js"])
+        graph.set_children("a.js", ["b.js"], prevent_cycles=False)
+        graph.set_children("b.js", ["a.js"], prevent_cycles=False)
+        try:
+            with open("test.bin", "wb") as f:
+                graph.store(f, format="binary")
+            with open("test.bin", "rb") as f:
+                new_graph = FileDependencyGraph.load(f, format="binary")
+            self.assertEqual(new_graph, graph)
+            self.assertEqual(new_graph.get_children("c\u00e9.js"), ["b.js", "a.js"])
+        finally:
+            if os.path.exists("test.bin"):
+                os.unlink("test.bin")
+
+    def test_mapped_binary_lookups(self):
+        graph = FileDependencyGraph()
+        graph.add_file("src/public/b.js", 1, 2.5, 3)
+        graph.add_file("src/public/a.js", 4, 5.5, 6, ["src/public/b.js"])
+        graph.add_file("src/public/index.html", 7, 8.5, 9, ["src/public/a.js"])
+        try:
+            with open("test.bin", "wb") as f:
+                graph.store(f, format="binary")
+            mapped = MappedFileDependencyGraph.open("test.bin")
+            try:
+                self.assertEqual(len(mapped), 3)
+                self.assertIn("src/public/a.js", mapped)
+                self.assertNotIn("src/public/c.js", mapped)
+                self.assertTrue(mapped.check_file("src/public/a.js", 4, 5.5, 6))
+                self.assertFalse(mapped.check_file("src/public/a.js", 4, 5.5, 7))
+                self.assertFalse(mapped.check_file("src/public/c.js", 4, 5.5, 6))
+                self.assertEqual(
+                    mapped.get_signature("src/public/b.js"),
+                    FileSignature(mtime=2.5, filesize=1, inode=3),
+                )
+                self.assertEqual(
+                    mapped.get_parents("src/public/a.js"), ["src/public/index.html"]
+                )
+                self.assertEqual(
+                    mapped.get_children("src/public/a.js"), ["src/public/b.js"]
+                )
+                self.assertEqual(frozenset(mapped), frozenset(graph.nodes))
+                self.assertRaises(ValueError, mapped.get_children, "src/public/c.js")
+                self.assertEqual(mapped.to_graph(), graph)
+            finally:
+                mapped.close()
+        finally:
+            if os.path.exists("test.bin"):
+                os.unlink("test.bin")
+
+    def test_migrates_json_graph(self):
+        graph = FileDependencyGraph()
+        graph.add_file("a.js", 0, 0, 0)
+        graph.add_file("b.js", 0, 0, 0, ["a.js"])
+        try:
+            with open("test.json", "w") as f:
+                graph.store(f)
+            loaded = load_build_graph("test.bin")
+            self.assertEqual(loaded, graph)
+            self.assertFalse(os.path.exists("test.json"))
+            mapped = load_build_graph("test.bin")
+            try:
+                self.assertIsInstance(mapped, MappedFileDependencyGraph)
+                self.assertEqual(mapped.to_graph(), graph)
+            finally:
+                mapped.close()
+        finally:
+            for path in ("test.json", "test.bin"):
+                if os.path.exists(path):
+                    os.unlink(path)
+
     def test_check_relationship_dne(self):
         graph = FileDependencyGraph()
         graph.add_file("a.js", 0, 0, 0)
@@ -0,0 +1,129 @@
+import helper  # noqa
+import unittest
+import os
+import shutil
+from vanillaplusjs.build.build_context import BuildContext
+from vanillaplusjs.build.build_graphs import load_build_graphs
+from vanillaplusjs.build.file_signature import FileSignature
+from vanillaplusjs.build.graph import FileDependencyGraph
+from vanillaplusjs.build.graph_journal import append_journal, read_journal
+from vanillaplusjs.build.graph_overlay import (
+    GraphNodeRecord,
+    OverlayFileDependencyGraph,
+)
+import vanillaplusjs.runners.init
+import vanillaplusjs.runners.build
+
+
+class Test(unittest.TestCase):
+    def test_overlay_matches_graph(self):
+        base = FileDependencyGraph()
+        base.add_file("a.js", 0, 0, 0)
+        base.add_file("b.js", 0, 0, 0, ["a.js"])
+        base.add_file("c.js", 0, 0, 0, ["b.js"])
+
+        overlay = OverlayFileDependencyGraph(base)
+        overlay.add_file("d.js", 1, 1, 1)
+        overlay.set_children("c.js", ["a.js", "d.js"])
+        overlay.remove_file("b.js", clear_children=True)
+        overlay.set_signature("a.js", 2, 2, 2)
+
+        expected = FileDependencyGraph()
+        expected.add_file("a.js", 2, 2, 2)
+        expected.add_file("d.js", 1, 1, 1)
+        expected.add_file("c.js", 0, 0, 0, ["a.js", "d.js"])
+
+        self.assertEqual(overlay.to_graph(), expected)
+        self.assertEqual(len(overlay), 3)
+        self.assertNotIn("b.js", overlay)
+        self.assertEqual(overlay.get_parents("a.js"), ["c.js"])
+        self.assertEqual(len(base.nodes), 3)
+        self.assertEqual(base.get_parents("a.js"), ["b.js"])
+        self.assertEqual(
+            frozenset(overlay.records.keys()),
+            frozenset(["a.js", "b.js", "c.js", "d.js"]),
+        )
+
+    def test_overlay_prevents_cycles(self):
+        base = FileDependencyGraph()
+        base.add_file("a.js", 0, 0, 0)
+        base.add_file("b.js", 0, 0, 0, ["a.js"])
+        overlay = OverlayFileDependencyGraph(base)
+        self.assertRaises(ValueError, overlay.set_children, "a.js", ["b.js"])
+        self.assertRaises(ValueError, overlay.set_children, "a.js", ["a.js"])
+        self.assertEqual(overlay.records, dict())
+
+    def test_flatten(self):
+        base = FileDependencyGraph()
+        base.add_file("a.js", 0, 0, 0)
+        first = OverlayFileDependencyGraph(base)
+        first.add_file("b.js", 0, 0, 0, ["a.js"])
+        second = OverlayFileDependencyGraph(first)
+        second.add_file("c.js", 0, 0, 0, ["b.js"])
+        flattened = second.flatten()
+        self.assertIs(flattened.base, base)
+        self.assertEqual(flattened.to_graph(), second.to_graph())
+
+    def test_journal_discards_torn_block(self):
+        record = GraphNodeRecord(FileSignature(1.5, 2, 3), ["b.js"], [])
+        try:
+            append_journal("test.journal", {"dependency": {"a.js": record}})
+            append_journal("test.journal", {"dependency": {"b.js": None}})
+            complete_size = os.path.getsize("test.journal")
+            with open("test.journal", "ab") as f:
+                f.write(b"\x10\x00\x00\x00\x00")
+
+            blocks = read_journal("test.journal")
+            self.assertEqual(
+                blocks,
+                [{"dependency": {"a.js": record}}, {"dependency": {"b.js": None}}],
+            )
+            self.assertEqual(os.path.getsize("test.journal"), complete_size)
+        finally:
+            if os.path.exists("test.journal"):
+                os.unlink("test.journal")
+
+    def test_incremental_build_appends_to_journal(self):
+        os.makedirs(os.path.join("tmp"), exist_ok=True)
+        context = BuildContext("tmp", dev=False, symlinks=False)
+        try:
+            vanillaplusjs.runners.init.main(["--folder", "tmp"])
+            with open(os.path.join("tmp", "src", "public", "test.txt"), "w") as f:
+                f.write("test")
+            vanillaplusjs.runners.build.main(["--folder", "tmp"])
+            self.assertTrue(os.path.exists(context.output_graph_file))
+            self.assertFalse(os.path.exists(context.graph_journal_file))
+
+            with open(os.path.join("tmp", "src", "public", "other.txt"), "w") as f:
+                f.write("other")
+            vanillaplusjs.runners.build.main(["--folder", "tmp"])
+            self.assertTrue(os.path.exists(context.graph_journal_file))
+
+            graphs = load_build_graphs(context)
+            self.assertIsInstance(graphs.output, OverlayFileDependencyGraph)
+            self.assertIn(os.path.join("src", "public", "test.txt"), graphs.output)
+            self.assertEqual(
+                frozenset(
+                    graphs.output.get_children(
+                        os.path.join("src", "public", "other.txt")
+                    )
+                ),
+                frozenset(
+                    [
+                        os.path.join("out", "www", "other.txt"),
+                        os.path.join("out", "www", "other.txt.hash"),
+                    ]
+                ),
+            )
+
+            os.remove(os.path.join("tmp", "src", "public", "other.txt"))
+            vanillaplusjs.runners.build.main(["--folder", "tmp"])
+            graphs = load_build_graphs(context)
+            self.assertNotIn(os.path.join("src", "public", "other.txt"), graphs.output)
+            self.assertNotIn(os.path.join("out", "www", "other.txt"), graphs.output)
+        finally:
+            shutil.rmtree("tmp")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import helper  # noqa
+import unittest
+import json
+import os
+import shutil
+from urllib.parse import urlencode
+from vanillaplusjs.build.build_context import BuildContext
+from vanillaplusjs.build.hash_cache import get_hash, load_hash_manifest
+import vanillaplusjs.runners.init
+import vanillaplusjs.runners.build
+
+
+class Test(unittest.TestCase):
+    def test_reuses_hash_within_build_generation(self):
+        os.makedirs(os.path.join("tmp", "out", "www"), exist_ok=True)
+        context = BuildContext("tmp", dev=False, symlinks=False)
+        relpath = os.path.join("out", "www", "main.js.hash")
+        hash_path = os.path.join("tmp", relpath)
+        try:
+            with open(hash_path, "w") as f:
+                f.write("first")
+
+            # without a build generation the hash file is always read
+            self.assertEqual(get_hash(context, relpath), "first")
+            with open(hash_path, "w") as f:
+                f.write("second")
+            self.assertEqual(get_hash(context, relpath), "second")
+
+            context.build_generation = "a"
+            self.assertEqual(get_hash(context, relpath), "second")
+            with open(hash_path, "w") as f:
+                f.write("third")
+            self.assertEqual(get_hash(context, relpath), "second")
+
+            context.build_generation = "b"
+            self.assertEqual(get_hash(context, relpath), "third")
+
+            os.remove(hash_path)
+            context.build_generation = "c"
+            with self.assertRaises(FileNotFoundError):
+                get_hash(context, relpath)
+        finally:
+            shutil.rmtree("tmp")
+
+    def test_build_maintains_hash_manifest(self):
+        os.makedirs(os.path.join("tmp"), exist_ok=True)
+        try:
+            vanillaplusjs.runners.init.main(["--folder", "tmp"])
+            with open(os.path.join("tmp", "vanillaplusjs.json")) as f:
+                config = json.load(f)
+            config["hash_manifest"] = True
+            with open(os.path.join("tmp", "vanillaplusjs.json"), "w") as f:
+                json.dump(config, f)
+
+            os.makedirs(os.path.join("tmp", "src", "public", "js"), exist_ok=True)
+            with open(os.path.join("tmp", "src", "public", "js", "a.js"), "w") as f:
+                f.write("export const a = 1;\n")
+            with open(os.path.join("tmp", "src", "public", "js", "b.js"), "w") as f:
+                f.write('import { a } from "./a.js";\nexport const b = a;\n')
+            vanillaplusjs.runners.build.main(["--folder", "tmp", "--no-daemon"])
+
+            context = BuildContext("tmp", dev=False, symlinks=False)
+            a_hash = os.path.join("out", "www", "js", "a.js.hash")
+            b_hash = os.path.join("out", "www", "js", "b.js.hash")
+            manifest = load_hash_manifest(context.hash_manifest_file)
+            for relpath in (a_hash, b_hash):
+                with open(os.path.join("tmp", relpath)) as f:
+                    self.assertEqual(manifest[relpath], f.read())
+
+            with open(os.path.join("tmp", "src", "public", "js", "a.js"), "w") as f:
+                f.write("export const a = 2;\n")
+            vanillaplusjs.runners.build.main(["--folder", "tmp", "--no-daemon"])
+
+            new_manifest = load_hash_manifest(context.hash_manifest_file)
+            self.assertNotEqual(new_manifest[a_hash], manifest[a_hash])
+            with open(os.path.join("tmp", a_hash)) as f:
+                self.assertEqual(new_manifest[a_hash], f.read())
+            with open(os.path.join("tmp", "out", "www", "js", "b.js")) as f:
+                self.assertIn(urlencode({"v": new_manifest[a_hash]}), f.read())
+
+            config["hash_manifest"] = False
+            with open(os.path.join("tmp", "vanillaplusjs.json"), "w") as f:
+                json.dump(config, f)
+            with open(os.path.join("tmp", "src", "public", "js", "a.js"), "w") as f:
+                f.write("export const a = 3;\n")
+            vanillaplusjs.runners.build.main(["--folder", "tmp", "--no-daemon"])
+            self.assertFalse(os.path.exists(context.hash_manifest_file))
+        finally:
+            shutil.rmtree("tmp")
+
+
+if __name__ == "__main__":
+    unittest.main()
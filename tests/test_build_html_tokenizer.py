@@ -0,0 +1,164 @@
+import helper  # noqa
+import unittest
+import io
+import json
+import os
+import shutil
+from vanillaplusjs.build.html import stream_tokenizer
+from vanillaplusjs.build.html.tokenizer import tokenize
+import vanillaplusjs.runners.init
+import vanillaplusjs.runners.build
+
+
+SUPPORTED_HTML = [
+    '<!DOCTYPE html><html><head><meta charset="utf-8"></head><body></body></html>',
+    """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="utf-8">
+    <title>Home</title>
+    <!--[TEMPLATE: ["/header.html", {"title": "Home"}]]-->
+    <link rel="stylesheet" href="/css/main.css">
+    <style>.bg-white { background: white; }</style>
+</head>
+<body>
+    <div class="bg-white">White background</div>
+    <ul>
+        <li>a &amp; b</li>
+        <li><a href="/?a=1&amp;b=2&c=3">link</a><ul><li>c</li></ul></li>
+    </ul>
+    <pre>
+keep</pre>
+    <textarea>
+text</textarea>
+    <script type="module">if (a < b && c </ d) {}</script>
+</body>
+</html>
+""",
+    '\n<title><!--[STACK: ["retrieve", "title"]]--></title>\n<link rel="stylesheet" href="/css/main.css">\n',
+    "<p>hello</p>",
+    "<p B=1 a='2' b=3 disabled>x&nbsp;y&notit; &#128; &#x1F600;</p><br/><wbr>",
+    "<html><body><p>x</p></body>  <!-- after --> </html> <!--z--> \n",
+    "<object><b>x</b></object><b>y</b>",
+]
+"""Html which the stream tokenizer supports without falling back"""
+
+UNSUPPORTED_HTML = [
+    "<p>a<p>b",
+    "<b><i>x</b></i>",
+    "<table><tr><td>x</td></tr></table>",
+    "<ul><li>a<li>b</ul>",
+    "<script>a<!--b-->c</script>",
+    "<svg><circle/></svg>",
+    "</p>",
+]
+"""Html which html5lib has to repair, so the stream tokenizer falls back"""
+
+
+def tokens_with_attribute_order(html: str, fragment: bool, engine: str) -> list:
+    result = []
+    for token in tokenize(io.StringIO(html), fragment=fragment, engine=engine):
+        if isinstance(token.get("data"), dict):
+            token = dict(token, data=list(token["data"].items()))
+        result.append(token)
+    return result
+
+
+class Test(unittest.TestCase):
+    def assert_engines_agree(self, html: str, fragment: bool):
+        self.assertEqual(
+            tokens_with_attribute_order(html, fragment, "html5lib"),
+            tokens_with_attribute_order(html, fragment, "stream"),
+            f"{html=}, {fragment=}",
+        )
+
+    def test_supported_html(self):
+        for html in SUPPORTED_HTML:
+            for fragment in (False, True):
+                if fragment and "<html" in html.lower():
+                    continue
+                stream_tokenizer.tokenize(html, fragment=fragment)
+                self.assert_engines_agree(html, fragment)
+
+    def test_unsupported_html(self):
+        for html in UNSUPPORTED_HTML:
+            for fragment in (False, True):
+                with self.assertRaises(stream_tokenizer.UnsupportedHTMLError):
+                    stream_tokenizer.tokenize(html, fragment=fragment)
+                self.assert_engines_agree(html, fragment)
+
+    def test_builds_match(self):
+        outputs = []
+        for engine in ("html5lib", "stream"):
+            os.makedirs(os.path.join("tmp"), exist_ok=True)
+            try:
+                vanillaplusjs.runners.init.main(["--folder", "tmp"])
+                with open(os.path.join("tmp", "vanillaplusjs.json")) as f:
+                    config = json.load(f)
+                config["html_tokenizer"] = engine
+                with open(os.path.join("tmp", "vanillaplusjs.json"), "w") as f:
+                    json.dump(config, f)
+
+                with open(os.path.join("tmp", "src", "public", "index.html"), "w") as f:
+                    f.write(SUPPORTED_HTML[1])
+                os.makedirs(os.path.join("tmp", "src", "public", "css"), exist_ok=True)
+                with open(
+                    os.path.join("tmp", "src", "public", "css", "main.css"), "w"
+                ) as f:
+                    f.write(".bg-white { background: white; }\n")
+                os.makedirs(os.path.join("tmp", "src", "partials"), exist_ok=True)
+                with open(
+                    os.path.join("tmp", "src", "partials", "header.html"), "w"
+                ) as f:
+                    f.write(SUPPORTED_HTML[2])
+                with open(os.path.join("tmp", "src", "public", "other.html"), "w") as f:
+                    f.write(UNSUPPORTED_HTML[0])
+
+                vanillaplusjs.runners.build.main(["--folder", "tmp", "--no-daemon"])
+
+                result = dict()
+                for name in ("index.html", "other.html"):
+                    with open(os.path.join("tmp", "out", "www", name), "rb") as f:
+                        result[name] = f.read()
+                outputs.append(result)
+            finally:
+                shutil.rmtree("tmp")
+
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_token_cache_keyed_by_engine(self):
+        os.makedirs(os.path.join("tmp"), exist_ok=True)
+        try:
+            vanillaplusjs.runners.init.main(["--folder", "tmp"])
+            with open(os.path.join("tmp", "src", "public", "index.html"), "w") as f:
+                f.write(SUPPORTED_HTML[1])
+            os.makedirs(os.path.join("tmp", "src", "partials"), exist_ok=True)
+            with open(os.path.join("tmp", "src", "partials", "header.html"), "w") as f:
+                f.write(SUPPORTED_HTML[2])
+            os.makedirs(os.path.join("tmp", "src", "public", "css"), exist_ok=True)
+
+            token_cache = os.path.join("tmp", "out", "token_cache")
+            for engine in ("stream", "html5lib"):
+                with open(os.path.join("tmp", "vanillaplusjs.json")) as f:
+                    config = json.load(f)
+                config["html_tokenizer"] = engine
+                with open(os.path.join("tmp", "vanillaplusjs.json"), "w") as f:
+                    json.dump(config, f)
+
+                # the pages are unchanged, but are rebuilt since their
+                # stylesheet changed
+                with open(
+                    os.path.join("tmp", "src", "public", "css", "main.css"), "w"
+                ) as f:
+                    f.write(f"/* {engine} */ .bg-white {{ background: white; }}\n")
+
+                vanillaplusjs.runners.build.main(["--folder", "tmp", "--no-daemon"])
+                self.assertIn(f"html-{engine}", os.listdir(token_cache))
+                self.assertIn(f"html-fragment-{engine}", os.listdir(token_cache))
+        finally:
+            shutil.rmtree("tmp")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import helper  # noqa
+import unittest
+import os
+import shutil
+from vanillaplusjs.build.build_scheduler import BuildScheduler
+from vanillaplusjs.build.exceptions import CyclicDependencyException
+import vanillaplusjs.runners.init
+import vanillaplusjs.runners.build
+
+
+class Test(unittest.TestCase):
+    def test_longest_chain_first(self):
+        scheduler = BuildScheduler(
+            {
+                "a.js": [],
+                "b.js": ["a.js"],
+                "c.js": ["b.js"],
+                "d.js": [],
+                "e.js": ["d.js", "other.js"],
+            }
+        )
+        self.assertEqual(scheduler.priorities["a.js"], 3)
+        self.assertEqual(scheduler.take_ready(lambda f: True), ["a.js", "d.js"])
+        self.assertEqual(scheduler.take_ready(lambda f: True), [])
+
+        scheduler.complete("d.js")
+        self.assertEqual(scheduler.take_ready(lambda f: True), ["e.js"])
+        scheduler.complete("a.js")
+        scheduler.complete("e.js")
+        self.assertEqual(scheduler.take_ready(lambda f: f != "b.js"), [])
+        self.assertEqual(scheduler.blocked, ["b.js"])
+        self.assertEqual(scheduler.take_ready(lambda f: True), ["b.js"])
+        scheduler.complete("b.js")
+        self.assertEqual(scheduler.take_ready(lambda f: True), ["c.js"])
+        self.assertFalse(scheduler.finished)
+        scheduler.complete("c.js")
+        self.assertTrue(scheduler.finished)
+
+    def test_reports_cycle(self):
+        with self.assertRaises(CyclicDependencyException) as cm:
+            BuildScheduler(
+                {
+                    "a.js": ["b.js"],
+                    "b.js": ["c.js"],
+                    "c.js": ["b.js"],
+                    "d.js": [],
+                }
+            )
+        self.assertIn("b.js -> c.js -> b.js", cm.exception.message)
+
+    def test_build_reports_cyclic_imports(self):
+        os.makedirs(os.path.join("tmp"), exist_ok=True)
+        try:
+            vanillaplusjs.runners.init.main(["--folder", "tmp"])
+            with open(os.path.join("tmp", "src", "public", "js", "a.js"), "w") as f:
+                f.write('import { b } from "/js/b.js";\nexport const a = 1;\n')
+            with open(os.path.join("tmp", "src", "public", "js", "b.js"), "w") as f:
+                f.write('import { a } from "/js/a.js";\nexport const b = 1;\n')
+
+            with self.assertRaises(CyclicDependencyException) as cm:
+                vanillaplusjs.runners.build.main(["--folder", "tmp", "--no-daemon"])
+            self.assertRegex(
+                cm.exception.message,
+                r"(a\.js -> .*b\.js -> .*a\.js)|(b\.js -> .*a\.js -> .*b\.js)",
+            )
+        finally:
+            shutil.rmtree("tmp")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import helper  # noqa
+import unittest
+import os
+import shutil
+from vanillaplusjs.build.build_context import BuildContext
+from vanillaplusjs.build.html.manipulate_and_serialize import (
+    iter_tokenize_file,
+    tokenize_file,
+)
+from vanillaplusjs.build.token_cache import (
+    forget_tokens,
+    get_token_cache_path,
+    get_tokens,
+    stream_tokens,
+)
+import vanillaplusjs.runners.init
+import vanillaplusjs.runners.build
+
+
+class Test(unittest.TestCase):
+    def test_reuses_tokens_until_file_changes(self):
+        os.makedirs(os.path.join("tmp", "src"), exist_ok=True)
+        context = BuildContext("tmp", dev=False, symlinks=False)
+        relpath = os.path.join("src", "test.html")
+        calls = []
+
+        def counting_tokenize_file(path: str):
+            calls.append(path)
+            return tokenize_file(path)
+
+        try:
+            with open(os.path.join("tmp", relpath), "w") as f:
+                f.write("<p>hello</p>")
+
+            first = get_tokens(context, relpath, "html", counting_tokenize_file)
+            second = get_tokens(context, relpath, "html", counting_tokenize_file)
+            self.assertEqual(first, second)
+            self.assertIsNot(first, second)
+            self.assertEqual(len(calls), 1)
+
+            # recently used tokens are kept in memory within the process
+            os.remove(get_token_cache_path(context, relpath, "html"))
+            self.assertEqual(
+                get_tokens(context, relpath, "html", counting_tokenize_file), first
+            )
+            self.assertEqual(len(calls), 1)
+
+            with open(os.path.join("tmp", relpath), "w") as f:
+                f.write("<p>goodbye, world</p>")
+            third = get_tokens(context, relpath, "html", counting_tokenize_file)
+            self.assertNotEqual(first, third)
+            self.assertEqual(len(calls), 2)
+
+            forget_tokens(context, relpath)
+            self.assertFalse(
+                os.path.exists(get_token_cache_path(context, relpath, "html"))
+            )
+        finally:
+            shutil.rmtree("tmp")
+
+    def test_streams_tokens_until_cached(self):
+        os.makedirs(os.path.join("tmp", "src"), exist_ok=True)
+        context = BuildContext("tmp", dev=False, symlinks=False)
+        relpath = os.path.join("src", "test.html")
+        calls = []
+
+        def counting_iter_tokenize_file(path: str):
+            calls.append(path)
+            return iter_tokenize_file(path)
+
+        try:
+            with open(os.path.join("tmp", relpath), "w") as f:
+                f.write("<p>hello</p>")
+            expected = tokenize_file(os.path.join("tmp", relpath))
+
+            # nothing is stored until the tokens have all been consumed
+            tokens = stream_tokens(
+                context, relpath, "html", counting_iter_tokenize_file
+            )
+            self.assertNotIsInstance(tokens, list)
+            next(iter(tokens))
+            del tokens
+            self.assertFalse(
+                os.path.exists(get_token_cache_path(context, relpath, "html"))
+            )
+
+            # mutating the streamed tokens does not affect the stored tokens
+            for token in stream_tokens(
+                context, relpath, "html", counting_iter_tokenize_file
+            ):
+                token["type"] = "Mutated"
+            self.assertEqual(len(calls), 2)
+
+            cached = stream_tokens(
+                context, relpath, "html", counting_iter_tokenize_file
+            )
+            self.assertEqual(cached, expected)
+            self.assertEqual(len(calls), 2)
+        finally:
+            shutil.rmtree("tmp")
+
+    def test_build_caches_tokens(self):
+        os.makedirs(os.path.join("tmp"), exist_ok=True)
+        context = BuildContext("tmp", dev=False, symlinks=False)
+        try:
+            vanillaplusjs.runners.init.main(["--folder", "tmp"])
+            vanillaplusjs.runners.build.main(["--folder", "tmp", "--no-daemon"])
+            relpath = os.path.join("src", "public", "index.html")
+            self.assertTrue(
+                os.path.exists(get_token_cache_path(context, relpath, "html-stream"))
+            )
+
+            os.remove(os.path.join("tmp", relpath))
+            vanillaplusjs.runners.build.main(["--folder", "tmp", "--no-daemon"])
+            self.assertFalse(
+                os.path.exists(get_token_cache_path(context, relpath, "html-stream"))
+            )
+        finally:
+            shutil.rmtree("tmp")
+
+    def test_build_caches_partials(self):
+        os.makedirs(os.path.join("tmp"), exist_ok=True)
+        context = BuildContext("tmp", dev=False, symlinks=False)
+        partial_relpath = os.path.join("src", "partials", "greeting.html")
+        try:
+            vanillaplusjs.runners.init.main(["--folder", "tmp"])
+            os.makedirs(os.path.join("tmp", "src", "partials"), exist_ok=True)
+            with open(os.path.join("tmp", partial_relpath), "w") as f:
+                f.write('<p>Hello, <!--[STACK: ["retrieve", "name"]]--></p>')
+            for name in ("a", "b"):
+                with open(
+                    os.path.join("tmp", "src", "public", f"{name}.html"), "w"
+                ) as f:
+                    f.write(
+                        "<!DOCTYPE html><html><head></head><body>"
+                        f'<!--[TEMPLATE: ["/greeting.html", {{"name": "{name}"}}]]-->'
+                        "</body></html>"
+                    )
+
+            vanillaplusjs.runners.build.main(["--folder", "tmp", "--no-daemon"])
+            self.assertTrue(
+                os.path.exists(
+                    get_token_cache_path(
+                        context, partial_relpath, "html-fragment-stream"
+                    )
+                )
+            )
+            with open(os.path.join("tmp", "out", "www", "b.html")) as f:
+                self.assertIn("<p>Hello, b</p>", f.read())
+
+            with open(os.path.join("tmp", partial_relpath), "w") as f:
+                f.write('<p>Goodbye, <!--[STACK: ["retrieve", "name"]]--></p>')
+            vanillaplusjs.runners.build.main(["--folder", "tmp", "--no-daemon"])
+            for name in ("a", "b"):
+                with open(os.path.join("tmp", "out", "www", f"{name}.html")) as f:
+                    self.assertIn(f"<p>Goodbye, {name}</p>", f.read())
+        finally:
+            shutil.rmtree("tmp")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import helper  # noqa
+import unittest
+import io
+import os
+import shutil
+from typing import List, Optional
+from vanillaplusjs.build.html.builder import HTMLBuilder
+from vanillaplusjs.build.html.manipulate_and_serialize import (
+    manipulate_and_serialize,
+)
+from vanillaplusjs.build.html.manipulator import HTMLManipulator
+from vanillaplusjs.build.html.token import HTMLToken
+from vanillaplusjs.build.html.tokenizer import tokenize
+import html5lib
+
+
+class HoldParagraphs(HTMLManipulator):
+    """Holds onto the tokens of each paragraph until it ends, then outputs
+    them unchanged
+    """
+
+    def __init__(self):
+        self.held: List[HTMLToken] = []
+        self.released: Optional[HTMLToken] = None
+
+    def start_mark(self, node: HTMLToken) -> bool:
+        # the released tokens are handled again, so skip the one we released
+        return (
+            node["type"] == "StartTag"
+            and node["name"] == "p"
+            and node is not self.released
+        )
+
+    def continue_mark(self, node: HTMLToken) -> Optional[List[HTMLToken]]:
+        self.held.append(node)
+        if node["type"] == "EndTag" and node["name"] == "p":
+            result = self.held
+            self.held = []
+            self.released = result[0]
+            return result
+        return None
+
+
+class FailOnParagraph(HTMLManipulator):
+    """Raises once the paragraph with the given text is reached"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def start_mark(self, node: HTMLToken) -> bool:
+        if node["type"] == "Characters" and node["data"] == self.text:
+            raise ValueError(f"failed on {self.text}")
+        return False
+
+    def continue_mark(self, node: HTMLToken) -> Optional[List[HTMLToken]]:
+        return [node]
+
+
+HTML = (
+    "<!DOCTYPE html><html><head><title>Test</title></head><body>"
+    + "".join(f"<p>Paragraph <b>{i}</b></p>\n" for i in range(500))
+    + "<script>if (a < b) {}</script></body></html>"
+)
+
+
+class Test(unittest.TestCase):
+    def test_buffers_only_held_tokens(self):
+        builder = HTMLBuilder([HoldParagraphs()])
+        output = []
+        for token in tokenize(io.StringIO(HTML)):
+            builder.handle_token(token)
+            output.extend(builder.consume_tokens())
+
+        self.assertEqual(output, list(tokenize(io.StringIO(HTML))))
+        # <p>, "Paragraph", " ", <b>, "{i}", </b>, </p>; regardless of how
+        # many paragraphs there are
+        self.assertEqual(builder.peak_buffered_tokens, 7)
+
+    def test_output_matches_serializing_at_once(self):
+        os.makedirs("tmp", exist_ok=True)
+        try:
+            infile = os.path.join("tmp", "in.html")
+            outfile = os.path.join("tmp", "out.html")
+            with open(infile, "w") as f:
+                f.write(HTML)
+
+            manipulate_and_serialize(infile, outfile, [HoldParagraphs()])
+
+            serializer = html5lib.serializer.HTMLSerializer(
+                omit_optional_tags=False, quote_attr_values="always"
+            )
+            expected = serializer.render(
+                list(tokenize(io.StringIO(HTML))), encoding="utf-8"
+            ) + bytes(os.linesep, encoding="utf-8")
+            with open(outfile, "rb") as f:
+                self.assertEqual(f.read(), expected)
+        finally:
+            shutil.rmtree("tmp")
+
+    def test_failure_leaves_output_unchanged(self):
+        os.makedirs("tmp", exist_ok=True)
+        try:
+            infile = os.path.join("tmp", "in.html")
+            outfile = os.path.join("tmp", "out.html")
+            with open(infile, "w") as f:
+                f.write(HTML)
+            with open(outfile, "w") as f:
+                f.write("previous")
+
+            # late enough that some output has already been written
+            with self.assertRaises(ValueError):
+                manipulate_and_serialize(infile, outfile, [FailOnParagraph("499")])
+
+            with open(outfile, "r") as f:
+                self.assertEqual(f.read(), "previous")
+            self.assertEqual(sorted(os.listdir("tmp")), ["in.html", "out.html"])
+        finally:
+            shutil.rmtree("tmp")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -51,6 +51,13 @@ class ExternalFileState:
     should double-check the integrity.
     """
 
+    fingerprint: Optional[str] = None
+    """The partial fingerprint of the file after we verified it (see
+    get_partial_fingerprint). If the signature changed but the fingerprint did
+    not, e.g., after a checkout touched the file, the integrity is not checked
+    again. None if not known, in which case it always is.
+    """
+
     @classmethod
     def from_json(cls, data: dict) -> "ExternalFilesState":
         """Creates an ExternalFilesState from a JSON object"""
@@ -58,6 +65,7 @@ class ExternalFileState:
             relpath=data["relpath"],
             integrity=data["integrity"],
             signature=FileSignature.from_json(data["signature"]),
+            fingerprint=data.get("fingerprint"),
         )
 
 
@@ -125,7 +133,9 @@ class BuildContext:
     """The default css file for imports if not specified"""
 
     icon_settings: "IconSettings" = None
-    """The icon settings to use when generating icons"""
+    """The icon settings to use when generating icons, or None to load them
+    when they are first needed. See get_icon_settings.
+    """
 
     image_settings: "ImageSettings" = None
     """The image settings to use when generating images"""
@@ -144,6 +154,51 @@ class BuildContext:
     at least a few seconds.
     """
 
+    content_digests: bool = False
+    """If true, cold builds store a digest of the contents of each input file
+    and files whose signature changed but whose contents did not are not
+    rebuilt. This is useful when the project is built from a fresh clone or
+    restored cache, where every signature changes.
+    """
+
+    html_tokenizer: str = "html5lib"
+    """Which engine to use for tokenizing html files; one of
+    HTML_TOKENIZER_ENGINES in vanillaplusjs.build.html.tokenizer. Both produce
+    the same tokens, but "stream" is much faster and only falls back to
+    html5lib for documents which html5lib would need to repair. New projects
+    use "stream", but projects which do not specify it keep using html5lib.
+    """
+
+    image_store_folder: Optional[str] = None
+    """The folder containing the store of exported images which is shared
+    between every image with the same contents and target, and which may be
+    shared between projects. None to disable the store. See
+    vanillaplusjs.build.html.manips.images.store for details.
+    """
+
+    image_store_max_size: Optional[int] = None
+    """The maximum size of the image store in bytes, after which the least
+    recently used images are removed. None for no limit.
+    """
+
+    external_files_cache_folder: Optional[str] = None
+    """The folder containing the downloaded external files by integrity, which
+    may be shared between projects. None for external_files within the out
+    folder. See vanillaplusjs.build.external_fetch for details.
+    """
+
+    hash_manifest: bool = False
+    """If true, builds store the contents of every hash file in the out folder
+    in a single manifest, which workers load once per build rather than
+    reading each hash file separately. See hash_cache for details.
+    """
+
+    build_generation: Optional[str] = None
+    """Identifies the build which is currently in progress, if any. Workers
+    may cache the contents of the out folder for as long as this does not
+    change. See hash_cache for details.
+    """
+
     @property
     def src_folder(self) -> str:
         """Returns the src folder where the input files are located"""
@@ -173,7 +228,8 @@ class BuildContext:
 
     @property
     def dependency_graph_file(self) -> str:
-        """Returns the path to the dependency graph file.
+        """Returns the path to the dependency graph file, stored in the binary
+        graph format (see graph_binary).
         In this graph, all the files in the graph are input files, and input
         file a is a parent of input file b if the outputs of b depend on a. All
         files are specified relative to the root folder with no leading slash;
@@ -185,7 +241,7 @@ class BuildContext:
           - b is a child of a
           - a is depended on by b
         """
-        return os.path.join(self.out_folder, "dependency_graph.json")
+        return os.path.join(self.out_folder, "dependency_graph.bin")
 
     @property
     def output_graph_file(self) -> str:
@@ -197,7 +253,7 @@ class BuildContext:
         that a single output file may have multiple input files: for example, an
         image which is used in multiple places.
         """
-        return os.path.join(self.out_folder, "output_graph.json")
+        return os.path.join(self.out_folder, "output_graph.bin")
 
     @property
     def placeholder_graph_file(self) -> str:
@@ -209,13 +265,72 @@ class BuildContext:
         the generated file. This augments the dependency graph: if a depends on b
         which is produced by c, then a depends on c.
         """
-        return os.path.join(self.out_folder, "placeholder_graph.json")
+        return os.path.join(self.out_folder, "placeholder_graph.bin")
+
+    @property
+    def graph_journal_file(self) -> str:
+        """Returns the path to the journal of changes to the dependency, output,
+        and placeholder graphs since they were last stored in full. See
+        graph_journal for details.
+        """
+        return os.path.join(self.out_folder, "graph_journal.bin")
+
+    @property
+    def directory_index_file(self) -> str:
+        """Returns the path to the index of the directories within the src
+        folder as of the previous cold build, which allows unchanged
+        directories to be skipped when looking for changed files. See
+        directory_scan for details.
+        """
+        return os.path.join(self.out_folder, "directory_index.json")
+
+    @property
+    def content_digests_file(self) -> str:
+        """Returns the path to the content digests of the input files, used
+        when content_digests is enabled. See content_digests for details.
+        """
+        return os.path.join(self.out_folder, "content_digests.json")
+
+    @property
+    def token_cache_folder(self) -> str:
+        """Returns the folder where the tokens of source files are cached
+        between scanning and building them. See token_cache for details.
+        """
+        return os.path.join(self.out_folder, "token_cache")
+
+    @property
+    def icon_settings_file(self) -> str:
+        """Returns the path to the colors and sizes extracted from the default
+        css file for icons. See get_icon_settings for details.
+        """
+        return os.path.join(self.out_folder, "icon_settings.json")
+
+    @property
+    def icon_cache_folder(self) -> str:
+        """Returns the folder where recolored icons are cached by their
+        contents. See the icons variants module for details.
+        """
+        return os.path.join(self.out_folder, "icon_cache")
+
+    @property
+    def hash_manifest_file(self) -> str:
+        """Returns the path to the hash manifest, used when hash_manifest is
+        enabled. See hash_cache for details.
+        """
+        return os.path.join(self.out_folder, "hash_manifest.json")
 
     @property
     def external_files_state_file(self) -> str:
         """Returns the path to the external files state JSON file"""
         return os.path.join(self.out_folder, "external_files_state.json")
 
+    @property
+    def daemon_socket_file(self) -> str:
+        """Returns the path to the unix socket which the build daemon listens
+        on while it is running, if any.
+        """
+        return os.path.join(self.out_folder, "daemon.sock")
+
 
 def load_external_files(data: Dict[str, Dict]) -> Dict[str, ExternalFile]:
     """Loads the external files from the given data"""
@@ -0,0 +1,226 @@
+"""Loads and stores the three graphs which describe the previous build"""
+from dataclasses import dataclass, fields
+from typing import Callable, Dict, Union
+from vanillaplusjs.build.build_context import BuildContext
+from vanillaplusjs.build.graph import FileDependencyGraph
+from vanillaplusjs.build.graph_binary import MappedFileDependencyGraph
+from vanillaplusjs.build.graph_journal import append_journal, read_journal
+from vanillaplusjs.build.graph_overlay import OverlayFileDependencyGraph
+from vanillaplusjs.build.ioutil import makedirs_safely, replace_atomically
+from loguru import logger
+import os
+
+
+AnyFileDependencyGraph = Union[
+    FileDependencyGraph, MappedFileDependencyGraph, OverlayFileDependencyGraph
+]
+"""A graph which supports the read operations needed for an incremental build"""
+
+JOURNAL_COMPACTION_MIN_BYTES = 64 * 1024
+"""The journal is compacted into the graph files once it is larger than both
+this and the graph files themselves
+"""
+
+
+@dataclass
+class BuildGraphs:
+    """The graphs which are produced by a build and consumed by the next
+    incremental build. See the corresponding properties on the BuildContext
+    for a description of each graph.
+    """
+
+    dependency: AnyFileDependencyGraph
+    """The graph of input files to the input files they depend on"""
+
+    output: AnyFileDependencyGraph
+    """The graph of input files to the output files they produce"""
+
+    placeholders: AnyFileDependencyGraph
+    """The graph of input files to the placeholder files they generated"""
+
+
+def load_build_graphs(context: BuildContext) -> BuildGraphs:
+    """Loads the graphs from the previous build within the given context,
+    using empty graphs for any which have not been produced yet. The graphs
+    are memory-mapped rather than loaded, so only the parts of the graphs
+    used by the build are read, and then any changes in the graph journal
+    are replayed on top of them.
+
+    If the graphs were stored in the legacy json format by an older version,
+    they are migrated to the binary format.
+
+    Args:
+        context (BuildContext): The context whose graphs should be loaded
+
+    Returns:
+        BuildGraphs: The graphs from the previous build
+    """
+    snapshot_paths = _get_snapshot_paths(context)
+    graphs = BuildGraphs(
+        **dict((name, load_build_graph(path)) for name, path in snapshot_paths.items())
+    )
+
+    if not all(os.path.exists(path) for path in snapshot_paths.values()):
+        # the journal is only meaningful relative to the graph files
+        try:
+            os.remove(context.graph_journal_file)
+        except FileNotFoundError:
+            pass
+        return graphs
+
+    blocks = read_journal(context.graph_journal_file)
+    if not blocks:
+        return graphs
+
+    logger.debug("Replaying {} graph journal blocks", len(blocks))
+    for name in snapshot_paths.keys():
+        records = dict()
+        for block in blocks:
+            records.update(block.get(name, dict()))
+        if records:
+            setattr(
+                graphs, name, OverlayFileDependencyGraph(getattr(graphs, name), records)
+            )
+    return graphs
+
+
+def load_build_graph(path: str) -> AnyFileDependencyGraph:
+    """Loads the binary graph at the given path, migrating it from the legacy
+    json file alongside it (the same name with a .json extension) if only the
+    json file exists.
+
+    Args:
+        path (str): The path to the binary graph file
+
+    Returns:
+        FileDependencyGraph, MappedFileDependencyGraph: The graph, which is
+            empty if neither the binary nor json file exist
+    """
+    if os.path.exists(path):
+        return MappedFileDependencyGraph.open(path)
+
+    legacy_path = os.path.splitext(path)[0] + ".json"
+    if not os.path.exists(legacy_path):
+        return FileDependencyGraph()
+
+    logger.info("Migrating {} to the binary graph format", legacy_path)
+    with open(legacy_path) as f:
+        graph = FileDependencyGraph.load(f)
+    store_build_graph(path, graph)
+    os.remove(legacy_path)
+    return graph
+
+
+def store_build_graphs(context: BuildContext, graphs: BuildGraphs) -> None:
+    """Stores the given graphs in full within the out folder of the given
+    context, so they can be loaded by the next build, and clears the graph
+    journal.
+
+    Args:
+        context (BuildContext): The context whose graphs should be stored
+        graphs (BuildGraphs): The graphs to store
+    """
+    makedirs_safely(context.out_folder)
+    for name, path in _get_snapshot_paths(context).items():
+        store_build_graph(path, getattr(graphs, name))
+
+    # if we crash before this the journal is replayed onto the new graph files,
+    # which is harmless as the journal records are absolute
+    try:
+        os.remove(context.graph_journal_file)
+    except FileNotFoundError:
+        pass
+
+
+def commit_build_graphs(context: BuildContext, graphs: BuildGraphs) -> BuildGraphs:
+    """Persists the graphs produced by a rebuild. Graphs which are overlays
+    are persisted by appending their records to the graph journal, so that
+    the cost is proportional to the number of nodes the rebuild touched. If
+    the journal has grown too large, or any of the graphs are not overlays,
+    the graphs are instead stored in full.
+
+    Args:
+        context (BuildContext): The context whose graphs should be stored
+        graphs (BuildGraphs): The graphs after the rebuild
+
+    Returns:
+        BuildGraphs: Graphs equivalent to the given ones which are suitable to
+            pass to the next rebuild
+    """
+    names = [field.name for field in fields(BuildGraphs)]
+    flattened = _map_graphs(
+        graphs,
+        lambda graph: graph.flatten()
+        if isinstance(graph, OverlayFileDependencyGraph)
+        else graph,
+    )
+    snapshot_paths = _get_snapshot_paths(context)
+
+    if not all(
+        isinstance(getattr(graphs, name), OverlayFileDependencyGraph)
+        and os.path.exists(snapshot_paths[name])
+        for name in names
+    ):
+        return _compact(context, flattened)
+
+    makedirs_safely(context.out_folder)
+    append_journal(
+        context.graph_journal_file,
+        dict((name, getattr(graphs, name).records) for name in names),
+    )
+
+    journal_size = os.path.getsize(context.graph_journal_file)
+    snapshots_size = sum(os.path.getsize(path) for path in snapshot_paths.values())
+    if journal_size > max(JOURNAL_COMPACTION_MIN_BYTES, snapshots_size):
+        logger.debug("Compacting graph journal ({} bytes)", journal_size)
+        return _compact(context, flattened)
+
+    return flattened
+
+
+def store_build_graph(path: str, graph: AnyFileDependencyGraph) -> None:
+    """Stores the given graph in the binary format at the given path. The file
+    is replaced atomically, so that a memory-mapped copy of the old graph
+    remains valid and an interrupted write does not corrupt the graph.
+
+    Args:
+        path (str): The path to store the graph at
+        graph (FileDependencyGraph, MappedFileDependencyGraph): The graph to store
+    """
+    if isinstance(graph, (MappedFileDependencyGraph, OverlayFileDependencyGraph)):
+        graph = graph.to_graph()
+
+    with replace_atomically(path) as temp_path:
+        with open(temp_path, "wb") as fp:
+            graph.store(fp, format="binary")
+
+
+def _compact(context: BuildContext, graphs: BuildGraphs) -> BuildGraphs:
+    materialized = _map_graphs(
+        graphs,
+        lambda graph: graph.to_graph()
+        if isinstance(graph, OverlayFileDependencyGraph)
+        else graph,
+    )
+    store_build_graphs(context, materialized)
+    return materialized
+
+
+def _get_snapshot_paths(context: BuildContext) -> Dict[str, str]:
+    return {
+        "dependency": context.dependency_graph_file,
+        "output": context.output_graph_file,
+        "placeholders": context.placeholder_graph_file,
+    }
+
+
+def _map_graphs(
+    graphs: BuildGraphs,
+    fn: Callable[[AnyFileDependencyGraph], AnyFileDependencyGraph],
+) -> BuildGraphs:
+    return BuildGraphs(
+        **dict(
+            (field.name, fn(getattr(graphs, field.name)))
+            for field in fields(BuildGraphs)
+        )
+    )
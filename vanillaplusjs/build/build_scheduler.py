@@ -0,0 +1,162 @@
+"""Decides the order in which the files within a rebuild are built. A file can
+only be built once every file it depends on has been built, and among the
+files which can be built, those with the longest chain of files waiting on them
+are started first so that the long chains are not left until the end, when
+there is nothing to run alongside them.
+"""
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+from vanillaplusjs.build.exceptions import CyclicDependencyException
+import heapq
+
+
+class BuildScheduler:
+    """Tracks which files within a rebuild are ready to be built. Each file
+    keeps a count of the dependencies which have not been built yet, so
+    completing a file only touches the files which depend on it.
+    """
+
+    def __init__(self, dependencies: Dict[str, Iterable[str]]) -> None:
+        """Initializes the scheduler for building the given files.
+
+        Args:
+            dependencies (dict[str, iterable[str]]): For each file to build, the
+                files it depends on. Dependencies which are not being built are
+                assumed to be up to date and are ignored.
+
+        Raises:
+            CyclicDependencyException: If the files to build depend on each
+                other cyclically, with the cycle in the message
+        """
+        self.dependencies: Dict[str, Set[str]] = dict(
+            (file, set(dep for dep in deps if dep in dependencies))
+            for file, deps in dependencies.items()
+        )
+        """The dependencies of each file which are also being built"""
+
+        self.dependents: Dict[str, List[str]] = dict(
+            (file, []) for file in dependencies
+        )
+        """The files being built which depend on each file"""
+
+        for file, deps in self.dependencies.items():
+            for dep in deps:
+                self.dependents[dep].append(file)
+
+        self.remaining_dependencies: Dict[str, int] = dict(
+            (file, len(deps)) for file, deps in self.dependencies.items()
+        )
+        """For each file which has not been started, how many of its
+        dependencies have not been built yet
+        """
+
+        self.priorities: Dict[str, int] = self._get_chain_lengths()
+        """For each file, the number of files in the longest chain of files
+        which depend on it, including itself
+        """
+
+        self.unfinished: Set[str] = set(dependencies)
+        """The files which have not finished building"""
+
+        self._ready: List[Tuple[int, str]] = [
+            (-self.priorities[file], file)
+            for file, count in self.remaining_dependencies.items()
+            if count == 0
+        ]
+        heapq.heapify(self._ready)
+
+        self._blocked: List[str] = []
+
+    @property
+    def finished(self) -> bool:
+        """True if every file has been built, False otherwise"""
+        return not self.unfinished
+
+    @property
+    def blocked(self) -> List[str]:
+        """The files whose dependencies are built, but which could not be
+        started when last offered
+        """
+        return list(self._blocked)
+
+    def take_ready(self, try_start: Callable[[str], bool]) -> List[str]:
+        """Offers each file whose dependencies have all been built to the
+        given function, in order of priority, and returns those it accepted.
+        Files which are not accepted are offered again on the next call.
+
+        Args:
+            try_start (Callable[[str], bool]): Called with each file which is
+                ready to be built. Returns True if the file has been started,
+                False if it must wait for some other reason.
+
+        Returns:
+            list[str]: The files which were started, in the order they were
+                started
+        """
+        for file in self._blocked:
+            heapq.heappush(self._ready, (-self.priorities[file], file))
+        self._blocked = []
+
+        started: List[str] = []
+        while self._ready:
+            (_, file) = heapq.heappop(self._ready)
+            if try_start(file):
+                del self.remaining_dependencies[file]
+                started.append(file)
+            else:
+                self._blocked.append(file)
+        return started
+
+    def complete(self, file: str) -> None:
+        """Marks that the given file, which was previously started, has been
+        built, which may allow the files depending on it to be started.
+
+        Args:
+            file (str): The file which was built
+        """
+        self.unfinished.remove(file)
+        for dependent in self.dependents[file]:
+            self.remaining_dependencies[dependent] -= 1
+            if self.remaining_dependencies[dependent] == 0:
+                heapq.heappush(self._ready, (-self.priorities[dependent], dependent))
+
+    def _get_chain_lengths(self) -> Dict[str, int]:
+        """Computes the priority of each file while verifying there are no
+        cycles, via a topological sort.
+        """
+        remaining = dict(self.remaining_dependencies)
+        order: List[str] = [file for file, count in remaining.items() if count == 0]
+        for file in order:
+            for dependent in self.dependents[file]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    order.append(dependent)
+
+        if len(order) < len(self.dependencies):
+            cycle = self._find_cycle(
+                set(file for file, count in remaining.items() if count > 0)
+            )
+            raise CyclicDependencyException(
+                "Cannot rebuild due to a cyclic dependency: {} "
+                "(where a -> b means a depends on b)".format(" -> ".join(cycle))
+            )
+
+        result: Dict[str, int] = dict()
+        for file in reversed(order):
+            result[file] = 1 + max(
+                (result[dependent] for dependent in self.dependents[file]),
+                default=0,
+            )
+        return result
+
+    def _find_cycle(self, stuck: Set[str]) -> List[str]:
+        """Finds a cycle among the given files, each of which has at least one
+        dependency among them. The result starts and ends with the same file.
+        """
+        path: List[str] = []
+        index_in_path: Dict[str, int] = dict()
+        file = min(stuck)
+        while file not in index_in_path:
+            index_in_path[file] = len(path)
+            path.append(file)
+            file = min(dep for dep in self.dependencies[file] if dep in stuck)
+        return path[index_in_path[file] :] + [file]
@@ -1,13 +1,24 @@
-from concurrent.futures import ProcessPoolExecutor
-
-import requests
 from vanillaplusjs.build.build_context import (
     BuildContext,
     ExternalFile,
     ExternalFileState,
     ExternalFilesState,
 )
+from vanillaplusjs.build.build_graphs import BuildGraphs
+from vanillaplusjs.build.content_digests import (
+    DIGEST_CHUNK_SIZE,
+    MAX_CONCURRENT_DIGESTS,
+    find_unchanged_files,
+    load_content_digests,
+    store_content_digests,
+)
+from vanillaplusjs.build.directory_scan import (
+    load_directory_index,
+    scan_directory,
+    store_directory_index,
+)
 from vanillaplusjs.build.exceptions import IntegrityMismatchException
+from vanillaplusjs.build.external_fetch import ExternalFileFetcher, parse_integrity
 from vanillaplusjs.build.ioutil import makedirs_safely
 from .graph import FileDependencyGraph
 from .file_signature import FileSignature, get_file_signature
@@ -15,20 +26,27 @@ from .hot_incremental_rebuild import hot_incremental_rebuild
 from loguru import logger
 import os
 from typing import Dict, Optional, Set, List
+import asyncio
 import concurrent.futures
 import hashlib
 from base64 import b64encode
-import secrets
 import json
 import dataclasses
 
 
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+"""How many bytes from each of the start and end of an external file are
+hashed for its partial fingerprint
+"""
+
+
 async def cold_incremental_rebuild(
     context: BuildContext,
     old_dependency_graph: FileDependencyGraph,
     old_output_graph: FileDependencyGraph,
     old_placeholders_graph: FileDependencyGraph,
-) -> None:
+    executor: Optional[concurrent.futures.Executor] = None,
+) -> BuildGraphs:
     """Builds the given folder, skipping the standard sanity checks to
     see if the folder has the correct structure.
 
@@ -56,6 +74,13 @@ async def cold_incremental_rebuild(
             in which case we remove the placeholder dependency, effectively
             "upgrading" it, which is not usually desirable but the only logical
             thing to do.
+        executor (concurrent.futures.Executor, None):
+            If specified, the executor to use for the rebuild rather than
+            creating a new process pool.
+
+    Returns:
+        BuildGraphs: The dependency, output, and placeholder graphs after the
+            rebuild
     """
     logger.debug(
         'Starting cold start incremental rebuild on "{}"',
@@ -71,28 +96,74 @@ async def cold_incremental_rebuild(
     # file signatures. In both cases, once we know what files have changed,
     # we can start the incremental rebuild.
 
-    relpaths_deleted: Set[str] = set(old_dependency_graph.nodes.keys())
+    old_directory_index = load_directory_index(context.directory_index_file)
+    known_files: Optional[Dict[str, List[str]]] = None
+    if old_directory_index is not None and len(old_dependency_graph) > 0:
+        known_files = dict()
+        for relpath in old_dependency_graph:
+            (dir_relpath, filename) = os.path.split(relpath)
+            known_files.setdefault(dir_relpath, []).append(filename)
+
+    # Listing the files is typically the bulk of the work, so directories are
+    # listed concurrently and unchanged directories are not listed at all; see
+    # directory_scan for details.
+    scan_result = scan_directory(
+        context.folder,
+        os.path.relpath(context.src_folder, context.folder),
+        old_index=old_directory_index,
+        known_files=known_files,
+    )
+    logger.debug(
+        "Listed {} directories and reused the listing of {} unchanged directories",
+        scan_result.listed,
+        scan_result.reused,
+    )
+
+    relpaths_deleted: Set[str] = set(old_dependency_graph)
     relpaths_changed: Dict[str, FileSignature] = dict()
     relpaths_added: Dict[str, FileSignature] = dict()
 
-    # PERF:
-    #   This is approximately O(1) in the number of src files. There does
-    #   not seem to be an obvious way to parallelize this, since the bulk
-    #   of the work is listing the files, and we don't know what prefixes
-    #   are heavy before starting.
-
-    for (dirpath, _, filenames) in os.walk(context.src_folder):
-        for filename in filenames:
-            relpath = os.path.relpath(os.path.join(dirpath, filename), context.folder)
-            signature = get_file_signature(os.path.join(context.folder, relpath))
-            if relpath in old_dependency_graph:
-                relpaths_deleted.remove(relpath)
-                if not old_dependency_graph.check_file(
-                    relpath, signature.filesize, signature.mtime, signature.inode
-                ):
-                    relpaths_changed[relpath] = signature
-            else:
-                relpaths_added[relpath] = signature
+    for relpath, signature in scan_result.files.items():
+        if relpath in old_dependency_graph:
+            relpaths_deleted.remove(relpath)
+            if not old_dependency_graph.check_file(
+                relpath, signature.filesize, signature.mtime, signature.inode
+            ):
+                relpaths_changed[relpath] = signature
+        else:
+            relpaths_added[relpath] = signature
+
+    relpaths_touched: Dict[str, FileSignature] = dict()
+    if context.content_digests:
+        old_digests = load_content_digests(context.content_digests_file)
+        digest_result = await asyncio.get_running_loop().run_in_executor(
+            None,
+            find_unchanged_files,
+            context.folder,
+            dict(
+                (relpath, old_dependency_graph.get_signature(relpath))
+                for relpath in relpaths_changed
+            ),
+            old_digests,
+            {**relpaths_changed, **relpaths_added},
+        )
+        for relpath, signature in digest_result.unchanged.items():
+            del relpaths_changed[relpath]
+            relpaths_touched[relpath] = signature
+
+        new_digests = dict(
+            (relpath, digest)
+            for relpath, digest in old_digests.items()
+            if relpath in old_dependency_graph
+            and relpath not in relpaths_deleted
+            and digest.signature == old_dependency_graph.get_signature(relpath)
+        )
+        new_digests.update(digest_result.digests)
+
+        logger.debug(
+            "Content digests matched {} files with changed signatures",
+            len(relpaths_touched),
+        )
 
     logger.info(
         "Cold start incremental build detected {} changed files, {} added files, and {} deleted files",
@@ -101,7 +172,7 @@ async def cold_incremental_rebuild(
         len(relpaths_deleted),
     )
 
-    await hot_incremental_rebuild(
+    new_graphs = await hot_incremental_rebuild(
         context,
         old_dependency_graph,
         old_output_graph,
@@ -109,12 +180,30 @@ async def cold_incremental_rebuild(
         relpaths_changed,
         relpaths_added,
         relpaths_deleted,
+        touched_files=relpaths_touched,
+        executor=executor,
     )
 
+    # only once the rebuild succeeded are all the files we found in the
+    # dependency graph, which the directory index relies on
+    store_directory_index(context.directory_index_file, scan_result.index)
+
+    if context.content_digests:
+        store_content_digests(context.content_digests_file, new_digests)
+    else:
+        try:
+            os.remove(context.content_digests_file)
+        except FileNotFoundError:
+            pass
+
+    return new_graphs
+
 
 async def check_external_files(context: BuildContext):
     """Scans the external files in the build; if any of them are out of date
-    or missing, they are updated from the url.
+    or missing, they are fetched from the url through the external files
+    cache. See external_fetch for details. Files which were only touched are
+    recognized by their partial fingerprint without being hashed again.
 
     Args:
         context (BuildContext): The context to build in
@@ -136,51 +225,66 @@ async def check_external_files(context: BuildContext):
             logger.info("Deleting old external file {}", old_external_file_relpath)
             os.remove(os.path.join(context.folder, old_external_file_relpath))
 
-    executor: Optional[ProcessPoolExecutor] = None
-    # We don't want to spin up a whole process pool unless we actually have
-    # something to do
+    to_verify: List[ExternalFile] = []
+    for desired_external_file in context.external_files.values():
+        if is_external_file_skippable(
+            context, external_files_state, desired_external_file.relpath
+        ):
+            new_external_files_state.state_by_relpath[
+                desired_external_file.relpath
+            ] = external_files_state.state_by_relpath[desired_external_file.relpath]
+            continue
 
-    futures: List[concurrent.futures.Future] = []
-    try:
-        for desired_external_file in context.external_files.values():
-            if is_external_file_skippable(
-                context, external_files_state, desired_external_file.relpath
-            ):
-                new_external_files_state.state_by_relpath[
-                    desired_external_file.relpath
-                ] = external_files_state.state_by_relpath[desired_external_file.relpath]
-                continue
+        to_verify.append(desired_external_file)
 
-            if executor is None:
-                executor = ProcessPoolExecutor()
+    if not to_verify:
+        return
 
-            futures.append(
-                executor.submit(handle_external_file, context, desired_external_file)
+    # hashlib releases the GIL while hashing, so threads verify files in
+    # parallel without the cost of starting processes
+    loop = asyncio.get_running_loop()
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(MAX_CONCURRENT_DIGESTS, len(to_verify)),
+        thread_name_prefix="vanillaplusjs-verify",
+    ) as verify_executor:
+        verified_states = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    verify_executor,
+                    verify_external_file,
+                    context,
+                    external_files_state,
+                    external_file,
+                )
+                for external_file in to_verify
             )
-    finally:
-        if executor is not None:
-            executor.shutdown(wait=True)
+        )
 
-    if not futures:
-        return
+    to_fetch: List[ExternalFile] = []
+    for external_file, verified_state in zip(to_verify, verified_states):
+        if verified_state is None:
+            to_fetch.append(external_file)
+        else:
+            new_external_files_state.state_by_relpath[
+                external_file.relpath
+            ] = verified_state
 
-    for future in futures:
-        future.result()
+    if to_fetch:
+        cache_folder = context.external_files_cache_folder or os.path.join(
+            context.out_folder, "external_files"
+        )
+        async with ExternalFileFetcher(cache_folder) as fetcher:
+            await asyncio.gather(
+                *(
+                    handle_external_file(context, fetcher, external_file)
+                    for external_file in to_fetch
+                )
+            )
 
-    for desired_external_file in context.external_files.values():
-        if (
-            desired_external_file.relpath
-            not in new_external_files_state.state_by_relpath
-        ):
+        for external_file in to_fetch:
             new_external_files_state.state_by_relpath[
-                desired_external_file.relpath
-            ] = ExternalFileState(
-                relpath=desired_external_file.relpath,
-                integrity=desired_external_file.integrity,
-                signature=get_file_signature(
-                    os.path.join(context.folder, desired_external_file.relpath)
-                ),
-            )
+                external_file.relpath
+            ] = get_external_file_state(context, external_file)
 
     external_files_state_folder = os.path.dirname(context.external_files_state_file)
     makedirs_safely(external_files_state_folder)
@@ -217,53 +321,112 @@ def is_external_file_skippable(
     return new_signature == old_state.signature
 
 
-def handle_external_file(
+def verify_external_file(
     context: BuildContext,
+    external_files_state: ExternalFilesState,
     external_file: ExternalFile,
-):
-    """Checks if the file at the given path relative to the project root
-    matches the desired integrity. If it does not, updates it from source.
+) -> Optional[ExternalFileState]:
+    """Checks if the external file, whose signature no longer matches the
+    stored state, still has the desired contents. If the stored state has the
+    same integrity and a partial fingerprint, only the fingerprint is
+    compared, so that files which were merely touched are not hashed again.
+    Otherwise the integrity of the entire file is checked.
 
-    Raises:
-        IntegrityMismatchException: If, after downloading the file from
-            the URL, the integrity still does not match.
+    Args:
+        context (BuildContext): The context to build in
+        external_files_state (ExternalFilesState): The stored state
+        external_file (ExternalFile): The external file to verify
+
+    Returns:
+        (ExternalFileState, None): The new state of the file if it has the
+            desired contents, None if it is missing or must be fetched
     """
+    path = os.path.join(context.folder, external_file.relpath)
+    old_state = external_files_state.state_by_relpath.get(external_file.relpath)
     try:
-        ensure_integrity(
-            os.path.join(context.folder, external_file.relpath), external_file.integrity
-        )
-        return
+        if (
+            old_state is not None
+            and old_state.integrity == external_file.integrity
+            and old_state.fingerprint is not None
+        ):
+            signature = get_file_signature(path)
+            fingerprint = get_partial_fingerprint(path)
+            if fingerprint == old_state.fingerprint:
+                logger.debug(
+                    "External file {} was touched but its fingerprint matches",
+                    external_file.relpath,
+                )
+                return ExternalFileState(
+                    relpath=external_file.relpath,
+                    integrity=external_file.integrity,
+                    signature=signature,
+                    fingerprint=fingerprint,
+                )
+
+        ensure_integrity(path, external_file.integrity)
     except (FileNotFoundError, IntegrityMismatchException):
-        pass
+        return None
 
-    logger.info(
-        "Downloading external file {} from {}", external_file.relpath, external_file.url
+    return get_external_file_state(context, external_file)
+
+
+def get_external_file_state(
+    context: BuildContext, external_file: ExternalFile
+) -> ExternalFileState:
+    """Gets the state to store for the given external file, which must have
+    just been verified or fetched
+    """
+    path = os.path.join(context.folder, external_file.relpath)
+    return ExternalFileState(
+        relpath=external_file.relpath,
+        integrity=external_file.integrity,
+        signature=get_file_signature(path),
+        fingerprint=get_partial_fingerprint(path),
     )
 
-    makedirs_safely(context.out_folder)
-    temp_path = os.path.join(context.out_folder, f"{secrets.token_urlsafe(8)}.tmp")
-    try:
-        response = requests.get(external_file.url, stream=True)
-        response.raise_for_status()
-        with open(temp_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
 
-        ensure_integrity(temp_path, external_file.integrity)
-        try:
-            os.unlink(os.path.join(context.folder, external_file.relpath))
-        except FileNotFoundError:
-            pass
-        makedirs_safely(
-            os.path.dirname(os.path.join(context.folder, external_file.relpath))
-        )
-        os.rename(temp_path, os.path.join(context.folder, external_file.relpath))
-        logger.info("Downloaded external file {}", external_file.relpath)
-    finally:
-        try:
-            os.unlink(temp_path)
-        except FileNotFoundError:
-            pass
+def get_partial_fingerprint(filepath: str) -> str:
+    """Gets a cheap fingerprint of the file at the given path, from its size
+    and the digests of its first and last FINGERPRINT_BLOCK_SIZE bytes. This
+    does not notice changes of the same size within the middle of the file,
+    so it is only used to recognize files which were touched (e.g., by a
+    checkout) since their integrity was checked, not to check integrity.
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    with open(filepath, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        head = f.read(FINGERPRINT_BLOCK_SIZE)
+        tail = b""
+        if size > FINGERPRINT_BLOCK_SIZE:
+            f.seek(max(FINGERPRINT_BLOCK_SIZE, size - FINGERPRINT_BLOCK_SIZE))
+            tail = f.read(FINGERPRINT_BLOCK_SIZE)
+
+    return "{}:{}:{}".format(
+        size, hashlib.blake2b(head).hexdigest(), hashlib.blake2b(tail).hexdigest()
+    )
+
+
+async def handle_external_file(
+    context: BuildContext,
+    fetcher: ExternalFileFetcher,
+    external_file: ExternalFile,
+):
+    """Fetches the external file from the cache or the url, replacing the
+    file at its path relative to the project root, which did not match the
+    desired integrity.
+
+    Raises:
+        IntegrityMismatchException: If, after downloading the file from
+            the URL, the integrity still does not match.
+    """
+    await fetcher.fetch(
+        external_file.url,
+        external_file.integrity,
+        os.path.join(context.folder, external_file.relpath),
+    )
+    logger.info("Fetched external file {}", external_file.relpath)
 
 
 def ensure_integrity(filepath: str, integrity: str) -> None:
@@ -278,11 +441,11 @@ def ensure_integrity(filepath: str, integrity: str) -> None:
         FileNotFoundError: If the file does not exist
         IntegrityMismatchException: If the file does not match the integrity
     """
-    (digest_type, expected_digest) = integrity.split("-")
-    digest = getattr(hashlib, digest_type)()
+    (digest_type, expected_digest) = parse_integrity(integrity)
+    digest = hashlib.new(digest_type)
     with open(filepath, "rb") as f_in:
         while True:
-            data = f_in.read(4096)
+            data = f_in.read(DIGEST_CHUNK_SIZE)
             if not data:
                 break
             digest.update(data)
@@ -0,0 +1,219 @@
+"""Content digests of the input files, which allow a cold build to recognize
+that a file whose signature changed (e.g., because the project was freshly
+cloned or restored from a cache, which changes every mtime and inode) still has
+the same contents as when it was last built, and hence does not need to be
+rebuilt.
+
+A digest is only trusted if it was taken of the file with the same signature
+as the one stored in the dependency graph, i.e., it describes the contents the
+previous build actually consumed.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+from vanillaplusjs.build.file_signature import FileSignature
+from vanillaplusjs.build.ioutil import makedirs_safely, replace_atomically
+import concurrent.futures
+import hashlib
+import json
+import os
+
+
+DIGEST_CHUNK_SIZE = 64 * 1024
+"""How many bytes are read at a time while computing a digest. Large enough
+that hashlib releases the GIL while hashing each chunk.
+"""
+
+MAX_CONCURRENT_DIGESTS = 8
+"""The maximum number of files which are read concurrently while computing
+digests, which bounds the amount of outstanding I/O
+"""
+
+
+@dataclass(frozen=True)
+class ContentDigest:
+    """The digest of the contents of a file when it had a particular signature"""
+
+    signature: FileSignature
+    """The signature of the file when the digest was computed"""
+
+    digest: str
+    """The hex-encoded blake2b digest of the contents of the file"""
+
+    def to_json(self) -> dict:
+        """Converts to a json-serializable object"""
+        return {
+            "signature": {
+                "mtime": self.signature.mtime,
+                "filesize": self.signature.filesize,
+                "inode": self.signature.inode,
+            },
+            "digest": self.digest,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ContentDigest":
+        """Loads the content digest stored in the given json object"""
+        return cls(
+            signature=FileSignature.from_json(data["signature"]),
+            digest=data["digest"],
+        )
+
+
+@dataclass
+class ContentDigestResult:
+    """The result of find_unchanged_files"""
+
+    unchanged: Dict[str, FileSignature]
+    """The files whose contents match the previous build, with their new
+    signature
+    """
+
+    digests: Dict[str, ContentDigest]
+    """The digests of every file that was checked"""
+
+
+def get_content_digest(path: str) -> str:
+    """Computes the digest of the contents of the file at the given path.
+    Blake2b is used as it's the fastest cryptographic hash in the standard
+    library on 64-bit platforms.
+
+    Args:
+        path (str): The path to the file
+
+    Returns:
+        str: The hex-encoded digest
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(DIGEST_CHUNK_SIZE)
+            if not data:
+                break
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def get_content_digests(
+    folder: str,
+    relpaths: Iterable[str],
+    max_workers: int = MAX_CONCURRENT_DIGESTS,
+) -> Dict[str, str]:
+    """Computes the digests of the given files in parallel using a thread pool,
+    reading at most max_workers files at a time.
+
+    Args:
+        folder (str): The folder the paths are relative to
+        relpaths (iterable[str]): The paths to the files to hash
+        max_workers (int): The maximum number of files to read concurrently
+
+    Returns:
+        dict[str, str]: The digest of each file, by path. Files which were
+            deleted before they could be hashed are omitted.
+    """
+    relpaths = list(relpaths)
+    if not relpaths:
+        return dict()
+
+    result: Dict[str, str] = dict()
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(max_workers, len(relpaths))
+    ) as executor:
+        futures = dict(
+            (
+                relpath,
+                executor.submit(get_content_digest, os.path.join(folder, relpath)),
+            )
+            for relpath in relpaths
+        )
+        for relpath, future in futures.items():
+            try:
+                result[relpath] = future.result()
+            except FileNotFoundError:
+                pass
+    return result
+
+
+def load_content_digests(path: str) -> Dict[str, ContentDigest]:
+    """Loads the content digests stored at the given path
+
+    Args:
+        path (str): The path to the content digests file
+
+    Returns:
+        dict[str, ContentDigest]: The content digests by path relative to the
+            project root, empty if the file does not exist
+    """
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return dict()
+
+    return dict(
+        (relpath, ContentDigest.from_json(value)) for relpath, value in data.items()
+    )
+
+
+def store_content_digests(path: str, digests: Dict[str, ContentDigest]) -> None:
+    """Stores the given content digests at the given path, replacing the file
+    atomically.
+
+    Args:
+        path (str): The path to the content digests file
+        digests (dict[str, ContentDigest]): The content digests to store
+    """
+    makedirs_safely(os.path.dirname(path))
+    with replace_atomically(path) as temp_path:
+        with open(temp_path, "w") as f:
+            json.dump(
+                dict((relpath, value.to_json()) for relpath, value in digests.items()),
+                f,
+            )
+
+
+def find_unchanged_files(
+    folder: str,
+    old_signatures: Dict[str, FileSignature],
+    old_digests: Dict[str, ContentDigest],
+    new_signatures: Dict[str, FileSignature],
+) -> ContentDigestResult:
+    """Determines which of the given files have the same contents as the
+    previous build despite having a different signature. Every file is hashed,
+    so that the digests can be stored for the next build.
+
+    Args:
+        folder (str): The folder the paths are relative to
+        old_signatures (dict[str, FileSignature]): The signature stored in the
+            dependency graph for each file which was in the previous build
+        old_digests (dict[str, ContentDigest]): The digests from the previous
+            build
+        new_signatures (dict[str, FileSignature]): The current signature of
+            each file to check
+
+    Returns:
+        ContentDigestResult: Which files are unchanged, and the digests of
+            every file which could be hashed
+    """
+    digests = get_content_digests(folder, new_signatures.keys())
+
+    unchanged: Dict[str, FileSignature] = dict()
+    new_digests: Dict[str, ContentDigest] = dict()
+    for relpath, digest in digests.items():
+        new_digests[relpath] = ContentDigest(
+            signature=new_signatures[relpath], digest=digest
+        )
+
+        old_digest: Optional[ContentDigest] = old_digests.get(relpath)
+        if (
+            old_digest is not None
+            and relpath in old_signatures
+            and old_digest.signature == old_signatures[relpath]
+            and old_digest.digest == digest
+        ):
+            unchanged[relpath] = new_signatures[relpath]
+
+    return ContentDigestResult(unchanged=unchanged, digests=new_digests)
+
@@ -31,6 +31,11 @@ class IconCommand:
     the default button settings, or `None` for no button
     """
 
+    sprite: bool = False
+    """True if the icon is referenced through the sprite sheet for the icon,
+    False if each color is referenced through its own file
+    """
+
     @property
     def input_icon(self) -> str:
         """The location of the input icon relative to the project root"""
@@ -41,6 +46,13 @@ class IconCommand:
         """The location of the output icon folder relative to the project root"""
         return os.path.join("out", "www", "img", "icons", self.icon_name)
 
+    @property
+    def output_sprite(self) -> str:
+        """The location of the sprite sheet relative to the project root"""
+        return os.path.join(self.output_icon_folder, "sprite.svg")
+
     def web_path_to(self, color: str) -> str:
         """Returns the path part of the URL for this icon in the given color"""
+        if self.sprite:
+            return f"/img/icons/{self.icon_name}/sprite.svg#{color}"
         return f"/img/icons/{self.icon_name}/{color}.svg"
@@ -1,16 +1,22 @@
 from vanillaplusjs.build.css.manips.icons.command import IconCommand
 from vanillaplusjs.build.css.manips.icons.parser import parse_icon_command
-from vanillaplusjs.build.css.manips.icons.settings import ButtonSetting
+from vanillaplusjs.build.css.manips.icons.settings import (
+    ButtonSetting,
+    IconSettings,
+    get_icon_settings,
+)
 from vanillaplusjs.build.css.manips.icons.tokenizer import tokenize
+import vanillaplusjs.build.css.manips.icons.variants as variants
 from vanillaplusjs.build.css.manipulator import CSSManipulator
-from typing import List, Literal, Optional, Set
+from typing import Callable, List, Literal, Optional, Set, Tuple
 from vanillaplusjs.build.build_context import BuildContext
 from vanillaplusjs.build.build_file_result import BuildFileResult
-from vanillaplusjs.build.ioutil import makedirs_safely
+from vanillaplusjs.build.hash_cache import remember_hash
 from vanillaplusjs.build.scan_file_result import ScanFileResult
 from vanillaplusjs.build.css.token import CSSToken, CSSTokenType
 import vanillaplusjs.build.handlers.hash as hash_handler
 from loguru import logger
+import hashlib
 import re
 import os
 import dataclasses
@@ -55,6 +61,17 @@ class IconManipulator(CSSManipulator):
         self.produced: Optional[Set[str]] = set() if mode == "build" else None
         self.reused: Optional[Set[str]] = set() if mode == "build" else None
 
+        self._icon_settings: Optional[IconSettings] = None
+
+    @property
+    def icon_settings(self) -> IconSettings:
+        """The icon settings, which are only loaded once we encounter an icon
+        command
+        """
+        if self._icon_settings is None:
+            self._icon_settings = get_icon_settings(self.context)
+        return self._icon_settings
+
     def start_mark(self, node: CSSToken) -> bool:
         """Returns True if we would like to start a replacement mark at the given
         node, false otherwise.
@@ -75,40 +92,71 @@ class IconManipulator(CSSManipulator):
         if self.relpath != css_file_relpath:
             self.children.add(css_file_relpath)
 
-        svg = None
-        replacer = None
+        source: Optional[Tuple[str, str]] = None
+        og_hex = self.icon_settings.color_map[args.icon_initial_color].to_hex()
+        minify = self.icon_settings.minify
 
-        for color in args.output_colors:
-            output_relpath = os.path.join(args.output_icon_folder, color + ".svg")
-            output_path = os.path.join(self.context.folder, output_relpath)
-            if os.path.exists(output_path):
-                self.reused.add(output_relpath)
-                continue
-            if svg is None:
+        def load_source() -> Tuple[str, str]:
+            """Reads the source svg and its hash once, on first use"""
+            nonlocal source
+            if source is None:
                 with open(os.path.join(self.context.folder, args.input_icon)) as f:
                     svg = f.read()
 
-                og_color = self.context.icon_settings.color_map[args.icon_initial_color]
-                replacer = f'"{og_color.to_hex()}"'
+                replacer = f'"{og_hex}"'
                 if replacer not in svg:
                     logger.warning(
                         f"Icon {args.icon_name} does not have the "
-                        f"color {args.icon_initial_color} ({og_color.to_hex()}) in it"
+                        f"color {args.icon_initial_color} ({og_hex}) in it"
                     )
                     logger.debug(f"{svg=}")
                     logger.debug(f"{replacer=}")
+                source = (svg, hashlib.sha256(svg.encode("utf-8")).hexdigest())
+            return source
+
+        def render(color: str) -> str:
+            return variants.render_variant(
+                load_source()[0],
+                og_hex,
+                self.icon_settings.color_map[color].to_hex(),
+                minify,
+            )
 
-            target_color = self.context.icon_settings.color_map[color]
-            new_svg = svg.replace(replacer, f'"{target_color.to_hex()}"')
-            makedirs_safely(os.path.dirname(output_path))
-            with open(output_path, "w", newline="\n") as f:
-                f.write(new_svg)
+        for color in args.output_colors:
+            output_relpath = os.path.join(args.output_icon_folder, color + ".svg")
+            if os.path.exists(os.path.join(self.context.folder, output_relpath)):
+                self.reused.add(output_relpath)
+                continue
 
-            hash_result = hash_handler.build_file(self.context, output_relpath)
-            self.produced.add(output_relpath)
-            self.children.update(hash_result.children)
-            self.produced.update(hash_result.produced)
-            self.reused.update(hash_result.reused)
+            key = variants.get_variant_key(
+                load_source()[1],
+                og_hex,
+                self.icon_settings.color_map[color].to_hex(),
+                minify,
+            )
+            self._place(key, lambda: render(color), output_relpath)
+
+        if args.sprite and not os.path.exists(
+            os.path.join(self.context.folder, args.output_sprite)
+        ):
+            key = variants.get_sprite_key(
+                load_source()[1],
+                og_hex,
+                [
+                    (color, value.to_hex())
+                    for color, value in self.icon_settings.color_map.items()
+                ],
+                minify,
+            )
+            self._place(
+                key,
+                lambda: variants.render_sprite(
+                    [(color, render(color)) for color in self.icon_settings.color_map]
+                ),
+                args.output_sprite,
+            )
+        elif args.sprite:
+            self.reused.add(args.output_sprite)
 
         resulting_tokens = []
         for size in args.output_sizes:
@@ -461,6 +509,19 @@ class IconManipulator(CSSManipulator):
 
         return resulting_tokens
 
+    def _place(self, key: str, render: Callable[[], str], output_relpath: str) -> None:
+        """Places the icon output with the given key within the icon cache at
+        the given path, alongside its hash, and records them as produced
+        """
+        sha256_b64 = variants.place(self.context, key, render, output_relpath)
+        hash_relpath = hash_handler.get_target_path(self.context, output_relpath)
+        hash_handler.write_hash(
+            os.path.join(self.context.folder, hash_relpath), sha256_b64
+        )
+        remember_hash(self.context, hash_relpath, sha256_b64)
+        self.produced.add(output_relpath)
+        self.produced.add(hash_relpath)
+
     def get_icon_command_args(self, node: CSSToken) -> Optional[IconCommand]:
         if node["type"] != CSSTokenType.comment:
             return None
@@ -481,7 +542,7 @@ class IconManipulator(CSSManipulator):
         except StopIteration as e:
             args: IconCommand = e.value
 
-        if args.icon_initial_color not in self.context.icon_settings.color_map:
+        if args.icon_initial_color not in self.icon_settings.color_map:
             return
 
         real_colors = (
@@ -489,22 +550,22 @@ class IconManipulator(CSSManipulator):
                 dict(  # dict to preserve order
                     (color, None)
                     for color in args.output_colors
-                    if color in self.context.icon_settings.color_map
+                    if color in self.icon_settings.color_map
                 )
             )
             if args.output_colors is not None
-            else self.context.icon_settings.color_map.keys()
+            else self.icon_settings.color_map.keys()
         )
         real_sizes = (
             list(
                 dict(  # dict to preserve order
                     (size, None)
                     for size in args.output_sizes
-                    if size in self.context.icon_settings.sizes
+                    if size in self.icon_settings.sizes
                 )
             )
             if args.output_sizes is not None
-            else self.context.icon_settings.sizes
+            else self.icon_settings.sizes
         )
 
         if not real_colors or not real_sizes:
@@ -513,17 +574,16 @@ class IconManipulator(CSSManipulator):
         real_button = (
             args.button
             if args.button != "default"
-            else self.context.icon_settings.default_button
+            else self.icon_settings.default_button
         )
 
         if real_button is not None:
 
             def is_setting_bad(setting: ButtonSetting) -> bool:
                 return (
-                    setting.active_color not in self.context.icon_settings.color_map
-                    or setting.hover_color not in self.context.icon_settings.color_map
-                    or setting.disabled_color
-                    not in self.context.icon_settings.color_map
+                    setting.active_color not in self.icon_settings.color_map
+                    or setting.hover_color not in self.icon_settings.color_map
+                    or setting.disabled_color not in self.icon_settings.color_map
                 )
 
             if real_button.default_button is not None and is_setting_bad(
@@ -547,7 +607,11 @@ class IconManipulator(CSSManipulator):
                 )
 
         return dataclasses.replace(
-            args, output_colors=real_colors, output_sizes=real_sizes, button=real_button
+            args,
+            output_colors=real_colors,
+            output_sizes=real_sizes,
+            button=real_button,
+            sprite=self.icon_settings.sprite,
         )
 
     def scan_icon_command(self, args: IconCommand) -> None:
@@ -572,6 +636,11 @@ class IconManipulator(CSSManipulator):
                 os.path.join(args.output_icon_folder, color + ".svg.hash")
             )
 
+        if args.sprite:
+            self.produces.add(args.output_sprite)
+            self.produces.add(args.output_sprite + ".hash")
+            self.dependencies.add(args.output_sprite + ".hash")
+
     def scan_result(self) -> ScanFileResult:
         """The scan result for this manipulator"""
         return ScanFileResult(
@@ -1,9 +1,17 @@
 import dataclasses
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from vanillaplusjs.build.build_context import BuildContext
+from vanillaplusjs.build.file_signature import (
+    FileSignature,
+    get_file_signature,
+    get_optional_file_signature,
+)
+from vanillaplusjs.build.ioutil import makedirs_safely, replace_atomically
 from .color import Color
+from loguru import logger
 import json
 import os
+import threading
 from vanillaplusjs.build.css.token import CSSToken, CSSTokenType
 from vanillaplusjs.build.css.tokenizer import tokenize
 import string
@@ -54,12 +62,43 @@ class IconSettings:
     we do not export buttons.
     """
 
+    minify: bool = False
+    """True if the whitespace and comments within the recolored icons are
+    removed, False to keep them as they are in the source icon
+    """
+
+    sprite: bool = False
+    """True if every color of an icon is also combined into a single sprite
+    sheet, which the generated css references instead of the individual
+    files, False otherwise
+    """
+
 
 def load_icon_settings(context: BuildContext) -> IconSettings:
-    """Loads the icon settings from the given build context."""
+    """Loads the icon settings from the given build context. This always
+    reads the configuration and the default css file; prefer get_icon_settings
+    while building.
+    """
     with open(context.config_file, "r") as f:
         config: dict = json.load(f)
 
+    color_map, sizes = load_root_variables(
+        os.path.join(context.folder, context.default_css_file)
+    )
+    minify, sprite = load_output_settings(config)
+    return IconSettings(
+        default_button=load_button_settings(config),
+        color_map=color_map,
+        sizes=sizes,
+        minify=minify,
+        sprite=sprite,
+    )
+
+
+def load_button_settings(config: dict) -> ButtonSettings:
+    """Loads the default button settings for icons from the given
+    configuration, i.e., the parsed vanillaplusjs.json
+    """
     button_settings: ButtonSettings = ButtonSettings(
         default_button=ButtonSetting(
             active_color="primary",
@@ -135,11 +174,41 @@ def load_icon_settings(context: BuildContext) -> IconSettings:
                         },
                     )
 
+    return button_settings
+
+
+def load_output_settings(config: dict) -> Tuple[bool, bool]:
+    """Loads whether icons are minified and combined into sprite sheets from
+    the given configuration, i.e., the parsed vanillaplusjs.json
+
+    Returns:
+        bool: True if icons are minified, False otherwise
+        bool: True if icons are combined into sprite sheets, False otherwise
+    """
+    icons: Optional[dict] = config.get("icons")
+    if icons is None:
+        return False, False
+    return bool(icons.get("minify", False)), bool(icons.get("sprite", False))
+
+
+def load_root_variables(path: str) -> Tuple[Dict[str, Color], List[str]]:
+    """Walks the stylesheet at the given path until the :root qualified rule,
+    and extracts the colors (from --col-* variables) and icon sizes (from
+    --icon-size-* variables) within it.
+
+    Args:
+        path (str): The path to the stylesheet, typically main.css
+
+    Returns:
+        dict[str, Color]: The colors by name, without the --col- prefix
+        list[str]: The unique icon sizes in order, without the --icon-size-
+            prefix
+    """
     color_map: Dict[str, Color] = dict()
     sizes: List[str] = list()
 
-    if os.path.exists(os.path.join(context.folder, context.default_css_file)):
-        with open(os.path.join(context.folder, context.default_css_file), "r") as f:
+    if os.path.exists(path):
+        with open(path, "r") as f:
             gen = tokenize(f)
 
             def next_significant():
@@ -213,13 +282,131 @@ def load_icon_settings(context: BuildContext) -> IconSettings:
                 pass
             gen.close()
 
-    return IconSettings(
-        default_button=button_settings,
-        color_map=color_map,
-        sizes=list(dict((s, None) for s in sizes)),  # dict to preserve order
+    return color_map, list(dict((s, None) for s in sizes))  # dict to preserve order
+
+
+ICON_SETTINGS_CACHE_VERSION = 1
+"""Incremented whenever the format of the icon settings cache changes"""
+
+_cache: Optional[Tuple[tuple, IconSettings]] = None
+"""The icon settings last loaded within this process, and the key they were
+loaded for, which includes the signatures of the configuration and default
+css file
+"""
+
+_cache_lock = threading.Lock()
+"""Protects the cache"""
+
+
+def get_icon_settings(context: BuildContext) -> IconSettings:
+    """Gets the icon settings for the given build context. This is intended to
+    be called only once an icon command is encountered, so that builds without
+    icons never need to walk the default css file.
+
+    Within each process the settings are reused until the configuration or
+    the default css file changes. The colors and sizes extracted from the
+    default css file are also stored in the out folder, keyed by its
+    signature, so that they are only extracted once per change rather than
+    once per process.
+
+    Args:
+        context (BuildContext): The context for the build. If its icon_settings
+            are set, they are used as is.
+
+    Returns:
+        IconSettings: The icon settings
+    """
+    global _cache
+
+    if context.icon_settings is not None:
+        return context.icon_settings
+
+    css_path = os.path.join(context.folder, context.default_css_file)
+    css_signature = get_optional_file_signature(css_path)
+    key = (
+        os.path.abspath(context.folder),
+        context.default_css_file,
+        get_file_signature(context.config_file),
+        css_signature,
+    )
+    with _cache_lock:
+        if _cache is not None and _cache[0] == key:
+            return _cache[1]
+
+    with open(context.config_file, "r") as f:
+        config: dict = json.load(f)
+
+    root_variables = (
+        _load_cached_root_variables(context, css_signature)
+        if css_signature is not None
+        else None
+    )
+    if root_variables is None:
+        logger.debug("Extracting icon colors and sizes from {}", css_path)
+        root_variables = load_root_variables(css_path)
+        if css_signature is not None:
+            _store_cached_root_variables(context, css_signature, *root_variables)
+
+    minify, sprite = load_output_settings(config)
+    result = IconSettings(
+        default_button=load_button_settings(config),
+        color_map=root_variables[0],
+        sizes=root_variables[1],
+        minify=minify,
+        sprite=sprite,
+    )
+    with _cache_lock:
+        _cache = (key, result)
+    return result
+
+
+def _load_cached_root_variables(
+    context: BuildContext, css_signature: FileSignature
+) -> Optional[Tuple[Dict[str, Color], List[str]]]:
+    try:
+        with open(context.icon_settings_file, "r") as f:
+            serd = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if (
+        serd.get("version") != ICON_SETTINGS_CACHE_VERSION
+        or serd.get("default_css_file") != context.default_css_file
+        or FileSignature.from_json(serd["signature"]) != css_signature
+    ):
+        return None
+
+    return (
+        dict((name, Color(**color)) for name, color in serd["colors"].items()),
+        serd["sizes"],
     )
 
 
+def _store_cached_root_variables(
+    context: BuildContext,
+    css_signature: FileSignature,
+    color_map: Dict[str, Color],
+    sizes: List[str],
+) -> None:
+    path = context.icon_settings_file
+    makedirs_safely(os.path.dirname(path))
+    with replace_atomically(path) as temp_path:
+        with open(temp_path, "w") as f:
+            json.dump(
+                {
+                    "version": ICON_SETTINGS_CACHE_VERSION,
+                    "default_css_file": context.default_css_file,
+                    "signature": dataclasses.asdict(css_signature),
+                    "colors": dict(
+                        (name, dataclasses.asdict(color))
+                        for name, color in color_map.items()
+                    ),
+                    "sizes": sizes,
+                },
+                f,
+            )
+
+
 NAMED_CSS_COLORS = {
     "aliceblue": Color(red=240, green=248, blue=255),
     "antiquewhite": Color(red=250, green=235, blue=215),
@@ -10,7 +10,7 @@ from typing import Generator, Optional
 
 from vanillaplusjs.build.css.token import CSSTokenType
 from .token import IconToken, IconTokenType
-from vanillaplusjs.build.ioutil import PreprocessedTextIO, PeekableTextIO
+from vanillaplusjs.build.ioutil import BufferedTextIO
 from vanillaplusjs.build.css.tokenizer import (
     _is_whitespace,
     _is_ident_start_codepoint,
@@ -38,7 +38,7 @@ def tokenize(fp: TextIOBase) -> Generator[IconToken, None, None]:
     Returns:
         None
     """
-    peekable = PreprocessedTextIO(PeekableTextIO(fp))
+    peekable = BufferedTextIO(fp)
     del fp
 
     while peeked := peekable.peek(1):
@@ -129,7 +129,7 @@ def tokenize(fp: TextIOBase) -> Generator[IconToken, None, None]:
     yield IconToken(type=IconTokenType.eof)
 
 
-def _consume_whitespace(fp: PeekableTextIO) -> Optional[IconToken]:
+def _consume_whitespace(fp: BufferedTextIO) -> Optional[IconToken]:
     """Consumes as much whitespace as possible"""
     res = ""
     while _is_whitespace(fp.peek(1)):
@@ -141,7 +141,7 @@ def _consume_whitespace(fp: PeekableTextIO) -> Optional[IconToken]:
     return None
 
 
-def _consume_ident_like(fp: PeekableTextIO) -> Optional[IconToken]:
+def _consume_ident_like(fp: BufferedTextIO) -> Optional[IconToken]:
     string = _consume_ident_sequence(fp)
     if string == "true":
         return IconToken(type=IconTokenType.true_literal, value=None)
@@ -152,7 +152,7 @@ def _consume_ident_like(fp: PeekableTextIO) -> Optional[IconToken]:
     return IconToken(type=IconTokenType.identifier, value=string)
 
 
-def _consume_comment(fp: PeekableTextIO) -> Optional[IconToken]:
+def _consume_comment(fp: BufferedTextIO) -> Optional[IconToken]:
     peek_2 = fp.peek(2)
     if peek_2 is None or len(peek_2) < 2:
         return None
@@ -169,7 +169,7 @@ def _consume_comment(fp: PeekableTextIO) -> Optional[IconToken]:
     return IconToken(type=IconTokenType.comment, value=res)
 
 
-def _consume_string(fp: PeekableTextIO) -> Optional[IconToken]:
+def _consume_string(fp: BufferedTextIO) -> Optional[IconToken]:
     res = _consume_css_string(fp)
     if res is None:
         return None
@@ -178,7 +178,7 @@ def _consume_string(fp: PeekableTextIO) -> Optional[IconToken]:
     return IconToken(type=IconTokenType.string_literal, value=res["value"])
 
 
-def _consume_number(fp: PeekableTextIO) -> Optional[IconToken]:
+def _consume_number(fp: BufferedTextIO) -> Optional[IconToken]:
     res = _consume_css_number(fp)
     if res is None:
         return None
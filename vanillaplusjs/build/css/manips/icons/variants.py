@@ -0,0 +1,250 @@
+"""Produces the recolored variants of icons, and optionally the sprite sheet
+which combines every color of an icon into one file.
+
+Variants are stored in a content-addressed cache within the out folder, keyed
+by the hash of the source svg, the colors, and how the variant is rendered,
+so that each variant is rendered, written, and hashed once no matter how many
+stylesheets ask for it. Outputs are placed by linking (or copying) the cached
+file into the www folder, and the hash of each output is taken from the cache
+rather than by reading the output back.
+"""
+from typing import Callable, List, Optional, Tuple
+from vanillaplusjs.build.build_context import BuildContext
+from vanillaplusjs.build.ioutil import (
+    link_or_copy,
+    makedirs_safely,
+    replace_atomically,
+)
+import base64
+import hashlib
+import json
+import os
+import re
+
+
+ICON_CACHE_VERSION = 1
+"""Incremented whenever the format of the cache, or the way variants are
+rendered, changes
+"""
+
+SVG_ROOT_TAG = re.compile(r"<svg\b(?P<attrs>[^>]*)>", flags=re.IGNORECASE)
+"""Matches the opening tag of the root svg element"""
+
+SVG_ATTRIBUTE = re.compile(
+    r'\s(?P<name>[\w:-]+)\s*=\s*(?P<q>["\'])(?P<value>.*?)(?P=q)'
+)
+"""Matches an attribute within an opening tag"""
+
+SVG_COMMENT = re.compile(r"<!--.*?-->", flags=re.DOTALL)
+"""Matches an xml comment"""
+
+SVG_WHITESPACE_BETWEEN_TAGS = re.compile(r">\s+<")
+"""Matches the whitespace between two tags"""
+
+SVG_ID = re.compile(r'(?<![\w:-])id\s*=\s*(["\'])(?P<id>.*?)\1')
+"""Matches an id attribute"""
+
+
+def get_variant_key(svg_hash: str, from_hex: str, to_hex: str, minify: bool) -> str:
+    """Determines the key within the cache of the variant of the svg with the
+    given hash where the color from_hex is replaced with to_hex
+    """
+    return _get_key(["variant", svg_hash, from_hex, to_hex, minify])
+
+
+def get_sprite_key(
+    svg_hash: str, from_hex: str, colors: List[Tuple[str, str]], minify: bool
+) -> str:
+    """Determines the key within the cache of the sprite sheet of the svg with
+    the given hash, where colors is the name and hex of each color in order
+    """
+    return _get_key(["sprite", svg_hash, from_hex, colors, minify])
+
+
+def _get_key(parts: list) -> str:
+    return hashlib.sha256(
+        json.dumps([ICON_CACHE_VERSION, *parts]).encode("utf-8")
+    ).hexdigest()
+
+
+def render_variant(svg: str, from_hex: str, to_hex: str, minify: bool) -> str:
+    """Replaces the given color within the svg, minifying it if requested"""
+    result = svg.replace(f'"{from_hex}"', f'"{to_hex}"')
+    if minify:
+        result = minify_svg(result)
+    return result
+
+
+def minify_svg(svg: str) -> str:
+    """Removes comments and the whitespace between tags from the given svg.
+    Whitespace is left alone if the svg has text elements, where it may be
+    significant.
+    """
+    result = SVG_COMMENT.sub("", svg)
+    if "<text" not in result:
+        result = SVG_WHITESPACE_BETWEEN_TAGS.sub("><", result)
+    return result.strip()
+
+
+def render_sprite(variants: List[Tuple[str, str]]) -> str:
+    """Combines the given variants of an icon into a single svg with the
+    variants stacked vertically and a view for each, so that the variant for
+    a color can be referenced as, e.g., sprite.svg#primary
+
+    Args:
+        variants (list[tuple[str, str]]): The name of each color and the
+            variant of the icon in that color
+
+    Returns:
+        str: The sprite sheet
+    """
+    parts: List[str] = []
+    total_height = 0.0
+    width = 0.0
+    for name, svg in variants:
+        attrs, inner = _split_root(svg)
+        view_box = attrs.pop("viewBox", None)
+        view_width, view_height = _get_size(attrs, view_box)
+        if view_box is None:
+            view_box = f"0 0 {view_width:g} {view_height:g}"
+        for attr in ("width", "height", "x", "y"):
+            attrs.pop(attr, None)
+        inner = _prefix_ids(inner, f"{name}__")
+
+        width = max(width, view_width)
+        parts.append(
+            f'<view id="{name}" viewBox="0 {total_height:g} '
+            f'{view_width:g} {view_height:g}"/>'
+        )
+        parts.append(
+            f'<svg x="0" y="{total_height:g}" width="{view_width:g}" '
+            f'height="{view_height:g}" viewBox="{view_box}"'
+            + "".join(f' {key}="{value}"' for key, value in attrs.items())
+            + f">{inner}</svg>"
+        )
+        total_height += view_height
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:g}" '
+        f'height="{total_height:g}" viewBox="0 0 {width:g} {total_height:g}">'
+        + "\n".join(["", *parts, ""])
+        + "</svg>\n"
+    )
+
+
+def _split_root(svg: str) -> Tuple[dict, str]:
+    match = SVG_ROOT_TAG.search(svg)
+    if match is None:
+        return dict(), svg
+
+    attrs_str = match.group("attrs")
+    attrs = dict(
+        (attr.group("name"), attr.group("value"))
+        for attr in SVG_ATTRIBUTE.finditer(attrs_str)
+    )
+    if attrs_str.rstrip().endswith("/"):
+        return attrs, ""
+
+    end = svg.rfind("</svg>")
+    if end < match.end():
+        end = len(svg)
+    return attrs, svg[match.end() : end]
+
+
+def _get_size(attrs: dict, view_box: Optional[str]) -> Tuple[float, float]:
+    if view_box is not None:
+        parts = view_box.replace(",", " ").split()
+        if len(parts) == 4:
+            try:
+                return float(parts[2]), float(parts[3])
+            except ValueError:
+                pass
+
+    try:
+        return (
+            float(re.sub(r"px$", "", attrs.get("width", "300"))),
+            float(re.sub(r"px$", "", attrs.get("height", "150"))),
+        )
+    except ValueError:
+        # the default size of an svg without a usable size
+        return 300.0, 150.0
+
+
+def _prefix_ids(svg: str, prefix: str) -> str:
+    # ids must be unique within the sprite sheet, so references to them
+    # within each variant are rewritten along with them
+    for match in list(SVG_ID.finditer(svg)):
+        iden = match.group("id")
+        escaped = re.escape(iden)
+        svg = re.sub(
+            rf'(?<![\w:-])id\s*=\s*(["\']){escaped}\1',
+            lambda m: f'id="{prefix}{iden}"',
+            svg,
+        )
+        svg = re.sub(
+            rf"url\(\s*#{escaped}\s*\)", lambda m: f"url(#{prefix}{iden})", svg
+        )
+        svg = re.sub(
+            rf'\b(xlink:)?href\s*=\s*(["\'])#{escaped}\2',
+            lambda m: f'{m.group(1) or ""}href="#{prefix}{iden}"',
+            svg,
+        )
+    return svg
+
+
+def place(
+    context: BuildContext, key: str, render: Callable[[], str], output_relpath: str
+) -> str:
+    """Places the cached file with the given key at the given path, rendering
+    and caching it first if it is not already cached. The output is replaced
+    atomically, so concurrent builds of the same output never observe a
+    partially written file.
+
+    Args:
+        context (BuildContext): The context for the build
+        key (str): The key of the file within the cache
+        render (() -> str): Renders the file, if it is not cached
+        output_relpath (str): Where to place the file, relative to the
+            project root
+
+    Returns:
+        str: The url-safe base64 encoded sha256 hash of the file
+    """
+    entry_path = os.path.join(context.icon_cache_folder, key[:2], key + ".svg")
+    output_path = os.path.join(context.folder, output_relpath)
+    makedirs_safely(os.path.dirname(output_path))
+
+    sha256_b64 = _read_entry_hash(entry_path)
+    if sha256_b64 is not None:
+        try:
+            with replace_atomically(output_path) as temp_path:
+                link_or_copy(entry_path, temp_path)
+            return sha256_b64
+        except FileNotFoundError:
+            # the cache was cleaned while we were reading it
+            pass
+
+    contents = render().encode("utf-8")
+    sha256_b64 = base64.urlsafe_b64encode(hashlib.sha256(contents).digest()).decode(
+        "utf-8"
+    )
+    makedirs_safely(os.path.dirname(entry_path))
+    with replace_atomically(entry_path) as temp_path:
+        with open(temp_path, "wb") as f:
+            f.write(contents)
+    # the hash is written last, so that its existence implies the entry is
+    # complete
+    with replace_atomically(entry_path + ".hash") as temp_path:
+        with open(temp_path, "w") as f:
+            f.write(sha256_b64)
+    with replace_atomically(output_path) as temp_path:
+        link_or_copy(entry_path, temp_path)
+    return sha256_b64
+
+
+def _read_entry_hash(entry_path: str) -> Optional[str]:
+    try:
+        with open(entry_path + ".hash", "r") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
@@ -4,11 +4,13 @@ from vanillaplusjs.build.css.manipulator import CSSManipulator
 from typing import Dict, List, Literal, Optional, Set, Generator
 from vanillaplusjs.build.build_context import BuildContext
 from vanillaplusjs.build.build_file_result import BuildFileResult
-from vanillaplusjs.build.css.tokenizer import tokenize_and_close
+from vanillaplusjs.build.css.rule_index import load_rule_index
+from vanillaplusjs.build.css.tokenizer import tokenize, tokenize_and_close
 from vanillaplusjs.build.scan_file_result import ScanFileResult
 from vanillaplusjs.build.css.token import CSSToken, CSSTokenType
 import vanillaplusjs.build.css.serializer
 from dataclasses import dataclass
+import io
 import re
 import os
 from loguru import logger
@@ -288,10 +290,10 @@ class NestManipulator(CSSManipulator):
     ```
 
     Also note that while you can invert the order within a single file, it can
-    be substantially faster to declare in the order they are needed. Furthermore,
-    when importing styles from other stylesheets, it will typically be faster
-    if the things you are importing are either in a small file or near the top
-    of the file.
+    be substantially faster to declare in the order they are needed. Importing
+    styles from other stylesheets is fast regardless of where they are declared,
+    since the top-level rules of each built stylesheet are indexed (see
+    vanillaplusjs.build.css.rule_index).
     """
 
     def __init__(
@@ -416,6 +418,10 @@ class NestManipulator(CSSManipulator):
         that it must have been resolved prior to us starting to resolve this
         file. Meaning that we can use the output of that file to resolve this
         import, saving us a lot of time.
+
+        Typically the output was indexed when it was built, so we only need to
+        look up the rule in its index; otherwise we tokenize the output until
+        we find the rule.
         """
 
         path_relative_to_public = imp.relpath[
@@ -423,6 +429,27 @@ class NestManipulator(CSSManipulator):
         ]
         out_path_relative_to_root = os.path.join("out", "www", path_relative_to_public)
 
+        index = load_rule_index(self.context, out_path_relative_to_root)
+        if index is not None:
+            block = index.get(imp.prelude)
+            if block is None:
+                raise ValueError(
+                    f"cannot resolve {imp} because {out_path_relative_to_root} has "
+                    f"no top-level qualified rule for {imp.prelude}"
+                )
+            simple_block = list(tokenize(io.StringIO(block)))
+            simple_block.pop()  # eof
+            self.referencable_rules.set_rule(
+                imp.relpath,
+                imp.prelude,
+                QualifiedRule(
+                    tokenized_prelude=list(tokenize(io.StringIO(imp.prelude)))[:-1],
+                    serialized_prelude=imp.prelude,
+                    simple_block=simple_block,
+                ),
+            )
+            return
+
         generator = self.resumable_imports.get(out_path_relative_to_root)
         if generator is None:
             if out_path_relative_to_root in self.resumable_imports:
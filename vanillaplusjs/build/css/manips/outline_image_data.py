@@ -1,6 +1,7 @@
 from typing import Dict, List, Literal, Optional, Set
 from vanillaplusjs.build.build_context import BuildContext
 from vanillaplusjs.build.build_file_result import BuildFileResult
+from vanillaplusjs.build.hash_cache import get_hash
 from vanillaplusjs.build.ioutil import makedirs_safely
 from vanillaplusjs.build.scan_file_result import ScanFileResult
 from vanillaplusjs.build.css.manipulator import CSSManipulator
@@ -145,8 +146,7 @@ class OutlineImageDataManipulator(CSSManipulator):
             self.produced.update(hash_build_result.produced)
             self.reused.update(hash_build_result.reused)
 
-        with open(out_path + ".hash") as f:
-            hash_value = f.read()
+        hash_value = get_hash(self.context, out_relpath + ".hash")
 
         result[1]["value"] += "?" + urlencode(
             {"v": hash_value, "pv": PROCESSOR_VERSION}
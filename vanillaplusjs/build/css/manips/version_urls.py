@@ -3,6 +3,7 @@ from vanillaplusjs.build.build_file_result import BuildFileResult
 from vanillaplusjs.build.css.manipulator import CSSManipulator
 from vanillaplusjs.build.css.token import CSSToken, CSSTokenType
 from vanillaplusjs.build.build_context import BuildContext
+from vanillaplusjs.build.hash_cache import get_hash
 from vanillaplusjs.build.scan_file_result import ScanFileResult
 from dataclasses import dataclass
 from urllib.parse import urlencode
@@ -84,6 +85,9 @@ class VersionURLsManipulator(CSSManipulator):
         if "?" in url:
             return None
 
+        # e.g., a view within a sprite sheet
+        url = url.split("#", 1)[0]
+
         path_relative_to_public = url[1:].replace("/", os.path.sep)
         path_relative_to_root = os.path.join("src", "public", path_relative_to_public)
 
@@ -104,13 +108,11 @@ class VersionURLsManipulator(CSSManipulator):
             return [node]
 
         self.children.add(new_suffix.path_of_hash_from_root)
-        with open(
-            os.path.join(self.context.folder, new_suffix.path_of_hash_from_root)
-        ) as f:
-            hash_value = f.read()
+        hash_value = get_hash(self.context, new_suffix.path_of_hash_from_root)
 
         suffix_to_add = "?" + urlencode({"v": hash_value, "pv": PROCESSOR_VERSION})
-        new_value = node["value"] + suffix_to_add
+        path, hash_sign, fragment = node["value"].partition("#")
+        new_value = path + suffix_to_add + hash_sign + fragment
 
         cp_node = node.copy()
         cp_node["value"] = new_value
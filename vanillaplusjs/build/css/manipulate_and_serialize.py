@@ -1,37 +1,58 @@
-from typing import List, Optional
+from typing import Callable, Iterable, List, Optional
 
 from vanillaplusjs.build.ioutil import makedirs_safely
 from .manipulator import CSSManipulator
 from .builder import CSSBuilder
-from .tokenizer import tokenize
+from .token import CSSToken
+from .tokenizer import tokenize, tokenize_and_close
 from .serializer import serialize
 import os
 
 
+def tokenize_file(infile: str) -> List[CSSToken]:
+    """Tokenizes the given CSS file"""
+    with open(infile, "r") as f:
+        return list(tokenize(f))
+
+
 def manipulate_and_serialize(
-    infile: str, outfile: Optional[str], manipulators: List[CSSManipulator]
+    infile: str,
+    outfile: Optional[str],
+    manipulators: List[CSSManipulator],
+    tokens: Optional[Iterable[CSSToken]] = None,
+    on_output: Optional[Callable[[CSSToken, str], None]] = None,
 ) -> None:
     """Tokenizes the given CSS file, applies the given manipulators to it,
     and writes the resulting tokens to the given file. If the outfile is None,
     this will not output anything, but will still tokenize the file and send
     it to the manipulators as if it were going to, which is useful if the
     manipulators have side-effects.
+
+    If the tokens of the file are already known (e.g., from the token cache),
+    they can be specified to avoid tokenizing the file again.
+
+    If on_output is specified, it is called with each token written to the
+    outfile and how it was serialized, in order.
     """
     builder = CSSBuilder(manipulators)
 
+    if tokens is None:
+        tokens = tokenize_and_close(open(infile, "r"))
+
     if outfile is None:
-        with open(infile, "r") as f:
-            for token in tokenize(f):
-                builder.handle_token(token)
+        for token in tokens:
+            builder.handle_token(token)
         return
 
     out_dir = os.path.dirname(outfile)
     if out_dir:
         makedirs_safely(out_dir)
 
-    with open(infile, "r") as f_in:
-        with open(outfile, "w", newline="\n") as f_out:
-            for in_token in tokenize(f_in):
-                builder.handle_token(in_token)
-                for out_token in builder.consume_tokens():
-                    f_out.write(serialize(out_token))
+    with open(outfile, "w", newline="\n") as f_out:
+        for in_token in tokens:
+            builder.handle_token(in_token)
+            for out_token in builder.consume_tokens():
+                serialized = serialize(out_token)
+                f_out.write(serialized)
+                if on_output is not None:
+                    on_output(out_token, serialized)
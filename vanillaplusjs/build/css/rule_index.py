@@ -0,0 +1,230 @@
+"""Indexes the top-level qualified rules of each built stylesheet, so that
+stylesheets which import a rule from another stylesheet (see
+vanillaplusjs.build.css.manips.nest) can look it up rather than tokenizing the
+built stylesheet until the rule turns up.
+
+The index is written alongside the build of the stylesheet, from the tokens
+as they are written to the output, and is produced by the same build so that
+it is cleaned whenever the stylesheet is. It maps from the serialized, stripped
+prelude of each top-level qualified rule to the serialized contents of its
+block, with leading and trailing whitespace removed, and the offsets of those
+contents within the built stylesheet. When a prelude is repeated, only the
+first rule is indexed, as that is the one an import would have found.
+
+Rules nested within at-rules (e.g., @media) are not indexed, matching what
+can be imported.
+"""
+from typing import Dict, List, Optional, Tuple
+from vanillaplusjs.build.build_context import BuildContext
+from vanillaplusjs.build.css.token import CSSToken, CSSTokenType
+from vanillaplusjs.build.ioutil import makedirs_safely, replace_atomically
+import json
+import os
+import threading
+
+
+RULE_INDEX_VERSION = 1
+"""Incremented whenever the format of the index changes"""
+
+
+def get_rule_index_path(out_relpath: str) -> str:
+    """Returns the path to the index for the built stylesheet at the given
+    path, both relative to the project root.
+
+    Args:
+        out_relpath (str): The path to the built stylesheet, e.g.,
+            out/www/css/main.css
+
+    Returns:
+        str: The path to the index, e.g., out/css_rules/css/main.css.json
+    """
+    out_www = os.path.join("out", "www")
+    assert out_relpath.startswith(out_www), f"{out_relpath=} not in {out_www}"
+    return os.path.join(
+        "out", "css_rules", out_relpath[len(out_www) + len(os.path.sep) :] + ".json"
+    )
+
+
+class RuleIndexer:
+    """Builds the index of a stylesheet from its output tokens, which must be
+    passed to handle_token in order along with how they were serialized.
+    """
+
+    def __init__(self) -> None:
+        self.rules: Dict[str, Tuple[str, int, int]] = dict()
+        """The indexed rules, as a map from the stripped prelude to the
+        stripped contents of the block and their start and end offsets
+        """
+
+        self.offset: int = 0
+        """The number of characters written so far"""
+
+        self.state: str = "top"
+        """One of top, cdo, at_rule, prelude, or block"""
+
+        self.nest_level: int = 0
+        """Within an at-rule or block, how many curly brackets are open"""
+
+        self.prelude: List[str] = []
+        """The serialized prelude of the current rule"""
+
+        self.block: List[Tuple[CSSToken, str, int]] = []
+        """The tokens in the block of the current rule, with how they were
+        serialized and at which offset
+        """
+
+    def handle_token(self, token: CSSToken, serialized: str) -> None:
+        """Handles the next token in the output stylesheet
+
+        Args:
+            token (CSSToken): The token which was written
+            serialized (str): The serialized token, as it was written
+        """
+        offset = self.offset
+        self.offset += len(serialized)
+        typ = token["type"]
+
+        if self.state == "top":
+            if typ in (CSSTokenType.whitespace, CSSTokenType.comment, CSSTokenType.eof):
+                return
+            if typ == CSSTokenType.cdo:
+                self.state = "cdo"
+            elif typ == CSSTokenType.at_keyword:
+                self.state = "at_rule"
+                self.nest_level = 0
+            else:
+                self.state = "prelude"
+                self.prelude = [serialized]
+            return
+
+        if self.state == "cdo":
+            if typ == CSSTokenType.cdc:
+                self.state = "top"
+            return
+
+        if self.state == "at_rule":
+            if typ == CSSTokenType.left_curly_bracket:
+                self.nest_level += 1
+            elif typ == CSSTokenType.right_curly_bracket:
+                self.nest_level -= 1
+                if self.nest_level == 0:
+                    self.state = "top"
+            elif typ == CSSTokenType.semicolon and self.nest_level == 0:
+                self.state = "top"
+            return
+
+        if self.state == "prelude":
+            if typ == CSSTokenType.left_curly_bracket:
+                self.state = "block"
+                self.nest_level = 1
+                self.block = []
+            else:
+                self.prelude.append(serialized)
+            return
+
+        if typ == CSSTokenType.left_curly_bracket:
+            self.nest_level += 1
+        elif typ == CSSTokenType.right_curly_bracket:
+            self.nest_level -= 1
+            if self.nest_level == 0:
+                self._finish_rule()
+                self.state = "top"
+                return
+
+        if typ == CSSTokenType.whitespace and not self.block:
+            return
+        self.block.append((token, serialized, offset))
+
+    def _finish_rule(self) -> None:
+        while self.block and self.block[-1][0]["type"] == CSSTokenType.whitespace:
+            self.block.pop()
+
+        prelude = "".join(self.prelude).strip()
+        if prelude in self.rules:
+            return
+
+        if self.block:
+            start = self.block[0][2]
+            end = self.block[-1][2] + len(self.block[-1][1])
+        else:
+            start = end = self.offset - 1
+        self.rules[prelude] = (
+            "".join(serialized for _, serialized, _ in self.block),
+            start,
+            end,
+        )
+
+    def store(self, path: str) -> None:
+        """Atomically writes the index to the given path"""
+        makedirs_safely(os.path.dirname(path))
+        with replace_atomically(path) as temp_path:
+            with open(temp_path, "w") as f:
+                json.dump(
+                    {
+                        "version": RULE_INDEX_VERSION,
+                        "rules": dict(
+                            (prelude, {"block": block, "start": start, "end": end})
+                            for prelude, (block, start, end) in self.rules.items()
+                        ),
+                    },
+                    f,
+                )
+
+
+_cache: Dict[str, Dict[str, str]] = dict()
+"""Maps from the path to an index relative to the project root to the block
+by prelude within that index
+"""
+
+_cache_generation: Optional[str] = None
+"""The build generation the cache was filled during"""
+
+_cache_lock = threading.Lock()
+"""Protects the cache"""
+
+
+def load_rule_index(
+    context: BuildContext, out_relpath: str
+) -> Optional[Dict[str, str]]:
+    """Loads the index for the built stylesheet at the given path relative to
+    the project root. Like hash files, an index is only rewritten by the build
+    which cleans it, so within a build generation it is only read once per
+    process.
+
+    Args:
+        context (BuildContext): The context for the build
+        out_relpath (str): The path to the built stylesheet, e.g.,
+            out/www/css/main.css
+
+    Returns:
+        (dict[str, str], None): The serialized block by stripped prelude, or
+            None if the stylesheet has not been indexed (e.g., because it was
+            built by an older version), in which case it must be tokenized
+    """
+    global _cache_generation
+
+    path = get_rule_index_path(out_relpath)
+    if context.build_generation is not None:
+        with _cache_lock:
+            if _cache_generation != context.build_generation:
+                _cache.clear()
+                _cache_generation = context.build_generation
+            result = _cache.get(path)
+            if result is not None:
+                return result
+
+    try:
+        with open(os.path.join(context.folder, path), "r") as f:
+            serd = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    if serd.get("version") != RULE_INDEX_VERSION:
+        return None
+
+    result = dict((prelude, rule["block"]) for prelude, rule in serd["rules"].items())
+    if context.build_generation is not None:
+        with _cache_lock:
+            if _cache_generation == context.build_generation:
+                _cache[path] = result
+    return result
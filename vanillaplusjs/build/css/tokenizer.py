@@ -5,7 +5,8 @@ https://www.w3.org/TR/css-syntax-3/#consume-token
 from io import TextIOBase
 from typing import Generator, Literal, Optional, Tuple, Union
 from .token import CSSToken, CSSTokenType
-from vanillaplusjs.build.ioutil import PreprocessedTextIO, PeekableTextIO
+from vanillaplusjs.build.ioutil import BufferedTextIO
+import re
 
 
 def tokenize(fp: TextIOBase) -> Generator[CSSToken, None, None]:
@@ -26,7 +27,7 @@ def tokenize(fp: TextIOBase) -> Generator[CSSToken, None, None]:
     Returns:
         None
     """
-    peekable = PreprocessedTextIO(PeekableTextIO(fp))
+    peekable = BufferedTextIO(fp)
     del fp
 
     while peeked := peekable.peek(1):
@@ -197,7 +198,7 @@ def tokenize_and_close(fp: TextIOBase) -> Generator[CSSToken, None, None]:
         fp.close()
 
 
-def _consume_comment(fp: PreprocessedTextIO) -> Optional[CSSToken]:
+def _consume_comment(fp: BufferedTextIO) -> Optional[CSSToken]:
     """https://www.w3.org/TR/css-syntax-3/#consume-comments
 
     Unlike as defined in the spec, this will return a Comment token
@@ -209,28 +210,33 @@ def _consume_comment(fp: PreprocessedTextIO) -> Optional[CSSToken]:
         return None
 
     fp.read(2)
-    comment = ""
-    while True:
-        peeked = fp.peek(2)
-        if peeked is None:
-            return None
-        if peeked == "*/":
-            fp.read(2)
-            return CSSToken(type=CSSTokenType.comment, value=comment)
-        comment += fp.read(1)
+    comment, terminated = fp.read_until("*/")
+    if not terminated:
+        return None
+    return CSSToken(type=CSSTokenType.comment, value=comment)
 
 
 WHITESPACE_CHARACTERS = "\n\t "
+WHITESPACE_RUN = re.compile("[\n\t ]+")
+"""Matches one or more whitespace characters"""
+
+STRING_RUNS = {quote: re.compile(f"[^{quote}\\\\\n]+") for quote in "'\""}
+"""For each quote, matches characters within a string started with that quote
+which need no special handling
+"""
 
+IDENT_CODEPOINT_RUN = re.compile("[a-zA-Z0-9_\\-\u0080-\U0010FFFF]+")
+"""Matches one or more ident code points"""
 
-def _consume_whitespace(fp: PreprocessedTextIO) -> Optional[CSSToken]:
+URL_RUN = re.compile("[^)\n\t \"'(\\\\\x00-\x08\x0b\x0e-\x1f\x7f]+")
+"""Matches characters within an unquoted url which need no special handling"""
+
+
+def _consume_whitespace(fp: BufferedTextIO) -> Optional[CSSToken]:
     """Consumes as much https://www.w3.org/TR/css-syntax-3/#whitespace
     as possible
     """
-    res = ""
-    while _is_whitespace(fp.peek(1)):
-        res += fp.read(1)
-
+    res = fp.read_run(WHITESPACE_RUN)
     if res:
         return CSSToken(type=CSSTokenType.whitespace, value=res)
 
@@ -238,7 +244,7 @@ def _consume_whitespace(fp: PreprocessedTextIO) -> Optional[CSSToken]:
 
 
 def _consume_string(
-    fp: PreprocessedTextIO, ending_code_point: Optional[str] = None
+    fp: BufferedTextIO, ending_code_point: Optional[str] = None
 ) -> Optional[CSSToken]:
     """https://www.w3.org/TR/css-syntax-3/#consume-a-string-token
 
@@ -248,8 +254,11 @@ def _consume_string(
     if ending_code_point is None:
         ending_code_point = fp.read(1)
 
+    plain_run = STRING_RUNS.get(ending_code_point)
     value = ""
     while True:
+        if plain_run is not None:
+            value += fp.read_run(plain_run)
         peeked = fp.peek(1)
         if peeked is None:
             return CSSToken(type=CSSTokenType.string, value=value)
@@ -278,7 +287,7 @@ def _consume_string(
         value += fp.read(1)
 
 
-def _consume_escaped_code_point(fp: PreprocessedTextIO) -> Optional[str]:
+def _consume_escaped_code_point(fp: BufferedTextIO) -> Optional[str]:
     """https://www.w3.org/TR/css-syntax-3/#consume-escaped-code-point"""
     first_char = fp.peek(1)
     if _is_hex_digit(first_char):
@@ -300,10 +309,14 @@ def _consume_escaped_code_point(fp: PreprocessedTextIO) -> Optional[str]:
     return fp.read(1)
 
 
-def _consume_ident_sequence(fp: PreprocessedTextIO) -> str:
+def _consume_ident_sequence(fp: BufferedTextIO) -> str:
     """https://www.w3.org/TR/css-syntax-3/#consume-an-ident-sequence"""
     result = ""
     while (peeked := fp.peek(1)) is not None:
+        if run := fp.read_run(IDENT_CODEPOINT_RUN):
+            result += run
+            continue
+
         if _is_ident_codepoint(peeked):
             result += fp.read(1)
             continue
@@ -319,7 +332,7 @@ def _consume_ident_sequence(fp: PreprocessedTextIO) -> str:
 
 
 def _consume_number(
-    fp: PreprocessedTextIO,
+    fp: BufferedTextIO,
 ) -> Optional[Tuple[Union[int, float], Literal["integer', 'number"]]]:
     """Consumes a number
 
@@ -383,7 +396,7 @@ def _consume_number(
     return float(repr), res_type
 
 
-def _consume_numeric_token(fp: PreprocessedTextIO) -> Optional[CSSToken]:
+def _consume_numeric_token(fp: BufferedTextIO) -> Optional[CSSToken]:
     """Consumes a numeric token; returns either a number token, percentage token,
     or a dimension token.
     https://www.w3.org/TR/css-syntax-3/#consume-a-numeric-token
@@ -413,7 +426,7 @@ def _consume_numeric_token(fp: PreprocessedTextIO) -> Optional[CSSToken]:
     )
 
 
-def _consume_ident_like(fp: PreprocessedTextIO) -> Optional[CSSToken]:
+def _consume_ident_like(fp: BufferedTextIO) -> Optional[CSSToken]:
     """Consumes an ident-like token
 
     https://www.w3.org/TR/css-syntax-3/#consume-an-ident-like-token
@@ -444,7 +457,7 @@ def _consume_ident_like(fp: PreprocessedTextIO) -> Optional[CSSToken]:
     return CSSToken(type=CSSTokenType.ident, value=string)
 
 
-def _consume_url(fp: PreprocessedTextIO) -> Optional[CSSToken]:
+def _consume_url(fp: BufferedTextIO) -> Optional[CSSToken]:
     """Consumes a URL token. Assumes that the initial url( has already been consumed.
     This also is for consuming an _unquoted_ URL; a quoted url should be parsed as
     a function token. This is only called via consume an ident-like token.
@@ -453,6 +466,7 @@ def _consume_url(fp: PreprocessedTextIO) -> Optional[CSSToken]:
     """
     value = ""
     while True:
+        value += fp.read_run(URL_RUN)
         peeked = fp.peek(1)
         if peeked is None or peeked == "":
             # parse error
@@ -478,7 +492,7 @@ def _consume_url(fp: PreprocessedTextIO) -> Optional[CSSToken]:
         value += fp.read(1)
 
 
-def _consume_remnants_of_bad_url(fp: PreprocessedTextIO) -> None:
+def _consume_remnants_of_bad_url(fp: BufferedTextIO) -> None:
     """Consumes the remnants of a bad URL
     https://www.w3.org/TR/css-syntax-3/#consume-the-remnants-of-a-bad-url
     """
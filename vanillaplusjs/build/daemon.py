@@ -0,0 +1,193 @@
+"""The build daemon keeps a WarmBuild alive and listens on a unix socket so
+that `vanillaplusjs build` can hand off work to it rather than starting cold.
+
+The protocol is a single newline-terminated JSON object in each direction
+per connection. Requests have a "type" of "ping", "build", or "shutdown", and
+responses have a "type" of "success", "error" (with a "message"), or
+"unavailable" (with a "message") when the daemon cannot perform the build as
+requested and the caller should build the project itself.
+"""
+from typing import List, Optional
+from vanillaplusjs.build.build_context import BuildContext
+from vanillaplusjs.build.exceptions import BuildException
+from vanillaplusjs.build.ioutil import makedirs_safely
+from vanillaplusjs.build.warm_build import WarmBuild
+from loguru import logger
+import asyncio
+import json
+import os
+import socket
+
+
+def is_daemon_supported() -> bool:
+    """Returns True if this platform supports the unix sockets the
+    daemon requires, False otherwise.
+    """
+    return hasattr(socket, "AF_UNIX")
+
+
+def request_build(
+    folder: str, dev: bool, delay_files: List[str], symlinks: Optional[bool] = None
+) -> bool:
+    """Asks the build daemon for the project in the given folder, if one
+    is running, to build the project.
+
+    Args:
+        folder (str): The folder containing vanillaplusjs.json
+        dev (bool): Whether to build for development or not
+        delay_files (list[str]): Files to delay processing, for debugging
+        symlinks (bool, None): If not None, the daemon only builds the project
+            if it uses the same symlink setting
+
+    Raises:
+        BuildException: If the daemon accepted the request but the build failed
+
+    Returns:
+        bool: True if the daemon built the project, False if there is no
+            daemon available and the caller should build the project itself
+    """
+    request = {
+        "type": "build",
+        "folder": os.path.abspath(folder),
+        "dev": dev,
+        "delay_files": delay_files,
+    }
+    if symlinks is not None:
+        request["symlinks"] = symlinks
+
+    response = send_request(folder, request)
+    if response is None:
+        return False
+
+    if response["type"] == "unavailable":
+        logger.debug("Build daemon unavailable: {}", response.get("message"))
+        return False
+
+    if response["type"] != "success":
+        raise BuildException(response.get("message", "daemon build failed"))
+
+    return True
+
+
+def send_request(folder: str, request: dict) -> Optional[dict]:
+    """Sends the given request to the daemon for the project in the given
+    folder and waits for the response.
+
+    Args:
+        folder (str): The folder containing vanillaplusjs.json
+        request (dict): The request to send
+
+    Returns:
+        dict, None: The response from the daemon, or None if there is no
+            daemon listening
+    """
+    if not is_daemon_supported():
+        return None
+
+    socket_path = BuildContext(folder, dev=False, symlinks=False).daemon_socket_file
+    if not os.path.exists(socket_path):
+        return None
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            logger.debug("Ignoring stale daemon socket at {}", socket_path)
+            return None
+
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+
+    if not line:
+        raise BuildException("daemon closed the connection without responding")
+
+    return json.loads(line)
+
+
+async def serve(warm_build: WarmBuild, stop_event: asyncio.Event) -> None:
+    """Listens on the daemon socket for the project of the given warm build
+    until the stop event is set or a shutdown request is received. Builds
+    are performed one at a time in the order they are received.
+
+    Args:
+        warm_build (WarmBuild): The warm build to use for builds
+        stop_event (asyncio.Event): Set to stop listening
+
+    Raises:
+        BuildException: If another daemon is already listening for this project
+    """
+    socket_path = BuildContext(
+        warm_build.folder, dev=False, symlinks=False
+    ).daemon_socket_file
+    build_lock = asyncio.Lock()
+
+    async def handle_connection(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            response = await handle_request(json.loads(line))
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def handle_request(request: dict) -> dict:
+        request_type = request.get("type")
+        if request_type == "ping":
+            return {"type": "success"}
+
+        if request_type == "shutdown":
+            stop_event.set()
+            return {"type": "success"}
+
+        if request_type != "build":
+            return {"type": "error", "message": f"unknown request {request_type=}"}
+
+        if os.path.abspath(request["folder"]) != os.path.abspath(warm_build.folder):
+            return {
+                "type": "error",
+                "message": f"daemon is for {warm_build.folder}, not {request['folder']}",
+            }
+
+        symlinks = request.get("symlinks")
+        if symlinks is not None and symlinks != warm_build.symlinks:
+            return {
+                "type": "unavailable",
+                "message": f"daemon uses {warm_build.symlinks=}, not {symlinks=}",
+            }
+
+        async with build_lock:
+            logger.info("Building {} for daemon request", warm_build.folder)
+            try:
+                await warm_build.cold_rebuild(
+                    dev=request["dev"], delay_files=request.get("delay_files") or []
+                )
+            except Exception as e:
+                logger.exception("Error building for daemon request")
+                return {"type": "error", "message": str(e)}
+        return {"type": "success"}
+
+    if os.path.lexists(socket_path):
+        if send_request(warm_build.folder, {"type": "ping"}) is not None:
+            raise BuildException(
+                f"A daemon is already running for {warm_build.folder}"
+            )
+        os.unlink(socket_path)
+
+    makedirs_safely(os.path.dirname(socket_path))
+    server = await asyncio.start_unix_server(handle_connection, path=socket_path)
+    logger.info("Build daemon listening on {}", socket_path)
+    try:
+        await stop_event.wait()
+    finally:
+        server.close()
+        await server.wait_closed()
+        try:
+            os.unlink(socket_path)
+        except FileNotFoundError:
+            pass
+        logger.info("Build daemon stopped")
@@ -0,0 +1,291 @@
+"""Lists every file within a folder along with its signature, for detecting
+what changed since the previous build. Directories are scanned concurrently in
+a thread pool, which matters most on network filesystems where each listing is
+a round trip, and the stat results from the listing are reused rather than
+statting each file a second time.
+
+A directory's mtime changes whenever an entry is added to, removed from, or
+renamed within it, but not when the contents of a file within it change. Thus
+if a directory has the same signature as in the previous scan, we know which
+files and subdirectories it contains without listing it, though we still need
+the signature of each file. This is similar to the untracked cache in git.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from vanillaplusjs.build.file_signature import FileSignature
+from vanillaplusjs.build.ioutil import makedirs_safely, replace_atomically
+import concurrent.futures
+import json
+import os
+import time
+
+
+MAX_SCAN_THREADS = 8
+"""The maximum number of directories which are scanned concurrently"""
+
+DIRECTORY_MTIME_GRANULARITY = 2
+"""How many seconds a directory must have been unchanged, as of the previous
+scan, for us to trust that its mtime would reflect any subsequent change. This
+accounts for filesystems which store mtimes with coarse precision, where an
+entry added in the same tick as the previous scan would not change the mtime.
+"""
+
+
+@dataclass
+class DirectoryIndexEntry:
+    """What we knew about a single directory as of the previous scan"""
+
+    signature: FileSignature
+    """The signature of the directory itself"""
+
+    subdirectories: List[str]
+    """The names of the directories within this directory"""
+
+
+@dataclass
+class DirectoryIndex:
+    """What we knew about every directory within the scanned folder as of the
+    previous scan
+    """
+
+    scanned_at: float
+    """The time at which the scan started, in seconds since the epoch"""
+
+    directories: Dict[str, DirectoryIndexEntry]
+    """The entry for each directory, by path relative to the project root"""
+
+    def to_json(self) -> dict:
+        """Converts to a json-serializable object"""
+        return {
+            "scanned_at": self.scanned_at,
+            "directories": dict(
+                (
+                    relpath,
+                    {
+                        "signature": {
+                            "mtime": entry.signature.mtime,
+                            "filesize": entry.signature.filesize,
+                            "inode": entry.signature.inode,
+                        },
+                        "subdirectories": entry.subdirectories,
+                    },
+                )
+                for relpath, entry in self.directories.items()
+            ),
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "DirectoryIndex":
+        """Loads the directory index stored in the given json object"""
+        return cls(
+            scanned_at=data["scanned_at"],
+            directories=dict(
+                (
+                    relpath,
+                    DirectoryIndexEntry(
+                        signature=FileSignature.from_json(entry["signature"]),
+                        subdirectories=list(entry["subdirectories"]),
+                    ),
+                )
+                for relpath, entry in data["directories"].items()
+            ),
+        )
+
+
+@dataclass
+class DirectoryScanResult:
+    """The result of scan_directory"""
+
+    files: Dict[str, FileSignature]
+    """The signature of every file within the folder, by path relative to the
+    project root
+    """
+
+    index: DirectoryIndex
+    """The index to use for the next scan"""
+
+    listed: int
+    """How many directories had to be listed"""
+
+    reused: int
+    """How many directories were not listed because they were unchanged"""
+
+
+def load_directory_index(path: str) -> Optional[DirectoryIndex]:
+    """Loads the directory index at the given path, if it exists"""
+    try:
+        with open(path, "r") as f:
+            return DirectoryIndex.from_json(json.load(f))
+    except FileNotFoundError:
+        return None
+
+
+def store_directory_index(path: str, index: DirectoryIndex) -> None:
+    """Stores the given directory index at the given path, replacing the file
+    atomically.
+    """
+    makedirs_safely(os.path.dirname(path))
+    with replace_atomically(path) as temp_path:
+        with open(temp_path, "w") as f:
+            json.dump(index.to_json(), f)
+
+
+def scan_directory(
+    root_folder: str,
+    relpath: str,
+    old_index: Optional[DirectoryIndex] = None,
+    known_files: Optional[Dict[str, List[str]]] = None,
+    max_workers: int = MAX_SCAN_THREADS,
+) -> DirectoryScanResult:
+    """Finds every file within the given folder. Symlinks to directories are
+    not followed, matching os.walk, and directories which cannot be listed
+    are skipped.
+
+    Args:
+        root_folder (str): The project root, which paths are relative to
+        relpath (str): The folder to scan, relative to the project root
+        old_index (DirectoryIndex, None): The index from the previous scan, if
+            known_files is also available
+        known_files (dict[str, list[str]], None): The names of the files which
+            were in each directory as of the previous scan, by the path to
+            the directory relative to the project root. Required for the old
+            index to be used.
+        max_workers (int): The maximum number of directories to scan at once
+
+    Returns:
+        DirectoryScanResult: The files that were found and the new index
+    """
+    scanned_at = time.time()
+    trusted: Dict[str, DirectoryIndexEntry] = dict()
+    if old_index is not None and known_files is not None:
+        trusted = dict(
+            (dir_relpath, entry)
+            for dir_relpath, entry in old_index.directories.items()
+            if entry.signature.mtime
+            < old_index.scanned_at - DIRECTORY_MTIME_GRANULARITY
+        )
+
+    files: Dict[str, FileSignature] = dict()
+    directories: Dict[str, DirectoryIndexEntry] = dict()
+    listed = 0
+    reused = 0
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {
+            executor.submit(
+                _scan_one_directory, root_folder, relpath, trusted, known_files
+            )
+        }
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                result = future.result()
+                if result is None:
+                    continue
+
+                (dir_relpath, entry, dir_files, was_listed) = result
+                directories[dir_relpath] = entry
+                files.update(dir_files)
+                if was_listed:
+                    listed += 1
+                else:
+                    reused += 1
+
+                for subdirectory in entry.subdirectories:
+                    pending.add(
+                        executor.submit(
+                            _scan_one_directory,
+                            root_folder,
+                            os.path.join(dir_relpath, subdirectory),
+                            trusted,
+                            known_files,
+                        )
+                    )
+
+    return DirectoryScanResult(
+        files=files,
+        index=DirectoryIndex(scanned_at=scanned_at, directories=directories),
+        listed=listed,
+        reused=reused,
+    )
+
+
+def _scan_one_directory(
+    root_folder: str,
+    dir_relpath: str,
+    trusted: Dict[str, DirectoryIndexEntry],
+    known_files: Optional[Dict[str, List[str]]],
+) -> Optional[Tuple[str, DirectoryIndexEntry, Dict[str, FileSignature], bool]]:
+    """Scans a single directory, returning its path, its index entry, the
+    files directly within it, and whether it had to be listed, or None if it
+    could not be scanned.
+    """
+    dir_path = os.path.join(root_folder, dir_relpath)
+    try:
+        # the directory must be stat'd before it is listed, so that any change
+        # made while we are listing it is detected on the next scan
+        signature = _signature_from_stat(os.lstat(dir_path))
+    except OSError:
+        return None
+
+    old_entry = trusted.get(dir_relpath)
+    if old_entry is not None and old_entry.signature == signature:
+        files: Dict[str, FileSignature] = dict()
+        for name in known_files.get(dir_relpath, []):
+            file_relpath = os.path.join(dir_relpath, name)
+            try:
+                files[file_relpath] = _signature_from_stat(
+                    os.lstat(os.path.join(root_folder, file_relpath))
+                )
+            except FileNotFoundError:
+                pass
+        return (dir_relpath, old_entry, files, False)
+
+    files = dict()
+    subdirectories: List[str] = []
+    try:
+        scandir_iter = os.scandir(dir_path)
+    except OSError:
+        return None
+
+    with scandir_iter:
+        for entry in scandir_iter:
+            try:
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        subdirectories.append(entry.name)
+                    continue
+                entry_stat = entry.stat(follow_symlinks=False)
+                # on windows the stat from a listing never includes the inode
+                inode = entry.inode() if os.name == "nt" else entry_stat.st_ino
+            except OSError:
+                continue
+
+            files[os.path.join(dir_relpath, entry.name)] = FileSignature(
+                mtime=entry_stat.st_mtime,
+                filesize=entry_stat.st_size,
+                inode=inode,
+            )
+
+    return (
+        dir_relpath,
+        DirectoryIndexEntry(signature=signature, subdirectories=subdirectories),
+        files,
+        True,
+    )
+
+
+def _signature_from_stat(stats: os.stat_result) -> FileSignature:
+    """Equivalent to get_file_signature, but from an existing stat result"""
+    try:
+        inode = stats.st_ino
+    except AttributeError:
+        inode = 0
+
+    return FileSignature(
+        mtime=stats.st_mtime,
+        filesize=stats.st_size,
+        inode=inode,
+    )
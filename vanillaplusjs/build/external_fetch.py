@@ -0,0 +1,252 @@
+"""Fetches external files into a content-addressed cache keyed by their
+integrity string, then copies them to where the project expects them.
+
+Since the integrity of a file determines its contents, the cache may be shared
+between projects and between CI runs, and a file only needs to be downloaded
+once no matter how many projects use it. Files are hashed as they are
+downloaded, so they are never read back to check their integrity, and partial
+downloads are kept so that they can be resumed with a range request, either
+after a dropped connection or by a later build.
+
+Downloads are coordinated with asyncio but run on a bounded pool of threads,
+each using a requests session which is shared by every download from the same
+host, so connections are reused rather than opened per file.
+"""
+from typing import Dict, Optional, Tuple
+from vanillaplusjs.build.exceptions import IntegrityMismatchException
+from vanillaplusjs.build.ioutil import makedirs_safely, replace_atomically
+from loguru import logger
+import asyncio
+import base64
+import concurrent.futures
+import fasteners
+import hashlib
+import os
+import requests
+import requests.adapters
+import shutil
+import threading
+import urllib.parse
+
+
+FETCH_CHUNK_SIZE = 64 * 1024
+"""How many bytes are read from the response at a time"""
+
+MAX_CONCURRENT_FETCHES = 8
+"""The default for the most files which are downloaded at once"""
+
+MAX_FETCH_ATTEMPTS = 3
+"""How many times a download is attempted, resuming where the previous attempt
+stopped, before giving up on a file
+"""
+
+FETCH_TIMEOUT_SECONDS = 30
+"""How long to wait to connect, or between bytes of the response"""
+
+
+def parse_integrity(integrity: str) -> Tuple[str, str]:
+    """Splits the given integrity string into its digest type and the
+    base64-encoded digest, e.g., sha384-xxx into (sha384, xxx)
+    """
+    (digest_type, expected_digest) = integrity.split("-", 1)
+    return digest_type, expected_digest
+
+
+def get_cache_path(cache_folder: str, integrity: str) -> str:
+    """Returns the path within the cache to the file with the given
+    integrity string
+    """
+    digest_type, expected_digest = parse_integrity(integrity)
+    name = expected_digest.replace("+", "-").replace("/", "_").rstrip("=")
+    return os.path.join(cache_folder, digest_type, name[:2], name)
+
+
+class ExternalFileFetcher:
+    """Downloads external files through a cache. This must be used as an async
+    context manager, which closes the sessions and threads on exit.
+    """
+
+    def __init__(
+        self, cache_folder: str, max_concurrency: int = MAX_CONCURRENT_FETCHES
+    ) -> None:
+        """Initializes the fetcher without any open connections
+
+        Args:
+            cache_folder (str): The folder containing the cache
+            max_concurrency (int): The most files to download at once
+        """
+        self.cache_folder = cache_folder
+        self.max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._sessions: Dict[str, requests.Session] = dict()
+        self._sessions_lock = threading.Lock()
+
+    async def __aenter__(self) -> "ExternalFileFetcher":
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="vanillaplusjs-fetch",
+        )
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        with self._sessions_lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    async def fetch(self, url: str, integrity: str, dst_path: str) -> None:
+        """Places the file with the given integrity at the given path, taking
+        it from the cache if it is there and downloading it from the given
+        url into the cache otherwise. The destination is replaced atomically.
+
+        Args:
+            url (str): Where to download the file from, if it is not cached
+            integrity (str): The expected hash of the file, e.g., sha384-xxx
+            dst_path (str): Where to place the file
+
+        Raises:
+            IntegrityMismatchException: If the downloaded file does not
+                match the integrity string
+            requests.RequestException: If the file could not be downloaded
+        """
+        async with self._semaphore:
+            await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._fetch_sync, url, integrity, dst_path
+            )
+
+    def _fetch_sync(self, url: str, integrity: str, dst_path: str) -> None:
+        cache_path = get_cache_path(self.cache_folder, integrity)
+        if not os.path.exists(cache_path):
+            makedirs_safely(os.path.dirname(cache_path))
+            # another build (possibly of another project) may be downloading
+            # the same file; wait for it rather than downloading it twice
+            with fasteners.InterProcessLock(cache_path + ".lock"):
+                if not os.path.exists(cache_path):
+                    self._download(url, integrity, cache_path)
+        else:
+            logger.debug("Using cached external file {} for {}", cache_path, url)
+
+        # copied rather than linked since the destination is within the
+        # source folder, where it may be modified in place
+        makedirs_safely(os.path.dirname(dst_path))
+        with replace_atomically(dst_path) as temp_path:
+            shutil.copyfile(cache_path, temp_path)
+
+    def _download(self, url: str, integrity: str, cache_path: str) -> None:
+        digest_type, expected_digest = parse_integrity(integrity)
+        part_path = cache_path + ".part"
+        our_digest, resumed = self._download_to_part(
+            url, digest_type, part_path, resume=True
+        )
+        if our_digest != expected_digest and resumed:
+            # the partial download may have been of a different file (e.g.,
+            # the url changed), so start over
+            logger.warning("Resumed download of {} did not match; restarting", url)
+            our_digest, _ = self._download_to_part(
+                url, digest_type, part_path, resume=False
+            )
+
+        if our_digest != expected_digest:
+            os.unlink(part_path)
+            raise IntegrityMismatchException(
+                f"From {url} expected {integrity}, got {our_digest}"
+            )
+        os.replace(part_path, cache_path)
+
+    def _download_to_part(
+        self, url: str, digest_type: str, part_path: str, resume: bool
+    ) -> Tuple[str, bool]:
+        """Downloads the file at the given url to the given path, continuing
+        from what is already there if resume is set and the server supports
+        range requests. Returns the base64 digest of the file and whether the
+        download was resumed.
+        """
+        digest = hashlib.new(digest_type)
+        offset = 0
+        resumed = False
+
+        if resume and os.path.exists(part_path):
+            # the state of the hash cannot be stored, so the part which was
+            # already downloaded is hashed again, which is far cheaper than
+            # downloading it again
+            with open(part_path, "rb") as f:
+                while True:
+                    chunk = f.read(FETCH_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    offset += len(chunk)
+
+        session = self._get_session(url)
+        for attempt in range(MAX_FETCH_ATTEMPTS):
+            headers = {"Accept-Encoding": "identity"}
+            if offset > 0:
+                headers["Range"] = f"bytes={offset}-"
+            logger.info(
+                "Downloading external file from {}{}",
+                url,
+                f" starting at byte {offset}" if offset > 0 else "",
+            )
+            try:
+                with session.get(
+                    url, headers=headers, stream=True, timeout=FETCH_TIMEOUT_SECONDS
+                ) as response:
+                    content_range = response.headers.get("Content-Range", "")
+                    if (
+                        offset > 0
+                        and response.status_code == 206
+                        and content_range.startswith(f"bytes {offset}-")
+                    ):
+                        mode = "ab"
+                        resumed = True
+                    elif offset > 0 and response.status_code == 416:
+                        # the previous download ended just before it was
+                        # moved into the cache
+                        resumed = True
+                        break
+                    else:
+                        response.raise_for_status()
+                        digest = hashlib.new(digest_type)
+                        offset = 0
+                        resumed = False
+                        mode = "wb"
+
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(FETCH_CHUNK_SIZE):
+                            digest.update(chunk)
+                            f.write(chunk)
+                            offset += len(chunk)
+                break
+            except (
+                requests.ConnectionError,
+                requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+            ) as e:
+                if attempt + 1 >= MAX_FETCH_ATTEMPTS:
+                    raise
+                logger.warning(
+                    "Download of {} interrupted after {} bytes ({}); resuming",
+                    url,
+                    offset,
+                    e,
+                )
+
+        return base64.b64encode(digest.digest()).decode("ascii"), resumed
+
+    def _get_session(self, url: str) -> requests.Session:
+        host = urllib.parse.urlsplit(url).netloc
+        with self._sessions_lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_maxsize=self.max_concurrency
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return session
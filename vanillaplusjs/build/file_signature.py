@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 import os
 
 
@@ -52,3 +53,19 @@ def get_file_signature(file: str) -> FileSignature:
         filesize=stats.st_size,
         inode=inode,
     )
+
+
+def get_optional_file_signature(file: str) -> Optional[FileSignature]:
+    """Gets the file signature for the given file, if it exists.
+
+    Args:
+        file (str): The path to the file to get the signature of
+
+    Returns:
+        FileSignature, None: The file signature, or None if there is no file
+            at the given path
+    """
+    try:
+        return get_file_signature(file)
+    except FileNotFoundError:
+        return None
@@ -1,5 +1,6 @@
 """Stores the file dependencies via a modified adjacency list."""
-from typing import Dict, List, Literal, Optional, Set, Tuple
+from typing import Dict, Iterator, List, Literal, Optional, Set, Tuple
+from vanillaplusjs.build.file_signature import FileSignature
 import io
 import json
 from dataclasses import dataclass
@@ -203,14 +204,16 @@ class FileDependencyGraph:
                 return False
         return True
 
-    def store(self, fp: io.FileIO, format: Literal["json"] = "json") -> None:
+    def store(self, fp: io.FileIO, format: Literal["json", "binary"] = "json") -> None:
         """Stores this graph in the given file, so that it can be loaded
         with load
 
         Args:
-            fp (io.FileIO): The object to write the graph to
-            format (str): The format to write the file in. Currently only
-                json is supported
+            fp (io.FileIO): The object to write the graph to. For the binary
+                format this must be opened in binary mode.
+            format (str): The format to write the file in. Either json, or
+                binary for the compact format described in graph_binary,
+                which can be memory-mapped with MappedFileDependencyGraph
 
         Raises:
             ValueError: if the format is not supported
@@ -236,19 +239,23 @@ class FileDependencyGraph:
                 )
                 print("}", file=fp, end="")
             print("}", file=fp)
+        elif format == "binary":
+            from vanillaplusjs.build.graph_binary import write_binary_graph
+
+            write_binary_graph(self, fp)
         else:
             raise ValueError(f"Unknown format: {format}")
 
     @classmethod
     def load(
-        kls, fp: io.FileIO, format: Literal["json"] = "json"
+        kls, fp: io.FileIO, format: Literal["json", "binary"] = "json"
     ) -> "FileDependencyGraph":
         """Loads the graph from the given file.
 
         Args:
-            fp (io.FileIO): The object to read the graph from
-            format (str): The format to read the file in. Currently only
-                json is supported
+            fp (io.FileIO): The object to read the graph from. For the binary
+                format this must be opened in binary mode.
+            format (str): The format to read the file in. Either json or binary
 
         Raises:
             ValueError: if the format is not supported
@@ -281,6 +288,12 @@ class FileDependencyGraph:
             res = kls()
             res.nodes = nodes
             return res
+        elif format == "binary":
+            from vanillaplusjs.build.graph_binary import MappedFileDependencyGraph
+
+            res = kls()
+            res.nodes = MappedFileDependencyGraph(fp.read()).to_graph().nodes
+            return res
         else:
             raise ValueError(f"Unknown format: {format}")
 
@@ -295,6 +308,13 @@ class FileDependencyGraph:
         """
         return a in self.nodes
 
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterates the paths of the files in the graph"""
+        return iter(self.nodes)
+
     def check_file(self, a: str, filesize: int, mtime: float, inode: int) -> bool:
         """Checks if we have an exact match for the file with the given name
 
@@ -317,6 +337,25 @@ class FileDependencyGraph:
             and a_node.inode == inode
         )
 
+    def get_signature(self, a: str) -> FileSignature:
+        """Gets the signature stored for the given file
+
+        Args:
+            a (str): The path to get the signature of
+
+        Raises:
+            ValueError: if a is not a file in the graph
+
+        Returns:
+            FileSignature: The filesize, mtime, and inode of the file
+        """
+        a_node = self.nodes.get(a)
+        if a_node is None:
+            raise ValueError(f"{a=} is not a file in the graph")
+        return FileSignature(
+            mtime=a_node.mtime, filesize=a_node.filesize, inode=a_node.inode
+        )
+
     def check_direct_relationship(self, a: str, b: str) -> FileRelationship:
         """Compares the relationship between a and b. This is analagous
         to the standard adjacency test, except distinguishing which one
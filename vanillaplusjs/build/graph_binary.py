@@ -0,0 +1,368 @@
+"""A compact binary format for FileDependencyGraph which can be memory-mapped,
+so that membership checks and neighbor lookups only touch the pages they need
+rather than materializing every node up front.
+
+The file consists of a fixed header followed by the following sections, where
+all integers and floats are little-endian and n is the number of nodes:
+
+- string offsets: n + 1 uint64 offsets into the string blob
+- filesize column: n int64
+- mtime column: n float64
+- inode column: n uint64
+- children pointers: n + 1 uint32 offsets into the children indices
+- children indices: one uint32 node id per edge
+- parents pointers: n + 1 uint32 offsets into the parents indices
+- parents indices: one uint32 node id per edge
+- string blob: the utf-8 encoded paths, concatenated
+
+Node ids are assigned in order of the utf-8 encoded path, so that a path can be
+found by binary searching the string table. Each path is stored exactly once;
+the adjacency lists refer to paths by their node id.
+"""
+from typing import Dict, Iterator, List, Optional, Union, TYPE_CHECKING
+from vanillaplusjs.build.file_signature import FileSignature
+import array
+import io
+import mmap
+import os
+import struct
+import sys
+
+if TYPE_CHECKING:
+    from vanillaplusjs.build.graph import FileDependencyGraph
+
+
+MAGIC = b"VPJSGRPH"
+"""The first bytes of every binary graph file"""
+
+VERSION = 1
+"""The version of the binary format; incremented on incompatible changes"""
+
+HEADER = struct.Struct("<8sIIIIQ")
+"""magic, version, node count, children edge count, parents edge count,
+string blob length
+"""
+
+_UINT64_PAIR = struct.Struct("<2Q")
+_UINT32_PAIR = struct.Struct("<2I")
+_FILESIZE = struct.Struct("<q")
+_MTIME = struct.Struct("<d")
+_INODE = struct.Struct("<Q")
+
+
+def write_binary_graph(graph: "FileDependencyGraph", fp: io.BufferedIOBase) -> None:
+    """Writes the given graph to the given binary file in the binary graph
+    format.
+
+    Args:
+        graph (FileDependencyGraph): The graph to write
+        fp (io.BufferedIOBase): The file to write to, opened in binary mode
+    """
+    encoded_paths = sorted((path.encode("utf-8"), path) for path in graph.nodes)
+    ids: Dict[str, int] = dict(
+        (path, idx) for idx, (_, path) in enumerate(encoded_paths)
+    )
+
+    string_offsets = array.array("Q", [0])
+    filesizes = array.array("q")
+    mtimes = array.array("d")
+    inodes = array.array("Q")
+    children_pointers = array.array("I", [0])
+    children_indices = array.array("I")
+    parents_pointers = array.array("I", [0])
+    parents_indices = array.array("I")
+
+    blob_length = 0
+    for encoded, path in encoded_paths:
+        node = graph.nodes[path]
+        blob_length += len(encoded)
+        string_offsets.append(blob_length)
+        filesizes.append(node.filesize)
+        mtimes.append(node.mtime)
+        inodes.append(node.inode)
+        children_indices.extend(ids[child.path] for child in node.children)
+        children_pointers.append(len(children_indices))
+        parents_indices.extend(ids[parent.path] for parent in node.parents)
+        parents_pointers.append(len(parents_indices))
+
+    fp.write(
+        HEADER.pack(
+            MAGIC,
+            VERSION,
+            len(encoded_paths),
+            len(children_indices),
+            len(parents_indices),
+            blob_length,
+        )
+    )
+    for column in (
+        string_offsets,
+        filesizes,
+        mtimes,
+        inodes,
+        children_pointers,
+        children_indices,
+        parents_pointers,
+        parents_indices,
+    ):
+        if sys.byteorder == "big":
+            column.byteswap()
+        fp.write(column.tobytes())
+
+    for encoded, _ in encoded_paths:
+        fp.write(encoded)
+
+
+class MappedFileDependencyGraph:
+    """A read-only view of a graph stored in the binary graph format. This
+    supports the read operations of FileDependencyGraph which are required
+    to perform an incremental build, decoding only what is accessed.
+
+    Use `to_graph` to get a mutable FileDependencyGraph.
+    """
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap]) -> None:
+        """Wraps the given buffer containing a binary graph.
+
+        Args:
+            buffer (bytes, mmap.mmap): The contents of the binary graph file
+
+        Raises:
+            ValueError: if the buffer is not a supported binary graph
+        """
+        if len(buffer) < HEADER.size:
+            raise ValueError("binary graph is truncated")
+
+        (
+            magic,
+            version,
+            node_count,
+            children_edge_count,
+            parents_edge_count,
+            blob_length,
+        ) = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("not a binary graph")
+        if version != VERSION:
+            raise ValueError(f"unsupported binary graph {version=}")
+
+        self.buffer = buffer
+        """The underlying buffer, which may be memory-mapped"""
+
+        self.node_count: int = node_count
+        """The number of files in the graph"""
+
+        self._string_offsets = HEADER.size
+        self._filesizes = self._string_offsets + (node_count + 1) * 8
+        self._mtimes = self._filesizes + node_count * 8
+        self._inodes = self._mtimes + node_count * 8
+        self._children_pointers = self._inodes + node_count * 8
+        self._children_indices = self._children_pointers + (node_count + 1) * 4
+        self._parents_pointers = self._children_indices + children_edge_count * 4
+        self._parents_indices = self._parents_pointers + (node_count + 1) * 4
+        self._blob = self._parents_indices + parents_edge_count * 4
+
+        if len(buffer) != self._blob + blob_length:
+            raise ValueError("binary graph is truncated")
+
+        self._ids: Dict[str, int] = dict()
+        """Cache of the node ids we have looked up by path"""
+
+    @classmethod
+    def open(cls, path: str) -> "MappedFileDependencyGraph":
+        """Memory-maps the binary graph at the given path. On Windows, where a
+        mapped file cannot be replaced, the file is read into memory instead.
+
+        Args:
+            path (str): The path to the binary graph file
+
+        Raises:
+            ValueError: if the file is not a supported binary graph
+        """
+        with open(path, "rb") as f:
+            if os.name == "nt" or os.fstat(f.fileno()).st_size == 0:
+                return cls(f.read())
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def close(self) -> None:
+        """Releases the underlying memory map, if any. The graph cannot be
+        used afterward.
+        """
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+    def __len__(self) -> int:
+        return self.node_count
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterates the paths of the files in the graph"""
+        for idx in range(self.node_count):
+            yield self._path(idx)
+
+    def __contains__(self, a: str) -> bool:
+        """Determines if the given file is in the graph
+
+        Args:
+            a (str): The file to check
+
+        Returns:
+            True if the file is in the graph, False otherwise
+        """
+        return self._find(a) is not None
+
+    def check_file(self, a: str, filesize: int, mtime: float, inode: int) -> bool:
+        """Checks if we have an exact match for the file with the given name
+
+        Args:
+            a (str): The path to check
+            filesize (int): The filesize to check
+            mtime (int): The mtime to check
+            inode (int): The inode to check
+
+        Returns:
+            True if the file is in the graph and has the given metadata,
+            False otherwise
+        """
+        idx = self._find(a)
+        if idx is None:
+            return False
+        return self._signature(idx) == FileSignature(
+            mtime=mtime, filesize=filesize, inode=inode
+        )
+
+    def get_signature(self, a: str) -> FileSignature:
+        """Gets the signature stored for the given file
+
+        Args:
+            a (str): The path to get the signature of
+
+        Raises:
+            ValueError: if a is not a file in the graph
+        """
+        return self._signature(self._require(a))
+
+    def get_parents(self, a: str) -> List[str]:
+        """Gets the parents of the given file.
+
+        Args:
+            a (str): The path to get the parents of
+
+        Raises:
+            ValueError: if a is not a file in the graph
+
+        Returns:
+            A list of the parents of the given file
+        """
+        return self._neighbors(
+            self._require(a), self._parents_pointers, self._parents_indices
+        )
+
+    def get_children(self, a: str) -> List[str]:
+        """Gets the children of the given file.
+
+        Args:
+            a (str): The path to get the children of
+
+        Raises:
+            ValueError: if a is not a file in the graph
+
+        Returns:
+            A list of the children of the given file
+        """
+        return self._neighbors(
+            self._require(a), self._children_pointers, self._children_indices
+        )
+
+    def to_graph(self) -> "FileDependencyGraph":
+        """Materializes every node into a mutable FileDependencyGraph
+
+        Returns:
+            FileDependencyGraph: The equivalent in-memory graph
+        """
+        from vanillaplusjs.build.graph import (
+            FileDependencyGraph,
+            FileDependencyGraphNode,
+        )
+
+        nodes: List[FileDependencyGraphNode] = []
+        for idx in range(self.node_count):
+            signature = self._signature(idx)
+            nodes.append(
+                FileDependencyGraphNode(
+                    self._path(idx),
+                    signature.filesize,
+                    signature.mtime,
+                    signature.inode,
+                    [],
+                    [],
+                )
+            )
+
+        for idx, node in enumerate(nodes):
+            node.children = [
+                nodes[child]
+                for child in self._neighbor_ids(
+                    idx, self._children_pointers, self._children_indices
+                )
+            ]
+            node.parents = [
+                nodes[parent]
+                for parent in self._neighbor_ids(
+                    idx, self._parents_pointers, self._parents_indices
+                )
+            ]
+
+        result = FileDependencyGraph()
+        result.nodes = dict((node.path, node) for node in nodes)
+        return result
+
+    def _encoded_path(self, idx: int) -> bytes:
+        start, end = _UINT64_PAIR.unpack_from(self.buffer, self._string_offsets + idx * 8)
+        return self.buffer[self._blob + start : self._blob + end]
+
+    def _path(self, idx: int) -> str:
+        return self._encoded_path(idx).decode("utf-8")
+
+    def _find(self, a: str) -> Optional[int]:
+        idx = self._ids.get(a)
+        if idx is not None:
+            return idx
+
+        target = a.encode("utf-8")
+        lo, hi = 0, self.node_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._encoded_path(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo < self.node_count and self._encoded_path(lo) == target:
+            self._ids[a] = lo
+            return lo
+        return None
+
+    def _require(self, a: str) -> int:
+        idx = self._find(a)
+        if idx is None:
+            raise ValueError(f"{a=} is not a file in the graph")
+        return idx
+
+    def _signature(self, idx: int) -> FileSignature:
+        return FileSignature(
+            mtime=_MTIME.unpack_from(self.buffer, self._mtimes + idx * 8)[0],
+            filesize=_FILESIZE.unpack_from(self.buffer, self._filesizes + idx * 8)[0],
+            inode=_INODE.unpack_from(self.buffer, self._inodes + idx * 8)[0],
+        )
+
+    def _neighbor_ids(self, idx: int, pointers: int, indices: int) -> List[int]:
+        start, end = _UINT32_PAIR.unpack_from(self.buffer, pointers + idx * 4)
+        return list(
+            struct.unpack_from(f"<{end - start}I", self.buffer, indices + start * 4)
+        )
+
+    def _neighbors(self, idx: int, pointers: int, indices: int) -> List[str]:
+        return [self._path(i) for i in self._neighbor_ids(idx, pointers, indices)]
+
+    def __repr__(self) -> str:
+        return f"MappedFileDependencyGraph({self.node_count=})"
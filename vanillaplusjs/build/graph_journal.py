@@ -0,0 +1,124 @@
+"""An append-only journal of the changes made to the build graphs since they
+were last stored in full. Each rebuild appends one block containing the new
+state of every node it touched, so the cost of persisting a rebuild scales with
+the number of touched nodes rather than the size of the project.
+
+Each block is a header (the payload length and its crc32) followed by a utf-8
+json payload mapping each graph name to the nodes that changed, where a node is
+either null (removed) or in the same shape as the json graph format. Because
+the records are absolute, replaying a block which was already applied is
+harmless, which allows the journal to be replayed onto snapshots that were
+written during an interrupted compaction.
+
+A block which was only partially written (e.g., due to a crash) fails its
+checksum and is discarded, along with anything after it, the next time the
+journal is read.
+"""
+from typing import Dict, List, Optional
+from vanillaplusjs.build.graph_overlay import GraphNodeRecord
+from loguru import logger
+import json
+import os
+import struct
+import zlib
+
+
+BLOCK_HEADER = struct.Struct("<II")
+"""payload length, crc32 of the payload"""
+
+GraphChanges = Dict[str, Dict[str, Optional[GraphNodeRecord]]]
+"""The changed nodes, by path, for each graph, by name"""
+
+
+def append_journal(path: str, changes: GraphChanges) -> None:
+    """Appends a block containing the given changes to the journal at the
+    given path, creating it if necessary. The block is flushed to disk before
+    returning.
+
+    Args:
+        path (str): The path to the journal
+        changes (GraphChanges): The changed nodes for each graph
+    """
+    payload = json.dumps(
+        dict(
+            (
+                graph_name,
+                dict(
+                    (node_path, record.to_json() if record is not None else None)
+                    for node_path, record in records.items()
+                ),
+            )
+            for graph_name, records in changes.items()
+        )
+    ).encode("utf-8")
+
+    with open(path, "ab") as f:
+        f.write(BLOCK_HEADER.pack(len(payload), zlib.crc32(payload)))
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_journal(path: str) -> List[GraphChanges]:
+    """Reads every complete block from the journal at the given path. If the
+    journal ends with an incomplete or corrupted block, the journal is
+    truncated to remove it.
+
+    Args:
+        path (str): The path to the journal
+
+    Returns:
+        list[GraphChanges]: The changes in each block, in the order they were
+            appended. Empty if the journal does not exist.
+    """
+    try:
+        f = open(path, "r+b")
+    except FileNotFoundError:
+        return []
+
+    result: List[GraphChanges] = []
+    with f:
+        valid_length = 0
+        while True:
+            header = f.read(BLOCK_HEADER.size)
+            if not header:
+                break
+
+            payload = b""
+            if len(header) == BLOCK_HEADER.size:
+                (payload_length, checksum) = BLOCK_HEADER.unpack(header)
+                payload = f.read(payload_length)
+
+            if (
+                len(header) != BLOCK_HEADER.size
+                or len(payload) != payload_length
+                or zlib.crc32(payload) != checksum
+            ):
+                logger.warning(
+                    "Discarding incomplete graph journal block at offset {} in {}",
+                    valid_length,
+                    path,
+                )
+                f.truncate(valid_length)
+                break
+
+            result.append(
+                dict(
+                    (
+                        graph_name,
+                        dict(
+                            (
+                                node_path,
+                                GraphNodeRecord.from_json(record)
+                                if record is not None
+                                else None,
+                            )
+                            for node_path, record in records.items()
+                        ),
+                    )
+                    for graph_name, records in json.loads(payload).items()
+                )
+            )
+            valid_length = f.tell()
+
+    return result
@@ -0,0 +1,292 @@
+"""A mutable view over a read-only dependency graph which records the state of
+every node it modifies, so that a rebuild can update the graphs in time
+proportional to the number of nodes it touches and persist only those nodes.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Set, Union
+from vanillaplusjs.build.file_signature import FileSignature
+from vanillaplusjs.build.graph import FileDependencyGraph, FileDependencyGraphNode
+from vanillaplusjs.build.graph_binary import MappedFileDependencyGraph
+
+
+@dataclass
+class GraphNodeRecord:
+    """The complete state of a single node within a graph. Records are
+    absolute, so applying the same record twice is harmless.
+    """
+
+    signature: FileSignature
+    """The signature of the file"""
+
+    parents: List[str]
+    """The files which depend on this file"""
+
+    children: List[str]
+    """The files which this file depends on"""
+
+    def to_json(self) -> dict:
+        """Converts to the same shape used for nodes in the json graph format"""
+        return {
+            "parents": self.parents,
+            "children": self.children,
+            "metadata": {
+                "filesize": self.signature.filesize,
+                "mtime": self.signature.mtime,
+                "inode": self.signature.inode,
+            },
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "GraphNodeRecord":
+        """Loads the record stored in the given json object"""
+        return cls(
+            signature=FileSignature.from_json(data["metadata"]),
+            parents=list(data["parents"]),
+            children=list(data["children"]),
+        )
+
+
+class OverlayFileDependencyGraph:
+    """Supports the same read operations as FileDependencyGraph, plus the
+    mutations the build requires, without modifying the base graph. Every
+    node which is modified (including nodes whose parents change because of
+    an edge added elsewhere) has its new state stored in records, where None
+    means the node was removed.
+    """
+
+    def __init__(
+        self,
+        base: Union[
+            FileDependencyGraph,
+            MappedFileDependencyGraph,
+            "OverlayFileDependencyGraph",
+        ],
+        records: Optional[Dict[str, Optional[GraphNodeRecord]]] = None,
+    ) -> None:
+        self.base = base
+        """The graph being overlaid, which is never modified"""
+
+        self.records: Dict[str, Optional[GraphNodeRecord]] = (
+            records if records is not None else dict()
+        )
+        """The state of every node which differs from the base, by path"""
+
+    def flatten(self) -> "OverlayFileDependencyGraph":
+        """If the base of this overlay is itself an overlay, returns an
+        equivalent overlay over the innermost base. Otherwise returns self.
+        """
+        if not isinstance(self.base, OverlayFileDependencyGraph):
+            return self
+        base = self.base.flatten()
+        return OverlayFileDependencyGraph(base.base, {**base.records, **self.records})
+
+    def to_graph(self) -> FileDependencyGraph:
+        """Materializes every node into a new FileDependencyGraph"""
+        nodes: Dict[str, FileDependencyGraphNode] = dict()
+        for path in self:
+            signature = self.get_signature(path)
+            nodes[path] = FileDependencyGraphNode(
+                path, signature.filesize, signature.mtime, signature.inode, [], []
+            )
+
+        for path, node in nodes.items():
+            node.parents = [nodes[p] for p in self.get_parents(path)]
+            node.children = [nodes[c] for c in self.get_children(path)]
+
+        result = FileDependencyGraph()
+        result.nodes = nodes
+        return result
+
+    def __contains__(self, a: str) -> bool:
+        if a in self.records:
+            return self.records[a] is not None
+        return a in self.base
+
+    def __iter__(self) -> Iterator[str]:
+        for path in self.base:
+            if path not in self.records:
+                yield path
+        for path, record in self.records.items():
+            if record is not None:
+                yield path
+
+    def __len__(self) -> int:
+        result = len(self.base)
+        for path, record in self.records.items():
+            in_base = path in self.base
+            if record is None and in_base:
+                result -= 1
+            elif record is not None and not in_base:
+                result += 1
+        return result
+
+    def check_file(self, a: str, filesize: int, mtime: float, inode: int) -> bool:
+        """Checks if we have an exact match for the file with the given name"""
+        if a not in self:
+            return False
+        return self.get_signature(a) == FileSignature(
+            mtime=mtime, filesize=filesize, inode=inode
+        )
+
+    def get_signature(self, a: str) -> FileSignature:
+        """Gets the signature of the given file
+
+        Raises:
+            ValueError: if a is not a file in the graph
+        """
+        if a in self.records:
+            return self._require(a).signature
+        return self.base.get_signature(a)
+
+    def get_parents(self, a: str) -> List[str]:
+        """Gets the parents of the given file
+
+        Raises:
+            ValueError: if a is not a file in the graph
+        """
+        if a in self.records:
+            return list(self._require(a).parents)
+        return self.base.get_parents(a)
+
+    def get_children(self, a: str) -> List[str]:
+        """Gets the children of the given file
+
+        Raises:
+            ValueError: if a is not a file in the graph
+        """
+        if a in self.records:
+            return list(self._require(a).children)
+        return self.base.get_children(a)
+
+    def add_file(
+        self,
+        a: str,
+        filesize: int,
+        mtime: float,
+        inode: int,
+        children: Optional[List[str]] = None,
+    ) -> None:
+        """Adds the given file to the graph, with the same semantics as
+        FileDependencyGraph.add_file
+
+        Raises:
+            ValueError: if a is already a file in the graph
+            ValueError: if any of the children are not in the graph
+        """
+        if a in self:
+            raise ValueError(f"{a=} is already a file in the graph")
+
+        if children and any(c not in self for c in children):
+            bad_children = [c for c in children if c not in self]
+            raise ValueError(f"{bad_children=} are not files in the graph")
+
+        self.records[a] = GraphNodeRecord(
+            FileSignature(mtime=mtime, filesize=filesize, inode=inode), [], []
+        )
+        for child in children or []:
+            self._writable(child).parents.append(a)
+            self.records[a].children.append(child)
+
+    def set_signature(self, a: str, filesize: int, mtime: float, inode: int) -> None:
+        """Updates the signature of the given file
+
+        Raises:
+            ValueError: if a is not a file in the graph
+        """
+        self._writable(a).signature = FileSignature(
+            mtime=mtime, filesize=filesize, inode=inode
+        )
+
+    def remove_file(
+        self, a: str, clear_parents: bool = False, clear_children: bool = False
+    ) -> None:
+        """Removes the given file from the graph, with the same semantics as
+        FileDependencyGraph.remove_file
+
+        Raises:
+            ValueError: if a is not a file in the graph
+            ValueError: if a has any parents in the graph and clear_parents is False
+            ValueError: if a has any children in the graph and clear_children is False
+        """
+        record = self._writable(a)
+        if record.parents and not clear_parents:
+            raise ValueError(
+                f"{a=} has parents in the graph and clear_parents is False"
+            )
+
+        if record.children and not clear_children:
+            raise ValueError(
+                f"{a=} has children in the graph and clear_children is False"
+            )
+
+        for parent in record.parents:
+            self._writable(parent).children.remove(a)
+
+        for child in record.children:
+            self._writable(child).parents.remove(a)
+
+        self.records[a] = None
+
+    def set_children(
+        self, a: str, children: List[str], prevent_cycles: bool = True
+    ) -> None:
+        """Updates the children for the given file, with the same semantics as
+        FileDependencyGraph.set_children
+
+        Raises:
+            ValueError: if a is not a file in the graph
+            ValueError: if any of the children of a are not files in the graph
+            ValueError: if a would have a cyclic relationship with another file
+              and prevent_cycles is True
+        """
+        if a not in self:
+            raise ValueError(f"{a=} is not a file in the graph")
+        if any(c not in self for c in children):
+            bad_children = [c for c in children if c not in self]
+            raise ValueError(f"{bad_children=} are not files in the graph")
+        if prevent_cycles:
+            ancestors = self._get_ancestors(a)
+            bad_children = [c for c in children if c == a or c in ancestors]
+            if bad_children:
+                raise ValueError(
+                    f"{bad_children=} would have a cyclic relationship with the file {a=}"
+                )
+
+        record = self._writable(a)
+        for child in record.children:
+            self._writable(child).parents.remove(a)
+        record.children = []
+        for child in children:
+            self._writable(child).parents.append(a)
+            record.children.append(child)
+
+    def _require(self, a: str) -> GraphNodeRecord:
+        record = self.records[a]
+        if record is None:
+            raise ValueError(f"{a=} is not a file in the graph")
+        return record
+
+    def _writable(self, a: str) -> GraphNodeRecord:
+        if a in self.records:
+            return self._require(a)
+
+        record = GraphNodeRecord(
+            self.base.get_signature(a),
+            self.base.get_parents(a),
+            self.base.get_children(a),
+        )
+        self.records[a] = record
+        return record
+
+    def _get_ancestors(self, a: str) -> Set[str]:
+        seen: Set[str] = set()
+        stack: List[str] = [a]
+        while stack:
+            for parent in self.get_parents(stack.pop()):
+                if parent not in seen:
+                    seen.add(parent)
+                    stack.append(parent)
+        return seen
+
+    def __repr__(self) -> str:
+        return f"OverlayFileDependencyGraph({self.base=}, {len(self.records)=})"
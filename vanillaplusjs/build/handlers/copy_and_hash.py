@@ -1,7 +1,12 @@
-"""Combination of the copy and hash handlers."""
+"""Combination of the copy and hash handlers. When both the copy and the
+hash need to be produced, the file is only read once.
+"""
 from vanillaplusjs.build.build_context import BuildContext
 from vanillaplusjs.build.build_file_result import BuildFileResult
+from vanillaplusjs.build.hash_cache import remember_hash
+from vanillaplusjs.build.ioutil import makedirs_safely
 from vanillaplusjs.build.scan_file_result import ScanFileResult
+import os
 import vanillaplusjs.build.handlers.copy
 import vanillaplusjs.build.handlers.hash
 
@@ -17,6 +22,31 @@ def scan_file(context: BuildContext, relpath: str) -> ScanFileResult:
 
 
 def build_file(context: BuildContext, relpath: str) -> BuildFileResult:
+    if not context.symlinks:
+        copy_target = vanillaplusjs.build.handlers.copy.get_target_path(
+            context, relpath
+        )
+        hash_target = vanillaplusjs.build.handlers.hash.get_target_path(
+            context, relpath
+        )
+        if copy_target is not None and hash_target is not None:
+            copy_target_rel_to_cwd = os.path.join(context.folder, copy_target)
+            hash_target_rel_to_cwd = os.path.join(context.folder, hash_target)
+            if not os.path.exists(copy_target_rel_to_cwd) and not os.path.exists(
+                hash_target_rel_to_cwd
+            ):
+                makedirs_safely(os.path.dirname(copy_target_rel_to_cwd))
+                sha256_b64 = vanillaplusjs.build.handlers.hash.copy_and_calculate_hash(
+                    os.path.join(context.folder, relpath), copy_target_rel_to_cwd
+                )
+                vanillaplusjs.build.handlers.hash.write_hash(
+                    hash_target_rel_to_cwd, sha256_b64
+                )
+                remember_hash(context, hash_target, sha256_b64)
+                return BuildFileResult(
+                    children=[], produced=[copy_target, hash_target], reused=[]
+                )
+
     copy_result = vanillaplusjs.build.handlers.copy.build_file(context, relpath)
     hash_result = vanillaplusjs.build.handlers.hash.build_file(context, relpath)
 
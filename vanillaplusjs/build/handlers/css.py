@@ -1,9 +1,15 @@
 """This module applies the standard css manipulators to the document,
 stores that in the output directory (as if it were copied), and then
-hashes that output as if via hash.
+hashes that output as if via hash. The top-level rules of the output are
+indexed for other stylesheets to import, see rule_index.
+
+Both scan_file and build_file accept the source of the file, in which case the
+file is read from memory rather than from disk and relpath does not need to
+exist. This is how inline scripts and styles are processed when they are
+outlined from html files.
 """
 
-from typing import List
+from typing import Iterable, List, Optional
 from vanillaplusjs.build.build_context import BuildContext
 from vanillaplusjs.build.build_file_result import BuildFileResult
 from vanillaplusjs.build.css.manips.nest import (
@@ -16,8 +22,16 @@ from vanillaplusjs.build.css.manips.outline_image_data import (
 from vanillaplusjs.build.css.manips.version_urls import VersionURLsManipulator
 import vanillaplusjs.build.handlers.copy
 import vanillaplusjs.build.handlers.hash
-from vanillaplusjs.build.css.manipulate_and_serialize import manipulate_and_serialize
+from vanillaplusjs.build.css.manipulate_and_serialize import (
+    manipulate_and_serialize,
+    tokenize_file,
+)
+from vanillaplusjs.build.css.rule_index import RuleIndexer, get_rule_index_path
+from vanillaplusjs.build.css.token import CSSToken
+from vanillaplusjs.build.css.tokenizer import tokenize
 from vanillaplusjs.build.scan_file_result import ScanFileResult
+from vanillaplusjs.build.token_cache import get_tokens
+import io
 import os
 
 
@@ -37,7 +51,9 @@ and `build_result(self) -> BuildFileResult`
 """
 
 
-def scan_file(context: BuildContext, relpath: str) -> ScanFileResult:
+def scan_file(
+    context: BuildContext, relpath: str, source: Optional[str] = None
+) -> ScanFileResult:
     if not relpath.endswith(".css"):
         return ScanFileResult([], [])
 
@@ -46,7 +62,10 @@ def scan_file(context: BuildContext, relpath: str) -> ScanFileResult:
 
     manips = [manip(context, relpath, "scan") for manip in MANIPULATORS]
     manipulate_and_serialize(
-        infile=os.path.join(context.folder, relpath), outfile=None, manipulators=manips
+        infile=os.path.join(context.folder, relpath),
+        outfile=None,
+        manipulators=manips,
+        tokens=_get_tokens(context, relpath, source),
     )
 
     sub_scan_results = [
@@ -59,10 +78,16 @@ def scan_file(context: BuildContext, relpath: str) -> ScanFileResult:
         dependencies.update(scan_result.dependencies)
         produces.update(scan_result.produces)
 
+    target_path = vanillaplusjs.build.handlers.copy.get_target_path(context, relpath)
+    if target_path is not None:
+        produces.add(get_rule_index_path(target_path))
+
     return ScanFileResult(dependencies=list(dependencies), produces=list(produces))
 
 
-def build_file(context: BuildContext, relpath: str) -> BuildFileResult:
+def build_file(
+    context: BuildContext, relpath: str, source: Optional[str] = None
+) -> BuildFileResult:
     if not relpath.endswith(".css"):
         return BuildFileResult([], [], [])
 
@@ -73,15 +98,22 @@ def build_file(context: BuildContext, relpath: str) -> BuildFileResult:
     reused = set()
 
     manips = [manip(context, relpath, "build") for manip in MANIPULATORS]
+    indexer = RuleIndexer()
 
     manipulate_and_serialize(
         infile=os.path.join(context.folder, relpath),
         outfile=os.path.join(context.folder, target_path),
         manipulators=manips,
+        tokens=_get_tokens(context, relpath, source),
+        on_output=indexer.handle_token,
     )
 
     produced.add(target_path)
 
+    index_path = get_rule_index_path(target_path)
+    indexer.store(os.path.join(context.folder, index_path))
+    produced.add(index_path)
+
     sub_build_results: List[BuildFileResult] = [
         vanillaplusjs.build.handlers.hash.build_file(context, target_path),
         *[manip.build_result() for manip in manips],
@@ -99,6 +131,17 @@ def build_file(context: BuildContext, relpath: str) -> BuildFileResult:
     )
 
 
+def _get_tokens(
+    context: BuildContext, relpath: str, source: Optional[str]
+) -> Iterable[CSSToken]:
+    """Gets the tokens of the file at the given path, or of the given source
+    if it is specified
+    """
+    if source is not None:
+        return tokenize(io.StringIO(source))
+    return get_tokens(context, relpath, "css", tokenize_file)
+
+
 if __name__ == "__main__":
     manipulate_and_serialize(
         "test.css",
@@ -1,3 +1,4 @@
+from typing import Optional
 from vanillaplusjs.build.build_context import BuildContext
 from vanillaplusjs.build.build_file_result import BuildFileResult
 from vanillaplusjs.build.scan_file_result import ScanFileResult
@@ -14,3 +15,20 @@ class Handler:
 
     def build_file(self, context: BuildContext, relpath: str) -> BuildFileResult:
         raise NotImplementedError()
+
+
+class SourceHandler(Handler):
+    """Describes a handler which can also handle files whose contents are
+    already in memory, in which case the file at relpath is never read and
+    does not need to exist.
+    """
+
+    def scan_file(
+        self, context: BuildContext, relpath: str, source: Optional[str] = None
+    ) -> ScanFileResult:
+        raise NotImplementedError()
+
+    def build_file(
+        self, context: BuildContext, relpath: str, source: Optional[str] = None
+    ) -> BuildFileResult:
+        raise NotImplementedError()
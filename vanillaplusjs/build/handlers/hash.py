@@ -7,12 +7,19 @@ import os
 from typing import Optional
 from vanillaplusjs.build.build_context import BuildContext
 from vanillaplusjs.build.build_file_result import BuildFileResult
-from vanillaplusjs.build.ioutil import makedirs_safely
+from vanillaplusjs.build.hash_cache import remember_hash
+from vanillaplusjs.build.ioutil import makedirs_safely, replace_atomically
 from vanillaplusjs.build.scan_file_result import ScanFileResult
 import hashlib
 import base64
 
 
+HASH_CHUNK_SIZE = 1024 * 1024
+"""How many bytes are read at a time while hashing or copying a file, so that
+large assets (e.g., videos) are never held in memory all at once
+"""
+
+
 def get_target_path(context: BuildContext, relpath: str) -> Optional[str]:
     """Determines where to hash the file to, if the file should be copied,
     otherwise returns None
@@ -52,17 +59,64 @@ def build_file(context: BuildContext, relpath: str) -> BuildFileResult:
         return BuildFileResult(children=[], produced=[], reused=[target_path])
 
     sha256_b64 = calculate_hash(src_path_rel_to_cwd)
+    write_hash(target_path_rel_to_cwd, sha256_b64)
+    remember_hash(context, target_path, sha256_b64)
+    return BuildFileResult(children=[], produced=[target_path], reused=[])
 
-    makedirs_safely(os.path.dirname(target_path_rel_to_cwd))
-    with open(target_path_rel_to_cwd, "w") as f:
-        f.write(sha256_b64)
 
-    return BuildFileResult(children=[], produced=[target_path], reused=[])
+def write_hash(path: str, sha256_b64: str) -> None:
+    """Writes the given hash to the hash file at the given path, creating
+    the parent folders if necessary
+    """
+    makedirs_safely(os.path.dirname(path))
+    with open(path, "w") as f:
+        f.write(sha256_b64)
 
 
 def calculate_hash(filepath: str) -> str:
+    """Calculates the url-safe base64 encoded sha256 hash of the file at the
+    given path, reading it in chunks of HASH_CHUNK_SIZE bytes
+    """
+    sha256 = hashlib.sha256()
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(filepath, "rb", buffering=0) as f:
+        while True:
+            amount = f.readinto(buffer)
+            if not amount:
+                break
+            sha256.update(view[:amount])
+
+    return base64.urlsafe_b64encode(sha256.digest()).decode("utf-8")
+
+
+def copy_and_calculate_hash(src: str, dst: str) -> str:
+    """Copies the file at src to dst while calculating its hash, so that the
+    source is only read once. The copy is written to a temporary file which
+    replaces dst once it is complete, so dst is never partially written.
+
+    Args:
+        src (str): The path to the file to copy
+        dst (str): The path to copy the file to
+
+    Returns:
+        str: The url-safe base64 encoded sha256 hash of the file
+    """
     sha256 = hashlib.sha256()
-    with open(filepath, "rb") as f:
-        sha256.update(f.read())
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with replace_atomically(dst) as temp_path:
+        with open(src, "rb", buffering=0) as fin, open(
+            temp_path, "wb", buffering=0
+        ) as fout:
+            while True:
+                amount = fin.readinto(buffer)
+                if not amount:
+                    break
+                chunk = view[:amount]
+                sha256.update(chunk)
+                written = 0
+                while written < amount:
+                    written += fout.write(chunk[written:])
 
     return base64.urlsafe_b64encode(sha256.digest()).decode("utf-8")
@@ -17,8 +17,13 @@ import vanillaplusjs.build.handlers.copy
 import vanillaplusjs.build.handlers.hash
 from vanillaplusjs.build.html.manips.outline import OutlineManipulator
 from vanillaplusjs.build.html.manips.template import TemplateManipulator
-from vanillaplusjs.build.html.manipulate_and_serialize import manipulate_and_serialize
+from vanillaplusjs.build.html.manipulate_and_serialize import (
+    iter_tokenize_file,
+    manipulate_and_serialize,
+)
 from vanillaplusjs.build.scan_file_result import ScanFileResult
+from vanillaplusjs.build.token_cache import stream_tokens
+import functools
 import os
 
 
@@ -63,7 +68,15 @@ def scan_file(context: BuildContext, relpath: str) -> ScanFileResult:
 
     manips = manipulators(context, relpath, "scan")
     manipulate_and_serialize(
-        infile=os.path.join(context.folder, relpath), outfile=None, manipulators=manips
+        infile=os.path.join(context.folder, relpath),
+        outfile=None,
+        manipulators=manips,
+        tokens=stream_tokens(
+            context,
+            relpath,
+            f"html-{context.html_tokenizer}",
+            functools.partial(iter_tokenize_file, engine=context.html_tokenizer),
+        ),
     )
 
     sub_scan_results = [
@@ -97,6 +110,12 @@ def build_file(context: BuildContext, relpath: str) -> BuildFileResult:
         infile=os.path.join(context.folder, relpath),
         outfile=os.path.join(context.folder, target_path),
         manipulators=manips,
+        tokens=stream_tokens(
+            context,
+            relpath,
+            f"html-{context.html_tokenizer}",
+            functools.partial(iter_tokenize_file, engine=context.html_tokenizer),
+        ),
     )
 
     produced.add(target_path)
@@ -1,9 +1,14 @@
 """This module applies the standard js manipulators to the document,
 stores that in the output directory (as if it were copied), and then
 hashes that output as if via hash.
+
+Both scan_file and build_file accept the source of the file, in which case the
+file is read from memory rather than from disk and relpath does not need to
+exist. This is how inline scripts and styles are processed when they are
+outlined from html files.
 """
 
-from typing import List
+from typing import List, Optional
 from vanillaplusjs.build.build_context import BuildContext
 from vanillaplusjs.build.build_file_result import BuildFileResult
 from vanillaplusjs.build.js.manips.hash_imports import (
@@ -31,7 +36,9 @@ and `build_result(self) -> BuildFileResult`
 """
 
 
-def scan_file(context: BuildContext, relpath: str) -> ScanFileResult:
+def scan_file(
+    context: BuildContext, relpath: str, source: Optional[str] = None
+) -> ScanFileResult:
     if not relpath.endswith(".js"):
         return ScanFileResult([], [])
 
@@ -40,7 +47,10 @@ def scan_file(context: BuildContext, relpath: str) -> ScanFileResult:
 
     manips = [manip(context, relpath, "scan") for manip in MANIPULATORS]
     manipulate_and_serialize(
-        infile=os.path.join(context.folder, relpath), outfile=None, manipulators=manips
+        infile=os.path.join(context.folder, relpath),
+        outfile=None,
+        manipulators=manips,
+        source=source,
     )
 
     sub_scan_results = [
@@ -56,7 +66,9 @@ def scan_file(context: BuildContext, relpath: str) -> ScanFileResult:
     return ScanFileResult(dependencies=list(dependencies), produces=list(produces))
 
 
-def build_file(context: BuildContext, relpath: str) -> BuildFileResult:
+def build_file(
+    context: BuildContext, relpath: str, source: Optional[str] = None
+) -> BuildFileResult:
     if not relpath.endswith(".js"):
         return BuildFileResult([], [], [])
 
@@ -72,6 +84,7 @@ def build_file(context: BuildContext, relpath: str) -> BuildFileResult:
         infile=os.path.join(context.folder, relpath),
         outfile=os.path.join(context.folder, target_path),
         manipulators=manips,
+        source=source,
     )
 
     produced.add(target_path)
@@ -0,0 +1,140 @@
+"""Caches the contents of the hash files in the out folder within each
+process, so that a file which is referenced by many pages, such as a module
+which is preloaded by every page, is only read once per process per build
+rather than once per reference.
+
+Hash files are only removed or rewritten by the build which cleans them,
+before any file is handed to a worker, so the cache is cleared whenever a
+worker sees a new build generation (see BuildContext.build_generation) and is
+otherwise trusted as is. Without a build generation, e.g., when manipulating
+files outside of a build, the hash files are always read.
+
+When the hash manifest is enabled, the build also stores every hash it knows
+about in a single file, which each worker loads once per build instead of
+opening each hash file separately. Entries are removed from the manifest
+before their hash file is cleaned, so an entry is valid whenever it exists.
+"""
+from typing import Dict, Iterable, Optional
+from vanillaplusjs.build.build_context import BuildContext
+from vanillaplusjs.build.ioutil import makedirs_safely, replace_atomically
+import json
+import os
+import threading
+
+
+_cache: Dict[str, str] = dict()
+"""Maps from the path to a hash file relative to the project root to its
+contents
+"""
+
+_cache_generation: Optional[str] = None
+"""The build generation the cache was filled during"""
+
+_cache_lock = threading.Lock()
+"""Protects the cache"""
+
+
+def get_hash(context: BuildContext, relpath: str) -> str:
+    """Gets the contents of the hash file at the given path, e.g.,
+    out/www/js/main.js.hash
+
+    Args:
+        context (BuildContext): The context for the build
+        relpath (str): The path to the hash file relative to the project root
+
+    Returns:
+        str: The hash stored in the file
+
+    Raises:
+        FileNotFoundError: If the hash file does not exist
+    """
+    global _cache_generation
+
+    if context.build_generation is None:
+        return _read_hash(context, relpath)
+
+    with _cache_lock:
+        if _cache_generation != context.build_generation:
+            _cache.clear()
+            if context.hash_manifest:
+                _cache.update(load_hash_manifest(context.hash_manifest_file))
+            _cache_generation = context.build_generation
+
+        result = _cache.get(relpath)
+        if result is not None:
+            return result
+
+    result = _read_hash(context, relpath)
+    remember_hash(context, relpath, result)
+    return result
+
+
+def remember_hash(context: BuildContext, relpath: str, value: str) -> None:
+    """Stores the hash which was just written to the hash file at the given
+    path, so that it does not have to be read back within this process.
+
+    Args:
+        context (BuildContext): The context for the build
+        relpath (str): The path to the hash file relative to the project root
+        value (str): The contents of the hash file
+    """
+    with _cache_lock:
+        if (
+            context.build_generation is not None
+            and _cache_generation == context.build_generation
+        ):
+            _cache[relpath] = value
+
+
+def _read_hash(context: BuildContext, relpath: str) -> str:
+    with open(os.path.join(context.folder, relpath), "r") as f:
+        return f.read().strip()
+
+
+def load_hash_manifest(path: str) -> Dict[str, str]:
+    """Loads the hash manifest stored at the given path
+
+    Args:
+        path (str): The path to the hash manifest
+
+    Returns:
+        dict[str, str]: The hash by path to the hash file relative to the
+            project root, empty if the manifest does not exist
+    """
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return dict()
+
+
+def update_hash_manifest(
+    context: BuildContext,
+    removed: Iterable[str] = (),
+    added: Iterable[str] = (),
+) -> None:
+    """Updates the hash manifest by removing the entries for the given hash
+    files and then reading the given hash files into it, replacing the
+    manifest atomically. Hash files which do not exist are skipped.
+
+    Args:
+        context (BuildContext): The context for the build
+        removed (iterable[str]): The paths to the hash files relative to the
+            project root which are about to be cleaned
+        added (iterable[str]): The paths to the hash files relative to the
+            project root which were produced
+    """
+    manifest = load_hash_manifest(context.hash_manifest_file)
+    for relpath in removed:
+        manifest.pop(relpath, None)
+    for relpath in added:
+        try:
+            manifest[relpath] = _read_hash(context, relpath)
+        except FileNotFoundError:
+            pass
+
+    path = context.hash_manifest_file
+    makedirs_safely(os.path.dirname(path))
+    with replace_atomically(path) as temp_path:
+        with open(temp_path, "w") as f:
+            json.dump(manifest, f)
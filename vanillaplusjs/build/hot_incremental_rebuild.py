@@ -1,20 +1,31 @@
-from typing import Dict, List, Literal, Set, Tuple
+from typing import Dict, List, Literal, Optional, Set, Tuple
 from vanillaplusjs.build.build_context import BuildContext
+from vanillaplusjs.build.build_graphs import BuildGraphs, commit_build_graphs
 from vanillaplusjs.build.build_file_result import BuildFileResult
 from vanillaplusjs.build.build_file import build_file
+from vanillaplusjs.build.build_scheduler import BuildScheduler
 from vanillaplusjs.build.exceptions import (
     CyclicDependencyException,
 )
 from vanillaplusjs.build.file_signature import FileSignature, get_file_signature
+from vanillaplusjs.build.graph_overlay import OverlayFileDependencyGraph
+from vanillaplusjs.build.hash_cache import update_hash_manifest
+from vanillaplusjs.build.html.manips.images.encode_scheduler import (
+    EncodeScheduler,
+    install_encode_scheduler,
+)
 from vanillaplusjs.build.ioutil import makedirs_safely
 from vanillaplusjs.build.scan_file import scan_file
 from vanillaplusjs.build.scan_file_result import ScanFileResult
+from vanillaplusjs.build.token_cache import forget_tokens
 from .graph import FileDependencyGraph
 from loguru import logger
 import concurrent.futures
 import os
 import asyncio
+import contextlib
 import itertools
+import secrets
 
 
 async def hot_incremental_rebuild(
@@ -25,7 +36,9 @@ async def hot_incremental_rebuild(
     changed_files: Dict[str, FileSignature],
     added_files: Dict[str, FileSignature],
     deleted_files: List[str],
-) -> None:
+    touched_files: Optional[Dict[str, FileSignature]] = None,
+    executor: Optional[concurrent.futures.Executor] = None,
+) -> BuildGraphs:
     """Performs a hot incremental rebuild; this refers to a rebuild where
     the files that changed have already been determined, and hence this only
     scales based on the number of files that must be rebuilt, rather than the
@@ -77,6 +90,20 @@ async def hot_incremental_rebuild(
             from the dependency graph, and if they are in the output graph,
             their outputs will be removed from the output graph and they will
             be checked for whether they are outputs of any file.
+        touched_files (dict[str, FileSignature], None):
+            The files that are in the old dependency graph whose signature
+            changed but whose contents are known to be the same, e.g., via
+            their content digest. These files are not rebuilt on their own
+            account; we only store their new signature.
+        executor (concurrent.futures.Executor, None):
+            If specified, the executor to scan and build files with. This
+            allows a long-lived process to keep its workers warm between
+            rebuilds. If None, a process pool is created for this rebuild
+            and shutdown before returning.
+
+    Returns:
+        BuildGraphs: The dependency, output, and placeholder graphs after the
+            rebuild, which have also been stored in the out folder.
     """
     logger.info(
         "Starting hot incremental rebuild of {} changed files, "
@@ -120,11 +147,39 @@ async def hot_incremental_rebuild(
         except FileNotFoundError:
             pass
 
+    touched_files = touched_files or dict()
+
     if not changed_files and not added_files and not deleted_files:
-        logger.info("Nothing to do, exiting")
-        return
+        if not touched_files:
+            logger.info("Nothing to do, exiting")
+            return BuildGraphs(
+                dependency=old_dependency_graph,
+                output=old_output_graph,
+                placeholders=old_placeholders_graph,
+            )
 
-    with concurrent.futures.ProcessPoolExecutor() as executor:
+        logger.info(
+            "Nothing to rebuild, updating the signatures of {} files",
+            len(touched_files),
+        )
+        new_graphs = BuildGraphs(
+            dependency=OverlayFileDependencyGraph(old_dependency_graph),
+            output=OverlayFileDependencyGraph(old_output_graph),
+            placeholders=OverlayFileDependencyGraph(old_placeholders_graph),
+        )
+        for file, signature in touched_files.items():
+            update_signature(new_graphs, file, signature)
+        return commit_build_graphs(context, new_graphs)
+
+    # workers discard anything they cached about the out folder during
+    # previous builds, since we are about to clean parts of it
+    context.build_generation = secrets.token_hex(8)
+
+    with (
+        contextlib.nullcontext(executor)
+        if executor is not None
+        else create_build_executor()
+    ) as executor:
         files_that_need_scanning = list(changed_files.keys()) + list(added_files.keys())
         updated_children: Dict[str, ScanFileResult] = dict()
         new_placeholders: Dict[str, str] = dict()  # placeholder -> original file
@@ -244,7 +299,6 @@ async def hot_incremental_rebuild(
         files_to_rebuild = [
             file for file in files_to_rebuild if file not in deleted_files
         ]
-        original_files_to_rebuild = frozenset(files_to_rebuild)
 
         logger.debug("{} files to rebuild", len(files_to_rebuild))
         logger.debug("{} files to clean", len(dirtied_outputs))
@@ -257,6 +311,17 @@ async def hot_incremental_rebuild(
                 possibly_empty_folders.add(folder)
                 folder = os.path.dirname(folder)
 
+        if context.hash_manifest:
+            update_hash_manifest(
+                context,
+                removed=[file for file in dirtied_outputs if file.endswith(".hash")],
+            )
+        else:
+            try:
+                os.unlink(context.hash_manifest_file)
+            except FileNotFoundError:
+                pass
+
         for file in dirtied_outputs:
             logger.debug("Cleaning {}", file)
             try:
@@ -300,62 +365,55 @@ async def hot_incremental_rebuild(
                 return old_output_graph.get_children(file)
             return []
 
-        while files_to_rebuild or pending_results:
-            rebuildable_files: List[str] = []
-            for file in files_to_rebuild:
-                file_depends_on: List[str] = get_file_depends_on(file)
-                file_creates: List[str] = get_file_creates(file)
-
-                all_dependencies_built = True
-                for child in file_depends_on:
-                    if (
-                        child not in updated_results
-                        and child in original_files_to_rebuild
-                    ):
-                        logger.debug(
-                            "Cannot rebuild {} until we have rebuilt {}",
-                            file,
-                            child,
-                        )
-                        all_dependencies_built = False
-                        break
-
-                if not all_dependencies_built:
-                    continue
+        file_creates_lookup: Dict[str, List[str]] = dict(
+            (file, get_file_creates(file)) for file in files_to_rebuild
+        )
+        scheduler = BuildScheduler(
+            dict((file, get_file_depends_on(file)) for file in files_to_rebuild)
+        )
+        logger.debug(
+            "Longest chain of dependent files to rebuild has length {}",
+            max(scheduler.priorities.values(), default=0),
+        )
 
-                all_outputs_not_pending = True
-                for output in file_creates:
-                    if output in pending_dirty_outputs or output in pending_artifacts:
-                        all_outputs_not_pending = False
-                        logger.debug(
-                            "Cannot rebuild {} while we are cleaning {}",
-                            file,
-                            output,
-                        )
+        def try_start_rebuild(file: str) -> bool:
+            file_creates = file_creates_lookup[file]
+            for output in file_creates:
+                if output in pending_dirty_outputs or output in pending_artifacts:
+                    logger.debug(
+                        "Cannot rebuild {} while we are cleaning {}",
+                        file,
+                        output,
+                    )
+                    return False
 
-                if not all_outputs_not_pending:
-                    continue
+            for output in file_creates:
+                if output in still_dirty_outputs:
+                    pending_dirty_outputs.add(output)
+                elif output in dirtied_artifacts:
+                    pending_artifacts.add(output)
+            return True
 
-                rebuildable_files.append(file)
-                for output in file_creates:
-                    if output in still_dirty_outputs:
-                        pending_dirty_outputs.add(output)
-                    elif output in dirtied_artifacts:
-                        pending_artifacts.add(output)
+        while not scheduler.finished:
+            rebuildable_files = scheduler.take_ready(try_start_rebuild)
 
             if not rebuildable_files and not pending_results:
                 logger.error("No files to rebuild")
                 raise CyclicDependencyException(
-                    "No files to rebuild. This is likely due to a cyclic "
-                    "dependency in the project. In particular, we did not find any "
-                    "buildable files in the following files: {}".format(
-                        ", ".join(files_to_rebuild)
+                    "No files to rebuild. The following files are waiting on "
+                    "outputs which another file was expected to produce, but "
+                    "did not: {}".format(
+                        ", ".join(
+                            "{} (creates {})".format(
+                                file, ", ".join(file_creates_lookup[file])
+                            )
+                            for file in scheduler.blocked
+                        )
                     )
                 )
 
             for file in rebuildable_files:
                 logger.debug("Queueing {} to be rebuilt asynchronously", file)
-                files_to_rebuild.remove(file)
                 concurrency_future_result = executor.submit(build_file, context, file)
                 pending_results[file] = asyncio.wrap_future(concurrency_future_result)
 
@@ -414,6 +472,7 @@ async def hot_incremental_rebuild(
 
                     updated_results[pending_file] = rebuild_result
                     del pending_results[pending_file]
+                    scheduler.complete(pending_file)
                     for file in rebuild_result.produced:
                         if file in still_dirty_outputs:
                             logger.debug("Cleaned {} using {}", file, pending_file)
@@ -452,6 +511,17 @@ async def hot_incremental_rebuild(
 
         logger.debug("Finished rebuilding {} files", len(updated_results))
 
+        if context.hash_manifest:
+            update_hash_manifest(
+                context,
+                added=[
+                    file
+                    for result in updated_results.values()
+                    for file in result.produced
+                    if file.endswith(".hash")
+                ],
+            )
+
         for file in still_dirty_artifacts:
             logger.debug("Cleaning {}", file)
             os.unlink(os.path.join(context.folder, file))
@@ -465,111 +535,117 @@ async def hot_incremental_rebuild(
                 logger.debug("Cleaning empty folder {}", folder_relpath)
                 os.rmdir(folder)
 
-        new_dependency_graph = FileDependencyGraph()
-        new_output_graph = FileDependencyGraph()
-        new_placeholder_graph = FileDependencyGraph()
+        # Rather than reconstructing the graphs, we only update the nodes this
+        # rebuild touched, so that updating and persisting the graphs scales
+        # with the size of the rebuild rather than the size of the project.
+        new_dependency_graph = OverlayFileDependencyGraph(old_dependency_graph)
+        new_output_graph = OverlayFileDependencyGraph(old_output_graph)
+        new_placeholder_graph = OverlayFileDependencyGraph(old_placeholders_graph)
 
-        all_input_files = list(
-            f
-            for f in frozenset(
-                list(updated_results.keys()) + list(old_dependency_graph.nodes.keys())
-            )
-            if f not in deleted_files
-        )
+        possibly_empty_output_nodes = set()
+        possibly_empty_placeholder_nodes = set()
+        for file in deleted_files:
+            forget_tokens(context, file)
 
-        possible_empty_placeholder_nodes = set()
-        for file in all_input_files:
-            new_signature: FileSignature = None
-            if file in changed_files:
-                new_signature = changed_files[file]
-            elif file in added_files:
-                new_signature = added_files[file]
-            else:
-                old_node = old_dependency_graph.nodes[file]
-                new_signature = FileSignature(
-                    old_node.mtime, old_node.filesize, old_node.inode
+            if file in new_dependency_graph:
+                new_dependency_graph.remove_file(
+                    file, clear_parents=True, clear_children=True
                 )
 
-            new_dependency_graph.add_file(
-                file, new_signature.filesize, new_signature.mtime, new_signature.inode
-            )
-            new_output_graph.add_file(
-                file, new_signature.filesize, new_signature.mtime, new_signature.inode
-            )
-            new_placeholder_graph.add_file(
-                file, new_signature.filesize, new_signature.mtime, new_signature.inode
-            )
-            possible_empty_placeholder_nodes.add(file)
-
-        possibly_empty_output_nodes = set()
-        for file, node in old_output_graph.nodes.items():
-            if file not in new_output_graph:
-                old_parents = old_output_graph.get_parents(file)
-
-                if old_parents:
-                    # this is produced file; we can delete it from the graph if
-                    # nothing else is now producing it
-                    if any(p in deleted_files for p in old_parents) and not any(
-                        p not in deleted_files and p not in updated_results
-                        for p in old_parents
-                    ):
-                        possibly_empty_output_nodes.add(file)
-                else:
-                    # this is a consumed file; we only need it if it still exists
-                    if file in deleted_files:
-                        continue
-
-                new_output_graph.add_file(file, node.filesize, node.mtime, node.inode)
+            if file in new_output_graph:
+                # outputs which were only produced by deleted files are removed
+                # once we know nothing else is producing them
+                possibly_empty_output_nodes.update(
+                    new_output_graph.get_children(file)
+                )
+                new_output_graph.remove_file(
+                    file, clear_parents=True, clear_children=True
+                )
 
-        for file, node in old_placeholders_graph.nodes.items():
-            if file not in new_placeholder_graph:
+            if file in new_placeholder_graph:
                 # either:
                 #  - file used to generate a placeholder, but now that file
                 #    has been deleted, the placeholders are now full-blown
                 #    files
                 #  - file was generated by generator, file was deleted, and
                 #    the generator did not reproduce it
-                continue
+                possibly_empty_placeholder_nodes.update(
+                    new_placeholder_graph.get_parents(file)
+                )
+                possibly_empty_placeholder_nodes.update(
+                    new_placeholder_graph.get_children(file)
+                )
+                new_placeholder_graph.remove_file(
+                    file, clear_parents=True, clear_children=True
+                )
 
-            old_generators_of_file = old_placeholders_graph.get_parents(file)
+        for file, signature in touched_files.items():
+            if file not in updated_results:
+                update_signature(
+                    BuildGraphs(
+                        dependency=new_dependency_graph,
+                        output=new_output_graph,
+                        placeholders=new_placeholder_graph,
+                    ),
+                    file,
+                    signature,
+                )
 
-            for generator in old_generators_of_file:
-                if generator in new_placeholder_graph:
-                    # generator still exists, so this file is still a placeholder
-                    new_placeholder_graph.set_children(
-                        generator,
-                        new_placeholder_graph.get_children(generator) + [file],
+        for file in updated_results.keys():
+            new_signature: FileSignature = None
+            if file in changed_files:
+                new_signature = changed_files[file]
+            elif file in added_files:
+                new_signature = added_files[file]
+            elif file in touched_files:
+                new_signature = touched_files[file]
+            else:
+                new_signature = old_dependency_graph.get_signature(file)
+
+            for graph in (new_dependency_graph, new_output_graph):
+                if file in graph:
+                    graph.set_signature(
+                        file,
+                        new_signature.filesize,
+                        new_signature.mtime,
+                        new_signature.inode,
+                    )
+                else:
+                    graph.add_file(
+                        file,
+                        new_signature.filesize,
+                        new_signature.mtime,
+                        new_signature.inode,
                     )
-                    possible_empty_placeholder_nodes.remove(generator)
-                    possible_empty_placeholder_nodes.remove(file)
-                    break
+
+            if file in new_placeholder_graph:
+                new_placeholder_graph.set_signature(
+                    file,
+                    new_signature.filesize,
+                    new_signature.mtime,
+                    new_signature.inode,
+                )
 
         for placeholder, generator in new_placeholders.items():
+            for file in (placeholder, generator):
+                if file not in new_placeholder_graph:
+                    signature = new_dependency_graph.get_signature(file)
+                    new_placeholder_graph.add_file(
+                        file, signature.filesize, signature.mtime, signature.inode
+                    )
+
             gen_children = new_placeholder_graph.get_children(generator)
             if placeholder not in gen_children:
                 gen_children.append(placeholder)
             new_placeholder_graph.set_children(generator, gen_children)
 
-        for file in all_input_files:
-            new_dependencies = (
-                updated_results[file].children
-                if file in updated_results
-                else old_dependency_graph.get_children(file)
-            )
+        for file, updated_result in updated_results.items():
             new_dependency_graph.set_children(
                 file,
-                children=new_dependencies,
+                children=updated_result.children,
             )
 
-            new_outputs: List[str] = None
-            if file in updated_results:
-                updated_result = updated_results[file]
-                new_outputs = updated_result.produced + updated_result.reused
-            elif file in old_output_graph:
-                new_outputs = old_output_graph.get_children(file)
-            else:
-                new_outputs = []
-
+            new_outputs: List[str] = updated_result.produced + updated_result.reused
             for output in new_outputs:
                 if output not in new_output_graph:
                     signature = get_file_signature(os.path.join(context.folder, output))
@@ -583,32 +659,64 @@ async def hot_incremental_rebuild(
             )
 
         for node in possibly_empty_output_nodes:
-            if not new_output_graph.get_parents(node):
+            if node in new_output_graph and not new_output_graph.get_parents(node):
                 new_output_graph.remove_file(node)
 
-        for node in possible_empty_placeholder_nodes:
-            if not new_placeholder_graph.get_parents(
-                node
-            ) and not new_placeholder_graph.get_children(node):
+        for node in possibly_empty_placeholder_nodes:
+            if (
+                node in new_placeholder_graph
+                and not new_placeholder_graph.get_parents(node)
+                and not new_placeholder_graph.get_children(node)
+            ):
                 new_placeholder_graph.remove_file(node)
 
         logger.debug(
-            "Finished constructing new dependency, output, and placeholder graphs"
+            "Finished updating {} dependency, {} output, and {} placeholder graph nodes",
+            len(new_dependency_graph.records),
+            len(new_output_graph.records),
+            len(new_placeholder_graph.records),
         )
 
-        makedirs_safely(context.out_folder)
+        new_graphs = commit_build_graphs(
+            context,
+            BuildGraphs(
+                dependency=new_dependency_graph,
+                output=new_output_graph,
+                placeholders=new_placeholder_graph,
+            ),
+        )
+
+        logger.debug("Finished storing dependency, output, and placeholder graphs")
+        logger.info('"{}" rebuilt successfully', context.folder)
+        return new_graphs
+
 
-        with open(context.dependency_graph_file, "w") as fp:
-            new_dependency_graph.store(fp)
+def create_build_executor() -> concurrent.futures.ProcessPoolExecutor:
+    """Creates the process pool which files are scanned and built on. The
+    workers share a single EncodeScheduler, so that the images they export
+    are encoded within one budget for the whole build.
+    """
+    return concurrent.futures.ProcessPoolExecutor(
+        initializer=install_encode_scheduler, initargs=(EncodeScheduler(),)
+    )
 
-        with open(context.output_graph_file, "w") as fp:
-            new_output_graph.store(fp)
 
-        with open(context.placeholder_graph_file, "w") as fp:
-            new_placeholder_graph.store(fp)
+def update_signature(
+    graphs: BuildGraphs, file: str, signature: FileSignature
+) -> None:
+    """Updates the signature of the given file in each of the given graphs
+    which contain it, without changing any edges.
 
-        logger.debug("Finished storing dependency, output, and placeholder graphs")
-        logger.info('"{}" rebuilt successfully', context.folder)
+    Args:
+        graphs (BuildGraphs): The graphs to update, which must be mutable
+        file (str): The file whose signature changed
+        signature (FileSignature): The new signature of the file
+    """
+    for graph in (graphs.dependency, graphs.output, graphs.placeholders):
+        if file in graph:
+            graph.set_signature(
+                file, signature.filesize, signature.mtime, signature.inode
+            )
 
 
 async def scan_files(
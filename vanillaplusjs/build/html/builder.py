@@ -1,3 +1,4 @@
+from collections import deque
 from typing import List, Optional
 from .manipulator import HTMLManipulator
 from .token import HTMLToken
@@ -23,6 +24,18 @@ class HTMLBuilder:
         the HTMLManipulator which is currently marked.
         """
 
+        self.marked_tokens: int = 0
+        """How many tokens the current mark has consumed without producing
+        output, i.e., how many tokens are being held by the manipulator.
+        """
+
+        self.peak_buffered_tokens: int = 0
+        """The most tokens that have been buffered at once, either as
+        unconsumed output or by a marked manipulator. When the output is
+        consumed after every token this is a good measure of how much of
+        the document had to be held in memory at once.
+        """
+
     def consume_tokens(self) -> List[HTMLToken]:
         """Returns any unconsumed output tokens and consumes them. This can be
         used to reduce the memory usage of this file for long streams, though
@@ -39,9 +52,12 @@ class HTMLBuilder:
         tokens that result from this token are delayed, i.e., are not determined
         until a later call.
         """
-        stack = [token]
+        # replacement tokens are spliced onto the front of a deque, so that
+        # handling a manipulator which returns k tokens is O(k) regardless of
+        # how many tokens are still pending from earlier replacements
+        stack = deque((token,))
         while stack:
-            token = stack.pop(0)
+            token = stack.popleft()
             if self.mark is None:
                 for manipulator in self.manipulators:
                     if manipulator.start_mark(token):
@@ -54,5 +70,12 @@ class HTMLBuilder:
 
             replacement_tokens = self.mark.continue_mark(token)
             if replacement_tokens is not None:
-                stack = replacement_tokens + stack
+                stack.extendleft(reversed(replacement_tokens))
                 self.mark = None
+                self.marked_tokens = 0
+            else:
+                self.marked_tokens += 1
+
+        self.peak_buffered_tokens = max(
+            self.peak_buffered_tokens, len(self.output), self.marked_tokens
+        )
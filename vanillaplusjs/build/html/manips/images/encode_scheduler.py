@@ -0,0 +1,154 @@
+"""Bounds the image exporting done by every worker of a build, so that a build
+whose workers are all exporting images runs about one encode per cpu and holds
+a bounded amount of decoded pixels in total, rather than each worker starting
+an encoder per cpu of its own.
+
+The scheduler is created alongside the process pool for the build and handed
+to each worker as it starts (see install_encode_scheduler), since the shared
+counters it uses can only be passed to a process when it is created. Within
+each worker, encodes run on a single thread pool which is reused by every
+image the worker exports.
+"""
+from typing import Iterator, Optional
+import concurrent.futures
+import contextlib
+import multiprocessing
+import os
+import threading
+
+
+MAX_IMAGE_MEMORY = 1024 * 1024 * 1024
+"""The default for the most bytes of decoded pixels which are held at once
+while exporting images, across every worker of the build
+"""
+
+
+class EncodeScheduler:
+    """Limits how many images are encoded at once and how many bytes of
+    decoded pixels are held at once, across every process it is shared with.
+    """
+
+    def __init__(
+        self, max_encodes: Optional[int] = None, max_memory: int = MAX_IMAGE_MEMORY
+    ) -> None:
+        """Initializes the scheduler with nothing running
+
+        Args:
+            max_encodes (int, None): The most images which may be encoded at
+                once, or None for the number of cpus
+            max_memory (int): The most bytes of decoded pixels which may be
+                held at once, unless a single export needs more on its own
+        """
+        self.max_encodes = max_encodes or os.cpu_count() or 1
+        self.max_memory = max_memory
+        self._condition = multiprocessing.Condition()
+        self._encodes = multiprocessing.RawValue("i", 0)
+        self._memory = multiprocessing.RawValue("q", 0)
+
+    @contextlib.contextmanager
+    def encode_slot(self) -> Iterator[None]:
+        """Waits until fewer than max_encodes images are being encoded, then
+        counts this as an encode until the context manager exits.
+        """
+        with self._condition:
+            while self._encodes.value >= self.max_encodes:
+                self._condition.wait()
+            self._encodes.value += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._encodes.value -= 1
+                self._condition.notify_all()
+
+    def acquire_memory(self, amount: int) -> None:
+        """Waits until the given number of bytes fits within max_memory, or
+        until nothing else is held, then holds them. This must only be called
+        while the caller holds no memory, since otherwise callers could wait
+        on each other forever; use fits_memory and adjust_memory to grow.
+        """
+        with self._condition:
+            while (
+                self._memory.value > 0
+                and self._memory.value + amount > self.max_memory
+            ):
+                self._condition.wait()
+            self._memory.value += amount
+
+    def fits_memory(self, amount: int) -> bool:
+        """Returns if holding the given number of additional bytes would stay
+        within max_memory
+        """
+        with self._condition:
+            return self._memory.value + amount <= self.max_memory
+
+    def adjust_memory(self, delta: int) -> None:
+        """Holds the given number of additional bytes without waiting, or
+        releases them if negative
+        """
+        with self._condition:
+            self._memory.value += delta
+            if delta < 0:
+                self._condition.notify_all()
+
+    @property
+    def memory_in_use(self) -> int:
+        """The number of bytes currently held across every process"""
+        with self._condition:
+            return self._memory.value
+
+
+_scheduler: Optional[EncodeScheduler] = None
+"""The scheduler for this process, if one has been installed or created"""
+
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+"""The thread pool which images are encoded on within this process"""
+
+_lock = threading.Lock()
+"""Protects the scheduler and executor"""
+
+
+def _forget_executor_in_child() -> None:
+    # the threads of the pool do not survive forking
+    global _executor, _lock
+    _executor = None
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_executor_in_child)
+
+
+def install_encode_scheduler(scheduler: EncodeScheduler) -> None:
+    """Uses the given scheduler for every image exported within this process.
+    This is intended to be used as the initializer of a process pool.
+    """
+    global _scheduler
+    with _lock:
+        _scheduler = scheduler
+
+
+def get_encode_scheduler() -> EncodeScheduler:
+    """Gets the scheduler for this process, creating one which is only used
+    within this process if none was installed
+    """
+    global _scheduler
+    with _lock:
+        if _scheduler is None:
+            _scheduler = EncodeScheduler()
+        return _scheduler
+
+
+def get_encode_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Gets the thread pool which images are encoded on within this process.
+    Encodes must still wait for an encode slot from the scheduler.
+    """
+    global _executor
+    scheduler = get_encode_scheduler()
+    with _lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=scheduler.max_encodes,
+                thread_name_prefix="vanillaplusjs-encode",
+            )
+        return _executor
@@ -1,17 +1,29 @@
 """Facilitates ensuring all the appropriate images are exported."""
 import dataclasses
-from typing import Dict, List, Literal, Optional, Tuple
+from typing import Callable, Dict, List, Literal, Optional, Tuple
 from vanillaplusjs.build.build_context import BuildContext
 from vanillaplusjs.build.build_file_result import BuildFileResult
 from vanillaplusjs.build.file_signature import get_file_signature
+from vanillaplusjs.build.hash_cache import get_hash
 from vanillaplusjs.build.html.manips.images.command import ImageCommand
 from vanillaplusjs.build.html.manips.images.resolutions import yield_sizes
 from vanillaplusjs.build.html.manips.images.settings import (
     ImageExport,
+    ImageFormat,
     compare_in_format,
 )
 from vanillaplusjs.build.ioutil import makedirs_safely
 from .cover_fit import cover_fit
+from .encode_scheduler import (
+    EncodeScheduler,
+    get_encode_executor,
+    get_encode_scheduler,
+)
+from .store import (
+    fetch as fetch_stored_outputs,
+    get_store_key,
+    publish as publish_stored_outputs,
+)
 import os
 import json
 from vanillaplusjs.build.html.manips.images.metadata import (
@@ -23,8 +35,10 @@ from vanillaplusjs.build.html.manips.images.metadata import (
     ImageTargetSettings,
     get_target,
     hash_image_settings,
+    load_choice_hints,
     load_metadata,
     reserve_target_lock_path,
+    store_choice_hints,
     store_metadata,
 )
 import shutil
@@ -32,10 +46,35 @@ from PIL import Image
 from loguru import logger
 import time
 import concurrent.futures
+import io
+import itertools
 from pathlib import Path
 
 Image.MAX_IMAGE_PIXELS = 1_000_000_000
 
+PYRAMID_MIN_FACTOR = 2
+"""A size is only resized from a larger size we already produced, rather than
+from the cropped source, if the larger size is at least this many times larger
+in both dimensions, so that the lanczos filter still has plenty of samples to
+work with and the result is indistinguishable from resizing the source.
+"""
+
+TRIAL_MAX_AREA_PX2 = 160 * 160
+"""When searching for the preferred export, the size of an export is estimated
+by encoding a copy of the image downsampled to at most this area
+"""
+
+TRIAL_MIN_FACTOR = 4
+"""The size of an export is only estimated if the image is at least this many
+times the area of the trial copy; otherwise the trial would not be much
+cheaper than encoding the export
+"""
+
+ESTIMATE_MARGIN = 0.75
+"""An export is only skipped based on its estimated size if it would not be
+preferred even if it were this fraction of its estimated size
+"""
+
 
 def export_command(
     context: BuildContext, command_file_path: str, command: ImageCommand
@@ -163,10 +202,9 @@ def export_command(
     image.close()
     del image
 
-    with open(
-        os.path.join(context.out_folder, "www", path_relative_to_public + ".hash")
-    ) as f:
-        contents_hash = f.read()
+    contents_hash = get_hash(
+        context, os.path.join("out", "www", path_relative_to_public + ".hash")
+    )
 
     settings_hash = hash_image_settings(context.image_settings)
     source = ImageSource(
@@ -175,40 +213,175 @@ def export_command(
         height=image_height,
         contents_hash=contents_hash,
     )
+    target_art_folder = os.path.join(context.folder, target_art_folder_relative_to_root)
+    store_key: Optional[str] = None
+    art_outputs: Optional[Dict[str, List[ImageTargetOutput]]] = None
+    if context.image_store_folder is not None:
+        store_key = get_store_key(contents_hash, target, settings_hash)
+        art_outputs = fetch_stored_outputs(
+            context.image_store_folder, store_key, target_art_folder
+        )
+
+    if art_outputs is None:
+        art_outputs = produce_outputs(
+            context,
+            os.path.join(context.folder, path_relative_to_root),
+            image_width,
+            image_height,
+            command,
+            crop_settings,
+            target_art_folder,
+            load_choice_hints(context, path_relative_to_public),
+        )
+        if store_key is not None:
+            publish_stored_outputs(
+                context.image_store_folder,
+                store_key,
+                target_art_folder,
+                art_outputs,
+                context.image_store_max_size,
+            )
+
+    if context.image_settings.search == "estimate":
+        store_choice_hints(context, path_relative_to_public, art_outputs)
+
     outputs: Dict[str, List[ImageTargetOutput]] = dict()
+    for format_name, art_output_list in art_outputs.items():
+        output_list: List[ImageTargetOutput] = []
+        outputs[format_name] = output_list
+        for art_output in art_output_list:
+            desired_path = os.path.join(target_art_folder, art_output.relpath)
+            output_list.append(
+                dataclasses.replace(
+                    art_output,
+                    relpath=os.path.join(
+                        os.path.relpath(
+                            target_art_folder_relative_to_root, "artifacts"
+                        ),
+                        art_output.relpath,
+                    ),
+                )
+            )
+            produced.append(os.path.relpath(desired_path, context.folder))
 
-    with concurrent.futures.ProcessPoolExecutor() as executor:
-        futures: List[concurrent.futures.Future] = []
-        for out_width, out_height in yield_sizes(
-            context, image_width, image_height, command.width, command.height
-        ):
-            for format_name, format_settings in context.image_settings.formats.items():
-                for export_name, export_settings in format_settings.exports.items():
-                    if not export_settings.applies_to(out_width, out_height):
-                        continue
-                    futures.append(
-                        executor.submit(
-                            produce_image,
-                            os.path.join(context.folder, path_relative_to_root),
-                            os.path.join(
-                                context.folder,
-                                target_art_folder_relative_to_root,
-                                f"{out_width}x{out_height}-{export_name}.{format_name}",
-                            ),
-                            out_width,
-                            out_height,
-                            command.crop_style,
-                            crop_settings,
-                            format_name,
-                            export_settings.formatter_kwargs,
-                        )
-                    )
+            out_path_relative_to_root = os.path.join(
+                target_out_folder_relative_to_root, art_output.relpath
+            )
+            makedirs_safely(
+                os.path.join(context.folder, target_out_folder_relative_to_root)
+            )
+            if context.symlinks:
+                os.symlink(
+                    desired_path,
+                    os.path.join(context.folder, out_path_relative_to_root),
+                )
+            else:
+                shutil.copy(
+                    desired_path,
+                    os.path.join(context.folder, out_path_relative_to_root),
+                )
+
+            produced.append(out_path_relative_to_root)
+
+    metadata = ImageMetadata(
+        settings_hash=settings_hash,
+        source=source,
+        target=ImageTarget(
+            settings=target,
+            outputs=outputs,
+        ),
+    )
+
+    with open(
+        os.path.join(
+            context.folder, target_art_folder_relative_to_root, "metadata.json"
+        ),
+        "w",
+    ) as f:
+        json.dump(store_metadata(metadata), f, indent=2)
+
+    return metadata, BuildFileResult(
+        children=children,
+        reused=reused,
+        produced=produced,
+    )
+
+
+def produce_outputs(
+    context: BuildContext,
+    src_file: str,
+    image_width: int,
+    image_height: int,
+    command: ImageCommand,
+    crop_settings: CropSettingsCover,
+    target_art_folder: str,
+    choice_hints: Dict[str, str],
+) -> Dict[str, List[ImageTargetOutput]]:
+    """Exports every size of the given image and keeps the preferred export
+    for each size and format. Depending on the search in the image settings,
+    either every applicable export is encoded, or only those which might be
+    preferred (see search_exports).
+
+    Args:
+        context (BuildContext): The build context.
+        src_file (str): The file containing the source image.
+        image_width (int): The width of the source image.
+        image_height (int): The height of the source image.
+        command (ImageCommand): The image command to export files for.
+        crop_settings (CropSettingsCover): The crop settings to use.
+        target_art_folder (str): The folder to store the outputs in.
+        choice_hints (dict[str, str]): The export to try first by format name
+            when searching, see load_choice_hints
+
+    Returns:
+        dict[str, list[ImageTargetOutput]]: The outputs by format, whose
+            relpath is the name of the file within target_art_folder
+    """
+    outputs: Dict[str, List[ImageTargetOutput]] = dict()
+    exports: Dict[Tuple[int, int], List[Tuple[str, str, dict]]] = dict()
+    candidates: Dict[str, Tuple[str, ImageExport]] = dict()
+    for out_width, out_height in yield_sizes(
+        context, image_width, image_height, command.width, command.height
+    ):
+        size_exports: List[Tuple[str, str, dict]] = []
+        for format_name, format_settings in context.image_settings.formats.items():
+            for export_name, export_settings in format_settings.exports.items():
+                if not export_settings.applies_to(out_width, out_height):
+                    continue
+                export_path = os.path.join(
+                    target_art_folder,
+                    f"{out_width}x{out_height}-{export_name}.{format_name}",
+                )
+                size_exports.append(
+                    (export_path, format_name, export_settings.formatter_kwargs)
+                )
+                candidates[export_path] = (export_name, export_settings)
+        if size_exports:
+            exports[(out_width, out_height)] = size_exports
+
+    def search_encoder(image: Image.Image, targets: List[Tuple[str, str, dict]]):
+        search_exports(
+            image,
+            [
+                (
+                    context.image_settings.formats[format_name],
+                    *candidates[dst_file],
+                    dst_file,
+                )
+                for dst_file, format_name, _ in targets
+            ],
+            choice_hints,
+        )
 
-        concurrent.futures.wait(futures, return_when=concurrent.futures.ALL_COMPLETED)
-        for future in futures:
-            if future.exception() is not None:
-                raise future.exception()
-            assert future.done()
+    produce_images(
+        src_file,
+        exports,
+        command.crop_style,
+        crop_settings,
+        encoder=(
+            search_encoder if context.image_settings.search == "estimate" else None
+        ),
+    )
 
     for out_width, out_height in yield_sizes(
         context, image_width, image_height, command.width, command.height
@@ -222,11 +395,14 @@ def export_command(
                 if not export_settings.applies_to(out_width, out_height):
                     continue
                 export_path = os.path.join(
-                    context.folder,
-                    target_art_folder_relative_to_root,
+                    target_art_folder,
                     f"{out_width}x{out_height}-{export_name}.{format_name}",
                 )
-                export_size = os.lstat(export_path).st_size
+                try:
+                    export_size = os.lstat(export_path).st_size
+                except FileNotFoundError:
+                    # skipped by search_exports
+                    continue
                 if (
                     best_export is None
                     or compare_in_format(
@@ -251,12 +427,9 @@ def export_command(
                 continue
 
             desired_filename = f"{out_width}x{out_height}.{format_name}"
-            desired_path = os.path.join(
-                context.folder,
-                target_art_folder_relative_to_root,
-                desired_filename,
+            os.rename(
+                best_export_path, os.path.join(target_art_folder, desired_filename)
             )
-            os.rename(best_export_path, desired_path)
 
             output_list = outputs.get(format_name)
             if output_list is None:
@@ -267,103 +440,342 @@ def export_command(
                 ImageTargetOutput(
                     width=out_width,
                     height=out_height,
-                    relpath=os.path.join(
-                        os.path.relpath(
-                            target_art_folder_relative_to_root, "artifacts"
-                        ),
-                        f"{out_width}x{out_height}.{format_name}",
-                    ),
+                    relpath=desired_filename,
                     choice=best_export_name,
                 )
             )
-            produced.append(os.path.relpath(desired_path, context.folder))
 
-            out_path_relative_to_root = os.path.join(
-                target_out_folder_relative_to_root, desired_filename
-            )
-            makedirs_safely(
-                os.path.join(context.folder, target_out_folder_relative_to_root)
-            )
-            if context.symlinks:
-                os.symlink(
-                    desired_path,
-                    os.path.join(context.folder, out_path_relative_to_root),
-                )
-            else:
-                shutil.copy(
-                    desired_path,
-                    os.path.join(context.folder, out_path_relative_to_root),
-                )
+    return outputs
 
-            produced.append(out_path_relative_to_root)
-
-    metadata = ImageMetadata(
-        settings_hash=settings_hash,
-        source=source,
-        target=ImageTarget(
-            settings=target,
-            outputs=outputs,
-        ),
-    )
 
-    with open(
-        os.path.join(
-            context.folder, target_art_folder_relative_to_root, "metadata.json"
-        ),
-        "w",
-    ) as f:
-        json.dump(store_metadata(metadata), f, indent=2)
-
-    return metadata, BuildFileResult(
-        children=children,
-        reused=reused,
-        produced=produced,
-    )
-
-
-def produce_image(
+def produce_images(
     src_file: str,
-    dst_file: str,
-    width: int,
-    height: int,
+    exports: Dict[Tuple[int, int], List[Tuple[str, str, dict]]],
     crop_style: Literal["cover"],
     crop_settings: CropSettingsCover,
-    format: str,
-    formatter_kwargs: dict,
-) -> None:
-    """Synchronously loads the given source file, processes it according to
-    the given settings, and saves the result to the given destination file.
+    scheduler: Optional[EncodeScheduler] = None,
+    encoder: Optional[
+        Callable[[Image.Image, List[Tuple[str, str, dict]]], None]
+    ] = None,
+) -> int:
+    """Produces every size of the image in the given file. The image is decoded
+    once and cropped once per distinct crop, each size is resized from the
+    smallest larger size which is at least PYRAMID_MIN_FACTOR times larger (or
+    the cropped image, if there is none), and only the encoding is done in
+    parallel.
+
+    The decoded pixels which are held, counting the source, the cropped source,
+    the resized images which may still be resized further, and the resized
+    images waiting to be encoded, are counted against the memory budget of the
+    scheduler. When exporting another size would exceed the budget we wait for
+    our pending encodes to finish first; the budget is only exceeded if the
+    source, its crop, and a single resized image do not fit on their own.
 
     Args:
         src_file (str): The file containing the image to process.
-        dst_file (str): The file to save the processed image to.
-        width (int): The width to resize the image to.
-        height (int): The height to resize the image to.
+        exports (dict[tuple[int, int], list[tuple[str, str, dict]]]): For each
+            (width, height) to produce, the files to save that size to, as
+            (destination file, format, formatter keyword arguments)
         crop_style (Literal["cover"]): The crop style to use.
         crop_settings (CropSettingsCover): The crop settings to use.
-        format (str): The format to save the image in, e.g., "jpeg"
-        formatter_kwargs (dict): The keyword arguments to pass to the formatter.
+        scheduler (EncodeScheduler, None): The scheduler which bounds encoding
+            and memory, or None for the scheduler of this process
+        encoder (callable, None): The function which saves each resized image
+            to its files, called with the same arguments as encode_image, or
+            None for encode_image
+
+    Returns:
+        int: The peak number of bytes of decoded pixels which were held for
+            this image
     """
     assert crop_style == "cover", f"crop style {crop_style} not supported"
-    image = Image.open(src_file)
-
-    (x, y, w, h) = cover_fit(
-        source_width=image.width,
-        source_height=image.height,
-        dest_width=width,
-        dest_height=height,
-        **dataclasses.asdict(crop_settings),
+    if not exports:
+        return 0
+
+    if scheduler is None:
+        scheduler = get_encode_scheduler()
+    if encoder is None:
+        encoder = encode_image
+    executor = get_encode_executor()
+
+    started_at = time.perf_counter()
+    source: Optional[Image.Image] = Image.open(src_file)
+    cropped: Optional[Image.Image] = None
+    intermediates: List[Image.Image] = []
+    pending: Dict[concurrent.futures.Future, Image.Image] = dict()
+    held_memory = 0
+    peak_memory = 0
+
+    def get_memory_in_use() -> int:
+        held = dict(
+            (id(img), img)
+            for img in itertools.chain(
+                (source, cropped), intermediates, pending.values()
+            )
+            if img is not None
+        )
+        return sum(get_decoded_size(img) for img in held.values())
+
+    def update_held_memory() -> None:
+        nonlocal held_memory, peak_memory
+        in_use = get_memory_in_use()
+        scheduler.adjust_memory(in_use - held_memory)
+        held_memory = in_use
+        peak_memory = max(peak_memory, in_use)
+
+    def reserve_memory(amount: int) -> None:
+        nonlocal held_memory, peak_memory
+        update_held_memory()
+        while pending and not scheduler.fits_memory(amount):
+            done, _ = concurrent.futures.wait(
+                pending.keys(), return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                del pending[future]
+                future.result()
+            update_held_memory()
+        scheduler.adjust_memory(amount)
+        held_memory += amount
+        peak_memory = max(peak_memory, held_memory)
+
+    def encode(image: Image.Image, targets: List[Tuple[str, str, dict]]) -> None:
+        with scheduler.encode_slot():
+            encoder(image, targets)
+
+    held_memory = get_decoded_size(source)
+    scheduler.acquire_memory(held_memory)
+    peak_memory = held_memory
+    try:
+        source.load()
+
+        # the crop can differ slightly between sizes due to rounding
+        sizes_by_crop: Dict[Tuple[int, int, int, int], List[Tuple[int, int]]] = dict()
+        for width, height in exports.keys():
+            crop = cover_fit(
+                source_width=source.width,
+                source_height=source.height,
+                dest_width=width,
+                dest_height=height,
+                **dataclasses.asdict(crop_settings),
+            )
+            sizes_by_crop.setdefault(crop, []).append((width, height))
+
+        bytes_per_pixel = get_decoded_size(source) // (source.width * source.height)
+        crops = list(sizes_by_crop.items())
+        for crop_index, ((x, y, w, h), sizes) in enumerate(crops):
+            if x != 0 or y != 0 or w != source.width or h != source.height:
+                reserve_memory(w * h * bytes_per_pixel)
+                cropped = source.crop((x, y, x + w, y + h))
+            else:
+                cropped = source
+
+            if crop_index == len(crops) - 1:
+                source = None
+
+            for width, height in sorted(sizes, reverse=True):
+                base = cropped
+                for index in range(len(intermediates) - 1, -1, -1):
+                    candidate = intermediates[index]
+                    if (
+                        candidate.width >= width * PYRAMID_MIN_FACTOR
+                        and candidate.height >= height * PYRAMID_MIN_FACTOR
+                    ):
+                        base = candidate
+                        # smaller sizes will never need the larger ones
+                        del intermediates[:index]
+                        break
+
+                if base.width != width or base.height != height:
+                    reserve_memory(width * height * bytes_per_pixel)
+                    resized = base.resize((width, height), Image.Resampling.LANCZOS)
+                    intermediates.append(resized)
+                else:
+                    resized = base
+
+                future = executor.submit(encode, resized, exports[(width, height)])
+                pending[future] = resized
+
+            cropped = None
+            intermediates = []
+            update_held_memory()
+
+        while pending:
+            future = next(iter(pending.keys()))
+            future.result()
+            del pending[future]
+            update_held_memory()
+    finally:
+        for future in pending.keys():
+            future.cancel()
+        concurrent.futures.wait(pending.keys())
+        scheduler.adjust_memory(-held_memory)
+
+    logger.debug(
+        "Produced {} sizes in {:.3f}s holding at most {:.1f}MiB of decoded pixels",
+        len(exports),
+        time.perf_counter() - started_at,
+        peak_memory / (1024 * 1024),
     )
+    return peak_memory
+
+
+def get_decoded_size(image: Image.Image) -> int:
+    """Estimates how many bytes the decoded pixels of the given image use.
+    Pillow stores every pixel of a multi-band image in 4 bytes.
+    """
+    if image.mode in ("1", "L", "P"):
+        return image.width * image.height
+    if image.mode.startswith("I;16"):
+        return image.width * image.height * 2
+    return image.width * image.height * 4
+
+
+def encode_image(image: Image.Image, targets: List[Tuple[str, str, dict]]) -> None:
+    """Synchronously saves the given image to each of the given files. The
+    files are saved one at a time, since saving stores the formatter arguments
+    on the image.
+
+    Args:
+        image (Image.Image): The processed image to save
+        targets (list[tuple[str, str, dict]]): The files to save to, as
+            (destination file, format, formatter keyword arguments)
+    """
+    for dst_file, format, formatter_kwargs in targets:
+        logger.debug("Exporting to {}", dst_file)
+        makedirs_safely(os.path.dirname(dst_file))
+        now = time.perf_counter()
+        image.save(dst_file, format=format, **formatter_kwargs)
+        time_taken = time.perf_counter() - now
+        logger.debug("Exported to {} in {:.3f}s", dst_file, time_taken)
+
+
+def search_exports(
+    image: Image.Image,
+    candidates: List[Tuple[ImageFormat, str, ImageExport, str]],
+    choice_hints: Dict[str, str],
+) -> None:
+    """Saves the given image in only those exports which might be preferred
+    within their format, leaving just the preferred export of each format.
+
+    Within each format, the export in the choice hints is tried first, then the
+    rest in descending order of preference. Once an export has been saved, a
+    later export is skipped if it would not be preferred even at the minimum
+    unit size of the format, which is exact, or if it would not be preferred
+    even at ESTIMATE_MARGIN of its size as estimated from a trial encode of a
+    downsampled copy of the image, which is only an estimate.
+
+    Args:
+        image (Image.Image): The processed image to save
+        candidates (list[tuple[ImageFormat, str, ImageExport, str]]): The
+            applicable exports, as (format, export name, export, destination
+            file)
+        choice_hints (dict[str, str]): The export to try first by format name
+    """
+    by_format: Dict[str, List[Tuple[ImageFormat, str, ImageExport, str]]] = dict()
+    for candidate in candidates:
+        by_format.setdefault(candidate[0].name, []).append(candidate)
+
+    trial: Optional[Image.Image] = None
+    area_px2 = image.width * image.height
+    for format_name, format_candidates in by_format.items():
+        hint = choice_hints.get(format_name)
+        format_candidates.sort(key=lambda c: (c[1] != hint, -c[2].preference, c[1]))
+
+        best_export: Optional[ImageExport] = None
+        best_size: Optional[int] = None
+        best_path: Optional[str] = None
+        for (
+            format_settings,
+            export_name,
+            export_settings,
+            dst_file,
+        ) in format_candidates:
+            if best_export is not None:
+                if (
+                    compare_in_format(
+                        format_settings, best_export, best_size, export_settings, 0
+                    )
+                    <= 0
+                ):
+                    logger.debug(
+                        "Skipping {}; it cannot be preferred over {}",
+                        dst_file,
+                        best_path,
+                    )
+                    continue
 
-    if x != 0 or y != 0 or w != image.width or h != image.height:
-        image = image.crop((x, y, x + w, y + h))
+                if area_px2 >= TRIAL_MAX_AREA_PX2 * TRIAL_MIN_FACTOR:
+                    if trial is None:
+                        trial = image.resize(
+                            get_trial_size(image.width, image.height),
+                            Image.Resampling.BILINEAR,
+                        )
+                    estimated_size = estimate_encoded_size(
+                        trial, area_px2, format_name, export_settings.formatter_kwargs
+                    )
+                    if (
+                        compare_in_format(
+                            format_settings,
+                            best_export,
+                            best_size,
+                            export_settings,
+                            int(estimated_size * ESTIMATE_MARGIN),
+                        )
+                        <= 0
+                    ):
+                        logger.debug(
+                            "Skipping {}; at an estimated {} bytes it is unlikely "
+                            "to be preferred over {}",
+                            dst_file,
+                            estimated_size,
+                            best_path,
+                        )
+                        continue
+
+            encode_image(
+                image, [(dst_file, format_name, export_settings.formatter_kwargs)]
+            )
+            size = os.lstat(dst_file).st_size
+            if (
+                best_export is None
+                or compare_in_format(
+                    format_settings, best_export, best_size, export_settings, size
+                )
+                > 0
+            ):
+                if best_path is not None:
+                    os.remove(best_path)
+                best_export = export_settings
+                best_size = size
+                best_path = dst_file
+            else:
+                os.remove(dst_file)
+
+
+def get_trial_size(width: int, height: int) -> Tuple[int, int]:
+    """Determines the size of the downsampled copy of an image of the given
+    size which is used to estimate the size of its exports
+    """
+    scale = (TRIAL_MAX_AREA_PX2 / (width * height)) ** 0.5
+    return max(1, round(width * scale)), max(1, round(height * scale))
 
-    if image.width != width or image.height != height:
-        image = image.resize((width, height), Image.Resampling.LANCZOS)
 
-    logger.debug("Exporting to {}", dst_file)
-    makedirs_safely(os.path.dirname(dst_file))
-    now = time.perf_counter()
-    image.save(dst_file, format=format, **formatter_kwargs)
-    time_taken = time.perf_counter() - now
-    logger.debug("Exported to {} in {:.3f}s", dst_file, time_taken)
+def estimate_encoded_size(
+    trial: Image.Image, area_px2: int, format: str, formatter_kwargs: dict
+) -> int:
+    """Estimates the size of an image with the given area when encoded with the
+    given settings, by encoding the downsampled trial copy of it in memory and
+    scaling the result by area.
+
+    Args:
+        trial (Image.Image): The downsampled copy of the image
+        area_px2 (int): The area of the image in squared pixels
+        format (str): The format to encode in
+        formatter_kwargs (dict): The keyword arguments for the formatter
+
+    Returns:
+        int: The estimated size of the encoded image in bytes
+    """
+    buffer = io.BytesIO()
+    trial.save(buffer, format=format, **formatter_kwargs)
+    return buffer.tell() * area_px2 // (trial.width * trial.height)
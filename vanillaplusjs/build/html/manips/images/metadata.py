@@ -19,6 +19,11 @@ and convenience of testing (compared to random identifiers or hashes).
 Note that scanning naively would not work since the scan step for all files
 occurs before the build step, though it could be accomplished by writing
 empty folders during the scan step, and handling these specially.
+
+Separately, we remember which export was chosen for each format of each source
+image in the out folder (see load_choice_hints). These are only hints for
+which export to try first, so they are not tracked by the rebuilder and
+survive the source image changing.
 """
 from dataclasses import dataclass
 import dataclasses
@@ -29,10 +34,11 @@ import os
 import json
 import fasteners
 from vanillaplusjs.build.handlers.hash import calculate_hash
+from vanillaplusjs.build.hash_cache import get_hash
 from vanillaplusjs.build.html.manips.images.settings import ImageSettings
 from loguru import logger
 
-from vanillaplusjs.build.ioutil import makedirs_safely
+from vanillaplusjs.build.ioutil import makedirs_safely, replace_atomically
 
 
 @dataclass(frozen=True)
@@ -251,15 +257,14 @@ def get_target(
     if not os.path.exists(art_path):
         return None
 
-    precomputed_hash_path = os.path.join(context.out_folder, "www", relpath + ".hash")
+    precomputed_hash_path = os.path.join("out", "www", relpath + ".hash")
     try:
-        with open(precomputed_hash_path, "r") as f:
-            contents_hash = f.read()
+        contents_hash = get_hash(context, precomputed_hash_path)
     except FileNotFoundError:
         logger.debug(
             "No precomputed hash available for {} (expected at {}), calculating on demand",
             os.path.join(context.public_folder, relpath),
-            precomputed_hash_path,
+            os.path.join(context.folder, precomputed_hash_path),
         )
         contents_hash = calculate_hash(os.path.join(context.public_folder, relpath))
 
@@ -366,6 +371,62 @@ def reserve_target(
         return counter
 
 
+def choice_hints_path(context: BuildContext, relpath: str) -> str:
+    """Returns the path to the file containing the choice hints for the
+    source image at the given path relative to the public folder
+    """
+    relpath_without_ext = os.path.splitext(relpath)[0]
+    return os.path.join(
+        context.out_folder, "image_choices", relpath_without_ext + ".json"
+    )
+
+
+def load_choice_hints(context: BuildContext, relpath: str) -> Dict[str, str]:
+    """Loads which export was last chosen in each format for the source image
+    at the given path relative to the public folder, so that it can be tried
+    first when the image is exported again.
+
+    Args:
+        context (BuildContext): The build context to use.
+        relpath (str): The path to the image relative to the public folder.
+
+    Returns:
+        dict[str, str]: The name of the chosen export by format name, empty
+            if nothing has been chosen yet
+    """
+    try:
+        with open(choice_hints_path(context, relpath), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return dict()
+
+
+def store_choice_hints(
+    context: BuildContext, relpath: str, outputs: Dict[str, List[ImageTargetOutput]]
+) -> None:
+    """Remembers the export chosen for the largest output in each format of the
+    source image at the given path relative to the public folder, merged with
+    the existing hints for its other formats.
+
+    Args:
+        context (BuildContext): The build context to use.
+        relpath (str): The path to the image relative to the public folder.
+        outputs (dict[str, list[ImageTargetOutput]]): The outputs just
+            produced for a target of the image
+    """
+    hints = load_choice_hints(context, relpath)
+    for format_name, output_list in outputs.items():
+        if output_list:
+            largest = max(output_list, key=lambda o: o.width * o.height)
+            hints[format_name] = largest.choice
+
+    path = choice_hints_path(context, relpath)
+    makedirs_safely(os.path.dirname(path))
+    with replace_atomically(path) as temp_path:
+        with open(temp_path, "w") as f:
+            json.dump(hints, f)
+
+
 def get_or_reserve_target(
     context: BuildContext,
     relpath: str,
@@ -412,6 +473,8 @@ def hash_image_settings(settings: ImageSettings) -> int:
     result = overflow(result * prime + stable_hash(settings.default_format))
     result = overflow(result * prime + stable_hash(settings.maximum_resolution))
     result = overflow(result * prime + stable_hash(settings.resolution_step))
+    # the search only affects how hard we look for the preferred export, not
+    # which exports are acceptable, so it does not invalidate existing images
     return result
 
 
@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Dict, Optional
+from typing import Dict, Literal, Optional
 from vanillaplusjs.build.build_context import BuildContext
 import pytypeutils as tus
 
@@ -120,6 +120,16 @@ class ImageSettings:
     this will generate a 1x, 2x, and 3x version.
     """
 
+    search: Literal["exhaustive", "estimate"] = "exhaustive"
+    """How we find the preferred export for each size and format. With
+    "exhaustive", every applicable export is encoded and compared. With
+    "estimate", exports are tried in order of preference, and an export is
+    skipped if it could not be preferred even at the minimum unit size, or if
+    a trial encode of a downsampled copy suggests it would not be preferred.
+    This is much faster, but may occasionally choose a different export than
+    "exhaustive" would have.
+    """
+
 
 def load_image_settings(settings: dict) -> ImageSettings:
     """Loads the image settings from the given dictionary, which is typically
@@ -134,6 +144,7 @@ def load_image_settings(settings: dict) -> ImageSettings:
             settings.get("resolution_step"),
             (int, float, str, Decimal),
         ),
+        settings_search=(settings.get("search", "exhaustive"), str),
     )
 
     formats = {}
@@ -185,6 +196,7 @@ def load_image_settings(settings: dict) -> ImageSettings:
     default_format = settings["default_format"]
     maximum_resolution = settings["maximum_resolution"]
     resolution_step = Decimal(settings["resolution_step"])
+    search = settings.get("search", "exhaustive")
 
     if default_format not in formats:
         raise ValueError(f"Default format {default_format} not found in formats")
@@ -192,9 +204,13 @@ def load_image_settings(settings: dict) -> ImageSettings:
     if resolution_step <= 0:
         raise ValueError("resolution_step must be > 0")
 
+    if search not in ("exhaustive", "estimate"):
+        raise ValueError(f"search must be exhaustive or estimate, not {search}")
+
     return ImageSettings(
         formats=formats,
         default_format=default_format,
         maximum_resolution=maximum_resolution,
         resolution_step=resolution_step,
+        search=search,
     )
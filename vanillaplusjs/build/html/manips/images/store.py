@@ -0,0 +1,227 @@
+"""A content-addressed store of exported images. Each entry holds every
+output produced for one target of one source image, keyed by the hash of the
+contents of the source, the target settings, and the image settings, so that
+exporting the same image to the same target again, whether from another path
+within the project, another project, or another checkout (e.g., in CI), only
+needs to link or copy the stored files.
+
+Entries are never modified once they are published. Publishing moves a fully
+written folder into place, so an entry exists if and only if it is complete.
+Each time an entry is used its outputs file is touched, and whenever the store
+grows beyond its maximum size the least recently used entries are removed.
+"""
+from typing import Dict, List, Optional
+from vanillaplusjs.build.html.manips.images.metadata import (
+    ImageTargetOutput,
+    ImageTargetSettings,
+)
+from vanillaplusjs.build.ioutil import link_or_copy, makedirs_safely
+from loguru import logger
+import dataclasses
+import fasteners
+import hashlib
+import json
+import os
+import secrets
+import shutil
+
+
+IMAGE_STORE_VERSION = 1
+"""Incremented whenever the format of the store, or the way images are
+exported, changes
+"""
+
+
+def get_store_key(
+    contents_hash: str, target: ImageTargetSettings, settings_hash: int
+) -> str:
+    """Determines the key of the entry for the given source image and target
+
+    Args:
+        contents_hash (str): The hash of the contents of the source image
+        target (ImageTargetSettings): The settings for the target
+        settings_hash (int): The hash of the image settings, see
+            hash_image_settings
+
+    Returns:
+        str: The hex-encoded key
+    """
+    return hashlib.sha256(
+        json.dumps(
+            [
+                IMAGE_STORE_VERSION,
+                contents_hash,
+                dataclasses.asdict(target),
+                settings_hash,
+            ],
+            sort_keys=True,
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+def get_entry_path(store_folder: str, key: str) -> str:
+    """Returns the folder for the entry with the given key"""
+    return os.path.join(store_folder, key[:2], key)
+
+
+def fetch(
+    store_folder: str, key: str, dst_folder: str
+) -> Optional[Dict[str, List[ImageTargetOutput]]]:
+    """Links or copies the outputs stored for the given key into the given
+    folder, if they are stored, and marks the entry as recently used.
+
+    Args:
+        store_folder (str): The folder containing the store
+        key (str): The key of the entry, see get_store_key
+        dst_folder (str): The folder to place the outputs in
+
+    Returns:
+        (dict[str, list[ImageTargetOutput]], None): If the entry was stored,
+            the outputs by format, whose relpath is the name of the file
+            within dst_folder. Otherwise None, and nothing is placed.
+    """
+    entry_path = get_entry_path(store_folder, key)
+    outputs_path = os.path.join(entry_path, "outputs.json")
+    try:
+        with open(outputs_path, "r") as f:
+            outputs = load_outputs(json.load(f))
+    except FileNotFoundError:
+        return None
+
+    makedirs_safely(dst_folder)
+    placed: List[str] = []
+    try:
+        for output_list in outputs.values():
+            for output in output_list:
+                dst_path = os.path.join(dst_folder, output.relpath)
+                link_or_copy(os.path.join(entry_path, output.relpath), dst_path)
+                placed.append(dst_path)
+    except FileNotFoundError:
+        # the entry was collected while we were reading it
+        for path in placed:
+            os.remove(path)
+        return None
+
+    try:
+        os.utime(outputs_path)
+    except FileNotFoundError:
+        pass
+
+    logger.debug("Reused stored image outputs {} in {}", entry_path, dst_folder)
+    return outputs
+
+
+def publish(
+    store_folder: str,
+    key: str,
+    src_folder: str,
+    outputs: Dict[str, List[ImageTargetOutput]],
+    max_size: Optional[int] = None,
+) -> None:
+    """Stores the given outputs under the given key, unless they are already
+    stored, then removes the least recently used entries if the store is
+    larger than max_size.
+
+    Args:
+        store_folder (str): The folder containing the store
+        key (str): The key of the entry, see get_store_key
+        src_folder (str): The folder containing the outputs
+        outputs (dict[str, list[ImageTargetOutput]]): The outputs by format,
+            whose relpath is the name of the file within src_folder
+        max_size (int, None): The maximum size of the store in bytes, or None
+            for no limit
+    """
+    entry_path = get_entry_path(store_folder, key)
+    if os.path.exists(entry_path):
+        return
+
+    temp_path = os.path.join(store_folder, "tmp", secrets.token_hex(8))
+    makedirs_safely(temp_path)
+    try:
+        for output_list in outputs.values():
+            for output in output_list:
+                link_or_copy(
+                    os.path.join(src_folder, output.relpath),
+                    os.path.join(temp_path, output.relpath),
+                )
+        with open(os.path.join(temp_path, "outputs.json"), "w") as f:
+            json.dump(store_outputs(outputs), f)
+
+        makedirs_safely(os.path.dirname(entry_path))
+        try:
+            os.rename(temp_path, entry_path)
+        except OSError:
+            if not os.path.exists(entry_path):
+                raise
+            # published concurrently by another worker or project
+    finally:
+        shutil.rmtree(temp_path, ignore_errors=True)
+
+    logger.debug("Stored image outputs from {} in {}", src_folder, entry_path)
+    if max_size is not None:
+        collect_garbage(store_folder, max_size)
+
+
+def collect_garbage(store_folder: str, max_size: int) -> None:
+    """Removes the least recently used entries from the store until it is no
+    larger than the given size.
+
+    Args:
+        store_folder (str): The folder containing the store
+        max_size (int): The maximum size of the store in bytes
+    """
+    makedirs_safely(store_folder)
+    with fasteners.InterProcessLock(os.path.join(store_folder, "gc.lock")):
+        entries = []
+        total_size = 0
+        for prefix in os.scandir(store_folder):
+            if len(prefix.name) != 2 or not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                try:
+                    last_used = os.stat(
+                        os.path.join(entry.path, "outputs.json")
+                    ).st_mtime
+                    size = sum(
+                        child.stat().st_size
+                        for child in os.scandir(entry.path)
+                        if child.is_file()
+                    )
+                except FileNotFoundError:
+                    continue
+                entries.append((last_used, size, entry.path))
+                total_size += size
+
+        if total_size <= max_size:
+            return
+
+        entries.sort()
+        for _, size, entry_path in entries:
+            if total_size <= max_size:
+                break
+            logger.debug("Removing least recently used stored image {}", entry_path)
+            # moved aside first so it disappears from the store all at once
+            trash_path = os.path.join(store_folder, "tmp", secrets.token_hex(8))
+            makedirs_safely(os.path.dirname(trash_path))
+            try:
+                os.rename(entry_path, trash_path)
+            except FileNotFoundError:
+                continue
+            shutil.rmtree(trash_path, ignore_errors=True)
+            total_size -= size
+
+
+def store_outputs(outputs: Dict[str, List[ImageTargetOutput]]) -> dict:
+    """Converts the outputs of an entry to a JSON-serializable dict"""
+    return dict(
+        (format, [dataclasses.asdict(output) for output in output_list])
+        for format, output_list in outputs.items()
+    )
+
+
+def load_outputs(serd: dict) -> Dict[str, List[ImageTargetOutput]]:
+    """Loads the outputs of an entry from a JSON serialized dict"""
+    return dict(
+        (format, [ImageTargetOutput(**output) for output in output_list])
+        for format, output_list in serd.items()
+    )
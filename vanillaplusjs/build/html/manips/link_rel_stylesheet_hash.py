@@ -4,6 +4,7 @@ from vanillaplusjs.build.scan_file_result import ScanFileResult
 from vanillaplusjs.build.html.manipulator import HTMLManipulator
 import vanillaplusjs.build.html.token as tkn
 from vanillaplusjs.build.build_context import BuildContext
+from vanillaplusjs.build.hash_cache import get_hash
 import os
 from vanillaplusjs.constants import PROCESSOR_VERSION
 from urllib.parse import urlencode
@@ -62,11 +63,7 @@ class LinkRelStylesheetHash(HTMLManipulator):
         dep_with_os_sep = dep.replace("/", os.path.sep)
         rel_to_out = os.path.join("out", "www", dep_with_os_sep)
 
-        expected_hash_loc = os.path.join(self.context.folder, rel_to_out + ".hash")
-        assert os.path.exists(expected_hash_loc), expected_hash_loc + " should exist"
-
-        with open(expected_hash_loc, "r") as f:
-            hash = f.read().strip()
+        hash = get_hash(self.context, rel_to_out + ".hash")
 
         return [
             tkn.HTMLToken(
@@ -1,14 +1,12 @@
-import errno
 from typing import Dict, List, Literal, Optional, Set
 from vanillaplusjs.build.build_context import BuildContext
 from vanillaplusjs.build.build_file_result import BuildFileResult
+from vanillaplusjs.build.hash_cache import get_hash
 from vanillaplusjs.build.html.manipulator import HTMLManipulator
 import vanillaplusjs.build.html.token as tkn
-from vanillaplusjs.build.handlers.handler import Handler
+from vanillaplusjs.build.handlers.handler import SourceHandler
 import os
-import io
 from urllib.parse import urlencode
-from vanillaplusjs.build.ioutil import makedirs_safely
 from vanillaplusjs.build.scan_file_result import ScanFileResult
 from vanillaplusjs.constants import PROCESSOR_VERSION
 
@@ -20,7 +18,8 @@ class OutlineManipulator(HTMLManipulator):
     respectively.
 
     The newly generated file will go through standard javascript and
-    css processing.
+    css processing. The contents are passed to the handler directly, so the
+    generated source file is never actually written to the src folder.
     """
 
     def __init__(
@@ -28,8 +27,8 @@ class OutlineManipulator(HTMLManipulator):
         context: BuildContext,
         relpath: str,
         mode: Literal["scan", "build"],
-        js_handler: Handler,
-        css_handler: Handler,
+        js_handler: SourceHandler,
+        css_handler: SourceHandler,
     ) -> None:
         self.context = context
         self.relpath = relpath
@@ -63,8 +62,10 @@ class OutlineManipulator(HTMLManipulator):
 
         self.outlining: Optional[Literal["script", "style"]] = None
         self.outlining_to_path: Optional[str] = None
-        """Relative to project root"""
-        self.outlining_to: Optional[io.TextIOBase] = None
+        """Relative to project root. The file does not exist; it's where the
+        outlined source would be if it were in the src folder"""
+        self.outlining_parts: Optional[List[str]] = None
+        """The contents of the tag we are outlining so far"""
         self.start_tag_attrs: Optional[Dict[str, str]] = None
         """The attributes to preserve on the start tag"""
 
@@ -78,36 +79,24 @@ class OutlineManipulator(HTMLManipulator):
         if self.outlining is None:
             if self._should_outline_script(node):
                 self.outlining = "script"
-                if self.script_outline_count == 0:
-                    makedirs_safely(
-                        os.path.join(self.context.folder, self.script_src_folder)
-                    )
                 self.script_outline_count += 1
                 self.outlining_to_path = os.path.join(
                     self.script_src_folder,
                     f"{self.script_outline_count}.js",
                 )
-                self.outlining_to = open(
-                    os.path.join(self.context.folder, self.outlining_to_path), "w"
-                )
+                self.outlining_parts = []
                 self.start_tag_attrs = dict(
                     (key, val) for (_, key), val in node["data"].items()
                 )
                 return None
             if self._should_outline_style(node):
                 self.outlining = "style"
-                if self.style_outline_count == 0:
-                    makedirs_safely(
-                        os.path.join(self.context.folder, self.style_src_folder)
-                    )
                 self.style_outline_count += 1
                 self.outlining_to_path = os.path.join(
                     self.style_src_folder,
                     f"{self.style_outline_count}.css",
                 )
-                self.outlining_to = open(
-                    os.path.join(self.context.folder, self.outlining_to_path), "w"
-                )
+                self.outlining_parts = []
                 self.start_tag_attrs = dict(
                     (key, val) for (_, key), val in node["data"]
                 )
@@ -116,36 +105,26 @@ class OutlineManipulator(HTMLManipulator):
             raise ValueError(f"Unexpected tag {node}")
 
         if node["type"] == "EndTag":
-            self.outlining_to.close()
-            self.outlining_to = None
+            source = "".join(self.outlining_parts)
+            self.outlining_parts = None
 
             handler = (
                 self.js_handler if self.outlining == "script" else self.css_handler
             )
             if self.mode == "scan":
-                scan_result = handler.scan_file(self.context, self.outlining_to_path)
+                scan_result = handler.scan_file(
+                    self.context, self.outlining_to_path, source=source
+                )
                 self.dependencies.update(scan_result.dependencies)
                 self.produces.update(scan_result.produces)
             else:
-                build_result = handler.build_file(self.context, self.outlining_to_path)
+                build_result = handler.build_file(
+                    self.context, self.outlining_to_path, source=source
+                )
                 self.children.update(build_result.children)
                 self.produced.update(build_result.produced)
                 self.reused.update(build_result.reused)
 
-            os.remove(os.path.join(self.context.folder, self.outlining_to_path))
-            possibly_empty_folder: str = os.path.dirname(self.outlining_to_path)
-
-            while possibly_empty_folder.count(os.path.sep) > 2:
-                try:
-                    os.rmdir(os.path.join(self.context.folder, possibly_empty_folder))
-                except (FileNotFoundError, PermissionError):
-                    break  # Scanning can happen concurrently
-                except OSError as e:
-                    if e.errno == errno.ENOTEMPTY:
-                        break
-                    raise
-                possibly_empty_folder = os.path.dirname(possibly_empty_folder)
-
             result_tag_attr = "src" if self.outlining == "script" else "href"
 
             start_tag_attrs = self.start_tag_attrs
@@ -158,21 +137,18 @@ class OutlineManipulator(HTMLManipulator):
             if self.mode == "scan":
                 target_path += "?v=tmp&pv=1"
             else:
-                out_path = (
+                out_relpath = (
                     os.path.join(
-                        self.context.folder,
                         self.script_out_folder,
                         f"{self.script_outline_count}.js",
                     )
                     if self.outlining == "script"
                     else os.path.join(
-                        self.context.folder,
                         self.style_out_folder,
                         f"{self.style_outline_count}.css",
                     )
                 )
-                with open(out_path + ".hash", "r") as f:
-                    target_hash = f.read()
+                target_hash = get_hash(self.context, out_relpath + ".hash")
                 target_path += "?" + urlencode(
                     {"v": target_hash, "pv": PROCESSOR_VERSION}
                 )
@@ -200,7 +176,7 @@ class OutlineManipulator(HTMLManipulator):
             return result
 
         assert node["type"] in ("Characters", "SpaceCharacters"), node
-        self.outlining_to.write(node["data"])
+        self.outlining_parts.append(node["data"])
         return None
 
     def _should_outline_script(self, node: tkn.HTMLToken) -> bool:
@@ -5,7 +5,9 @@ import vanillaplusjs.build.html.token as tkn
 from vanillaplusjs.build.build_context import BuildContext
 from vanillaplusjs.build.html.manipulator import HTMLManipulator
 from vanillaplusjs.build.scan_file_result import ScanFileResult
-from vanillaplusjs.build.html.tokenizer import tokenize
+from vanillaplusjs.build.html.manipulate_and_serialize import tokenize_file
+from vanillaplusjs.build.token_cache import get_tokens
+import functools
 import re
 import json
 import os
@@ -146,9 +148,18 @@ class TemplateManipulator(HTMLManipulator):
                     type="Comment", data=f"[STACK: {json.dumps(['define', key, val])}]"
                 )
             )
-        with open(os.path.join(self.context.folder, imp.relpath), "r") as f:
-            tokens = list(tokenize(f, fragment=True))
-            result.extend(tokens)
+        # partials are typically included by many pages, so their tokens are
+        # shared via the token cache rather than parsed for every include
+        result.extend(
+            get_tokens(
+                self.context,
+                imp.relpath,
+                f"html-fragment-{self.context.html_tokenizer}",
+                functools.partial(
+                    tokenize_file, engine=self.context.html_tokenizer, fragment=True
+                ),
+            )
+        )
         result.append(
             tkn.HTMLToken(type="Comment", data=f"[STACK: {json.dumps(['pop'])}]")
         )
@@ -1,42 +1,116 @@
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional
 
-from vanillaplusjs.build.ioutil import makedirs_safely
+from loguru import logger
+from vanillaplusjs.build.ioutil import makedirs_safely, replace_atomically
 from .manipulator import HTMLManipulator
 from .builder import HTMLBuilder
+from .token import HTMLToken
 from .tokenizer import tokenize
 import html5lib
 import os
 
 
+OUTPUT_BUFFER_SIZE = 64 * 1024
+"""The most serialized bytes which are buffered before being written"""
+
+
+def tokenize_file(
+    infile: str, engine: str = "html5lib", fragment: bool = False
+) -> List[HTMLToken]:
+    """Tokenizes the given HTML file using the given engine, which is one of
+    HTML_TOKENIZER_ENGINES. If fragment is True the file is tokenized as a
+    fragment of a document, e.g., a partial, rather than a whole document.
+
+    Raises:
+        ValueError: If the file is not valid HTML
+    """
+    return list(iter_tokenize_file(infile, engine=engine, fragment=fragment))
+
+
+def iter_tokenize_file(
+    infile: str, engine: str = "html5lib", fragment: bool = False
+) -> Iterator[HTMLToken]:
+    """Same as tokenize_file, except the tokens are yielded as they are
+    produced, keeping the file open until they have all been consumed
+
+    Raises:
+        ValueError: If the file is not valid HTML
+    """
+    with open(infile, "r") as f:
+        try:
+            yield from tokenize(f, fragment=fragment, engine=engine)
+        except html5lib.html5parser.ParseError:
+            raise ValueError(f"{infile} is not a valid HTML file")
+
+
 def manipulate_and_serialize(
-    infile: str, outfile: Optional[str], manipulators: List[HTMLManipulator]
+    infile: str,
+    outfile: Optional[str],
+    manipulators: List[HTMLManipulator],
+    tokens: Optional[Iterable[HTMLToken]] = None,
 ) -> None:
     """Tokenizes the given HTML file, applies the given manipulators to it,
     and writes the resulting tokens to the given file. If the outfile is None,
     this will not output anything, but will still tokenize the file and send
     it to the manipulators as if it were going to, which is useful if the
     manipulators have side-effects.
+
+    If the tokens of the file are already known (e.g., from the token cache),
+    they can be specified to avoid tokenizing the file again. They may be a
+    generator, in which case they are consumed as they are produced.
+
+    The output is serialized as soon as it is produced, i.e., whenever no
+    manipulator is holding onto tokens, so only the tokens held by a
+    manipulator and OUTPUT_BUFFER_SIZE bytes of output are buffered at a time.
+    It is written to a temporary file which replaces the outfile once it is
+    complete, so if a manipulator raises the outfile is left as it was.
     """
     builder = HTMLBuilder(manipulators)
 
-    with open(infile, "r") as f:
-        try:
-            for token in tokenize(f):
-                builder.handle_token(token)
-        except html5lib.html5parser.ParseError:
-            raise ValueError(f"{infile} is not a valid HTML file")
+    if tokens is None:
+        tokens = iter_tokenize_file(infile)
 
     if outfile is None:
+        for token in tokens:
+            builder.handle_token(token)
+            builder.consume_tokens()
         return
 
     makedirs_safely(os.path.dirname(outfile))
 
-    output_tokens = builder.consume_tokens()
     serializer = html5lib.serializer.HTMLSerializer(
         omit_optional_tags=False, quote_attr_values="always"
     )
 
-    with open(outfile, "wb") as f:
-        for block in serializer.serialize(output_tokens, encoding="utf-8"):
-            f.write(block)
-        f.write(bytes(os.linesep, encoding="utf-8"))
+    with replace_atomically(outfile) as temp_path:
+        with open(temp_path, "wb") as f:
+            pending: List[bytes] = []
+            pending_size = 0
+            for block in serializer.serialize(
+                _stream_output(builder, tokens), encoding="utf-8"
+            ):
+                pending.append(block)
+                pending_size += len(block)
+                if pending_size >= OUTPUT_BUFFER_SIZE:
+                    f.write(b"".join(pending))
+                    pending = []
+                    pending_size = 0
+            pending.append(bytes(os.linesep, encoding="utf-8"))
+            f.write(b"".join(pending))
+
+    logger.debug(
+        "Serialized {} with at most {} buffered tokens",
+        outfile,
+        builder.peak_buffered_tokens,
+    )
+
+
+def _stream_output(
+    builder: HTMLBuilder, tokens: Iterable[HTMLToken]
+) -> Iterator[HTMLToken]:
+    """Feeds the given tokens to the builder, yielding its output as soon as
+    it is available
+    """
+    for token in tokens:
+        builder.handle_token(token)
+        yield from builder.consume_tokens()
@@ -0,0 +1,762 @@
+"""A fast html tokenizer which produces the same tokens as parsing the document
+with html5lib and walking the resulting DOM, without building the DOM.
+
+The markup is scanned with regular expressions and the tree construction rules
+are only followed as far as they apply to well-formed documents: elements are
+either void or explicitly closed in the order they were opened, and the
+optional html, head, and body tags may be omitted. Whenever the document uses
+markup that html5lib would have to repair (misnested or missing end tags,
+tables, foreign content, unusual character references, etc.) this raises
+UnsupportedHTMLError, and the caller should tokenize the document with html5lib
+instead.
+
+Text is split into nodes exactly where html5lib's tokenizer splits it, since
+the DOM keeps one text node per character token and the walker splits the
+leading and trailing whitespace of each text node into separate tokens.
+"""
+from typing import Dict, List, Optional, Tuple
+from .token import HTMLToken
+import html5lib.constants
+import html5lib.treewalkers.base
+import re
+
+
+class UnsupportedHTMLError(Exception):
+    """Raised when the document contains markup which this tokenizer does
+    not handle the same way as html5lib.
+    """
+
+
+SPACE_CHARACTERS = "\t\n\x0c\r "
+"""The characters html considers whitespace"""
+
+_SPACE_CHARACTERS_SET = frozenset(SPACE_CHARACTERS)
+
+WALKER_VOID_ELEMENTS = frozenset(html5lib.treewalkers.base.voidElements)
+"""The elements the tree walker emits as EmptyTag tokens"""
+
+VOID_ELEMENTS = frozenset(
+    (
+        "area",
+        "base",
+        "br",
+        "command",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "keygen",
+        "link",
+        "meta",
+        "param",
+        "source",
+        "track",
+        "wbr",
+    )
+)
+"""The elements the parser closes as soon as they are opened"""
+
+SPECIAL_ELEMENTS = frozenset(
+    name
+    for (namespace, name) in html5lib.constants.specialElements
+    if namespace == html5lib.constants.namespaces["html"]
+)
+"""The elements with special parsing rules"""
+
+FORMATTING_ELEMENTS = frozenset(
+    (
+        "a",
+        "b",
+        "big",
+        "code",
+        "em",
+        "font",
+        "i",
+        "nobr",
+        "s",
+        "small",
+        "strike",
+        "strong",
+        "tt",
+        "u",
+    )
+)
+"""The elements which are tracked in the list of active formatting elements"""
+
+MARKER_ELEMENTS = frozenset(("applet", "marquee", "object"))
+"""The elements which add a marker to the list of active formatting elements"""
+
+HEADING_ELEMENTS = frozenset(("h1", "h2", "h3", "h4", "h5", "h6"))
+
+CLOSES_P_ELEMENTS = frozenset(
+    (
+        "address",
+        "article",
+        "aside",
+        "blockquote",
+        "center",
+        "details",
+        "dir",
+        "div",
+        "dl",
+        "fieldset",
+        "figcaption",
+        "figure",
+        "footer",
+        "header",
+        "hgroup",
+        "main",
+        "menu",
+        "nav",
+        "ol",
+        "p",
+        "section",
+        "summary",
+        "ul",
+        "pre",
+        "listing",
+        "form",
+        "li",
+        "dd",
+        "dt",
+        "hr",
+        "xmp",
+    )
+).union(HEADING_ELEMENTS)
+"""The start tags which close an open p element"""
+
+RAWTEXT_ELEMENTS = frozenset(("style", "xmp", "iframe", "noembed", "noframes"))
+"""The elements whose contents are text without character references"""
+
+RCDATA_ELEMENTS = frozenset(("title", "textarea"))
+"""The elements whose contents are text with character references"""
+
+DROP_NEWLINE_ELEMENTS = frozenset(("pre", "listing", "textarea"))
+"""The elements which ignore a newline immediately after their start tag"""
+
+UNSUPPORTED_START_TAGS = frozenset(
+    (
+        "basefont",
+        "bgsound",
+        "body",
+        "caption",
+        "col",
+        "colgroup",
+        "frame",
+        "frameset",
+        "head",
+        "html",
+        "image",
+        "isindex",
+        "math",
+        "noscript",
+        "optgroup",
+        "option",
+        "plaintext",
+        "rp",
+        "rt",
+        "select",
+        "svg",
+        "table",
+        "tbody",
+        "td",
+        "tfoot",
+        "th",
+        "thead",
+        "tr",
+    )
+)
+"""The start tags which are only supported as the optional html, head, and
+body tags of a document, if at all
+"""
+
+HEAD_VOID_ELEMENTS = frozenset(("base", "command", "link", "meta"))
+HEAD_ELEMENTS = HEAD_VOID_ELEMENTS.union(("title", "style", "noframes", "script"))
+"""The start tags which are handled by the rules for the head"""
+
+_MARKER = None
+"""The marker within the list of active formatting elements"""
+
+_ASCII_LOWER = str.maketrans(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"
+)
+
+_SPACE_RUN = re.compile(r"[\t\n\x0c\r ]+")
+_TEXT = re.compile(r"[^&<]+")
+_RAW_TEXT = re.compile(r"[^<]+")
+_LETTERS = re.compile(r"[A-Za-z]+")
+_START_TAG = re.compile(r"<([A-Za-z][^\t\n\x0c\r />]*)")
+_ATTRIBUTE = re.compile(
+    r"[\t\n\x0c\r ]+([^\t\n\x0c\r /=>\"'<]+)"
+    r"(?:[\t\n\x0c\r ]*=[\t\n\x0c\r ]*"
+    r"(?:\"([^\"]*)\"|'([^']*)'|([^\t\n\x0c\r >\"'<=`]+)))?"
+)
+_TAG_CLOSE = re.compile(r"[\t\n\x0c\r ]*(/?)>")
+_END_TAG = re.compile(r"</([A-Za-z][^\t\n\x0c\r />]*)[\t\n\x0c\r ]*>")
+_END_TAG_CLOSE = re.compile(r"[\t\n\x0c\r ]*>")
+_DOCTYPE = re.compile(r"<!doctype[\t\n\x0c\r ]+html[\t\n\x0c\r ]*>", re.IGNORECASE)
+_DIGITS = re.compile(r"[0-9]+")
+_HEX_DIGITS = re.compile(r"[0-9a-fA-F]+")
+_ENTITY_NAME_CONTINUES = re.compile(r"[A-Za-z0-9=]")
+
+_ENTITY_PREFIXES = frozenset(
+    name[:length]
+    for name in html5lib.constants.entities
+    for length in range(1, len(name) + 1)
+)
+"""Every string which the name of a named character reference starts with"""
+
+
+def tokenize(text: str, fragment: bool = False) -> List[HTMLToken]:
+    """Tokenizes the given html, producing the same tokens as walking the DOM
+    that html5lib would build for it.
+
+    Args:
+        text (str): The html to tokenize
+        fragment (bool): Whether or not this is a fragment of HTML rather than
+            a full document.
+
+    Returns:
+        list[HTMLToken]: The tokens in the html
+
+    Raises:
+        UnsupportedHTMLError: If the html uses markup which this tokenizer
+            does not support, in which case html5lib should be used instead
+    """
+    return _Tokenizer(text, fragment).tokenize()
+
+
+class _Tokenizer:
+    """Holds the state while tokenizing a single document. The stack of open
+    elements only contains names, since each element is emitted as soon as
+    it is opened.
+    """
+
+    def __init__(self, text: str, fragment: bool) -> None:
+        if "\x00" in text:
+            raise UnsupportedHTMLError("null character")
+
+        self.text = text.replace("\r\n", "\n").replace("\r", "\n")
+        self.pos = 0
+        self.fragment = fragment
+        self.result: List[HTMLToken] = []
+
+        self.mode = "in_body" if fragment else "initial"
+        """The insertion mode, using the names from the html specification"""
+
+        self.open_elements: List[str] = ["html"] if fragment else []
+        """The names of the open elements. For fragments the html element is
+        the context, and is not part of the output.
+        """
+
+        self.active_formatting: List[Optional[Tuple[str, dict]]] = []
+        """The name and attributes of each active formatting element, or the
+        marker
+        """
+
+        self.drop_newline = False
+        """True if the next token is the first within a pre, listing, or
+        textarea element, so a leading newline is ignored
+        """
+
+        self.after_body_comments: List[HTMLToken] = []
+        """Comments after the body, which belong to the html element"""
+
+        self.after_html_comments: List[HTMLToken] = []
+        """Comments after the html element, which belong to the document"""
+
+    def tokenize(self) -> List[HTMLToken]:
+        text = self.text
+        length = len(text)
+        while self.pos < length:
+            char = text[self.pos]
+            if char == "<":
+                self.handle_markup()
+            elif char == "&":
+                (data, self.pos) = self.consume_character_reference(self.pos)
+                self.handle_text(data, data in _SPACE_CHARACTERS_SET)
+            elif char in SPACE_CHARACTERS:
+                match = _SPACE_RUN.match(text, self.pos)
+                self.pos = match.end()
+                self.handle_text(match.group(), True)
+            else:
+                match = _TEXT.match(text, self.pos)
+                self.pos = match.end()
+                self.handle_text(match.group(), False)
+
+        self.handle_eof()
+        return self.result
+
+    def handle_markup(self) -> None:
+        """Handles the markup starting with "<" at the current position"""
+        text = self.text
+        pos = self.pos
+        next_char = text[pos + 1 : pos + 2]
+
+        if next_char == "!":
+            if text.startswith("<!--", pos):
+                self.handle_comment(self.consume_comment(pos))
+                return
+            match = _DOCTYPE.match(text, pos)
+            if match is None or self.mode != "initial":
+                raise UnsupportedHTMLError("unsupported markup declaration")
+            self.pos = match.end()
+            self.result.append(
+                {"type": "Doctype", "name": "html", "publicId": None, "systemId": None}
+            )
+            self.mode = "before_html"
+            return
+
+        if next_char == "/":
+            match = _END_TAG.match(text, pos)
+            if match is None:
+                raise UnsupportedHTMLError("unsupported end tag")
+            self.pos = match.end()
+            self.handle_end_tag(match.group(1).translate(_ASCII_LOWER))
+            return
+
+        if next_char in ("?", ">"):
+            raise UnsupportedHTMLError("bogus markup")
+
+        match = _START_TAG.match(text, pos)
+        if match is None:
+            self.pos = pos + 1
+            self.handle_text("<", False)
+            return
+
+        name = match.group(1).translate(_ASCII_LOWER)
+        pos = match.end()
+        attributes: Dict[Tuple[None, str], str] = dict()
+        while True:
+            attribute = _ATTRIBUTE.match(text, pos)
+            if attribute is None:
+                break
+            pos = attribute.end()
+            if ":" in attribute.group(1):
+                raise UnsupportedHTMLError("namespaced attribute")
+            key = (None, attribute.group(1).translate(_ASCII_LOWER))
+            if key in attributes:
+                continue
+            if attribute.group(2) is not None:
+                value = self.decode_attribute(attribute.group(2), '"')
+            elif attribute.group(3) is not None:
+                value = self.decode_attribute(attribute.group(3), "'")
+            elif attribute.group(4) is not None:
+                value = self.decode_attribute(attribute.group(4), ">")
+            else:
+                value = ""
+            attributes[key] = value
+
+        close = _TAG_CLOSE.match(text, pos)
+        if close is None:
+            raise UnsupportedHTMLError("unsupported start tag")
+        self.pos = close.end()
+        self.handle_start_tag(name, attributes)
+
+    def consume_comment(self, pos: int) -> str:
+        """Consumes the comment starting at the given position, which starts
+        with <!--, and returns its contents.
+        """
+        text = self.text
+        start = pos + 4
+        if text.startswith(">", start) or text.startswith("->", start):
+            raise UnsupportedHTMLError("abruptly closed comment")
+        end = text.find("-->", start)
+        if end < 0:
+            raise UnsupportedHTMLError("unclosed comment")
+        bang = text.find("--!>", start, end + 3)
+        if 0 <= bang < end:
+            raise UnsupportedHTMLError("comment closed with --!>")
+        self.pos = end + 3
+        return text[start:end]
+
+    def consume_character_reference(
+        self, pos: int, allowed_char: Optional[str] = None, text: Optional[str] = None
+    ) -> Tuple[str, int]:
+        """Consumes the character reference starting with the "&" at the
+        given position, returning the characters it refers to and the position
+        after it. This follows html5lib, including how it handles references
+        which are missing the semicolon or do not refer to anything. If an
+        allowed character is given the reference is within an attribute value
+        which ends with that character.
+        """
+        if text is None:
+            text = self.text
+        next_char = text[pos + 1 : pos + 2]
+        if (
+            next_char == ""
+            or next_char in _SPACE_CHARACTERS_SET
+            or next_char in ("<", "&")
+            or next_char == allowed_char
+        ):
+            return ("&", pos + 1)
+
+        if next_char == "#":
+            start = pos + 2
+            is_hex = text[start : start + 1] in ("x", "X")
+            if is_hex:
+                start += 1
+            digits = (_HEX_DIGITS if is_hex else _DIGITS).match(text, start)
+            if digits is None:
+                return ("&" + text[pos + 1 : start], start)
+
+            codepoint = int(digits.group(), 16 if is_hex else 10)
+            if codepoint in html5lib.constants.replacementCharacters:
+                data = html5lib.constants.replacementCharacters[codepoint]
+            elif 0xD800 <= codepoint <= 0xDFFF or codepoint > 0x10FFFF:
+                data = "\uFFFD"
+            else:
+                data = chr(codepoint)
+            end = digits.end()
+            if text.startswith(";", end):
+                end += 1
+            return (data, end)
+
+        # the longest run of characters which could start the name of an entity
+        end = pos + 1
+        while end < len(text) and text[pos + 1 : end + 1] in _ENTITY_PREFIXES:
+            end += 1
+        candidate = text[pos + 1 : end]
+
+        for length in range(len(candidate), 0, -1):
+            name = candidate[:length]
+            if name in html5lib.constants.entities:
+                if (
+                    name[-1] != ";"
+                    and allowed_char is not None
+                    and _ENTITY_NAME_CONTINUES.match(text, pos + 1 + length)
+                ):
+                    break
+                return (html5lib.constants.entities[name] + candidate[length:], end)
+
+        return ("&" + candidate, end)
+
+    def decode_attribute(self, value: str, allowed_char: str) -> str:
+        """Replaces the character references in the given attribute value,
+        which ended with the given character.
+        """
+        if "&" not in value:
+            return value
+
+        value += allowed_char
+        parts = []
+        pos = 0
+        while True:
+            ampersand = value.find("&", pos)
+            if ampersand < 0:
+                parts.append(value[pos:-1])
+                return "".join(parts)
+            parts.append(value[pos:ampersand])
+            (data, pos) = self.consume_character_reference(
+                ampersand, allowed_char, value
+            )
+            parts.append(data)
+
+    def consume_rcdata(self, name: str, rawtext: bool, script: bool) -> None:
+        """Consumes the contents of the element with the given name whose
+        start tag was just handled, up to and including its end tag, and
+        handles the text within it. Rawtext contents do not contain character
+        references, and are not split at whitespace.
+        """
+        text = self.text
+        length = len(text)
+        pos = self.pos
+        while True:
+            if pos >= length:
+                raise UnsupportedHTMLError(f"unclosed {name}")
+
+            char = text[pos]
+            if char == "<":
+                if text.startswith("</", pos):
+                    letters = _LETTERS.match(text, pos + 2)
+                    if letters is None:
+                        self.emit_contents("</", False)
+                        pos += 2
+                        continue
+
+                    if letters.group().translate(_ASCII_LOWER) == name:
+                        close = _END_TAG_CLOSE.match(text, letters.end())
+                        if close is not None:
+                            self.pos = close.end()
+                            self.drop_newline = False
+                            self.emit_end_tag()
+                            return
+                        if text[letters.end() : letters.end() + 1] in (
+                            SPACE_CHARACTERS + "/"
+                        ):
+                            raise UnsupportedHTMLError(f"unsupported end tag {name}")
+
+                    self.emit_contents("</" + letters.group(), False)
+                    pos = letters.end()
+                    continue
+
+                if script and text.startswith("<!", pos):
+                    raise UnsupportedHTMLError("escaped script data")
+
+                self.emit_contents("<", False)
+                pos += 1
+            elif rawtext:
+                match = _RAW_TEXT.match(text, pos)
+                pos = match.end()
+                self.emit_contents(match.group(), False)
+            elif char == "&":
+                (data, pos) = self.consume_character_reference(pos)
+                self.emit_contents(data, data in _SPACE_CHARACTERS_SET)
+            elif char in SPACE_CHARACTERS:
+                match = _SPACE_RUN.match(text, pos)
+                pos = match.end()
+                self.emit_contents(match.group(), True)
+            else:
+                match = _TEXT.match(text, pos)
+                pos = match.end()
+                self.emit_contents(match.group(), False)
+
+    def emit_text(self, data: str) -> None:
+        """Emits the given text node the way the tree walker would, i.e.,
+        with leading and trailing whitespace as separate tokens
+        """
+        middle = data.lstrip(SPACE_CHARACTERS)
+        if len(middle) < len(data):
+            self.result.append(
+                {"type": "SpaceCharacters", "data": data[: len(data) - len(middle)]}
+            )
+        stripped = middle.rstrip(SPACE_CHARACTERS)
+        if stripped:
+            self.result.append({"type": "Characters", "data": stripped})
+        if len(stripped) < len(middle):
+            self.result.append(
+                {"type": "SpaceCharacters", "data": middle[len(stripped) :]}
+            )
+
+    def emit_contents(self, data: str, space: bool) -> None:
+        """Emits the given text node within the current element, where space
+        is True for nodes which html5lib tokenizes as SpaceCharacters
+        """
+        if self.drop_newline:
+            self.drop_newline = False
+            if space and data.startswith("\n"):
+                data = data[1:]
+                if not data:
+                    return
+        self.emit_text(data)
+
+    def emit_start_tag(self, name: str, attributes: dict) -> None:
+        if name in VOID_ELEMENTS:
+            if name in WALKER_VOID_ELEMENTS:
+                self.result.append(
+                    {
+                        "type": "EmptyTag",
+                        "name": name,
+                        "namespace": None,
+                        "data": attributes,
+                    }
+                )
+            else:
+                self.result.append(
+                    {
+                        "type": "StartTag",
+                        "name": name,
+                        "namespace": None,
+                        "data": attributes,
+                    }
+                )
+                self.result.append({"type": "EndTag", "name": name, "namespace": None})
+            return
+
+        self.result.append(
+            {"type": "StartTag", "name": name, "namespace": None, "data": attributes}
+        )
+        self.open_elements.append(name)
+
+    def emit_end_tag(self) -> None:
+        name = self.open_elements.pop()
+        self.result.append({"type": "EndTag", "name": name, "namespace": None})
+
+    def close_implied(self) -> None:
+        """Handles the optional tag implied by the current insertion mode, i.e.,
+        what html5lib does for anything that isn't expected in this mode
+        """
+        if self.mode == "initial":
+            self.mode = "before_html"
+        elif self.mode == "before_html":
+            self.emit_start_tag("html", dict())
+            self.mode = "before_head"
+        elif self.mode == "before_head":
+            self.emit_start_tag("head", dict())
+            self.mode = "in_head"
+        elif self.mode == "in_head":
+            self.emit_end_tag()
+            self.mode = "after_head"
+        elif self.mode == "after_head":
+            self.emit_start_tag("body", dict())
+            self.mode = "in_body"
+        else:
+            raise UnsupportedHTMLError(f"unexpected content in {self.mode}")
+
+    def handle_text(self, data: str, space: bool) -> None:
+        """Handles a single text node, where space is True for nodes which
+        html5lib tokenizes as SpaceCharacters
+        """
+        while True:
+            if self.mode == "in_body":
+                self.emit_contents(data, space)
+                return
+
+            if space:
+                if self.mode in ("initial", "before_html", "before_head"):
+                    return
+                if self.mode in ("in_head", "after_head"):
+                    self.emit_text(data)
+                    return
+                # whitespace after the body is still part of the body
+                self.emit_text(data)
+                return
+
+            self.close_implied()
+
+    def handle_comment(self, data: str) -> None:
+        token: HTMLToken = {"type": "Comment", "data": data}
+        if self.mode == "after_body":
+            self.after_body_comments.append(token)
+        elif self.mode == "after_html":
+            self.after_html_comments.append(token)
+        else:
+            self.drop_newline = False
+            self.result.append(token)
+
+    def handle_start_tag(self, name: str, attributes: dict) -> None:
+        while self.mode != "in_body":
+            if self.mode in ("after_body", "after_html"):
+                raise UnsupportedHTMLError(f"unexpected {name} in {self.mode}")
+            if name == "html":
+                if self.mode == "before_html":
+                    self.emit_start_tag(name, attributes)
+                    self.mode = "before_head"
+                    return
+                if self.mode != "initial":
+                    raise UnsupportedHTMLError(f"unexpected html in {self.mode}")
+            elif name == "head" and self.mode == "before_head":
+                self.emit_start_tag(name, attributes)
+                self.mode = "in_head"
+                return
+            elif self.mode == "in_head":
+                if name in HEAD_ELEMENTS:
+                    self.handle_element_start(name, attributes)
+                    return
+                if name in ("head", "noscript", "basefont", "bgsound"):
+                    raise UnsupportedHTMLError(f"unexpected {name} in head")
+            elif self.mode == "after_head":
+                if name == "body":
+                    self.emit_start_tag(name, attributes)
+                    self.mode = "in_body"
+                    return
+                if name in HEAD_ELEMENTS or name in ("head", "frameset"):
+                    raise UnsupportedHTMLError(f"unexpected {name} after head")
+            self.close_implied()
+
+        if name in UNSUPPORTED_START_TAGS:
+            raise UnsupportedHTMLError(f"unsupported {name}")
+
+        self.drop_newline = False
+        if name in CLOSES_P_ELEMENTS and "p" in self.open_elements:
+            raise UnsupportedHTMLError(f"{name} closes p")
+        if name in HEADING_ELEMENTS and self.open_elements[-1] in HEADING_ELEMENTS:
+            raise UnsupportedHTMLError("nested heading")
+        if name in ("li", "dd", "dt"):
+            stop_names = ("li",) if name == "li" else ("dd", "dt")
+            for open_element in reversed(self.open_elements):
+                if open_element in stop_names:
+                    raise UnsupportedHTMLError(f"{name} closes {open_element}")
+                if open_element in SPECIAL_ELEMENTS and open_element not in (
+                    "address",
+                    "div",
+                    "p",
+                ):
+                    break
+        if name in ("button", "form", "nobr") and name in self.open_elements:
+            raise UnsupportedHTMLError(f"nested {name}")
+
+        if name in FORMATTING_ELEMENTS:
+            matching = 0
+            for entry in reversed(self.active_formatting):
+                if entry is _MARKER:
+                    break
+                if name == "a" and entry[0] == "a":
+                    raise UnsupportedHTMLError("nested a")
+                if entry == (name, attributes):
+                    matching += 1
+            if matching >= 3:
+                raise UnsupportedHTMLError(f"repeated {name}")
+            self.active_formatting.append((name, attributes))
+        elif name in MARKER_ELEMENTS:
+            self.active_formatting.append(_MARKER)
+
+        self.handle_element_start(name, attributes)
+
+    def handle_element_start(self, name: str, attributes: dict) -> None:
+        """Emits the start tag of the given element and, if its contents are
+        text, the contents and end tag
+        """
+        self.emit_start_tag(name, attributes)
+        if name == "script":
+            self.consume_rcdata(name, rawtext=True, script=True)
+        elif name in RAWTEXT_ELEMENTS:
+            self.consume_rcdata(name, rawtext=True, script=False)
+        elif name in RCDATA_ELEMENTS:
+            self.drop_newline = name in DROP_NEWLINE_ELEMENTS
+            self.consume_rcdata(name, rawtext=False, script=False)
+        elif name in DROP_NEWLINE_ELEMENTS:
+            self.drop_newline = True
+
+    def handle_end_tag(self, name: str) -> None:
+        self.drop_newline = False
+        if self.mode == "in_head" and name == "head":
+            self.emit_end_tag()
+            self.mode = "after_head"
+            return
+
+        if self.mode == "after_body" and name == "html":
+            self.mode = "after_html"
+            return
+
+        if self.mode != "in_body" or not self.open_elements:
+            raise UnsupportedHTMLError(f"unexpected end tag {name} in {self.mode}")
+
+        if name in ("body", "html"):
+            if self.fragment or self.open_elements[-1] != "body":
+                raise UnsupportedHTMLError(f"unexpected end tag {name}")
+            self.mode = "after_body" if name == "body" else "after_html"
+            return
+
+        if self.open_elements[-1] != name or len(self.open_elements) < 2:
+            raise UnsupportedHTMLError(f"misnested end tag {name}")
+
+        if name in FORMATTING_ELEMENTS:
+            for idx in range(len(self.active_formatting) - 1, -1, -1):
+                entry = self.active_formatting[idx]
+                if entry is _MARKER:
+                    raise UnsupportedHTMLError(f"{name} outside of formatting scope")
+                if entry[0] == name:
+                    del self.active_formatting[idx]
+                    break
+        elif name in MARKER_ELEMENTS:
+            while self.active_formatting:
+                if self.active_formatting.pop() is _MARKER:
+                    break
+
+        self.emit_end_tag()
+
+    def handle_eof(self) -> None:
+        if self.fragment:
+            while len(self.open_elements) > 1:
+                self.emit_end_tag()
+            return
+
+        while self.mode not in ("in_body", "after_body", "after_html"):
+            self.close_implied()
+
+        while len(self.open_elements) > 1:
+            self.emit_end_tag()
+        self.result.extend(self.after_body_comments)
+        self.emit_end_tag()
+        self.result.extend(self.after_html_comments)
@@ -1,11 +1,22 @@
 import io
-from typing import Generator
+from typing import Generator, Iterator
+from loguru import logger
 from .token import HTMLToken
+from . import stream_tokenizer
 import html5lib
 
 
-def tokenize(f: io.TextIOBase, fragment=False) -> Generator[HTMLToken, None, None]:
-    """Tokenizes the given file using html5lib. This will correct certain
+HTML_TOKENIZER_ENGINES = ("html5lib", "stream")
+"""The engines which can be used to tokenize html. html5lib builds a DOM and
+walks it, whereas stream produces the same tokens directly, falling back to
+html5lib for documents it does not support.
+"""
+
+
+def tokenize(
+    f: io.TextIOBase, fragment=False, engine: str = "html5lib"
+) -> Generator[HTMLToken, None, None]:
+    """Tokenizes the given file as html5lib would. This will correct certain
     parsing issues with html5lib, such as it improperly missing the comment
     in the fragment <title><!--comment-->hi</title>
 
@@ -13,6 +24,9 @@ def tokenize(f: io.TextIOBase, fragment=False) -> Generator[HTMLToken, None, Non
         f: The file to tokenize.
         fragment: Whether or not this is a fragment of HTML rather than a
             full document.
+        engine: One of HTML_TOKENIZER_ENGINES. The stream engine reads the
+            entire file before yielding any tokens, so that if the file turns
+            out to be unsupported it can be tokenized with html5lib instead.
 
     Yields:
         HTMLToken: The tokens in the file.
@@ -23,6 +37,24 @@ def tokenize(f: io.TextIOBase, fragment=False) -> Generator[HTMLToken, None, Non
     Returns:
         None
     """
+    if engine == "stream":
+        text = f.read()
+        try:
+            tokens = stream_tokenizer.tokenize(text, fragment=fragment)
+        except stream_tokenizer.UnsupportedHTMLError as e:
+            logger.debug("Tokenizing html with html5lib: {}", e)
+            f = io.StringIO(text)
+        else:
+            yield from _fix_comments(iter(tokens))
+            return
+    elif engine != "html5lib":
+        raise ValueError(f"unknown html tokenizer engine: {engine}")
+
+    yield from _fix_comments(_walk_dom(f, fragment))
+
+
+def _walk_dom(f: io.TextIOBase, fragment: bool) -> Iterator[HTMLToken]:
+    """Parses the given file into a DOM with html5lib and walks it"""
     tb = html5lib.treebuilders.getTreeBuilder("dom")
     parser = html5lib.HTMLParser(tb, strict=False, namespaceHTMLElements=False)
     if fragment:
@@ -30,8 +62,13 @@ def tokenize(f: io.TextIOBase, fragment=False) -> Generator[HTMLToken, None, Non
     else:
         doc = parser.parse(f)
     walker = html5lib.getTreeWalker("dom")
+    return iter(walker(doc))
 
-    tokens = iter(walker(doc))
+
+def _fix_comments(tokens: Iterator[HTMLToken]) -> Generator[HTMLToken, None, None]:
+    """Converts comments which html5lib tokenized as text, e.g., within a
+    title, back into comments.
+    """
     while True:
         try:
             token = next(tokens)
@@ -2,13 +2,16 @@
 """
 
 
-from typing import Optional
+from typing import Iterator, List, Optional, Pattern, Tuple
+import contextlib
 import re
 from io import TextIOBase
 import time
 import os
 import random
 from loguru import logger
+import secrets
+import shutil
 import stat
 
 
@@ -190,6 +193,137 @@ class PreprocessedTextIO:
             attempted_peek_length = new_peek_length
 
 
+def preprocess(text: str) -> str:
+    """Performs the preprocessing described at
+    https://www.w3.org/TR/css-syntax-3/#input-preprocessing on the given text
+    all at once, i.e., what PreprocessedTextIO does as it's read.
+    """
+    return SURROGATE.sub("\uFFFD", CARRIAGE_RETURN_LIKE.sub("\n", text))
+
+
+class BufferedTextIO:
+    """Same interface as PreprocessedTextIO, except the underlying file is read
+    and preprocessed in large chunks, so that peeking and reading are just
+    slices of an already preprocessed buffer. Furthermore, this can consume
+    runs of characters matching a regular expression or up to a terminator
+    at once, which is far faster than consuming them one at a time.
+    """
+
+    def __init__(self, fp: TextIOBase, chunk_size: int = 64 * 1024) -> None:
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        """The preprocessed text which has been read from the file but which
+        may not have been consumed yet
+        """
+        self.position = 0
+        """The index within the buffer of the next character to consume"""
+        self.discarded = 0
+        """How many consumed characters have been dropped from the buffer"""
+        self.seen_eof = False
+
+    def _fill(self) -> bool:
+        """Reads and preprocesses the next chunk from the file, discarding
+        the consumed part of the buffer. Returns False if we are at the end
+        of the file, True otherwise.
+        """
+        if self.seen_eof:
+            return False
+
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.seen_eof = True
+            return False
+
+        if chunk[-1] == "\r":
+            # ensure a \r\n pair is preprocessed together
+            chunk += self.fp.read(1) or ""
+
+        if self.position > 0:
+            self.discarded += self.position
+            self.buffer = self.buffer[self.position :]
+            self.position = 0
+
+        self.buffer += preprocess(chunk)
+        return True
+
+    def tell(self) -> int:
+        """Returns how many characters of the preprocessed text have been
+        consumed so far
+        """
+        return self.discarded + self.position
+
+    def read(self, n: int = -1) -> Optional[str]:
+        """Reads and advances n characters. If n is -1, then reads all
+        remaining characters.
+
+        If we're at EOF, returns None.
+        """
+        res = self.peek(n)
+        if res is not None:
+            self.position += len(res)
+        return res
+
+    def peek(self, n: int = 1) -> Optional[str]:
+        """Returns without advancing the next n characters. If n is -1, then
+        returns all remaining characters.
+
+        If we're at EOF, returns None.
+        """
+        if n < 0:
+            while self._fill():
+                pass
+            res = self.buffer[self.position :]
+        else:
+            while len(self.buffer) - self.position < n and self._fill():
+                pass
+            res = self.buffer[self.position : self.position + n]
+        return res or None
+
+    def read_run(self, pattern: Pattern[str]) -> str:
+        """Reads and advances past as many characters as possible which match
+        the given pattern, which must match one or more characters at a time,
+        e.g., `[a-z]+`. Returns the empty string if the next character does not
+        match.
+        """
+        parts: List[str] = []
+        while self.position < len(self.buffer) or self._fill():
+            match = pattern.match(self.buffer, self.position)
+            if match is None:
+                break
+            parts.append(match.group())
+            self.position = match.end()
+            if self.position < len(self.buffer):
+                break
+        return "".join(parts)
+
+    def read_until(self, terminator: str) -> Tuple[str, bool]:
+        """Reads and advances past everything up to and including the next
+        occurrence of the given terminator.
+
+        Returns:
+            (str, bool): The characters before the terminator, and True if the
+                terminator was found, or the remaining characters and False if
+                we reached the end of the file first.
+        """
+        parts: List[str] = []
+        while True:
+            index = self.buffer.find(terminator, self.position)
+            if index >= 0:
+                parts.append(self.buffer[self.position : index])
+                self.position = index + len(terminator)
+                return "".join(parts), True
+
+            # the terminator may be split between this chunk and the next
+            keep_from = max(self.position, len(self.buffer) - len(terminator) + 1)
+            parts.append(self.buffer[self.position : keep_from])
+            self.position = keep_from
+            if not self._fill():
+                parts.append(self.buffer[self.position :])
+                self.position = len(self.buffer)
+                return "".join(parts), False
+
+
 def makedirs_safely(path: str) -> None:
     """Creates the directory at path, and all parent directories if necessary.
     This is more reliable than the standard os.makedirs when the directory may
@@ -226,3 +360,47 @@ def makedirs_safely(path: str) -> None:
             if i == 4:
                 raise
             logger.warning(f"Permission error creating {path}; attempt {i+1}/5")
+
+
+def link_or_copy(src: str, dst: str) -> None:
+    """Hard links the file at src to dst, copying it instead if they are on
+    different devices or hard links are not supported. This is only as good as
+    a copy if neither file is modified in place afterwards, e.g., because
+    both are only ever replaced.
+
+    Raises:
+        FileNotFoundError: If there is no file at src
+    """
+    try:
+        os.link(src, dst)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+@contextlib.contextmanager
+def replace_atomically(path: str) -> Iterator[str]:
+    """Yields a temporary path next to the given path to write the new file
+    to, then atomically replaces the file at the given path with it once the
+    block completes. If the block raises, the file at the given path is left
+    unchanged and the temporary file is removed. Since the temporary path is
+    unique, concurrent writers never observe each other's partial files.
+
+    Example:
+        with replace_atomically(path) as temp_path:
+            with open(temp_path, "w") as f:
+                f.write("hello")
+
+    Args:
+        path (str): The path to the file to replace
+    """
+    temp_path = f"{path}.{secrets.token_urlsafe(8)}.tmp"
+    try:
+        yield temp_path
+        os.replace(temp_path, path)
+    finally:
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
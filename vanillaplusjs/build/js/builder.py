@@ -1,3 +1,4 @@
+from collections import deque
 from typing import List, Optional
 from .manipulator import JSManipulator
 from .token import JSToken
@@ -39,9 +40,12 @@ class JSBuilder:
         tokens that result from this token are delayed, i.e., are not determined
         until a later call.
         """
-        stack = [token]
+        # replacement tokens are spliced onto the front of a deque, so that
+        # handling a manipulator which returns k tokens is O(k) regardless of
+        # how many tokens are still pending from earlier replacements
+        stack = deque((token,))
         while stack:
-            token = stack.pop(0)
+            token = stack.popleft()
             if self.mark is None:
                 for manipulator in self.manipulators:
                     if manipulator.start_mark(token):
@@ -54,5 +58,5 @@ class JSBuilder:
 
             replacement_tokens = self.mark.continue_mark(token)
             if replacement_tokens is not None:
-                stack = replacement_tokens + stack
+                stack.extendleft(reversed(replacement_tokens))
                 self.mark = None
@@ -1,6 +1,7 @@
 from typing import Generator, List, Literal, Optional, Set, Tuple, Union
 from vanillaplusjs.build.build_context import BuildContext
 from vanillaplusjs.build.build_file_result import BuildFileResult
+from vanillaplusjs.build.hash_cache import get_hash
 from vanillaplusjs.build.js.yield_manipulator import JSYieldManipulator
 from vanillaplusjs.build.js.token import JSToken, JSTokenType
 from vanillaplusjs.build.scan_file_result import ScanFileResult
@@ -114,6 +115,12 @@ class HashImportsManipulator(JSYieldManipulator):
 
         return self._handle_import(token["value"])
 
+    def get_required_prefix_length(self, source: str) -> int:
+        # every import statement (or the comment that we inserted to skip
+        # one) contains the word import, and we will mark at that token
+        last_import = source.rfind("import")
+        return 0 if last_import < 0 else last_import + len("import")
+
     def _handle_import(self, import_path: str) -> Union[Literal[False], List[JSToken]]:
         if not any(import_path.startswith(prefix) for prefix in ("/", "./", "../")):
             return self._mark_import_bad("unexpected path format")
@@ -147,14 +154,9 @@ class HashImportsManipulator(JSYieldManipulator):
 
         rel_to_public = os.path.relpath(rel_to_root, os.path.join("src", "public"))
 
-        exp_hash_file = os.path.join(
-            self.context.folder, "out", "www", rel_to_public + ".hash"
+        file_hash = get_hash(
+            self.context, os.path.join("out", "www", rel_to_public + ".hash")
         )
-        if not os.path.exists(exp_hash_file):
-            raise FileNotFoundError(exp_hash_file)
-
-        with open(exp_hash_file, "r") as f:
-            file_hash = f.read()
 
         new_import_path = (
             import_path + "?" + urlencode({"v": file_hash, "pv": PROCESSOR_VERSION})
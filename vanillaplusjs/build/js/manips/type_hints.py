@@ -1,4 +1,5 @@
 from typing import Generator, List, Literal, Union
+import re
 from vanillaplusjs.build.build_context import BuildContext
 from vanillaplusjs.build.js.serializer import serialize_many
 from vanillaplusjs.build.js.token import JSToken, JSTokenType
@@ -7,6 +8,9 @@ from vanillaplusjs.build.build_file_result import BuildFileResult
 from vanillaplusjs.build.scan_file_result import ScanFileResult
 
 
+LINE_TERMINATOR = re.compile(r"[\n\r\u2028\u2029]")
+
+
 class TypeHintsManipulator(JSYieldManipulator):
     """If a line contains a comment which, when stripped, looks like
     @@type-hint, then the entire line is commented out. This is useful for type
@@ -25,6 +29,17 @@ class TypeHintsManipulator(JSYieldManipulator):
 
         self._skip_next_line = False
 
+    def get_required_prefix_length(self, source: str) -> int:
+        if self.mode == "scan":
+            return 0
+
+        # we may change the entire line containing the last type hint
+        last_hint = source.rfind("@@type-hint")
+        if last_hint < 0:
+            return 0
+        line_end = LINE_TERMINATOR.search(source, last_hint)
+        return len(source) if line_end is None else line_end.end()
+
     def handle(
         self, token: JSToken
     ) -> Generator[None, JSToken, Union[Literal[False], List[JSToken]]]:
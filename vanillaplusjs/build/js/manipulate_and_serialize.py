@@ -1,37 +1,101 @@
-from typing import List, Optional
+from typing import Iterable, List, Optional
 
-from vanillaplusjs.build.ioutil import makedirs_safely
+from vanillaplusjs.build.ioutil import makedirs_safely, preprocess
 from .manipulator import JSManipulator
 from .builder import JSBuilder
-from .tokenizer import tokenize
+from .token import JSToken
+from .tokenizer import tokenize, tokenize_with_offsets
 from .serializer import serialize
 import os
 
 
+def tokenize_file(infile: str) -> List[JSToken]:
+    """Tokenizes the given JS file"""
+    with open(infile, "r") as f:
+        return list(tokenize(f))
+
+
 def manipulate_and_serialize(
-    infile: str, outfile: Optional[str], manipulators: List[JSManipulator]
+    infile: str,
+    outfile: Optional[str],
+    manipulators: List[JSManipulator],
+    tokens: Optional[Iterable[JSToken]] = None,
+    source: Optional[str] = None,
 ) -> None:
     """Tokenizes the given JS file, applies the given manipulators to it,
     and writes the resulting tokens to the given file. If the outfile is None,
     this will not output anything, but will still tokenize the file and send
     it to the manipulators as if it were going to, which is useful if the
     manipulators have side-effects.
+
+    If the tokens of the file are already known (e.g., from the token cache),
+    they can be specified to avoid tokenizing the file again.
+
+    Otherwise, the file (or the given source, in which case infile is not read)
+    is only tokenized until every manipulator has seen the part of it that it
+    needs, which is typically just the import statements at the top of the
+    file. The remainder is copied to the output verbatim.
     """
     builder = JSBuilder(manipulators)
 
+    if tokens is None:
+        if source is None:
+            with open(infile, "r") as f:
+                source = f.read()
+        _manipulate_and_serialize_prefix(builder, source, outfile)
+        return
+
     if outfile is None:
-        with open(infile, "r") as f:
-            for token in tokenize(f):
-                builder.handle_token(token)
+        for token in tokens:
+            builder.handle_token(token)
         return
 
     out_dir = os.path.dirname(outfile)
     if out_dir:
         makedirs_safely(out_dir)
 
-    with open(infile, "r") as f_in:
-        with open(outfile, "w", newline="\n") as f_out:
-            for in_token in tokenize(f_in):
-                builder.handle_token(in_token)
-                for out_token in builder.consume_tokens():
-                    f_out.write(serialize(out_token))
+    with open(outfile, "w", newline="\n") as f_out:
+        for in_token in tokens:
+            builder.handle_token(in_token)
+            for out_token in builder.consume_tokens():
+                f_out.write(serialize(out_token))
+
+
+def _manipulate_and_serialize_prefix(
+    builder: JSBuilder, source: str, outfile: Optional[str]
+) -> None:
+    """Passes the tokens of the given source to the builder until none of its
+    manipulators need any more tokens, then copies the rest of the source
+    verbatim. If the outfile is None, nothing is written.
+    """
+    # preprocessing up front means the tokenizer offsets line up with source
+    source = preprocess(source)
+    required = max(
+        (m.get_required_prefix_length(source) for m in builder.manipulators),
+        default=0,
+    )
+
+    f_out = None
+    if outfile is not None:
+        out_dir = os.path.dirname(outfile)
+        if out_dir:
+            makedirs_safely(out_dir)
+        f_out = open(outfile, "w", newline="\n")
+
+    try:
+        end = 0
+        if required > 0:
+            for (token, end) in tokenize_with_offsets(source):
+                builder.handle_token(token)
+                output = builder.consume_tokens()
+                if f_out is not None:
+                    for out_token in output:
+                        f_out.write(serialize(out_token))
+                if end >= required and builder.mark is None:
+                    break
+
+        if f_out is not None and end < len(source):
+            f_out.write(source[end:])
+    finally:
+        if f_out is not None:
+            f_out.close()
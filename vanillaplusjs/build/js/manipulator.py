@@ -48,3 +48,21 @@ class JSManipulator:
                 or a list of nodes to replace the marked nodes with.
         """
         return []
+
+    def get_required_prefix_length(self, source: str) -> int:
+        """Returns how much of the given source this manipulator needs to see.
+        The manipulator must not need any tokens which start at or after the
+        returned index, nor change them, so that once no manipulator is
+        marked and every manipulator has seen what it needs, the rest of
+        the source can be copied verbatim rather than tokenized.
+
+        By default the manipulator needs the entire source.
+
+        Args:
+            source (str): The javascript being manipulated
+
+        Returns:
+            int: The number of characters from the start of source which
+                this manipulator needs to see.
+        """
+        return len(source)
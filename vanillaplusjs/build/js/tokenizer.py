@@ -5,10 +5,11 @@ This only supports a subset of javascript tokens; in particular, we focus on onl
 just enough tokens that for a javascript module we can detect any import statements
 that the document starts with.
 """
-from io import TextIOBase
-from typing import Generator, Optional, Union
+from io import StringIO, TextIOBase
+from typing import Generator, Optional, Tuple, Union
 from vanillaplusjs.build.js.token import JSToken, JSTokenType, JSTokenWithExtra
-from vanillaplusjs.build.ioutil import PreprocessedTextIO, PeekableTextIO
+from vanillaplusjs.build.ioutil import BufferedTextIO
+import re
 import string
 from .unicode_derived import is_id_start, is_id_continue
 
@@ -30,9 +31,34 @@ def tokenize(fp: TextIOBase) -> Generator[Union[JSToken, JSTokenWithExtra], None
     Returns:
         None
     """
-    peekable = PreprocessedTextIO(PeekableTextIO(fp))
-    del fp
+    return _tokenize(BufferedTextIO(fp))
 
+
+def tokenize_with_offsets(
+    text: str,
+) -> Generator[Tuple[Union[JSToken, JSTokenWithExtra], int], None, None]:
+    """Tokenizes the given text, yielding each token alongside the index within
+    the text just after the token. This allows the caller to stop tokenizing
+    part way through and handle the rest of the text some other way.
+
+    The indices are within the preprocessed text, so the text should already
+    be preprocessed (see ioutil.preprocess) for them to line up.
+
+    Args:
+        text (str): The javascript to tokenize
+
+    Yields:
+        (JSToken, int): the next token and where it ends within text
+    """
+    peekable = BufferedTextIO(StringIO(text))
+    for token in _tokenize(peekable):
+        yield token, peekable.tell()
+
+
+def _tokenize(
+    peekable: BufferedTextIO,
+) -> Generator[Union[JSToken, JSTokenWithExtra], None, None]:
+    """Tokenizes the given preprocessed text; see tokenize"""
     while peeked := peekable.peek(1):
         if (ws := _consume_whitespace(peekable)) is not None:
             yield ws
@@ -101,20 +127,17 @@ def tokenize_and_close(fp: TextIOBase) -> Generator[JSToken, None, None]:
         fp.close()
 
 
-def _consume_whitespace(peekable: PeekableTextIO) -> Optional[JSToken]:
+def _consume_whitespace(peekable: BufferedTextIO) -> Optional[JSToken]:
     """Consumes as much whitespace as possible from the given peekable
     https://tc39.es/ecma262/#sec-white-space
     """
-    res = ""
-    while (peeked := peekable.peek(1)) and _is_whitespace(peeked):
-        res += peekable.read(1)
-
+    res = peekable.read_run(WHITESPACE_RUN)
     if res:
         return JSToken(type=JSTokenType.whitespace, value=res)
     return None
 
 
-def _consume_comment(peekable: PeekableTextIO) -> Optional[JSToken]:
+def _consume_comment(peekable: BufferedTextIO) -> Optional[JSToken]:
     """Consumes a comment from the given peekable, if one is present."""
     next_2 = peekable.peek(2)
     if next_2 is None or len(next_2) != 2:
@@ -131,26 +154,19 @@ def _consume_comment(peekable: PeekableTextIO) -> Optional[JSToken]:
     return None
 
 
-def _consume_single_line_comment(peekable: PeekableTextIO) -> Optional[JSToken]:
+def _consume_single_line_comment(peekable: BufferedTextIO) -> Optional[JSToken]:
     """Consumes a single-line comment from the given peekable, if one is present.
     Assumes that the starting "//" has already been consumed.
     """
-    res = ""
-    while (peeked := peekable.peek(1)) and not _is_newline(peeked):
-        res += peekable.read(1)
+    res = peekable.read_run(SINGLE_LINE_COMMENT_RUN)
     return JSToken(type=JSTokenType.comment, value=res)
 
 
-def _consume_multi_line_comment(peekable: PeekableTextIO) -> Optional[JSToken]:
+def _consume_multi_line_comment(peekable: BufferedTextIO) -> Optional[JSToken]:
     """Consumes a multi-line comment from the given peekable, if one is present.
     Assumes that the starting "/*" has already been consumed.
     """
-    res = ""
-    while (peeked := peekable.peek(2)) and peeked != "*/":
-        res += peekable.read(1)
-
-    if peeked == "*/":
-        peekable.read(2)
+    res, _ = peekable.read_until("*/")
     return JSToken(type=JSTokenType.comment, value=res)
 
 
@@ -161,9 +177,9 @@ RESERVED_IDENTIFIERS = {
 }
 
 
-def _consume_identifier(peekable: PeekableTextIO) -> Optional[JSToken]:
+def _consume_identifier(peekable: BufferedTextIO) -> Optional[JSToken]:
     """Consumes an identifier from the given peekable, if one is present."""
-    res = ""
+    res = peekable.read_run(ASCII_IDENTIFIER_RUN)
     while peeked := peekable.peek(1):
         if peeked == "\\" and _is_unicode_escape_sequence(peekable.peek(10)[1:]):
             peekable.read(1)
@@ -175,6 +191,9 @@ def _consume_identifier(peekable: PeekableTextIO) -> Optional[JSToken]:
         else:
             break
 
+        if res:
+            res += peekable.read_run(ASCII_IDENTIFIER_CONTINUE_RUN)
+
     if not res:
         return None
 
@@ -184,7 +203,7 @@ def _consume_identifier(peekable: PeekableTextIO) -> Optional[JSToken]:
     return JSToken(type=JSTokenType.identifier, value=res)
 
 
-def _consume_unicode_escape_sequence(peekable: PeekableTextIO) -> Optional[str]:
+def _consume_unicode_escape_sequence(peekable: BufferedTextIO) -> Optional[str]:
     """Consumes a unicode escape sequence from the given peekable, if one is present.
     This consumes something like 'u1234' or 'u{1234}', and does not expect to start
     on a slash. Returns the actual unicode character; returns None if theres a parse
@@ -224,13 +243,15 @@ def _consume_unicode_escape_sequence(peekable: PeekableTextIO) -> Optional[str]:
     return chr(int(res, 16))
 
 
-def _consume_string_literal(peekable: PeekableTextIO) -> JSToken:
+def _consume_string_literal(peekable: BufferedTextIO) -> JSToken:
     """Consumes a string from the given peekable, assuming that the current
     peeked character is a quote.
     """
     quote = peekable.read(1)
+    plain_run = STRING_LITERAL_RUNS[quote]
     res = ""
     while True:
+        res += peekable.read_run(plain_run)
         peeked = peekable.peek(1)
         if not peeked or _is_newline(peeked):
             return JSToken(type=JSTokenType.invalid, value=quote + res)
@@ -268,7 +289,7 @@ def _consume_string_literal(peekable: PeekableTextIO) -> JSToken:
             res += peekable.read(1)
 
 
-def _consume_regex(peekable: PeekableTextIO) -> Union[JSToken, JSTokenWithExtra]:
+def _consume_regex(peekable: BufferedTextIO) -> Union[JSToken, JSTokenWithExtra]:
     """Consumes a regular expression literal from the given peekable, assuming that
     the current peeked character is a slash.
     """
@@ -276,6 +297,7 @@ def _consume_regex(peekable: PeekableTextIO) -> Union[JSToken, JSTokenWithExtra]
     group_level = 0
     res = ""
     while True:
+        res += peekable.read_run(REGEX_RUN)
         peeked = peekable.peek(1)
         if not peeked or _is_newline(peeked):
             return JSToken(type=JSTokenType.invalid, value="/" + res)
@@ -290,12 +312,7 @@ def _consume_regex(peekable: PeekableTextIO) -> Union[JSToken, JSTokenWithExtra]
         if peeked == "[":
             group_level += 1
         res += peekable.read(1)
-    flags = ""
-    while True:
-        peeked = peekable.peek(1)
-        if peeked is None or peeked not in "igmsuyd":
-            break
-        flags += peekable.read(1)
+    flags = peekable.read_run(REGEX_FLAGS_RUN)
 
     return JSTokenWithExtra(
         type=JSTokenType.regex,
@@ -309,6 +326,54 @@ WHITESPACE_CHARACTERS = frozenset(
 )
 
 
+WHITESPACE_RUN = re.compile(
+    "[" + "".join(re.escape(ch) for ch in sorted(WHITESPACE_CHARACTERS)) + "]+"
+)
+"""Matches one or more whitespace characters"""
+
+SINGLE_LINE_COMMENT_RUN = re.compile("[^\n\u2028\u2029]+")
+"""Matches the contents of a single line comment"""
+
+ASCII_IDENTIFIER_RUN = re.compile(
+    "["
+    + "".join(re.escape(chr(i)) for i in range(128) if is_id_start(chr(i)))
+    + "]["
+    + "".join(
+        re.escape(chr(i))
+        for i in range(128)
+        if chr(i) == "$" or is_id_continue(chr(i))
+    )
+    + "]*"
+)
+"""Matches the start of an identifier which is made of ascii characters"""
+
+ASCII_IDENTIFIER_CONTINUE_RUN = re.compile(
+    "["
+    + "".join(
+        re.escape(chr(i))
+        for i in range(128)
+        if chr(i) == "$" or is_id_continue(chr(i))
+    )
+    + "]+"
+)
+"""Matches ascii characters which can continue an identifier"""
+
+STRING_LITERAL_RUNS = {
+    quote: re.compile(f"[^{quote}\\\\\n\u2028\u2029]+") for quote in "'\""
+}
+"""For each quote, matches characters within a string literal started with
+that quote which need no special handling
+"""
+
+REGEX_RUN = re.compile("[^/\\\\\\[\\]\n\u2028\u2029]+")
+"""Matches characters within a regular expression literal which need no special
+handling
+"""
+
+REGEX_FLAGS_RUN = re.compile("[igmsuyd]+")
+"""Matches the flags of a regular expression literal"""
+
+
 def _is_whitespace(char: str) -> bool:
     """Returns true if the given characters are all whitespace characters."""
     return char and all(ch in WHITESPACE_CHARACTERS for ch in char)
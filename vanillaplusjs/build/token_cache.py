@@ -0,0 +1,262 @@
+"""Caches the tokens of source files within the out folder, so that a file
+which is tokenized while scanning does not have to be tokenized again when it
+is built. Tokenizing is the most expensive part of handling html and css
+files, and the cache can be used across worker processes. Javascript files are
+only tokenized as far as their imports, so they are not cached.
+
+Each entry is keyed by the path to the file and is only used if the file still
+has the same signature as when it was tokenized. Since the tokens only depend
+on the contents of the file, an entry remains valid until the file changes,
+and is reused when the file is rebuilt because one of its dependencies changed.
+
+Recently used entries are also kept in memory, so that a file which is
+tokenized many times within the same process, such as a partial which is
+included by most pages, is only read from disk once per process.
+"""
+from collections import OrderedDict
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+from vanillaplusjs.build.build_context import BuildContext
+from vanillaplusjs.build.file_signature import get_file_signature
+from vanillaplusjs.build.ioutil import makedirs_safely, replace_atomically
+import vanillaplusjs.constants
+import hashlib
+import os
+import pickle
+import threading
+
+
+T = TypeVar("T")
+
+TOKEN_CACHE_VERSION = 1
+"""Incremented whenever the format of the token cache changes"""
+
+MAX_CACHED_FILE_SIZE = 4 * 1024 * 1024
+"""Files larger than this many bytes are tokenized without being cached"""
+
+MAX_MEMORY_CACHE_SIZE = 32 * 1024 * 1024
+"""The most bytes of serialized tokens which are kept in memory per process"""
+
+_memory_cache: "OrderedDict[str, Tuple[tuple, bytes]]" = OrderedDict()
+"""Maps from the path to a cache entry to its header and serialized tokens,
+ordered from least to most recently used
+"""
+
+_memory_cache_size = 0
+"""The total length of the serialized tokens in the memory cache"""
+
+_memory_cache_lock = threading.Lock()
+"""Protects the memory cache"""
+
+
+def get_tokens(
+    context: BuildContext,
+    relpath: str,
+    language: str,
+    tokenize_file: Callable[[str], List[T]],
+) -> List[T]:
+    """Gets the tokens for the file at the given path, using the cached tokens
+    if the file has not changed since they were stored, otherwise tokenizing
+    the file and storing the result.
+
+    Args:
+        context (BuildContext): The context for the build
+        relpath (str): The path to the file relative to the project root
+        language (str): The language of the file and how it is tokenized,
+            e.g., "html-stream", so that the same file tokenized in different
+            ways (including by different engines) has distinct entries
+        tokenize_file (Callable[[str], list]): Tokenizes the file at the given
+            path. The tokens must be picklable.
+
+    Returns:
+        list: The tokens. These are never shared with another caller, so they
+            may be mutated freely.
+    """
+    path = os.path.join(context.folder, relpath)
+    cache_path = get_token_cache_path(context, relpath, language)
+    filesize, header = _get_header(path)
+
+    tokens = _load(cache_path, header)
+    if tokens is not None:
+        return tokens
+
+    tokens = tokenize_file(path)
+    if filesize <= MAX_CACHED_FILE_SIZE:
+        _store(
+            cache_path, header, pickle.dumps(tokens, protocol=pickle.HIGHEST_PROTOCOL)
+        )
+
+    return tokens
+
+
+def stream_tokens(
+    context: BuildContext,
+    relpath: str,
+    language: str,
+    tokenize_file: Callable[[str], Iterable[T]],
+) -> Iterable[T]:
+    """Same as get_tokens, except that if the tokens are not cached they are
+    yielded as the file is tokenized rather than collected into a list first,
+    so that they can be consumed (e.g., serialized) while the file is still
+    being tokenized.
+
+    If the file is larger than MAX_CACHED_FILE_SIZE the tokens are returned
+    exactly as tokenize_file produces them. Otherwise a pickled copy of each
+    token is kept as it is yielded, and the tokens are stored once they have
+    all been consumed. Nothing is stored if they are not all consumed.
+
+    Args:
+        context (BuildContext): The context for the build
+        relpath (str): The path to the file relative to the project root
+        language (str): The language of the file and how it is tokenized
+        tokenize_file (Callable[[str], iterable]): Tokenizes the file at the
+            given path, typically as a generator. The tokens must be picklable.
+
+    Returns:
+        iterable: The tokens, which may only be iterated once. These are never
+            shared with another caller, so they may be mutated freely.
+    """
+    path = os.path.join(context.folder, relpath)
+    cache_path = get_token_cache_path(context, relpath, language)
+    filesize, header = _get_header(path)
+
+    tokens = _load(cache_path, header)
+    if tokens is not None:
+        return tokens
+
+    if filesize > MAX_CACHED_FILE_SIZE:
+        return tokenize_file(path)
+
+    return _stream_and_store(cache_path, header, tokenize_file(path))
+
+
+def _stream_and_store(
+    cache_path: str, header: tuple, tokens: Iterable[T]
+) -> Iterator[T]:
+    pickled: List[bytes] = []
+    for token in tokens:
+        # the consumer may mutate the token, so it is copied before it's yielded
+        pickled.append(pickle.dumps(token, protocol=pickle.HIGHEST_PROTOCOL))
+        yield token
+
+    _store(
+        cache_path,
+        header,
+        pickle.dumps(
+            [pickle.loads(data) for data in pickled], protocol=pickle.HIGHEST_PROTOCOL
+        ),
+    )
+
+
+def _get_header(path: str) -> Tuple[int, tuple]:
+    """Returns the size of the file at the given path and the header which
+    cache entries for it must have to be used
+    """
+    # the signature must be taken before the file is read, so that if the
+    # file changes while it's being tokenized we will not trust the tokens
+    signature = get_file_signature(path)
+    return signature.filesize, (
+        TOKEN_CACHE_VERSION,
+        vanillaplusjs.constants.PROCESSOR_VERSION,
+        signature.filesize,
+        signature.mtime,
+        signature.inode,
+    )
+
+
+def _load(cache_path: str, header: tuple) -> Optional[list]:
+    """Loads the tokens stored at the given path from memory or disk if they
+    have the given header, otherwise returns None
+    """
+    with _memory_cache_lock:
+        entry = _memory_cache.get(cache_path)
+        if entry is not None and entry[0] == header:
+            _memory_cache.move_to_end(cache_path)
+            return pickle.loads(entry[1])
+
+    try:
+        with open(cache_path, "rb") as f:
+            if pickle.load(f) == header:
+                data = f.read()
+                tokens = pickle.loads(data)
+                _remember(cache_path, header, data)
+                return tokens
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        pass
+
+    return None
+
+
+def _store(cache_path: str, header: tuple, data: bytes) -> None:
+    """Stores the given serialized tokens at the given path with the given
+    header, and remembers them in memory
+    """
+    makedirs_safely(os.path.dirname(cache_path))
+    with replace_atomically(cache_path) as temp_path:
+        with open(temp_path, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.write(data)
+    _remember(cache_path, header, data)
+
+
+def forget_tokens(context: BuildContext, relpath: str) -> None:
+    """Removes any cached tokens for the file at the given path, e.g., because
+    it has been deleted.
+
+    Args:
+        context (BuildContext): The context for the build
+        relpath (str): The path to the file relative to the project root
+    """
+    global _memory_cache_size
+
+    try:
+        languages = os.listdir(context.token_cache_folder)
+    except FileNotFoundError:
+        return
+
+    for language in languages:
+        cache_path = get_token_cache_path(context, relpath, language)
+        with _memory_cache_lock:
+            entry = _memory_cache.pop(cache_path, None)
+            if entry is not None:
+                _memory_cache_size -= len(entry[1])
+
+        try:
+            os.remove(cache_path)
+        except FileNotFoundError:
+            pass
+
+
+def get_token_cache_path(context: BuildContext, relpath: str, language: str) -> str:
+    """Gets where the cached tokens for the given file are stored
+
+    Args:
+        context (BuildContext): The context for the build
+        relpath (str): The path to the file relative to the project root
+        language (str): The language the file was tokenized as
+
+    Returns:
+        str: The path to the cache entry
+    """
+    key = hashlib.sha1(relpath.replace(os.path.sep, "/").encode("utf-8")).hexdigest()
+    return os.path.join(context.token_cache_folder, language, f"{key}.pickle")
+
+
+def _remember(cache_path: str, header: tuple, data: bytes) -> None:
+    """Stores the given serialized tokens in the memory cache, evicting the
+    least recently used entries to stay within MAX_MEMORY_CACHE_SIZE
+    """
+    global _memory_cache_size
+
+    if len(data) > MAX_MEMORY_CACHE_SIZE:
+        return
+
+    with _memory_cache_lock:
+        old_entry = _memory_cache.pop(cache_path, None)
+        if old_entry is not None:
+            _memory_cache_size -= len(old_entry[1])
+
+        _memory_cache[cache_path] = (header, data)
+        _memory_cache_size += len(data)
+        while _memory_cache_size > MAX_MEMORY_CACHE_SIZE:
+            (_, (_, evicted)) = _memory_cache.popitem(last=False)
+            _memory_cache_size -= len(evicted)
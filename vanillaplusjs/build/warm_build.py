@@ -0,0 +1,269 @@
+"""Keeps the state required to build a project in memory between builds, so
+that long-lived processes (such as the build daemon or the dev watcher) do not
+have to reload the configuration, the graphs, or the worker pool every time a
+file changes.
+"""
+from typing import Dict, List, Optional, Tuple
+from vanillaplusjs.build.build_context import (
+    BuildContext,
+    load_external_files,
+    load_js_constants,
+)
+from vanillaplusjs.build.build_graphs import BuildGraphs, load_build_graphs
+from vanillaplusjs.build.cold_incremental_rebuild import cold_incremental_rebuild
+from vanillaplusjs.build.exceptions import MissingConfigurationException
+from vanillaplusjs.build.file_signature import (
+    FileSignature,
+    get_file_signature,
+    get_optional_file_signature,
+)
+from vanillaplusjs.build.hot_incremental_rebuild import (
+    create_build_executor,
+    hot_incremental_rebuild,
+)
+from vanillaplusjs.build.html.manips.images.settings import load_image_settings
+from vanillaplusjs.build.html.tokenizer import HTML_TOKENIZER_ENGINES
+import vanillaplusjs.constants
+from concurrent.futures.process import BrokenProcessPool
+from loguru import logger
+import concurrent.futures
+import json
+import os
+
+
+def load_build_context(
+    folder: str,
+    dev: bool,
+    symlinks: bool,
+    delay_files: Optional[List[str]] = None,
+) -> BuildContext:
+    """Loads the build context for the project in the given folder from
+    its configuration file.
+
+    Args:
+        folder (str): The folder containing vanillaplusjs.json
+        dev (bool): Whether to build for development or not
+        symlinks (bool): Whether symlinks should be used when building
+        delay_files (list[str], None): Files to delay processing, for debugging
+
+    Raises:
+        MissingConfigurationException: If the configuration file is missing,
+            malformed, out of date, or there is no src folder
+
+    Returns:
+        BuildContext: The loaded build context
+    """
+    context = BuildContext(folder, dev=dev, symlinks=symlinks)
+    if not os.path.exists(context.config_file):
+        raise MissingConfigurationException("Run vanillaplusjs init first")
+
+    with open(context.config_file) as f:
+        config = json.load(f)
+
+    if not isinstance(config, dict):
+        raise MissingConfigurationException(
+            "vanillaplusjs.json should be a JSON object"
+        )
+
+    if config["version"] != vanillaplusjs.constants.CONFIGURATION_VERSION:
+        raise MissingConfigurationException(
+            "vanillaplusjs.json is out of date; please run vanillaplusjs init again"
+        )
+
+    context.host = config["host"]
+    if not os.path.exists(context.src_folder):
+        raise MissingConfigurationException("No src folder found")
+
+    context.image_settings = load_image_settings(config["images"])
+    context.auto_generate_images_js_placeholders = config[
+        "auto_generate_images_js_placeholders"
+    ]
+    context.external_files = load_external_files(config["external_files"])
+    context.js_constants = load_js_constants(config["js_constants"])
+    context.content_digests = config.get("content_digests", False)
+    context.html_tokenizer = config.get("html_tokenizer", "html5lib")
+    context.hash_manifest = config.get("hash_manifest", False)
+    image_store = config.get("image_store")
+    if image_store is not None and image_store.get("folder") is not None:
+        context.image_store_folder = os.path.join(
+            folder, os.path.expanduser(image_store["folder"])
+        )
+        context.image_store_max_size = image_store.get("max_size_bytes")
+    external_files_cache = config.get("external_files_cache")
+    if (
+        external_files_cache is not None
+        and external_files_cache.get("folder") is not None
+    ):
+        context.external_files_cache_folder = os.path.join(
+            folder, os.path.expanduser(external_files_cache["folder"])
+        )
+    if context.html_tokenizer not in HTML_TOKENIZER_ENGINES:
+        raise MissingConfigurationException(
+            "html_tokenizer must be one of {}".format(
+                ", ".join(HTML_TOKENIZER_ENGINES)
+            )
+        )
+    context.delay_files = delay_files or []
+    return context
+
+
+class WarmBuild:
+    """Holds the build context, the graphs from the most recent build, and a
+    process pool for a single project, reloading only the pieces whose inputs
+    have changed between builds.
+
+    The configuration is reloaded when vanillaplusjs.json changes, and the
+    graphs are reloaded when the files in the out folder no longer match the
+    graphs we produced (e.g., because the project was cleaned or built by
+    another process). The icon settings are loaded by the workers when they
+    are first needed, see get_icon_settings.
+
+    This is not thread-safe; callers must ensure only one build is in
+    progress at a time.
+    """
+
+    def __init__(self, folder: str, symlinks: bool) -> None:
+        self.folder = folder
+        """The project root folder"""
+
+        self.symlinks = symlinks
+        """Whether symlinks should be used when building"""
+
+        self.context: Optional[BuildContext] = None
+        """The build context, if it has been loaded"""
+
+        self.config_signature: Optional[FileSignature] = None
+        """The signature of vanillaplusjs.json when the context was loaded"""
+
+        self.graphs: Optional[BuildGraphs] = None
+        """The graphs from the most recent build, if they have been loaded"""
+
+        self.graph_signatures: Optional[Tuple[Optional[FileSignature], ...]] = None
+        """The signatures of the dependency, output, and placeholder graph files
+        and the graph journal which correspond to the graphs in memory
+        """
+
+        self.executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        """The worker pool which is reused between builds"""
+
+    def prepare(self, dev: bool, delay_files: Optional[List[str]] = None) -> None:
+        """Ensures the context and graphs are up to date with whats on disk,
+        reloading only what has changed.
+
+        Args:
+            dev (bool): Whether the next build is for development or not
+            delay_files (list[str], None): Files to delay processing, for debugging
+
+        Raises:
+            MissingConfigurationException: If the configuration cannot be loaded
+        """
+        config_file = os.path.join(self.folder, "vanillaplusjs.json")
+        try:
+            config_signature = get_file_signature(config_file)
+        except FileNotFoundError:
+            raise MissingConfigurationException("Run vanillaplusjs init first")
+
+        if self.context is None or config_signature != self.config_signature:
+            logger.debug("Loading configuration for {}", self.folder)
+            self.context = load_build_context(
+                self.folder, dev=dev, symlinks=self.symlinks
+            )
+            self.config_signature = config_signature
+
+        self.context.dev = dev
+        self.context.delay_files = delay_files or []
+
+        if self.graphs is None or self._get_graph_signatures() != self.graph_signatures:
+            logger.debug("Loading graphs for {}", self.folder)
+            self.graphs = load_build_graphs(self.context)
+            self.graph_signatures = self._get_graph_signatures()
+
+        if self.executor is None:
+            self.executor = create_build_executor()
+
+    async def cold_rebuild(
+        self, dev: bool, delay_files: Optional[List[str]] = None
+    ) -> None:
+        """Rebuilds the project, detecting what has changed by comparing
+        the signatures of the source files against the graphs in memory.
+
+        Args:
+            dev (bool): Whether to build for development or not
+            delay_files (list[str], None): Files to delay processing, for debugging
+        """
+        self.prepare(dev, delay_files)
+        try:
+            new_graphs = await cold_incremental_rebuild(
+                self.context,
+                self.graphs.dependency,
+                self.graphs.output,
+                self.graphs.placeholders,
+                executor=self.executor,
+            )
+        except BrokenProcessPool:
+            self._discard_executor()
+            raise
+        self._store_graphs(new_graphs)
+
+    async def hot_rebuild(
+        self,
+        dev: bool,
+        changed_files: Dict[str, FileSignature],
+        added_files: Dict[str, FileSignature],
+        deleted_files: List[str],
+    ) -> None:
+        """Rebuilds the project when the changed files are already known. See
+        hot_incremental_rebuild for details on the arguments.
+
+        Args:
+            dev (bool): Whether to build for development or not
+            changed_files (dict[str, FileSignature]): The files which changed
+            added_files (dict[str, FileSignature]): The files which were added
+            deleted_files (list[str]): The files which were deleted
+        """
+        self.prepare(dev)
+        try:
+            new_graphs = await hot_incremental_rebuild(
+                self.context,
+                self.graphs.dependency,
+                self.graphs.output,
+                self.graphs.placeholders,
+                changed_files,
+                added_files,
+                deleted_files,
+                executor=self.executor,
+            )
+        except BrokenProcessPool:
+            self._discard_executor()
+            raise
+        self._store_graphs(new_graphs)
+
+    def close(self) -> None:
+        """Releases the worker pool. The warm build can still be used
+        afterward, but the next build will need to start a new pool.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def _store_graphs(self, graphs: BuildGraphs) -> None:
+        self.graphs = graphs
+        self.graph_signatures = self._get_graph_signatures()
+
+    def _discard_executor(self) -> None:
+        logger.warning("Worker pool broke during the build; it will be recreated")
+        executor = self.executor
+        self.executor = None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _get_graph_signatures(self) -> Tuple[Optional[FileSignature], ...]:
+        return tuple(
+            get_optional_file_signature(path)
+            for path in (
+                self.context.dependency_graph_file,
+                self.context.output_graph_file,
+                self.context.placeholder_graph_file,
+                self.context.graph_journal_file,
+            )
+        )
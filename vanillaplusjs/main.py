@@ -5,6 +5,7 @@ import vanillaplusjs.runners.build
 import vanillaplusjs.runners.run
 import vanillaplusjs.runners.dev
 import vanillaplusjs.runners.clean
+import vanillaplusjs.runners.daemon
 import sys
 from loguru import logger
 
@@ -27,6 +28,9 @@ class Command(Enum):
     dev = "dev"
     """Builds and then runs the webserver"""
 
+    daemon = "daemon"
+    """Keeps the build warm in memory so that builds can be handed off to it"""
+
     def __str__(self):
         return self.value
 
@@ -50,6 +54,8 @@ def main():
         vanillaplusjs.runners.clean.main(subargs)
     elif opts.command == Command.dev:
         vanillaplusjs.runners.dev.main(subargs)
+    elif opts.command == Command.daemon:
+        vanillaplusjs.runners.daemon.main(subargs)
     else:
         raise ValueError("Invalid command")
 
@@ -3,18 +3,11 @@ import argparse
 from loguru import logger
 import os
 import sys
-import json
-from vanillaplusjs.build.build_context import (
-    BuildContext,
-    ExternalFile,
-    load_external_files,
-    load_js_constants,
-)
+from vanillaplusjs.build.build_graphs import load_build_graphs
 from vanillaplusjs.build.cold_incremental_rebuild import cold_incremental_rebuild
-from vanillaplusjs.build.css.manips.icons.settings import load_icon_settings
-from vanillaplusjs.build.html.manips.images.settings import load_image_settings
-import vanillaplusjs.constants
-from vanillaplusjs.build.graph import FileDependencyGraph
+from vanillaplusjs.build.daemon import request_build
+from vanillaplusjs.build.exceptions import MissingConfigurationException
+from vanillaplusjs.build.warm_build import load_build_context
 import asyncio
 
 
@@ -54,6 +47,11 @@ def main(args: Sequence[str]):
             "time sensitive"
         ),
     )
+    argparser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Build in this process even if a build daemon is running for the folder",
+    )
     args = argparser.parse_args(args)
     symlinks = None
     if args.symlinks:
@@ -61,12 +59,20 @@ def main(args: Sequence[str]):
     elif args.no_symlinks:
         symlinks = False
     build(
-        args.folder, dev=args.dev, symlinks=symlinks, delay_files=args.delay_files or []
+        args.folder,
+        dev=args.dev,
+        symlinks=symlinks,
+        delay_files=args.delay_files or [],
+        use_daemon=not args.no_daemon,
     )
 
 
 def build(
-    folder: str, dev: bool, symlinks: Optional[bool], delay_files: List[str]
+    folder: str,
+    dev: bool,
+    symlinks: Optional[bool],
+    delay_files: List[str],
+    use_daemon: bool = True,
 ) -> None:
     """Builds the static files within the given folder. The folder should
     follow the following structure:
@@ -94,85 +100,35 @@ def build(
             we use the given value.
         delay_files (List[str]): A list of files to delay processing. This is
             primarily for debugging.
+        use_daemon (bool): If True and a build daemon is running for the
+            folder, the build is handed off to the daemon, which already has
+            the configuration and graphs loaded. If symlinks is set and the
+            daemon uses a different setting, we build in this process instead.
     """
+    if use_daemon and request_build(
+        folder, dev=dev, delay_files=delay_files, symlinks=symlinks
+    ):
+        logger.info("Build daemon rebuilt {}", folder)
+        return
+
     if symlinks is None:
         symlinks = detect_symlink_support()
-    context = BuildContext(folder, dev=dev, symlinks=symlinks)
-    if not os.path.exists(context.config_file):
-        print("Run vanillaplusjs init first")
-        sys.exit(1)
-
-    with open(context.config_file) as f:
-        config = json.load(f)
-
-    if not isinstance(config, dict):
-        print("vanillaplusjs.json should be a JSON object")
-        sys.exit(1)
-
-    if config["version"] != vanillaplusjs.constants.CONFIGURATION_VERSION:
-        print("vanillaplusjs.json is out of date; please run vanillaplusjs init again")
-        sys.exit(1)
-
-    context.host = config["host"]
-    if not os.path.exists(context.src_folder):
-        print("No src folder found")
+    try:
+        context = load_build_context(
+            folder, dev=dev, symlinks=symlinks, delay_files=delay_files
+        )
+    except MissingConfigurationException as e:
+        print(e.message)
         sys.exit(1)
 
-    context.icon_settings = load_icon_settings(context)
-    context.image_settings = load_image_settings(config["images"])
-    context.auto_generate_images_js_placeholders = config[
-        "auto_generate_images_js_placeholders"
-    ]
-    context.external_files = load_external_files(config["external_files"])
-    context.js_constants = load_js_constants(config["js_constants"])
-    context.delay_files = delay_files
-
-    old_dependency_graph = FileDependencyGraph()
-    # In this graph, all the files in the graph are input files, and input
-    # file a is a parent of input file b if the outputs of a depend on b.
-    # All files are specified relative to the root folder with no leading
-    # slash; e.g., "src/public/index.html".
-
-    old_output_graph = FileDependencyGraph()
-    # In this graph, the root files are all input files, but all children
-    # are either in out/ or in artifacts/. Furthermore, the maximum depth
-    # of this graph is 1. An input file a is a parent of output file b if
-    # output file b would be produced exactly as is, so long as a is not
-    # modified. Note that a single output file may have multiple input
-    # files: for example, an image which is used in multiple places.
-
-    old_placeholders_graph = FileDependencyGraph()
-    # In this graph, all the files in the graph are input files, and input
-    # file a is a parent of input file b if file b is generated from file a.
-    # This is used when we are generating JS files in the out folder, and
-    # we want a placeholder file in the src folder containing type hints for
-    # the generated file. This augments the dependency graph: if a depends on b
-    # which is produced by c, then a depends on c.
-
-    if os.path.exists(context.dependency_graph_file):
-        logger.debug("Loading old dependency graph")
-        with open(context.dependency_graph_file) as f:
-            old_dependency_graph = FileDependencyGraph.load(f)
-        logger.debug("Loaded old dependency graph")
-
-    if os.path.exists(context.output_graph_file):
-        logger.debug("Loading old outputs graph")
-        with open(context.output_graph_file) as f:
-            old_output_graph = FileDependencyGraph.load(f)
-        logger.debug("Loaded old outputs graph")
-
-    if os.path.exists(context.placeholder_graph_file):
-        logger.debug("Loading old placeholders graph")
-        with open(context.placeholder_graph_file) as f:
-            old_placeholders_graph = FileDependencyGraph.load(f)
-        logger.debug("Loaded old placeholders graph")
+    graphs = load_build_graphs(context)
 
     loop = asyncio.new_event_loop()
     try:
         asyncio.set_event_loop(loop)
         loop.run_until_complete(
             cold_incremental_rebuild(
-                context, old_dependency_graph, old_output_graph, old_placeholders_graph
+                context, graphs.dependency, graphs.output, graphs.placeholders
             )
         )
 
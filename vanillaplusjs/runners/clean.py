@@ -3,7 +3,8 @@ import argparse
 import os
 import shutil
 import sys
-from vanillaplusjs.build.graph import FileDependencyGraph
+from vanillaplusjs.build.build_context import BuildContext
+from vanillaplusjs.build.build_graphs import load_build_graphs
 
 
 def main(args: Sequence[str]):
@@ -55,14 +56,12 @@ def clean(folder: str, placeholders: bool) -> None:
         sys.exit(1)
 
     if placeholders:
-        placeholder_graph_path = os.path.join(folder, "out", "placeholder_graph.json")
-        if os.path.exists(placeholder_graph_path):
-            with open(placeholder_graph_path, "r") as f:
-                placeholder_graph = FileDependencyGraph.load(f)
-
-            for file, node in placeholder_graph.nodes.items():
-                if node.parents:
-                    os.remove(os.path.join(folder, file))
+        placeholder_graph = load_build_graphs(
+            BuildContext(folder, dev=False, symlinks=False)
+        ).placeholders
+        for file in placeholder_graph:
+            if placeholder_graph.get_parents(file):
+                os.remove(os.path.join(folder, file))
 
     shutil.rmtree(os.path.join(folder, "out"), ignore_errors=True)
     shutil.rmtree(os.path.join(folder, "artifacts"), ignore_errors=True)
@@ -79,19 +78,15 @@ def prompt_placeholders(folder: str) -> bool:
     Returns:
         bool: The users choice, if it matters, otherwise an arbitrary value
     """
-    placeholder_graph_path = os.path.join(folder, "out", "placeholder_graph.json")
-    if not os.path.exists(placeholder_graph_path):
-        return False
-
-    with open(placeholder_graph_path, "r") as f:
-        placeholder_graph = FileDependencyGraph.load(f)
-
-    if len(placeholder_graph.nodes) == 0:
+    placeholder_graph = load_build_graphs(
+        BuildContext(folder, dev=False, symlinks=False)
+    ).placeholders
+    if len(placeholder_graph) == 0:
         return False
 
     placeholders: List[str] = []
-    for file, node in placeholder_graph.nodes.items():
-        if node.parents:
+    for file in placeholder_graph:
+        if placeholder_graph.get_parents(file):
             placeholders.append(file)
 
     if len(placeholders) == 0:
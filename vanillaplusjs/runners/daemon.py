@@ -0,0 +1,93 @@
+from typing import Optional, Sequence
+from vanillaplusjs.build.daemon import is_daemon_supported, send_request, serve
+from vanillaplusjs.build.warm_build import WarmBuild
+from .build import detect_symlink_support
+import argparse
+from loguru import logger
+import asyncio
+import os
+import sys
+
+
+def main(args: Sequence[str]):
+    argparser = argparse.ArgumentParser(
+        prog="vanillajsplus daemon",
+        description=(
+            "Runs a build daemon which keeps the configuration, dependency "
+            "graphs, and worker pool in memory, so that subsequent calls to "
+            "build are handed off to it rather than starting cold"
+        ),
+    )
+    argparser.add_argument(
+        "--folder",
+        type=str,
+        default=".",
+        help="The folder containing vanillaplusjs.json",
+    )
+    argparser.add_argument(
+        "--symlinks", action="store_true", help="Force the use of symlinks"
+    )
+    argparser.add_argument(
+        "--no-symlinks", action="store_true", help="Prevent the use of symlinks"
+    )
+    argparser.add_argument(
+        "--stop", action="store_true", help="Stops the running daemon, if any"
+    )
+    args = argparser.parse_args(args)
+
+    if args.stop:
+        stop(args.folder)
+        return
+
+    symlinks = None
+    if args.symlinks:
+        symlinks = True
+    elif args.no_symlinks:
+        symlinks = False
+    daemon(args.folder, symlinks=symlinks)
+
+
+def daemon(folder: str, symlinks: Optional[bool]) -> None:
+    """Runs the build daemon for the project in the given folder until
+    interrupted or stopped via `vanillaplusjs daemon --stop`.
+
+    Args:
+        folder (str): The folder containing vanillaplusjs.json
+        symlinks (bool, None): If None, we auto-detect symlink support. Otherwise,
+            we use the given value.
+    """
+    if not is_daemon_supported():
+        logger.warning("The build daemon requires unix socket support")
+        sys.exit(1)
+
+    if not os.path.exists(os.path.join(folder, "vanillaplusjs.json")):
+        logger.warning(
+            'vanillaplusjs.json not found. Call "vanillaplusjs init" to create it.'
+        )
+        sys.exit(1)
+
+    if symlinks is None:
+        symlinks = detect_symlink_support()
+
+    warm_build = WarmBuild(os.path.abspath(folder), symlinks=symlinks)
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve(warm_build, asyncio.Event()))
+    except KeyboardInterrupt:
+        logger.info("Shutting down daemon...")
+    finally:
+        warm_build.close()
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def stop(folder: str) -> None:
+    """Stops the build daemon for the project in the given folder, if
+    it is running.
+
+    Args:
+        folder (str): The folder containing vanillaplusjs.json
+    """
+    if send_request(folder, {"type": "shutdown"}) is None:
+        logger.info("No daemon is running for {}", folder)
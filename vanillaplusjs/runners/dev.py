@@ -1,14 +1,6 @@
 from typing import Sequence, Set
-from vanillaplusjs.build.build_context import (
-    BuildContext,
-    load_external_files,
-    load_js_constants,
-)
-from vanillaplusjs.build.css.manips.icons.settings import load_icon_settings
 from vanillaplusjs.build.file_signature import get_file_signature
-from vanillaplusjs.build.graph import FileDependencyGraph
-from vanillaplusjs.build.hot_incremental_rebuild import hot_incremental_rebuild
-from vanillaplusjs.build.html.manips.images.settings import load_image_settings
+from vanillaplusjs.build.warm_build import WarmBuild
 from .build import build, detect_symlink_support
 from .run import run_server
 import argparse
@@ -27,7 +19,6 @@ import sys
 import signal
 import threading
 import time
-import json
 import asyncio
 import shutil
 
@@ -155,6 +146,7 @@ def dev(folder: str, host: str, port: int, watch: bool, debounce: int) -> None:
             observer.stop()
             observer.join()
             logger.info("Observer stopped")
+        event_handler.warm_build.close()
     finally:
         os.chdir(abs_cwd)
 
@@ -180,6 +172,10 @@ class DevEventHandler(FileSystemEventHandler):
         """True if the last build failed and there haven't been any changes since,
         False if the last build succeeded or there have been changes since"""
 
+        self.warm_build = WarmBuild(folder, symlinks=symlinks)
+        """Keeps the configuration, graphs, and worker pool in memory between
+        rebuilds; only used from the thread calling rebuild_if_appropriate"""
+
         self.lock = threading.RLock()
         """The lock for the deleted/changed/created/last_change_at/unbuildable variables."""
 
@@ -213,37 +209,6 @@ class DevEventHandler(FileSystemEventHandler):
 
         logger.info("Rebuilding...")
 
-        context = BuildContext(self.folder, dev=True, symlinks=self.symlinks)
-
-        with open(context.config_file) as f:
-            config = json.load(f)
-
-        context.host = config["host"]
-        context.icon_settings = load_icon_settings(context)
-        context.image_settings = load_image_settings(config["images"])
-        context.auto_generate_images_js_placeholders = config[
-            "auto_generate_images_js_placeholders"
-        ]
-        context.external_files = load_external_files(config["external_files"])
-        context.js_constants = load_js_constants(config["js_constants"])
-        context.delay_files = []
-
-        old_dependency_graph = FileDependencyGraph()
-        old_output_graph = FileDependencyGraph()
-        old_placeholder_graph = FileDependencyGraph()
-
-        if os.path.exists(context.dependency_graph_file):
-            with open(context.dependency_graph_file) as f:
-                old_dependency_graph = FileDependencyGraph.load(f)
-
-        if os.path.exists(context.output_graph_file):
-            with open(context.output_graph_file) as f:
-                old_output_graph = FileDependencyGraph.load(f)
-
-        if os.path.exists(context.placeholder_graph_file):
-            with open(context.placeholder_graph_file) as f:
-                old_placeholder_graph = FileDependencyGraph.load(f)
-
         changed_files = dict(
             (os.path.relpath(file, self.folder), get_file_signature(file))
             for file in changed
@@ -272,11 +237,8 @@ class DevEventHandler(FileSystemEventHandler):
         asyncio.set_event_loop(loop)
         try:
             loop.run_until_complete(
-                hot_incremental_rebuild(
-                    context,
-                    old_dependency_graph,
-                    old_output_graph,
-                    old_placeholder_graph,
+                self.warm_build.hot_rebuild(
+                    True,
                     changed_files,
                     added_files,
                     deleted_files,
@@ -148,9 +148,18 @@ def init(folder: str, host: Optional[str] = None) -> None:
                         "default_format": "jpeg",
                         "maximum_resolution": 7,
                         "resolution_step": decimal.Decimal(0.5),
+                        "search": "estimate",
                     },
                     "auto_generate_images_js_placeholders": True,
+                    "content_digests": False,
+                    "html_tokenizer": "stream",
+                    "hash_manifest": False,
+                    "image_store": {
+                        "folder": "out/image_store",
+                        "max_size_bytes": 1024 * 1024 * 1024,
+                    },
                     "external_files": {},
+                    "external_files_cache": {"folder": "out/external_files"},
                     "js_constants": {
                         "relpath": "src/public/js/constants.js",
                         "shared": {},